@@ -2,55 +2,195 @@
 admin.py
 
 Configuração do painel administrativo Django para o sistema de reservas.
-Define as interfaces de administração para os modelos Mesa e Booking.
+Define as interfaces de administração para os modelos Mesa, Booking e RecurringBooking
+e para o horário de funcionamento (horário semanal, horários especiais e encerramentos).
+
+As listagens mostram o local (café) selecionado; a página "Locais" (/admin/api/mesa/locations/)
+apresenta o resumo de todos os locais e permite mudar de local.
 """
 
-from django.contrib import admin
-from datetime import datetime
-from .models import Mesa, Booking
-from .views import RESERVATION_DURATION
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from datetime import date, datetime, timedelta
+from .bulk import BulkMoveError, bulk_cancel, bulk_move
+from .changes import record_deletions, record_mesa_deletions
+from .events import booking_event_data, publish
+from .locations import LOCATION_COOKIE, LOCATIONS, get_location, location_database
+from .models import Mesa, Booking, RecurringBooking, Tombstone, OpeningHours, SpecialHours, Closure
+from .pagination import LargeTablePaginator
+from .allocation import RESERVATION_DURATION
+from .recurrence import RECURRENCE_WINDOW_DAYS, materialise_recurrences
+from .search import search_bookings
+from .slots import invalidate_calendar
+
+
+class MoveBookingsActionForm(ActionForm):
+    """
+    Formulário de ações da listagem de reservas.
+    
+    Acrescenta o campo da mesa de destino usado pela ação "Mover reservas selecionadas".
+    """
+    target_mesa = forms.IntegerField(required=False, min_value=1, label='Mesa de destino (ID)')
+
+
+class LocationAdminMixin:
+    """
+    Indica o local (café) atual no título das listagens do painel.
+    """
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            'title': f'{self.model._meta.verbose_name_plural.capitalize()} — {LOCATIONS[get_location()]["name"]}',
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
 
 
 @admin.register(Mesa)
-class MesaAdmin(admin.ModelAdmin):
+class MesaAdmin(LocationAdminMixin, admin.ModelAdmin):
     """
     Configuração da interface administrativa para o modelo Mesa.
     
     Permite visualização, filtragem e busca de mesas no painel admin.
     O campo 'existe_reserva' é calculado automaticamente e não pode ser editado manualmente.
+    As mesas juntáveis e as suas mesas adjacentes definem os grupos de mesas que podem ser
+    juntas para grupos grandes.
     """
-    list_display = ('id', 'lugares', 'existe_reserva')
-    list_filter = ('existe_reserva',)
+    list_display = ('id', 'lugares', 'joinable', 'existe_reserva')
+    list_filter = ('existe_reserva', 'joinable')
     search_fields = ('id',)
     readonly_fields = ('existe_reserva',)
+    filter_horizontal = ('adjacent',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    actions = ('cancel_mesa_bookings',)
     
     fieldsets = (
         ('Configuração da Mesa', {
             'fields': ('lugares',)
         }),
+        ('Mesas Juntas', {
+            'fields': ('joinable', 'adjacent'),
+            'description': 'Grupos maiores do que qualquer mesa podem ocupar mesas juntáveis e adjacentes '
+                           '(o menor conjunto livre, até 3 mesas).'
+        }),
         ('Status', {
             'fields': ('existe_reserva',),
             'description': 'Este campo é atualizado automaticamente com base nas reservas ativas.'
         }),
     )
+    
+    @admin.action(description='Cancelar todas as reservas das mesas selecionadas')
+    def cancel_mesa_bookings(self, request, queryset):
+        """
+        Cancela todas as reservas das mesas selecionadas (ex.: encerramento de uma zona).
+        
+        As reservas são removidas com um único DELETE numa transação, seguido de um
+        único recálculo do estado das mesas.
+        """
+        cancelled = bulk_cancel(Booking.objects.filter(mesa__in=queryset))
+        self.message_user(request, f'{cancelled} reserva(s) cancelada(s).', messages.SUCCESS)
+    
+    def get_urls(self):
+        urls = [
+            path('locations/', self.admin_site.admin_view(self.locations_view), name='api_mesa_locations'),
+        ]
+        return urls + super().get_urls()
+    
+    def locations_view(self, request):
+        """
+        Resumo de mesas e reservas de todos os locais, com a opção de mudar de local.
+        
+        Cada local é consultado na sua própria base de dados com duas agregações.
+        O parâmetro '?select=<local>' define o local das restantes páginas do painel
+        (cookie 'location') e regressa à listagem de mesas.
+        """
+        selected = request.GET.get('select')
+        if selected in LOCATIONS:
+            response = redirect('admin:api_mesa_changelist')
+            response.set_cookie(LOCATION_COOKIE, selected, samesite='Lax')
+            return response
+        
+        today = date.today()
+        rows = []
+        for location, config in LOCATIONS.items():
+            database = config['database']
+            mesas = Mesa.objects.using(database).aggregate(
+                mesas=Count('id'),
+                lugares=Sum('lugares', default=0),
+                ocupadas=Count('id', filter=Q(existe_reserva=True)),
+            )
+            reservas = Booking.objects.using(database).aggregate(
+                hoje=Count('id', filter=Q(date=today)),
+                pessoas_hoje=Sum('number_of_guests', filter=Q(date=today), default=0),
+                futuras=Count('id', filter=Q(date__gt=today)),
+            )
+            rows.append({'id': location, 'name': config['name'], 'current': location == get_location(), **mesas, **reservas})
+        
+        totals = {key: sum(row[key] for row in rows) for key in ('mesas', 'lugares', 'ocupadas', 'hoje', 'pessoas_hoje', 'futuras')}
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Locais',
+            'opts': self.model._meta,
+            'rows': rows,
+            'totals': totals,
+            'today': today,
+        }
+        return TemplateResponse(request, 'admin/api/locations.html', context)
+    
+    def save_model(self, request, obj, form, change):
+        """Grava a mesa e notifica as ligações em tempo real."""
+        super().save_model(request, obj, form, change)
+        publish('mesa.updated' if change else 'mesa.created', id=obj.id, lugares=obj.lugares)
+    
+    def delete_model(self, request, obj):
+        """Remove a mesa (e as suas reservas), regista a remoção e notifica as ligações em tempo real."""
+        mesa_id = obj.id
+        record_mesa_deletions([mesa_id])
+        super().delete_model(request, obj)
+        publish('mesa.deleted', id=mesa_id)
+    
+    def delete_queryset(self, request, queryset):
+        """Remove as mesas selecionadas (e as suas reservas), regista a remoção e notifica as ligações em tempo real."""
+        mesa_ids = list(queryset.values_list('id', flat=True))
+        record_mesa_deletions(mesa_ids)
+        super().delete_queryset(request, queryset)
+        for mesa_id in mesa_ids:
+            publish('mesa.deleted', id=mesa_id)
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(LocationAdminMixin, admin.ModelAdmin):
     """
     Configuração da interface administrativa para o modelo Booking (Reserva).
     
     Permite gerenciamento completo de reservas, incluindo:
     - Visualização de todas as reservas com informações detalhadas
     - Filtragem por data e mesa
-    - Busca por nome e telefone do cliente
+    - Busca por nome e telefone do cliente (índice de texto, sem acentos, ver api/search.py)
     - Cálculo automático do horário de término (end_time)
+    
+    A listagem está preparada para tabelas de grande dimensão: a mesa de cada reserva é
+    obtida no mesmo JOIN, o total de linhas é estimado acima de um limite e a paginação
+    evita OFFSET (ver LargeTablePaginator).
     """
-    list_display = ('id', 'name', 'phone', 'mesa', 'date', 'start_time', 'end_time', 'number_of_guests', 'notes')
+    list_display = ('id', 'name', 'phone', 'mesa', 'date', 'start_time', 'end_time', 'number_of_guests', 'notes', 'party')
     list_filter = ('date', 'mesa')
+    list_select_related = ('mesa',)
     search_fields = ('name', 'phone')
     date_hierarchy = 'date'
-    readonly_fields = ('end_time',)
+    readonly_fields = ('end_time', 'recurrence')
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    action_form = MoveBookingsActionForm
+    actions = ('cancel_selected_bookings', 'move_selected_bookings')
     
     fieldsets = (
         ('Informações do Cliente', {
@@ -62,11 +202,27 @@ class BookingAdmin(admin.ModelAdmin):
             'description': 'O horário de término é calculado automaticamente (início + 1h15min).'
         }),
         ('Observações', {
-            'fields': ('notes',),
-            'description': 'Informações adicionais sobre a reserva (opcional).'
+            'fields': ('notes', 'recurrence'),
+            'description': 'Informações adicionais sobre a reserva (opcional) e reserva recorrente que a gerou.'
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Pesquisa as reservas no índice de texto (api/search.py), em vez de um LIKE '%...%' sobre toda a tabela.
+        
+        Args:
+            request: Objeto HttpRequest da requisição atual.
+            queryset: Reservas da listagem (já filtradas).
+            search_term: Texto pesquisado (palavras do nome ou telefone).
+        
+        Returns:
+            tuple[QuerySet, bool]: Reservas encontradas e se podem conter duplicados (nunca).
+        """
+        if not search_term.strip():
+            return queryset, False
+        return search_bookings(queryset, search_term), False
+    
     def save_model(self, request, obj, form, change):
         """
         Sobrescreve o método de salvamento para calcular automaticamente o horário de término.
@@ -90,4 +246,170 @@ class BookingAdmin(admin.ModelAdmin):
             # Extrai apenas o componente de tempo e atribui ao end_time
             obj.end_time = end_datetime.time()
         
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+        publish('booking.updated' if change else 'booking.created', **booking_event_data(obj))
+    
+    def delete_model(self, request, obj):
+        """Remove a reserva, regista a remoção e notifica as ligações em tempo real."""
+        if obj.party:
+            # Reserva em mesas juntas: remove as reservas de todas as mesas do grupo
+            bulk_cancel(Booking.objects.filter(party=obj.party))
+            return
+        booking_id = obj.id
+        super().delete_model(request, obj)
+        record_deletions(Tombstone.BOOKING, [booking_id])
+        publish('booking.cancelled', **booking_event_data(obj))
+    
+    def delete_queryset(self, request, queryset):
+        """Remove as reservas selecionadas (ação "apagar" do admin), com registo e notificação das remoções."""
+        bulk_cancel(queryset)
+    
+    @admin.action(description='Cancelar reservas selecionadas')
+    def cancel_selected_bookings(self, request, queryset):
+        """
+        Cancela as reservas selecionadas com um único DELETE numa transação.
+        
+        Combinado com os filtros da listagem (data, mesa) e com "selecionar todas",
+        permite cancelar todas as reservas de um dia ou de uma mesa de uma só vez.
+        """
+        cancelled = bulk_cancel(queryset)
+        self.message_user(request, f'{cancelled} reserva(s) cancelada(s).', messages.SUCCESS)
+    
+    @admin.action(description='Mover reservas selecionadas para a mesa de destino')
+    def move_selected_bookings(self, request, queryset):
+        """
+        Move as reservas selecionadas para a mesa indicada no campo "Mesa de destino".
+        
+        A mudança é feita com um único UPDATE numa transação e é recusada se a mesa
+        não tiver capacidade suficiente ou se existirem conflitos de horário.
+        """
+        target_id = request.POST.get('target_mesa')
+        
+        try:
+            target_mesa = Mesa.objects.get(pk=int(target_id))
+        except (TypeError, ValueError, Mesa.DoesNotExist):
+            self.message_user(request, 'Indique o ID de uma mesa de destino válida.', messages.ERROR)
+            return
+        
+        try:
+            moved = bulk_move(queryset, target_mesa)
+        except BulkMoveError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        
+        self.message_user(request, f'{moved} reserva(s) movida(s) para a mesa {target_mesa.id}.', messages.SUCCESS)
+
+
+@admin.register(RecurringBooking)
+class RecurringBookingAdmin(LocationAdminMixin, admin.ModelAdmin):
+    """
+    Reservas recorrentes de clientes habituais (mesma mesa e hora, todas as semanas ou
+    de duas em duas semanas).
+    
+    A regra é gravada uma única vez; as reservas das próximas semanas são criadas em
+    massa ao gravar e, depois, diariamente (ver api/recurrence.py). Alterar uma regra
+    substitui as suas reservas futuras; removê-la cancela-as (as passadas mantêm-se).
+    """
+    list_display = ('id', 'name', 'phone', 'mesa', 'first_date', 'start_time', 'interval_weeks', 'until', 'materialised_until')
+    list_filter = ('interval_weeks', 'mesa')
+    list_select_related = ('mesa',)
+    search_fields = ('name', 'phone')
+    readonly_fields = ('end_time', 'materialised_until')
+    
+    fieldsets = (
+        ('Informações do Cliente', {
+            'fields': ('name', 'phone'),
+        }),
+        ('Detalhes da Reserva', {
+            'fields': ('mesa', 'start_time', 'end_time', 'number_of_guests', 'notes'),
+            'description': 'O horário de término é calculado automaticamente (início + 1h15min).'
+        }),
+        ('Repetição', {
+            'fields': ('first_date', 'interval_weeks', 'until', 'materialised_until'),
+            'description': f'As reservas são criadas para os próximos {RECURRENCE_WINDOW_DAYS} dias; '
+                           'datas com a mesa ocupada ou o café encerrado são ignoradas.'
+        }),
+    )
+    
+    def save_model(self, request, obj, form, change):
+        """Grava a regra (substituindo as reservas futuras, se alterada) e cria as reservas das próximas semanas."""
+        obj.end_time = (datetime.combine(date.today(), obj.start_time) + RESERVATION_DURATION).time()
+        if change:
+            bulk_cancel(self._future_occurrences(Booking.objects.filter(recurrence=obj)))
+            obj.materialised_until = max(obj.first_date, date.today()) - timedelta(days=1)
+        super().save_model(request, obj, form, change)
+        
+        created, skipped = materialise_recurrences(date.today() + timedelta(days=RECURRENCE_WINDOW_DAYS), rules=[obj.pk])
+        self.message_user(request, f'{created} reserva(s) criada(s).', messages.SUCCESS)
+        if skipped:
+            dates = ', '.join(day.strftime('%d/%m/%Y') for _, day in skipped)
+            self.message_user(request, f'Datas ignoradas (mesa ocupada, horário passado ou café encerrado): {dates}.', messages.WARNING)
+    
+    def delete_model(self, request, obj):
+        """Cancela as reservas futuras da regra e remove-a."""
+        bulk_cancel(self._future_occurrences(Booking.objects.filter(recurrence=obj)))
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        """Cancela as reservas futuras das regras selecionadas e remove-as."""
+        bulk_cancel(self._future_occurrences(Booking.objects.filter(recurrence__in=queryset)))
+        super().delete_queryset(request, queryset)
+    
+    def _future_occurrences(self, bookings):
+        now = datetime.now()
+        return bookings.filter(Q(date__gt=now.date()) | Q(date=now.date(), start_time__gt=now.time()))
+
+
+class CalendarAdmin(LocationAdminMixin, admin.ModelAdmin):
+    """
+    Base das interfaces do horário de funcionamento.
+    
+    Qualquer alteração descarta o calendário de horários reserváveis do local em cache
+    (após o commit), pelo que os pedidos seguintes já usam o novo horário.
+    """
+    
+    def _invalidate(self):
+        location = get_location()
+        transaction.on_commit(lambda: invalidate_calendar(location), using=location_database(location))
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self._invalidate()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._invalidate()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self._invalidate()
+
+
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(CalendarAdmin):
+    """
+    Horário semanal: um turno por linha. Dias sem turnos ficam encerrados; um fecho
+    igual ou anterior à abertura termina no dia seguinte (ex.: 08:30 às 00:30).
+    """
+    list_display = ('weekday', 'opening', 'closing')
+    list_filter = ('weekday',)
+
+
+@admin.register(SpecialHours)
+class SpecialHoursAdmin(CalendarAdmin):
+    """
+    Horários especiais de datas concretas, que substituem o horário semanal desse dia.
+    """
+    list_display = ('date', 'opening', 'closing', 'note')
+    date_hierarchy = 'date'
+
+
+@admin.register(Closure)
+class ClosureAdmin(CalendarAdmin):
+    """
+    Encerramentos (feriados, férias, eventos privados): não são aceites reservas que se
+    sobreponham ao período. Reservas já existentes não são alteradas.
+    """
+    list_display = ('start', 'end', 'reason')
+    date_hierarchy = 'start'
+    search_fields = ('reason',)
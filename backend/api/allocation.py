@@ -0,0 +1,291 @@
+"""
+allocation.py
+
+Regras de alocação de mesas usadas por create_booking, sem acesso à base de dados.
+
+As funções recebem as mesas e as reservas já existentes em memória, pelo que podem ser
+usadas tanto pelo endpoint (com os dados lidos da base de dados) como pelo simulador de
+capacidade (api/simulation.py), que reproduz milhares de pedidos sem HTTP nem SQL.
+"""
+
+from datetime import time, timedelta
+
+from django.conf import settings
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Duração padrão de cada reserva (1 hora e 15 minutos)
+RESERVATION_DURATION = timedelta(hours=1, minutes=15)
+
+# Granularidade (minutos) do calendário de horários reserváveis (ver api/slots.py)
+SLOT_MINUTES = 15
+
+# Horário de funcionamento por defeito do simulador (08:30 às 00:30, exceto domingos).
+# Na API, o horário de cada local é configurado no painel (ver api/slots.py).
+OPENING_TIME = time(8, 30)
+CLOSING_TIME = time(0, 30)
+CLOSED_WEEKDAYS = frozenset({6})
+
+# Estratégias de escolha da mesa
+EXACT_FIRST = 'exact_first'  # Mesas com capacidade exata; só sem nenhuma, mesas maiores (comportamento da API)
+BEST_FIT = 'best_fit'        # A mesa livre mais pequena com capacidade suficiente
+FIRST_FIT = 'first_fit'      # A primeira mesa livre com capacidade suficiente
+STRATEGIES = (EXACT_FIRST, BEST_FIT, FIRST_FIT)
+
+# Número máximo de mesas juntas para um grupo (None: sem limite; ver table_groups)
+MAX_JOINED_TABLES = getattr(settings, 'MAX_JOINED_TABLES', None)
+
+# ================================================================================================
+# REGRAS
+# ================================================================================================
+
+def is_open(start, opening=OPENING_TIME, closing=CLOSING_TIME, closed_weekdays=CLOSED_WEEKDAYS):
+    """
+    Verifica se uma reserva pode começar no instante indicado.
+
+    O fecho pode ser depois da meia-noite (ex.: 00:30); os limites são inclusivos.
+
+    Args:
+        start (datetime): Início da reserva.
+        opening (time): Hora de abertura.
+        closing (time): Hora de fecho.
+        closed_weekdays (Container[int]): Dias da semana encerrados (0 = segunda, 6 = domingo).
+
+    Returns:
+        bool: True se o café estiver aberto.
+    """
+    if start.weekday() in closed_weekdays:
+        return False
+
+    moment = start.time()
+    if closing <= opening:
+        return not closing < moment < opening
+    return opening <= moment <= closing
+
+
+def candidate_tables(guests, tables, strategy=EXACT_FIRST):
+    """
+    Mesas que podem receber um grupo, pela ordem em que são consideradas.
+
+    Args:
+        guests (int): Número de convidados.
+        tables (Sequence[tuple[int, int]]): Mesas (id, lugares), pela ordem de preferência.
+        strategy (str): Uma das estratégias em STRATEGIES.
+
+    Returns:
+        list[tuple[int, int]]: Mesas (id, lugares) candidatas.
+    """
+    if strategy == EXACT_FIRST:
+        # Se existir alguma mesa com a capacidade exata, apenas essas são consideradas
+        candidates = [table for table in tables if table[1] == guests]
+        if not candidates:
+            candidates = [table for table in tables if table[1] >= guests]
+    elif strategy == BEST_FIT:
+        candidates = sorted((table for table in tables if table[1] >= guests), key=lambda table: table[1])
+    elif strategy == FIRST_FIT:
+        candidates = [table for table in tables if table[1] >= guests]
+    else:
+        raise ValueError(f"Estratégia desconhecida: '{strategy}'. Use uma de: {', '.join(STRATEGIES)}.")
+    return candidates
+
+
+def find_table(start, end, guests, tables, bookings, strategy=EXACT_FIRST):
+    """
+    Escolhe uma mesa livre para uma reserva.
+
+    Os instantes podem ser de qualquer tipo comparável (datetime na API, minutos no
+    simulador), desde que o mesmo tipo seja usado para a reserva e para as existentes.
+
+    Args:
+        start: Início da nova reserva.
+        end: Fim da nova reserva.
+        guests (int): Número de convidados.
+        tables (Sequence[tuple[int, int]]): Mesas (id, lugares), pela ordem de preferência.
+        bookings (Mapping[int, Iterable[tuple]]): Reservas (início, fim) de cada mesa no mesmo dia.
+        strategy (str): Uma das estratégias em STRATEGIES.
+
+    Returns:
+        int | None: Identificador da mesa escolhida, ou None se não houver mesa livre.
+    """
+    for table_id, _ in candidate_tables(guests, tables, strategy):
+        if is_free(table_id, start, end, bookings):
+            return table_id
+
+    return None
+
+
+def is_free(table_id, start, end, bookings):
+    """
+    Verifica se uma mesa não tem reservas sobrepostas a um intervalo.
+
+    Args:
+        table_id (int): Identificador da mesa.
+        start: Início do intervalo.
+        end: Fim do intervalo.
+        bookings (Mapping[int, Iterable[tuple]]): Reservas (início, fim) de cada mesa no mesmo dia.
+
+    Returns:
+        bool: True se a mesa estiver livre.
+    """
+    # Sobreposição: a nova reserva começa antes do fim de uma existente e termina depois do seu início
+    return not any(start < booking_end and end > booking_start for booking_start, booking_end in bookings.get(table_id, ()))
+
+
+def table_groups(guests, tables, adjacency, max_tables=MAX_JOINED_TABLES):
+    """
+    Conjuntos de mesas juntáveis que podem receber um grupo, pela ordem em que são considerados.
+
+    São considerados os conjuntos ligados (cada mesa adjacente a outra do conjunto) de 2 ou
+    mais mesas (até 'max_tables', se indicado), gerados uma única vez cada (algoritmo ESU,
+    a partir da primeira mesa do conjunto pela ordem de 'tables'). A pesquisa é podada:
+
+    - um conjunto que já tem lugares suficientes não é alargado: um conjunto maior que o
+      contenha ocupa as mesmas mesas e mais uma, pelo que nunca é preferível (pela mesma
+      razão, é ignorado um conjunto que continue ligado e com lugares suficientes sem
+      uma das suas mesas);
+    - um conjunto é abandonado se nem com todas as mesas que o podem alargar (ligadas à
+      primeira mesa e posteriores a ela), ou com as maiores mesas até 'max_tables',
+      chegaria aos lugares em falta.
+
+    Os conjuntos não dependem das reservas, pelo que podem ser combinados com a ocupação
+    de qualquer intervalo (find_table_group) ou de um dia inteiro (mapas de bits).
+
+    Args:
+        guests (int): Número de convidados.
+        tables (Sequence[tuple[int, int]]): Mesas juntáveis (id, lugares), pela ordem de preferência.
+        adjacency (Mapping[int, Iterable[int]]): Mesas adjacentes de cada mesa.
+        max_tables (int | None): Número máximo de mesas de um conjunto (None: sem limite).
+
+    Returns:
+        list[tuple[int, ...]]: Conjuntos de mesas, do menor para o maior (em número de
+        mesas e, depois, de lugares).
+    """
+    seats = dict(tables)
+    order = {table_id: index for index, (table_id, _) in enumerate(tables)}
+    neighbours = {
+        table_id: {other for other in adjacency.get(table_id, ()) if other in seats and other != table_id}
+        for table_id in seats
+    }
+    largest = max(seats.values(), default=0)
+    limit = len(seats) if max_tables is None else max_tables
+    groups = []
+
+    def extend(group, total, extension, root, reach):
+        if total >= guests:
+            if len(group) > 1 and not any(
+                total - seats[table_id] >= guests and _connected(set(group) - {table_id}, neighbours)
+                for table_id in group
+            ):
+                groups.append(group)
+            return
+        if len(group) == limit or min(reach, total + (limit - len(group)) * largest) < guests:
+            return
+
+        # Mesas já no conjunto ou adjacentes a ele: as restantes extensões vêm de cada nova mesa
+        covered = set(group).union(*(neighbours[table_id] for table_id in group))
+        extension = list(extension)
+        while extension:
+            table_id = extension.pop()
+            new = [other for other in neighbours[table_id] if order[other] > order[root] and other not in covered]
+            extend(group + (table_id,), total + seats[table_id], extension + new, root, reach)
+
+    for root in seats:
+        # Lugares de todas as mesas que podem pertencer a um conjunto iniciado nesta mesa
+        reach = sum(seats[table_id] for table_id in _reachable(root, neighbours, lambda other: order[other] > order[root]))
+        extend((root,), seats[root], [other for other in neighbours[root] if order[other] > order[root]], root, reach)
+
+    groups.sort(key=lambda group: (len(group), sum(seats[table_id] for table_id in group), sorted(map(order.get, group))))
+    return groups
+
+
+def _connected(group, neighbours):
+    """Verifica se um conjunto de mesas está ligado pelas adjacências."""
+    return _reachable(next(iter(group)), neighbours, group.__contains__) == group
+
+
+def _reachable(start, neighbours, allowed):
+    """Mesas ligadas a 'start' através de mesas aceites por 'allowed' (incluindo 'start')."""
+    pending = [start]
+    reached = set(pending)
+    while pending:
+        for other in neighbours[pending.pop()]:
+            if other not in reached and allowed(other):
+                reached.add(other)
+                pending.append(other)
+    return reached
+
+
+def find_table_group(start, end, guests, tables, bookings, adjacency, max_tables=MAX_JOINED_TABLES):
+    """
+    Escolhe o menor conjunto de mesas juntáveis livres para uma reserva (sem mesa única livre).
+
+    Args:
+        start: Início da nova reserva.
+        end: Fim da nova reserva.
+        guests (int): Número de convidados.
+        tables (Sequence[tuple[int, int]]): Mesas juntáveis (id, lugares), pela ordem de preferência.
+        bookings (Mapping[int, Iterable[tuple]]): Reservas (início, fim) de cada mesa no mesmo dia.
+        adjacency (Mapping[int, Iterable[int]]): Mesas adjacentes de cada mesa.
+        max_tables (int | None): Número máximo de mesas juntas (None: sem limite).
+
+    Returns:
+        tuple[int, ...] | None: Mesas escolhidas, ou None se nenhum conjunto estiver livre.
+    """
+    for group in table_groups(guests, tables, adjacency, max_tables):
+        if all(is_free(table_id, start, end, bookings) for table_id in group):
+            return group
+
+    return None
+
+
+def exceeds_joined_limit(guests, tables, adjacency, max_tables=MAX_JOINED_TABLES):
+    """
+    Verifica se é o limite de mesas juntas que impede um grupo de ser sentado.
+
+    Isto acontece quando nem as 'max_tables' maiores mesas juntáveis têm lugares
+    suficientes, mas as mesas juntáveis ligadas entre si (sem limite) teriam.
+
+    Args:
+        guests (int): Número de convidados.
+        tables (Sequence[tuple[int, int]]): Mesas juntáveis (id, lugares).
+        adjacency (Mapping[int, Iterable[int]]): Mesas adjacentes de cada mesa.
+        max_tables (int | None): Número máximo de mesas juntas (None: sem limite).
+
+    Returns:
+        bool: True se o grupo só caberia em mais do que 'max_tables' mesas.
+    """
+    if max_tables is None or sum(sorted((table[1] for table in tables), reverse=True)[:max_tables]) >= guests:
+        return False
+
+    seats = dict(tables)
+    neighbours = {table_id: {other for other in adjacency.get(table_id, ()) if other in seats} for table_id in seats}
+    pending = set(seats)
+    while pending:
+        component = _reachable(pending.pop(), neighbours, lambda other: True)
+        pending -= component
+        if sum(seats[table_id] for table_id in component) >= guests:
+            return True
+    return False
+
+
+def split_guests(guests, group, tables):
+    """
+    Distribui os convidados pelas mesas de um conjunto (pelo menos um por mesa, se possível).
+
+    Args:
+        guests (int): Número de convidados.
+        group (Sequence[int]): Mesas do conjunto.
+        tables (Mapping[int, int]): Lugares de cada mesa.
+
+    Returns:
+        dict[int, int]: Convidados em cada mesa (a soma é 'guests').
+    """
+    split = {table_id: 1 if index < guests else 0 for index, table_id in enumerate(group)}
+    remaining = guests - sum(split.values())
+    for table_id in sorted(group, key=lambda table_id: -tables[table_id]):
+        added = min(tables[table_id] - split[table_id], remaining)
+        split[table_id] += added
+        remaining -= added
+    return split
@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
     verbose_name = 'Management System'
+
+    def ready(self):
+        # Registo das queries lentas (api/slowqueries.py): desativado, as ligações não são instrumentadas
+        if getattr(settings, 'SLOW_QUERY_ENABLED', False):
+            from django.db.backends.signals import connection_created
+            from .slowqueries import instrument_connection
+            connection_created.connect(instrument_connection)
@@ -0,0 +1,266 @@
+"""
+batch.py
+
+Execução de vários pedidos à API num único pedido HTTP (/api/batch/).
+
+Cada sub-pedido indica o método e o caminho de um endpoint existente (api/urls.py) e é
+executado pela view desse endpoint, sem voltar a passar pelos middlewares: a sessão,
+o utilizador autenticado e o local (café) são os do pedido agregado, resolvidos uma
+única vez. O rate limiting é aplicado ao pedido agregado (charge_throttles), com um
+custo por sub-pedido no scope do respetivo endpoint; os sub-pedidos não voltam a
+consumir tokens.
+
+Sub-pedidos de leitura (GET) consecutivos são executados em paralelo; um sub-pedido
+de escrita é executado sozinho, depois de todos os anteriores terminarem, pelo que
+as escritas são aplicadas pela ordem indicada e as leituras seguintes já as refletem.
+As escritas feitas pelos endpoints de leitura (limpeza das reservas expiradas) são
+executadas uma única vez pela view do pedido agregado, antes dos sub-pedidos.
+
+Um erro inesperado num sub-pedido (exceção que não é uma APIException do DRF) é
+registado e devolvido como 500 no resultado desse sub-pedido; os restantes resultados
+são devolvidos normalmente.
+"""
+
+import contextvars
+import json
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import Throttled
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Número máximo de sub-pedidos por pedido agregado
+BATCH_MAX_REQUESTS = getattr(settings, 'BATCH_MAX_REQUESTS', 10)
+
+# Número de threads que executam os sub-pedidos de leitura em paralelo (por processo)
+BATCH_MAX_WORKERS = getattr(settings, 'BATCH_MAX_WORKERS', 4)
+
+# Métodos aceites e métodos de leitura (executados em paralelo)
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+READ_METHODS = ('GET',)
+
+# Rotas que não podem ser incluídas num pedido agregado: alteram a sessão partilhada
+# (login/logout), não devolvem JSON (stream, ficheiros de perfis) ou são o próprio batch
+BATCH_EXCLUDED_ROUTES = {'admin_login', 'admin_logout', 'token_refresh', 'stream', 'profile_download', 'batch'}
+
+# Cabeçalhos das respostas dos sub-pedidos incluídos no resultado
+BATCH_RESPONSE_HEADERS = ('Idempotent-Replayed',)
+
+# Cabeçalhos do pedido agregado que não são herdados pelos sub-pedidos
+_PARENT_ONLY_HEADERS = ('HTTP_IDEMPOTENCY_KEY', 'HTTP_X_PROFILE', 'CONTENT_LENGTH', 'CONTENT_TYPE')
+
+_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+# Erros inesperados dos sub-pedidos, registados como os erros 500 dos restantes pedidos
+logger = logging.getLogger('django.request')
+
+# ================================================================================================
+# VALIDAÇÃO
+# ================================================================================================
+
+def parse_subrequests(data):
+    """
+    Valida os sub-pedidos de um pedido agregado e resolve as respetivas views.
+
+    Args:
+        data (dict): Corpo do pedido: {"requests": [{"method", "path", "body", "headers", "id"}, ...]}.
+
+    Returns:
+        tuple[list[dict], str | None]: Sub-pedidos validados (com a rota resolvida em
+        'match') e mensagem de erro, se existir.
+    """
+    entries = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        return [], "Indique os sub-pedidos em 'requests' (lista não vazia)."
+    if len(entries) > BATCH_MAX_REQUESTS:
+        return [], f"Máximo de {BATCH_MAX_REQUESTS} sub-pedidos por pedido."
+
+    subrequests = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            return [], f"Sub-pedido {index}: deve ser um objeto."
+
+        method = str(entry.get("method", "GET")).upper()
+        if method not in BATCH_METHODS:
+            return [], f"Sub-pedido {index}: método inválido. Métodos aceites: {', '.join(BATCH_METHODS)}."
+
+        url = entry.get("path")
+        if not isinstance(url, str) or not url.startswith("/api/"):
+            return [], f"Sub-pedido {index}: 'path' deve ser um caminho da API (ex.: \"/api/mesas/list/\")."
+        url = urlsplit(url)
+
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return [], f"Sub-pedido {index}: endpoint inexistente ({url.path})."
+        if match.url_name in BATCH_EXCLUDED_ROUTES or not hasattr(match.func, "cls"):
+            return [], f"Sub-pedido {index}: o endpoint {url.path} não pode ser incluído num pedido agregado."
+
+        headers = entry.get("headers") or {}
+        if not isinstance(headers, dict) or not all(isinstance(value, str) for value in headers.values()):
+            return [], f"Sub-pedido {index}: 'headers' deve ser um objeto com valores de texto."
+
+        subrequests.append({
+            "id": entry.get("id", index),
+            "method": method,
+            "path": url.path,
+            "query": url.query,
+            "body": entry.get("body"),
+            "headers": headers,
+            "match": match,
+        })
+
+    return subrequests, None
+
+# ================================================================================================
+# RATE LIMITING
+# ================================================================================================
+
+def charge_throttles(request, subrequests):
+    """
+    Consome, de uma só vez, os tokens de todos os sub-pedidos.
+
+    Cada sub-pedido custa um token no balde de cada throttle do seu endpoint; os custos
+    são somados por throttle e retirados com uma única operação por balde.
+
+    Args:
+        request: Pedido DRF agregado (identifica o cliente).
+        subrequests (list[dict]): Sub-pedidos validados por parse_subrequests.
+
+    Raises:
+        Throttled: Algum balde não tem tokens suficientes (429, com 'Retry-After').
+    """
+    costs = Counter(
+        throttle_class
+        for subrequest in subrequests
+        for throttle_class in subrequest["match"].func.cls.throttle_classes
+    )
+
+    for throttle_class, cost in costs.items():
+        throttle = throttle_class()
+        if throttle.rate is None:
+            continue
+        key = throttle.get_cache_key(request, None)
+        if key is not None and not throttle.consume(key, cost):
+            raise Throttled(wait=throttle.wait())
+
+# ================================================================================================
+# EXECUÇÃO
+# ================================================================================================
+
+def execute(request, subrequests):
+    """
+    Executa os sub-pedidos e devolve os respetivos resultados, pela ordem recebida.
+
+    Args:
+        request: Pedido DRF agregado (sessão, utilizador e local partilhados).
+        subrequests (list[dict]): Sub-pedidos validados por parse_subrequests.
+
+    Returns:
+        list[dict]: {"id", "status", "body", "headers"} de cada sub-pedido.
+    """
+    # Dentro de uma transação (ex.: testes), outras threads não veriam os dados por confirmar
+    parallel = not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+    results = []
+    reads = []
+    for subrequest in subrequests:
+        if subrequest["method"] in READ_METHODS and parallel:
+            reads.append(subrequest)
+            continue
+        results += _run_parallel(request, reads)
+        reads = []
+        results.append(_run(request, subrequest))
+    results += _run_parallel(request, reads)
+
+    return results
+
+
+def _run_parallel(request, subrequests):
+    """Executa sub-pedidos de leitura em paralelo, cada um no contexto (local) do pedido agregado."""
+    if len(subrequests) < 2:
+        return [_run(request, subrequest) for subrequest in subrequests]
+
+    futures = [
+        _executor.submit(contextvars.copy_context().run, _run_in_worker, request, subrequest)
+        for subrequest in subrequests
+    ]
+    return [future.result() for future in futures]
+
+
+def _run_in_worker(request, subrequest):
+    """Executa um sub-pedido numa thread do executor, fechando a ligação à base de dados no fim."""
+    try:
+        return _run(request, subrequest)
+    finally:
+        close_old_connections()
+
+
+def _run(request, subrequest):
+    """Executa um sub-pedido através da view do endpoint e converte a resposta (500 se falhar)."""
+    match = subrequest["match"]
+    try:
+        response = match.func(_build_request(request, subrequest), *match.args, **match.kwargs)
+    except Exception:
+        # As APIException já foram convertidas em respostas pela view (DRF)
+        logger.exception("Erro no sub-pedido %s %s de /api/batch/", subrequest["method"], subrequest["path"])
+        return {
+            "id": subrequest["id"],
+            "status": 500,
+            "body": {"detail": "Erro interno do servidor."},
+            "headers": {},
+        }
+
+    return {
+        "id": subrequest["id"],
+        "status": response.status_code,
+        "body": getattr(response, "data", None),
+        "headers": {name: response[name] for name in BATCH_RESPONSE_HEADERS if response.has_header(name)},
+    }
+
+
+def _build_request(request, subrequest):
+    """
+    Constrói o HttpRequest de um sub-pedido a partir do pedido agregado.
+
+    O sub-pedido partilha a sessão, o utilizador e o local do pedido agregado. A
+    verificação de CSRF e o rate limiting já foram feitos para o pedido agregado.
+    """
+    parent = request._request
+    body = b"" if subrequest["body"] is None else json.dumps(subrequest["body"]).encode()
+
+    sub = HttpRequest()
+    sub.method = subrequest["method"]
+    sub.path = sub.path_info = subrequest["path"]
+    sub.META = {key: value for key, value in parent.META.items() if key not in _PARENT_ONLY_HEADERS}
+    sub.META.update({
+        "REQUEST_METHOD": sub.method,
+        "PATH_INFO": sub.path,
+        "QUERY_STRING": subrequest["query"],
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+    })
+    for name, value in subrequest["headers"].items():
+        sub.META["HTTP_" + name.upper().replace("-", "_")] = value
+
+    sub.GET = QueryDict(subrequest["query"])
+    sub.COOKIES = parent.COOKIES
+    sub._body = body
+    sub._read_started = True  # O DRF lê o corpo a partir de 'body'
+
+    sub.session = parent.session
+    sub.user = request.user
+    sub.location = getattr(parent, "location", None)
+    sub.resolver_match = subrequest["match"]
+    sub._dont_enforce_csrf_checks = True
+    sub.batched = True  # Sem rate limiting próprio (ver TokenBucketThrottle.allow_request)
+    return sub
@@ -0,0 +1,208 @@
+"""
+bulk.py
+
+Operações em massa sobre reservas, partilhadas pelo painel administrativo e pela API.
+
+Cada operação é executada como um único DELETE/UPDATE baseado em conjuntos, dentro de
+uma transação, seguido de um único recálculo do estado de ocupação das mesas. Evita o
+custo de cancelar reservas uma a uma (uma contagem, uma gravação e uma limpeza de
+reservas expiradas por reserva).
+
+As reservas movidas e as mesas recalculadas partilham um único número de sequência, e
+as reservas canceladas um único tombstone por reserva (ver changes.py).
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .changes import record_deletions
+from .events import publish
+from .models import Booking, ChangeSequence, Mesa, Tombstone
+
+# ================================================================================================
+# EXCEÇÕES
+# ================================================================================================
+
+class BulkMoveError(Exception):
+    """Erro de validação ao mover reservas para outra mesa (mensagem apresentável ao utilizador)."""
+
+# ================================================================================================
+# OPERAÇÕES
+# ================================================================================================
+
+def filter_bookings(queryset, ids=None, date_from=None, date_to=None, mesa=None):
+    """
+    Restringe um queryset de reservas pelos critérios de seleção em massa.
+
+    Os critérios fornecidos são combinados (AND).
+
+    Args:
+        queryset (QuerySet): Queryset de reservas de partida.
+        ids (list[int] | None): Identificadores das reservas.
+        date_from (date | None): Data inicial (inclusive).
+        date_to (date | None): Data final (inclusive).
+        mesa (int | None): Identificador da mesa.
+
+    Returns:
+        QuerySet: Queryset filtrado.
+    """
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if date_from is not None:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date__lte=date_to)
+    if mesa is not None:
+        queryset = queryset.filter(mesa_id=mesa)
+    return queryset
+
+
+def bulk_cancel(queryset):
+    """
+    Cancela (remove) todas as reservas do queryset.
+
+    As reservas em mesas juntas são canceladas em todas as mesas do grupo.
+
+    Args:
+        queryset (QuerySet): Reservas a cancelar.
+
+    Returns:
+        int: Número de reservas canceladas.
+    """
+    with transaction.atomic(using=queryset.db):
+        affected = list(queryset.order_by().values_list('id', 'mesa_id', 'party'))
+        parties = {party for _, _, party in affected if party}
+        if parties:
+            # Acrescenta as reservas das restantes mesas de cada grupo
+            queryset = Booking.objects.using(queryset.db).filter(
+                Q(pk__in=[booking_id for booking_id, _, _ in affected]) | Q(party__in=parties)
+            )
+            affected = list(queryset.values_list('id', 'mesa_id', 'party'))
+        affected_mesas = sorted({mesa_id for _, mesa_id, _ in affected})
+        cancelled, _ = queryset.order_by().delete()
+        record_deletions(Tombstone.BOOKING, [booking_id for booking_id, _, _ in affected])
+        recompute_mesa_occupancy(affected_mesas)
+        if cancelled:
+            publish('bookings.cancelled', mesas=affected_mesas)
+
+    return cancelled
+
+
+def bulk_move(queryset, target_mesa):
+    """
+    Move todas as reservas do queryset para a mesa 'target_mesa'.
+
+    A operação só é executada se a mesa de destino tiver capacidade para todas as
+    reservas e se nenhuma delas se sobrepuser a reservas já existentes nessa mesa
+    (ou entre si).
+
+    Args:
+        queryset (QuerySet): Reservas a mover.
+        target_mesa (Mesa): Mesa de destino.
+
+    Returns:
+        int: Número de reservas movidas.
+
+    Raises:
+        BulkMoveError: Se a mesa de destino não tiver capacidade ou existirem conflitos de horário.
+    """
+    with transaction.atomic(using=queryset.db):
+        moving = list(queryset.order_by().values('id', 'mesa_id', 'date', 'start_time', 'end_time', 'number_of_guests'))
+        if not moving:
+            return 0
+
+        largest_party = max(booking['number_of_guests'] for booking in moving)
+        if largest_party > target_mesa.lugares:
+            raise BulkMoveError(
+                f"A mesa {target_mesa.id} tem {target_mesa.lugares} lugares, "
+                f"insuficiente para uma reserva de {largest_party} pessoas."
+            )
+
+        # Reservas que já estão na mesa de destino, nas datas afetadas
+        moving_ids = [booking['id'] for booking in moving]
+        existing = Booking.objects.filter(
+            mesa=target_mesa,
+            date__in={booking['date'] for booking in moving},
+        ).exclude(pk__in=moving_ids).values('id', 'date', 'start_time', 'end_time')
+
+        conflict = _find_overlap(moving + list(existing))
+        if conflict is not None:
+            first, second = conflict
+            raise BulkMoveError(
+                f"Conflito de horário na mesa {target_mesa.id} entre as reservas {first} e {second}."
+            )
+
+        source_mesas = {booking['mesa_id'] for booking in moving}
+        moved = Booking.objects.filter(pk__in=moving_ids).update(mesa=target_mesa, seq=ChangeSequence.advance(queryset.db))
+        recompute_mesa_occupancy(source_mesas | {target_mesa.id})
+        publish('bookings.moved', mesas=sorted(source_mesas | {target_mesa.id}))
+
+    return moved
+
+
+def recompute_mesa_occupancy(mesa_ids=None):
+    """
+    Recalcula o campo 'existe_reserva' das mesas com um único UPDATE.
+
+    Apenas as mesas cujo estado muda são atualizadas, com um número de sequência obtido
+    na mesma transação do UPDATE (um cliente de /api/changes/ nunca recebe esse número
+    sem as mesas correspondentes). Sem mesas a alterar, não é feita nenhuma escrita nem
+    consumido nenhum número de sequência.
+
+    Args:
+        mesa_ids (Iterable[int] | None): Mesas a recalcular (todas, se None).
+
+    Returns:
+        int: Número de mesas atualizadas.
+    """
+    using = router.db_for_write(Mesa)
+    occupied = Exists(Booking.objects.using(using).filter(mesa=OuterRef('pk')))
+    stale = Mesa.objects.using(using).filter((Q(existe_reserva=True) & ~occupied) | (Q(existe_reserva=False) & occupied))
+    if mesa_ids is not None:
+        stale = stale.filter(pk__in=mesa_ids)
+
+    # Leitura fora da transação: sem alterações, não é obtido o bloqueio de escrita (BEGIN IMMEDIATE)
+    changed = list(stale.values_list('pk', flat=True))
+    if not changed:
+        return 0
+
+    with transaction.atomic(using=using):
+        seq = ChangeSequence.advance(using)
+        return stale.filter(pk__in=changed).update(existe_reserva=occupied, seq=seq)
+
+# ================================================================================================
+# FUNÇÕES AUXILIARES
+# ================================================================================================
+
+def _find_overlap(bookings):
+    """
+    Procura duas reservas sobrepostas numa lista de reservas da mesma mesa.
+
+    As reservas são agrupadas por data e ordenadas pelo início; basta comparar cada
+    reserva com a que termina mais tarde entre as anteriores.
+
+    Args:
+        bookings (list[dict]): Reservas com 'id', 'date', 'start_time' e 'end_time'.
+
+    Returns:
+        tuple[int, int] | None: Identificadores de duas reservas em conflito, ou None.
+    """
+    by_date = defaultdict(list)
+    for booking in bookings:
+        start = datetime.combine(booking['date'], booking['start_time'])
+        end = datetime.combine(booking['date'], booking['end_time'])
+        by_date[booking['date']].append((start, end, booking['id']))
+
+    for intervals in by_date.values():
+        intervals.sort()
+        latest_end, latest_id = None, None
+        for start, end, booking_id in intervals:
+            if latest_end is not None and start < latest_end:
+                return latest_id, booking_id
+            if latest_end is None or end > latest_end:
+                latest_end, latest_id = end, booking_id
+
+    return None
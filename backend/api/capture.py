@@ -0,0 +1,359 @@
+"""
+capture.py
+
+Registo do tráfego real da API para reprodução posterior (comando 'replay_capture').
+
+Com CAPTURE_ENABLED, o CaptureMiddleware (api/middleware.py) regista cada pedido à API:
+rota (nome em api/urls.py), método, caminho, parâmetros, corpo, instante, duração,
+código de estado e uma impressão digital (hash) da resposta. Os dados pessoais são
+anonimizados antes de serem gravados:
+
+    - 'name', 'phone', 'notes', 'username' e os termos de pesquisa ('q') são
+      substituídos por pseudónimos determinísticos (HMAC com a SECRET_KEY), válidos para
+      a API: o mesmo cliente tem sempre o mesmo pseudónimo, pelo que duplicados e
+      repetições se comportam como no tráfego original;
+    - 'password' e 'refresh' não são registados;
+    - o cliente (IP ou utilizador) é registado apenas como um identificador opaco;
+    - na impressão digital da resposta, os valores destes campos são ignorados.
+
+Os registos são gravados em CAPTURE_DIR, num ficheiro por processo, em MessagePack
+comprimido com zstd. O ficheiro só recebe novos dados no fim (append-only): cada bloco
+de registos é um frame zstd independente, pelo que uma interrupção do processo perde
+no máximo o bloco em memória.
+"""
+
+import atexit
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:  # Dependências opcionais (necessárias apenas com CAPTURE_ENABLED)
+    msgpack = zstandard = None
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Diretoria dos ficheiros de registo
+CAPTURE_DIR = Path(getattr(settings, 'CAPTURE_DIR', settings.BASE_DIR / 'data' / 'captures'))
+
+# Número de registos por bloco comprimido e intervalo máximo entre gravações (segundos)
+CAPTURE_FLUSH_RECORDS = getattr(settings, 'CAPTURE_FLUSH_RECORDS', 256)
+CAPTURE_FLUSH_INTERVAL = getattr(settings, 'CAPTURE_FLUSH_INTERVAL', 5)
+
+# Corpos de pedidos maiores do que este tamanho (bytes) não são registados
+CAPTURE_MAX_BODY = getattr(settings, 'CAPTURE_MAX_BODY', 64 * 1024)
+
+# Nível de compressão zstd
+CAPTURE_ZSTD_LEVEL = 9
+
+# Campos anonimizados (corpo, parâmetros e respostas) e campos não registados
+PSEUDONYMISED_FIELDS = ('name', 'phone', 'notes', 'username', 'q')
+DROPPED_FIELDS = ('password', 'refresh')
+
+# Campos das respostas com valores aleatórios (códigos de holds), ignorados na impressão digital
+VOLATILE_FIELDS = ('hold',)
+
+# Cabeçalhos dos pedidos registados
+CAPTURE_HEADERS = ('Idempotency-Key', 'X-Location', 'Accept')
+
+# Extensão dos ficheiros de registo
+CAPTURE_SUFFIX = '.msgpack.zst'
+
+# Tipo de cliente do pedido
+ANONYMOUS, AUTHENTICATED, STAFF = 0, 1, 2
+
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# ================================================================================================
+# ANONIMIZAÇÃO
+# ================================================================================================
+
+def _digest(field, value):
+    """HMAC de um valor (com a SECRET_KEY), específico de cada campo."""
+    return hmac.new(settings.SECRET_KEY.encode(), f'{field}:{value}'.encode(), hashlib.sha256).hexdigest()
+
+
+def pseudonym(field, value):
+    """
+    Pseudónimo determinístico de um dado pessoal, aceite pelas validações da API.
+
+    Args:
+        field (str): Nome do campo ('name', 'phone', 'notes', 'username', 'q').
+        value: Valor original.
+
+    Returns:
+        Pseudónimo (o mesmo para o mesmo valor), ou o valor original se não for texto.
+    """
+    if not isinstance(value, str) or not value:
+        return value
+
+    digest = _digest(field, value)
+    if field == 'phone':
+        # Mesmo número de dígitos (telefones inválidos continuam inválidos)
+        length = len(re.sub(r'\D+', '', value))
+        return '9' + str(int(digest, 16))[:max(length - 1, 0)] if length else value
+    if field == 'notes':
+        return 'Notas ' + ''.join(chr(ord('a') + int(c, 16)) for c in digest[:max(len(value) - 6, 1)])
+    # Apenas letras (nomes e utilizadores)
+    return 'Cliente ' + ''.join(chr(ord('a') + int(c, 16)) for c in digest[:10])
+
+
+def sanitise(value):
+    """
+    Anonimiza os dados pessoais de um corpo ou de parâmetros (estrutura JSON).
+
+    Args:
+        value: Dicionário, lista ou valor simples.
+
+    Returns:
+        Cópia com os campos pessoais substituídos por pseudónimos e sem palavras-passe.
+    """
+    if isinstance(value, dict):
+        return {
+            key: pseudonym(key, item) if key in PSEUDONYMISED_FIELDS else sanitise(item)
+            for key, item in value.items() if key not in DROPPED_FIELDS
+        }
+    if isinstance(value, list):
+        return [sanitise(item) for item in value]
+    return value
+
+
+def _mask(value):
+    """Remove os valores dos campos pessoais e aleatórios (para comparar respostas com pseudónimos diferentes)."""
+    if isinstance(value, dict):
+        return {key: '*' if key in PSEUDONYMISED_FIELDS + VOLATILE_FIELDS else _mask(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_mask(item) for item in value]
+    return value
+
+
+def shift_dates(value, days):
+    """
+    Desloca as datas ("YYYY-MM-DD") de uma estrutura JSON.
+
+    Args:
+        value: Dicionário, lista ou valor simples.
+        days (int): Número de dias (negativo para recuar).
+
+    Returns:
+        Cópia com as datas deslocadas.
+    """
+    if not days:
+        return value
+    if isinstance(value, dict):
+        return {key: shift_dates(item, days) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shift_dates(item, days) for item in value]
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value + timedelta(days=days)
+    if isinstance(value, str) and _ISO_DATE_RE.match(value):
+        try:
+            return (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+        except ValueError:
+            return value
+    return value
+
+
+def response_digest(response, shift_days=0):
+    """
+    Impressão digital do conteúdo de uma resposta, sem os dados pessoais.
+
+    Nas respostas do DRF é calculada sobre os dados (independente do formato pedido,
+    JSON ou MessagePack); nas restantes, sobre o conteúdo.
+
+    Args:
+        response (HttpResponse): Resposta.
+        shift_days (int): Dias a descontar nas datas da resposta (reprodução com datas deslocadas).
+
+    Returns:
+        str | None: Hash (hexadecimal), ou None para respostas em streaming.
+    """
+    if getattr(response, 'streaming', False):
+        return None
+    if hasattr(response, 'data'):
+        data = shift_dates(json.loads(json.dumps(response.data, cls=DjangoJSONEncoder)), -shift_days)
+        content = json.dumps(_mask(data), sort_keys=True, separators=(',', ':')).encode()
+    else:
+        content = response.content
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def client_ident(request):
+    """Identificador opaco do cliente (utilizador autenticado ou IP de origem)."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        source = f'user:{user.pk}'
+    else:
+        source = 'ip:' + (request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip() or request.META.get('REMOTE_ADDR', ''))
+    return _digest('client', source)[:16]
+
+# ================================================================================================
+# REGISTO
+# ================================================================================================
+
+def build_record(request, response, started, duration):
+    """
+    Constrói o registo (anonimizado) de um pedido.
+
+    Args:
+        request (HttpRequest): Pedido.
+        response (HttpResponse): Resposta.
+        started (float): Instante do pedido (time.time()).
+        duration (float): Duração do processamento (segundos).
+
+    Returns:
+        dict: Registo a gravar (ver CaptureLog.append).
+    """
+    body = None
+    raw = getattr(request, '_body', b'')
+    if raw and len(raw) <= CAPTURE_MAX_BODY:
+        try:
+            body = sanitise(json.loads(raw))
+        except ValueError:
+            body = None
+
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        kind = STAFF if user.is_staff else AUTHENTICATED
+    else:
+        kind = ANONYMOUS
+
+    match = getattr(request, 'resolver_match', None)
+    return {
+        't': round(started, 6),
+        'r': match.url_name if match else None,
+        'm': request.method,
+        'p': request.path,
+        'q': sanitise({key: values[-1] for key, values in request.GET.lists()}),
+        'b': body,
+        'h': {name: request.headers[name] for name in CAPTURE_HEADERS if name in request.headers},
+        'c': client_ident(request),
+        'a': kind,
+        's': response.status_code,
+        'd': round(duration * 1000, 3),
+        'x': response_digest(response),
+        # Código do hold criado: os pedidos seguintes que o usam são reproduzidos com o novo código
+        'k': data.get('hold') if isinstance(data := getattr(response, 'data', None), dict) else None,
+    }
+
+
+class CaptureLog:
+    """
+    Ficheiro de registo de um processo: blocos MessagePack comprimidos, acrescentados no fim.
+
+    Os registos são acumulados em memória e gravados num novo frame zstd a cada
+    CAPTURE_FLUSH_RECORDS registos, a cada CAPTURE_FLUSH_INTERVAL segundos e no fim do processo.
+    """
+
+    def __init__(self, directory=CAPTURE_DIR):
+        if msgpack is None or zstandard is None:
+            raise ImproperlyConfigured("O registo de tráfego (DJANGO_CAPTURE=1) requer os pacotes msgpack e zstandard.")
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._pid = None
+        self._compressor = zstandard.ZstdCompressor(level=CAPTURE_ZSTD_LEVEL)
+        atexit.register(self.flush)
+
+    @property
+    def path(self):
+        """Ficheiro do processo atual (um novo ficheiro depois de um fork)."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = self.directory / f"capture-{datetime.now():%Y%m%dT%H%M%S}-{self._pid}{CAPTURE_SUFFIX}"
+        return self._path
+
+    def append(self, record):
+        """
+        Acrescenta um registo (gravado no bloco seguinte).
+
+        Args:
+            record (dict): Registo (ver build_record).
+        """
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) < CAPTURE_FLUSH_RECORDS and time.monotonic() - self._last_flush < CAPTURE_FLUSH_INTERVAL:
+                return
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            self._write(records)
+
+    def flush(self):
+        """Grava os registos em memória."""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            self._write(records)
+
+    def _write(self, records):
+        if not records:
+            return
+        packer = msgpack.Packer(use_bin_type=True)
+        frame = self._compressor.compress(b''.join(packer.pack(record) for record in records))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as file:
+            file.write(frame)
+
+# ================================================================================================
+# LEITURA
+# ================================================================================================
+
+def capture_files(paths):
+    """
+    Lista os ficheiros de registo indicados (ficheiros ou diretorias).
+
+    Args:
+        paths (Iterable[str | Path]): Ficheiros ou diretorias.
+
+    Returns:
+        list[Path]: Ficheiros de registo, por ordem de nome.
+    """
+    files = []
+    for path in map(Path, paths):
+        files += sorted(path.glob(f'*{CAPTURE_SUFFIX}')) if path.is_dir() else [path]
+    return files
+
+
+def read_capture(paths):
+    """
+    Lê os registos de um ou mais ficheiros, por ordem cronológica.
+
+    Um bloco incompleto no fim de um ficheiro (processo interrompido durante a gravação)
+    é ignorado.
+
+    Args:
+        paths (Iterable[str | Path]): Ficheiros ou diretorias de registo.
+
+    Returns:
+        list[dict]: Registos (ver build_record), ordenados pelo instante do pedido.
+    """
+    if msgpack is None or zstandard is None:
+        raise ImproperlyConfigured("A leitura de registos de tráfego requer os pacotes msgpack e zstandard.")
+
+    records = []
+    for path in capture_files(paths):
+        with open(path, 'rb') as file:
+            reader = zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True)
+            unpacker = msgpack.Unpacker(reader, raw=False)
+            try:
+                for record in unpacker:
+                    records.append(record)
+            except (zstandard.ZstdError, ValueError):
+                continue
+    records.sort(key=lambda record: record['t'])
+    return records
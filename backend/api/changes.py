@@ -0,0 +1,145 @@
+"""
+changes.py
+
+Registo incremental de alterações a mesas e reservas (/api/changes/?since=<seq>).
+
+Cada gravação de uma mesa ou reserva recebe um número de sequência global e
+monotónico (campo 'seq', ver models.SequencedModel); cada remoção deixa um tombstone
+com o seu próprio número de sequência. Um cliente guarda o último número recebido e
+pede apenas as alterações posteriores, através dos índices sobre 'seq'.
+
+Os tombstones são apagados ao fim de CHANGES_TOMBSTONE_TTL; clientes que não
+sincronizem durante esse período têm de voltar a sincronizar desde o início (since=0).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Booking, ChangeSequence, Mesa, Tombstone
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Tempo durante o qual as remoções são mantidas (segundos)
+CHANGES_TOMBSTONE_TTL = timedelta(seconds=getattr(settings, 'CHANGES_TOMBSTONE_TTL', 30 * 24 * 60 * 60))
+
+# Número máximo de linhas de cada tipo devolvidas por pedido
+CHANGES_PAGE_SIZE = getattr(settings, 'CHANGES_PAGE_SIZE', 500)
+
+# ================================================================================================
+# REGISTO DE REMOÇÕES
+# ================================================================================================
+
+def record_deletions(model, object_ids):
+    """
+    Regista a remoção de objetos com um único número de sequência.
+
+    Args:
+        model (str): Tombstone.BOOKING ou Tombstone.MESA.
+        object_ids (Iterable[int]): Identificadores dos objetos removidos.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+
+    using = router.db_for_write(Tombstone)
+    with transaction.atomic(using=using):
+        seq = ChangeSequence.advance(using)
+        Tombstone.objects.using(using).bulk_create(
+            [Tombstone(model=model, object_id=object_id, seq=seq) for object_id in object_ids],
+            batch_size=500,
+        )
+
+
+def record_mesa_deletions(mesa_ids):
+    """
+    Regista a remoção de mesas e das reservas removidas em cascata com elas.
+
+    Deve ser chamado antes da remoção, enquanto as reservas ainda existem.
+
+    Args:
+        mesa_ids (Iterable[int]): Identificadores das mesas a remover.
+    """
+    mesa_ids = list(mesa_ids)
+    record_deletions(Tombstone.BOOKING, Booking.objects.filter(mesa__in=mesa_ids).values_list('id', flat=True))
+    record_deletions(Tombstone.MESA, mesa_ids)
+
+
+def prune_tombstones():
+    """
+    Apaga os tombstones mais antigos do que CHANGES_TOMBSTONE_TTL e avança o horizonte.
+
+    Returns:
+        int: Número de tombstones apagados.
+    """
+    using = router.db_for_write(Tombstone)
+    expired = Tombstone.objects.using(using).filter(created_at__lt=timezone.now() - CHANGES_TOMBSTONE_TTL)
+
+    with transaction.atomic(using=using):
+        horizon = expired.aggregate(horizon=Max('seq'))['horizon']
+        if horizon is None:
+            return 0
+        ChangeSequence.objects.using(using).filter(pk=1, horizon__lt=horizon).update(horizon=horizon)
+        # Remove também os tombstones com o mesmo número de sequência, ainda dentro do prazo
+        deleted, _ = Tombstone.objects.using(using).filter(seq__lte=horizon).delete()
+
+    return deleted
+
+# ================================================================================================
+# CONSULTA
+# ================================================================================================
+
+def collect_changes(since, booking_columns, mesa_columns, limit=CHANGES_PAGE_SIZE):
+    """
+    Obtém as alterações com número de sequência superior a 'since'.
+
+    O resultado termina num número de sequência 'until' completo (nenhuma alteração com
+    seq <= until fica de fora), que o cliente usa como 'since' no pedido seguinte.
+
+    Args:
+        since (int): Último número de sequência conhecido pelo cliente.
+        booking_columns (list[str]): Colunas das reservas a devolver (values_list).
+        mesa_columns (list[str]): Colunas das mesas a devolver (values_list).
+        limit (int): Número máximo de linhas de cada tipo.
+
+    Returns:
+        dict | None: 'until', 'more', 'bookings' e 'mesas' (tuplos de colunas) e 'deleted'
+        (identificadores por tipo), ou None se 'since' for anterior ao horizonte dos
+        tombstones (o cliente tem de voltar a sincronizar com since=0).
+    """
+    counter = ChangeSequence.objects.filter(pk=1).values('value', 'horizon').first()
+    current, horizon = (counter['value'], counter['horizon']) if counter else (0, 0)
+    # since=0 (sincronização completa) não depende dos tombstones
+    if 0 < since < horizon:
+        return None
+
+    sources = (Booking.objects.all(), Mesa.objects.all(), Tombstone.objects.all())
+
+    # Número de sequência da primeira alteração que não cabe na página de cada tipo
+    until, more = current, False
+    for queryset in sources:
+        overflow = queryset.filter(seq__gt=since).order_by('seq').values_list('seq', flat=True)[limit:limit + 1]
+        if overflow:
+            more = True
+            until = min(until, overflow[0] - 1)
+    # Uma única alteração em massa maior do que a página é devolvida por inteiro
+    until = max(until, since + 1) if more else until
+
+    bookings, mesas, tombstones = (queryset.filter(seq__gt=since, seq__lte=until).order_by('seq') for queryset in sources)
+
+    deleted = {Tombstone.BOOKING: [], Tombstone.MESA: []}
+    for model, object_id in tombstones.values_list('model', 'object_id'):
+        deleted[model].append(object_id)
+
+    return {
+        'until': until,
+        'more': more,
+        'bookings': list(bookings.values_list(*booking_columns)),
+        'mesas': list(mesas.values_list(*mesa_columns)),
+        'deleted': deleted,
+    }
@@ -0,0 +1,265 @@
+"""
+events.py
+
+Difusão de eventos em tempo real para o endpoint Server-Sent Events (/api/stream/).
+
+Os endpoints que alteram reservas ou mesas publicam eventos compactos com publish().
+Cada processo tem um único broker, que entrega cada evento a todas as ligações SSE
+abertas nesse processo (uma fila asyncio por ligação).
+
+Para a difusão entre workers, cada processo com subscritores cria um socket Unix de
+datagramas numa diretoria partilhada (EVENTS_SOCKET_DIR) e cada evento publicado é
+enviado para todos os sockets dessa diretoria, substituindo localmente um serviço de
+pub/sub (ex.: Redis). Sem EVENTS_SOCKET_DIR, os eventos ficam no processo que os publica.
+
+Uma ligação inativa custa apenas uma fila vazia à espera: não há timers nem tarefas por
+ligação, e um único temporizador por event loop envia os heartbeats a todas as ligações.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import socket
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .locations import get_location, location_database
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Diretoria dos sockets de difusão entre workers (None: apenas no próprio processo)
+EVENTS_SOCKET_DIR = getattr(settings, 'EVENTS_SOCKET_DIR', None)
+
+# Intervalo entre heartbeats enviados a ligações inativas (segundos)
+EVENTS_HEARTBEAT_INTERVAL = getattr(settings, 'EVENTS_HEARTBEAT_INTERVAL', 15)
+
+# Número máximo de eventos pendentes por ligação (ligações lentas recebem um pedido de ressincronização)
+EVENTS_QUEUE_SIZE = 100
+
+# Número máximo de ligações SSE abertas por processo
+EVENTS_MAX_SUBSCRIBERS = getattr(settings, 'EVENTS_MAX_SUBSCRIBERS', 10000)
+
+# Mensagens especiais entregues às filas das ligações
+HEARTBEAT = b''
+RESYNC = b'{"type":"resync"}'
+
+# Tamanho máximo de um datagrama recebido
+_DATAGRAM_SIZE = 65536
+
+# ================================================================================================
+# PUBLICAÇÃO
+# ================================================================================================
+
+def publish(event_type, **data):
+    """
+    Publica um evento depois de a transação atual ser confirmada (ou de imediato, sem transação).
+
+    Os eventos são públicos: não devem incluir dados pessoais (nome, telefone, notas).
+    Cada evento indica o local (café) a que pertence.
+
+    Args:
+        event_type (str): Tipo do evento (ex.: 'booking.created').
+        **data: Campos adicionais do evento (datas e horas são convertidas para ISO 8601).
+    """
+    event = {'type': event_type, 'location': get_location(), **data}
+    message = json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    transaction.on_commit(lambda: broker.publish(message), using=location_database())
+
+
+def booking_event_data(booking):
+    """
+    Campos públicos de uma reserva incluídos nos eventos.
+
+    Args:
+        booking (Booking | dict): Reserva (instância ou dicionário com os mesmos campos).
+
+    Returns:
+        dict: Mesa, data, início e fim da reserva.
+    """
+    get = booking.get if isinstance(booking, dict) else lambda field: getattr(booking, field)
+    return {
+        'mesa': get('mesa_id'),
+        'date': get('date'),
+        'start_time': get('start_time'),
+        'end_time': get('end_time'),
+    }
+
+# ================================================================================================
+# BROKER
+# ================================================================================================
+
+class Broker:
+    """
+    Distribui os eventos pelas ligações SSE do processo.
+
+    Suporta subscritores em vários event loops (ex.: testes); no servidor ASGI existe um
+    único loop por worker.
+    """
+
+    def __init__(self, socket_dir=None):
+        self.socket_dir = Path(socket_dir) if socket_dir else None
+        self._subscribers = {}
+        self._heartbeats = {}
+        self._lock = threading.Lock()
+        self._socket = None
+        self._socket_path = None
+        self._reader_loop = None
+
+    # --------------------------------------------------------------------------------------------
+    # Publicação (qualquer thread)
+    # --------------------------------------------------------------------------------------------
+
+    def publish(self, message):
+        """
+        Envia uma mensagem a todos os subscritores (de todos os workers, com socket_dir).
+
+        Args:
+            message (bytes): Evento serializado em JSON.
+        """
+        if self.socket_dir is None:
+            self.deliver(message)
+            return
+
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for path in self.socket_dir.glob('*.sock'):
+                try:
+                    sender.sendto(message, str(path))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Socket de um worker que já terminou
+                    path.unlink(missing_ok=True)
+                except BlockingIOError:
+                    # Worker sobrecarregado: o evento é descartado para esse worker
+                    pass
+        finally:
+            sender.close()
+
+    def deliver(self, message):
+        """
+        Entrega uma mensagem às ligações deste processo, no event loop de cada uma.
+
+        Args:
+            message (bytes): Evento serializado em JSON (ou HEARTBEAT).
+        """
+        with self._lock:
+            loops = list(self._subscribers)
+
+        for loop in loops:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._deliver_local, loop, message)
+
+    # --------------------------------------------------------------------------------------------
+    # Subscrição (event loop da ligação)
+    # --------------------------------------------------------------------------------------------
+
+    @property
+    def subscriber_count(self):
+        """Número de ligações SSE abertas neste processo."""
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self):
+        """
+        Regista uma nova ligação no event loop atual.
+
+        Returns:
+            asyncio.Queue: Fila de onde a ligação lê os eventos.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+
+        with self._lock:
+            self._subscribers.setdefault(loop, set()).add(queue)
+
+        if loop not in self._heartbeats:
+            self._heartbeats[loop] = loop.call_later(EVENTS_HEARTBEAT_INTERVAL, self._heartbeat, loop)
+
+        if self.socket_dir is not None and (self._reader_loop is None or self._reader_loop.is_closed()):
+            self._bind(loop)
+
+        return queue
+
+    def unsubscribe(self, queue):
+        """
+        Remove uma ligação (ex.: quando o cliente se desliga).
+
+        Args:
+            queue (asyncio.Queue): Fila devolvida por subscribe().
+        """
+        with self._lock:
+            for loop, queues in list(self._subscribers.items()):
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[loop]
+                    handle = self._heartbeats.pop(loop, None)
+                    if handle is not None:
+                        handle.cancel()
+
+    # --------------------------------------------------------------------------------------------
+    # Funções auxiliares
+    # --------------------------------------------------------------------------------------------
+
+    def _deliver_local(self, loop, message):
+        """Coloca a mensagem nas filas das ligações do loop (executado no próprio loop)."""
+        with self._lock:
+            queues = list(self._subscribers.get(loop, ()))
+
+        for queue in queues:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Ligação lenta: descarta os eventos pendentes e pede ao cliente que volte a sincronizar
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def _heartbeat(self, loop):
+        """Envia um heartbeat a todas as ligações do loop e agenda o seguinte."""
+        self._deliver_local(loop, HEARTBEAT)
+        with self._lock:
+            active = loop in self._subscribers
+        if active:
+            self._heartbeats[loop] = loop.call_later(EVENTS_HEARTBEAT_INTERVAL, self._heartbeat, loop)
+        else:
+            self._heartbeats.pop(loop, None)
+
+    def _bind(self, loop):
+        """Cria o socket de difusão deste processo e regista-o no loop."""
+        if self._socket is None:
+            self.socket_dir.mkdir(parents=True, exist_ok=True)
+            self._socket_path = self.socket_dir / f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock'
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._socket.bind(str(self._socket_path))
+            self._socket.setblocking(False)
+            atexit.register(self._close)
+
+        loop.add_reader(self._socket.fileno(), self._receive)
+        self._reader_loop = loop
+
+    def _receive(self):
+        """Lê os datagramas pendentes e entrega-os às ligações deste processo."""
+        while True:
+            try:
+                message = self._socket.recv(_DATAGRAM_SIZE)
+            except BlockingIOError:
+                return
+            self.deliver(message)
+
+    def _close(self):
+        """Remove o socket deste processo."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket_path.unlink(missing_ok=True)
+
+
+# Broker único do processo
+broker = Broker(EVENTS_SOCKET_DIR)
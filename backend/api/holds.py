@@ -0,0 +1,226 @@
+"""
+holds.py
+
+Reservas temporárias de mesas (holds): enquanto o cliente preenche o formulário de
+reserva, o horário escolhido fica guardado durante HOLD_SECONDS segundos, sem escrever
+na base de dados.
+
+Cada mesa guardada ocupa, na cache, uma chave por intervalo de SLOT_MINUTES minutos da
+reserva (o mesmo formato do calendário de api/slots.py), criada com cache.add: a
+criação é atómica, pelo que dois pedidos simultâneos nunca guardam o mesmo intervalo da
+mesma mesa. As chaves expiram sozinhas; um formulário abandonado não deixa nada para
+limpar. Duas reservas sobrepostas partilham sempre pelo menos um intervalo, pelo que
+basta consultar as chaves dos intervalos de uma reserva para saber se está livre.
+
+create_booking, a disponibilidade e as sugestões de horários tratam as mesas guardadas
+como ocupadas (exceto para o pedido que apresenta o respetivo código). Uma chave por
+data ('holds_<local>_<data>') indica se existe algum hold nessa data: nas restantes
+datas, nenhuma chave de mesa é lida.
+
+Com vários processos, o backend de cache tem de ser partilhado (DJANGO_REDIS_URL ou
+DJANGO_CACHE_TABLE em core/settings.py); o gunicorn recusa arrancar com vários workers e
+a cache em memória de cada processo.
+"""
+
+import secrets
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .allocation import RESERVATION_DURATION
+from .locations import get_location
+from .slots import SLOT, SLOTS_PER_DAY, occupied_slots
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Tempo (segundos) durante o qual um horário fica guardado
+HOLD_SECONDS = getattr(settings, 'HOLD_SECONDS', 5 * 60)
+
+# Chave de cache de um intervalo guardado de uma mesa (valor: código do hold)
+HOLD_SLOT_KEY = 'hold_%(location)s_%(date)s_%(mesa)s_%(slot)s'
+
+# Chave de cache que indica a existência de holds numa data
+HOLD_DAY_KEY = 'holds_%(location)s_%(date)s'
+
+# Chave de cache de um hold (data, início e chaves dos intervalos guardados)
+HOLD_KEY = 'hold_%(token)s'
+
+# ================================================================================================
+# INTERVALOS
+# ================================================================================================
+
+def hold_slots(start, end):
+    """
+    Intervalos de SLOT_MINUTES minutos ocupados, total ou parcialmente, por uma reserva.
+
+    Args:
+        start (datetime): Início da reserva.
+        end (datetime): Fim da reserva.
+
+    Returns:
+        range: Índices dos intervalos (contados a partir das 00:00 da data de início).
+    """
+    midnight = datetime.combine(start.date(), time.min)
+    return range((start - midnight) // SLOT, -((midnight - end) // SLOT))
+
+
+def _slot_keys(location, day, mesa_ids, slots):
+    """
+    Chaves de cache dos intervalos das mesas indicadas, por mesa.
+
+    Os intervalos depois da meia-noite pertencem à data seguinte, para que uma reserva
+    que termina depois da meia-noite ocupe as mesmas chaves que as reservas dessa data.
+    """
+    dates = {slot: (day + timedelta(days=slot // SLOTS_PER_DAY)).isoformat() for slot in slots}
+    return {
+        mesa_id: [
+            HOLD_SLOT_KEY % {'location': location, 'date': dates[slot], 'mesa': mesa_id, 'slot': slot % SLOTS_PER_DAY}
+            for slot in slots
+        ]
+        for mesa_id in mesa_ids
+    }
+
+
+def _day_keys(location, start, end):
+    """Chaves de cache que indicam a existência de holds nas datas de um período."""
+    return [
+        HOLD_DAY_KEY % {'location': location, 'date': (start.date() + timedelta(days=offset)).isoformat()}
+        for offset in range((end - timedelta(microseconds=1)).date().toordinal() - start.date().toordinal() + 1)
+    ]
+
+# ================================================================================================
+# CRIAÇÃO E LIBERTAÇÃO
+# ================================================================================================
+
+def place_hold(start, mesa_ids, end=None):
+    """
+    Guarda uma ou mais mesas (mesas juntas) para uma reserva no local atual.
+
+    Cada intervalo é guardado com cache.add (atómico); se algum já estiver guardado por
+    outro pedido, os intervalos guardados por esta chamada são libertados. A chave da data
+    é gravada antes dos intervalos: um pedido que encontre um intervalo guardado encontra
+    sempre a chave da respetiva data.
+
+    Args:
+        start (datetime): Início da reserva.
+        mesa_ids (Iterable[int]): Mesas a guardar.
+        end (datetime | None): Fim da reserva (por defeito, start + RESERVATION_DURATION).
+
+    Returns:
+        str | None: Código do hold, ou None se alguma das mesas já estiver guardada.
+    """
+    end = end or start + RESERVATION_DURATION
+    location = get_location()
+    token = secrets.token_urlsafe(16)
+
+    keys = [key for mesa_keys in _slot_keys(location, start.date(), mesa_ids, hold_slots(start, end)).values() for key in mesa_keys]
+    cache.set_many(dict.fromkeys(_day_keys(location, start, end), True), HOLD_SECONDS)
+
+    added = []
+    for key in keys:
+        if not cache.add(key, token, HOLD_SECONDS):
+            cache.delete_many(added)
+            return None
+        added.append(key)
+
+    cache.set(HOLD_KEY % {'token': token}, {'location': location, 'start': start, 'keys': keys}, HOLD_SECONDS)
+    return token
+
+
+def get_hold(token):
+    """
+    Devolve um hold ativo.
+
+    Args:
+        token (str): Código do hold.
+
+    Returns:
+        dict | None: {"location": str, "start": datetime, "keys": list[str]}, ou None se
+        o hold não existir ou tiver expirado.
+    """
+    if not token:
+        return None
+    return cache.get(HOLD_KEY % {'token': token})
+
+
+def release_hold(token):
+    """
+    Liberta um hold antes de expirar (reserva criada ou formulário cancelado).
+
+    Apenas são removidas as chaves que ainda pertencem ao hold.
+
+    Args:
+        token (str): Código do hold.
+
+    Returns:
+        bool: True se o hold existia.
+    """
+    hold = get_hold(token)
+    if hold is None:
+        return False
+    owned = [key for key, value in cache.get_many(hold['keys']).items() if value == token]
+    cache.delete_many([*owned, HOLD_KEY % {'token': token}])
+    return True
+
+# ================================================================================================
+# MESAS GUARDADAS
+# ================================================================================================
+
+def held_intervals(start, end, mesa_ids, exclude=None):
+    """
+    Intervalos guardados por holds das mesas indicadas, num período do local atual.
+
+    Args:
+        start (datetime): Início do período (ex.: de uma nova reserva).
+        end (datetime): Fim do período.
+        mesa_ids (Iterable[int]): Mesas.
+        exclude (str | None): Código de um hold a ignorar (o do próprio pedido).
+
+    Returns:
+        dict[int, list[tuple[datetime, datetime]]]: Intervalos guardados de cada mesa, no
+        formato das reservas de api/allocation.py::find_table.
+    """
+    location = get_location()
+    day = start.date()
+    held = defaultdict(list)
+    if not cache.get_many(_day_keys(location, start, end)):
+        return held
+
+    slots = hold_slots(start, end)
+    keys = _slot_keys(location, day, mesa_ids, slots)
+    values = cache.get_many([key for mesa_keys in keys.values() for key in mesa_keys])
+    midnight = datetime.combine(day, time.min)
+    for mesa_id, mesa_keys in keys.items():
+        for slot, key in zip(slots, mesa_keys):
+            if values.get(key, exclude) != exclude:
+                held[mesa_id].append((midnight + slot * SLOT, midnight + (slot + 1) * SLOT))
+    return held
+
+
+def with_holds(day, occupancy, mesa_ids):
+    """
+    Acrescenta os holds de uma data aos horários ocupados de cada mesa.
+
+    Args:
+        day (date): Data.
+        occupancy (Mapping[int, int]): Horários ocupados de cada mesa (ver api/suggestions.py::get_occupancy).
+        mesa_ids (Iterable[int]): Mesas a considerar.
+
+    Returns:
+        Mapping[int, int]: Horários ocupados de cada mesa, incluindo os holds (o próprio
+        'occupancy' se não houver holds na data).
+    """
+    # Inclui o início da data seguinte, onde terminam as reservas que começam antes da meia-noite
+    midnight = datetime.combine(day, time.min)
+    held = held_intervals(midnight, midnight + SLOTS_PER_DAY * SLOT + RESERVATION_DURATION, mesa_ids)
+    if not held:
+        return occupancy
+
+    occupancy = dict(occupancy)
+    for mesa_id, intervals in held.items():
+        occupancy[mesa_id] = occupancy.get(mesa_id, 0) | occupied_slots(day, intervals)
+    return occupancy
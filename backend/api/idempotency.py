@@ -0,0 +1,249 @@
+"""
+idempotency.py
+
+Suporte ao cabeçalho 'Idempotency-Key' nos endpoints mutáveis da API.
+
+Quando um cliente envia o cabeçalho, o primeiro resultado do pedido é armazenado
+(com TTL) na tabela indexada IdempotencyKey. Repetições com a mesma chave devolvem
+a resposta armazenada através de uma única leitura por chave única, sem voltar a
+executar validações nem a lógica de alocação de mesas. Repetições concorrentes
+aguardam que o primeiro pedido termine.
+
+As chaves expiradas são ignoradas (e substituídas) quando a mesma chave volta a ser
+usada; as restantes são removidas periodicamente por prune_idempotency_keys (comando
+'python manage.py prune_idempotency_keys'), e não em cada pedido.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .locations import get_location
+from .models import IdempotencyKey
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Nome do cabeçalho HTTP utilizado pelos clientes
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Tamanho máximo aceite para o valor do cabeçalho
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Tempo de vida de uma chave armazenada (segundos)
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+# Tempo máximo que uma repetição concorrente aguarda pelo primeiro pedido (segundos)
+IDEMPOTENCY_WAIT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+
+# Intervalo entre verificações enquanto o primeiro pedido está em curso (segundos)
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+# ================================================================================================
+# DECORADOR
+# ================================================================================================
+
+def idempotent(view_func):
+    """
+    Torna um endpoint mutável idempotente quando o cliente envia 'Idempotency-Key'.
+
+    Deve ser aplicado diretamente sobre a função da view (abaixo de @api_view e dos
+    restantes decoradores do DRF), para que autenticação, permissões e rate limiting
+    sejam avaliados antes de consultar a chave.
+
+    Comportamento:
+        - Sem cabeçalho: o endpoint é executado normalmente.
+        - Primeira utilização da chave: o endpoint é executado e a resposta armazenada.
+        - Repetição com o mesmo pedido: devolve a resposta armazenada.
+        - Repetição com pedido diferente: 422 UNPROCESSABLE ENTITY.
+        - Repetição enquanto o primeiro pedido está em curso: aguarda o resultado
+          (até IDEMPOTENCY_WAIT_TIMEOUT), devolvendo 409 CONFLICT se o tempo esgotar.
+
+    Args:
+        view_func: Função da view a proteger.
+
+    Returns:
+        function: View envolvida com o tratamento de idempotência.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        raw_key = request.headers.get(IDEMPOTENCY_HEADER)
+
+        # Sem cabeçalho, o pedido segue o fluxo habitual
+        if not raw_key:
+            return view_func(request, *args, **kwargs)
+
+        if len(raw_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {"detail": f"Cabeçalho '{IDEMPOTENCY_HEADER}' inválido. Máximo de {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        key = _scoped_key(request, view_func.__name__, raw_key)
+        request_hash = _request_fingerprint(request)
+
+        # Tenta reservar a chave; já reservada por outro pedido, devolve a resposta armazenada
+        record = _reserve(key, request_hash)
+        if record is None:
+            return _replay(key, request_hash)
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            # Liberta a chave para que o cliente possa repetir o pedido
+            record.delete()
+            raise
+
+        # Erros do servidor não são armazenados, permitindo nova tentativa
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            status_code=response.status_code,
+            response_body=json.dumps(response.data, cls=DjangoJSONEncoder),
+        )
+
+        return response
+
+    return wrapper
+
+# ================================================================================================
+# LIMPEZA
+# ================================================================================================
+
+def prune_idempotency_keys():
+    """
+    Remove as chaves expiradas (consulta pelo índice de expires_at).
+
+    Executado periodicamente (comando prune_idempotency_keys), fora dos pedidos: as chaves
+    expiradas que ainda existam são ignoradas pelo decorador.
+
+    Returns:
+        int: Número de chaves removidas.
+    """
+    removed, _ = IdempotencyKey.objects.filter(expires_at__lt=timezone.now()).delete()
+    return removed
+
+# ================================================================================================
+# FUNÇÕES AUXILIARES
+# ================================================================================================
+
+def _reserve(key, request_hash):
+    """
+    Reserva uma chave para o pedido atual.
+
+    A restrição UNIQUE garante que apenas um pedido a obtém (num savepoint, para que a
+    falha não interrompa uma transação em curso). Uma chave expirada que ainda não foi
+    removida pela limpeza periódica é libertada e reservada de novo; entre pedidos
+    concorrentes, apenas um consegue removê-la.
+
+    Args:
+        key (str): Chave armazenada.
+        request_hash (str): Impressão digital do pedido.
+
+    Returns:
+        IdempotencyKey | None: Registo criado, ou None se a chave já estiver reservada.
+    """
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic(using=IdempotencyKey.objects.db):
+                return IdempotencyKey.objects.create(
+                    key=key,
+                    request_hash=request_hash,
+                    expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+                )
+        except IntegrityError:
+            expired, _ = IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+            if not expired:
+                return None
+    return None
+
+
+def _scoped_key(request, endpoint, raw_key):
+    """
+    Gera a chave armazenada, isolando-a por local, endpoint e utilizador.
+
+    Args:
+        request: Pedido DRF atual.
+        endpoint (str): Nome da view protegida.
+        raw_key (str): Valor do cabeçalho enviado pelo cliente.
+
+    Returns:
+        str: Hash SHA-256 (hexadecimal) da chave composta.
+    """
+    user_id = request.user.pk if request.user and request.user.is_authenticated else 'anon'
+    composite = f"{get_location()}:{endpoint}:{user_id}:{raw_key}"
+    return hashlib.sha256(composite.encode()).hexdigest()
+
+
+def _request_fingerprint(request):
+    """
+    Calcula a impressão digital do pedido (método, caminho e corpo).
+
+    Args:
+        request: Pedido DRF atual.
+
+    Returns:
+        str: Hash SHA-256 (hexadecimal) do pedido.
+    """
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    payload = f"{request.method}:{request.path}:{body}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(key, request_hash):
+    """
+    Devolve a resposta armazenada para uma chave já utilizada.
+
+    Se o primeiro pedido ainda estiver em curso, aguarda até IDEMPOTENCY_WAIT_TIMEOUT
+    segundos pela sua conclusão.
+
+    Args:
+        key (str): Chave armazenada.
+        request_hash (str): Impressão digital do pedido repetido.
+
+    Returns:
+        Response: Resposta original, ou erro 409/422.
+    """
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+
+    while True:
+        record = IdempotencyKey.objects.filter(key=key).first()
+
+        # O primeiro pedido falhou e libertou a chave entretanto
+        if record is None:
+            return Response(
+                {"detail": "O pedido original falhou. Repita o pedido."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        if record.request_hash != request_hash:
+            return Response(
+                {"detail": f"O cabeçalho '{IDEMPOTENCY_HEADER}' já foi utilizado com um pedido diferente."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        if record.status_code is not None:
+            response = Response(json.loads(record.response_body), status=record.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        if time.monotonic() >= deadline:
+            return Response(
+                {"detail": "Um pedido com a mesma chave ainda está em processamento."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
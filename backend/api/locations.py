@@ -0,0 +1,126 @@
+"""
+locations.py
+
+Suporte a vários locais (cafés) numa única instalação.
+
+As mesas, reservas (incluindo as recorrentes) e horários de cada local (e o respetivo registo de alterações)
+ficam numa base de dados própria (settings.LOCATIONS), escolhida pelo LocationRouter
+a partir do local do pedido atual. Os restantes modelos (utilizadores, sessões, chaves de
+idempotência) ficam na base de dados 'default'.
+
+O local do pedido é definido pelo LocationMiddleware (cabeçalho 'X-Location' ou cookie
+'location') e guardado numa ContextVar, válida tanto em views síncronas como assíncronas.
+As views continuam a usar os managers habituais (Mesa.objects, Booking.objects).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Locais configurados (identificador -> {'name', 'database'})
+LOCATIONS = settings.LOCATIONS
+
+# Local usado quando o pedido não indica nenhum
+DEFAULT_LOCATION = settings.DEFAULT_LOCATION
+
+# Cabeçalho HTTP e cookie com o local do pedido
+LOCATION_HEADER = 'X-Location'
+LOCATION_COOKIE = 'location'
+
+# Modelos guardados na base de dados de cada local
+SHARDED_MODELS = {'mesa', 'booking', 'recurringbooking', 'changesequence', 'tombstone', 'openinghours', 'specialhours', 'closure'}
+
+# Local do pedido (ou bloco use_location) atual
+_current_location = ContextVar('location', default=DEFAULT_LOCATION)
+
+# ================================================================================================
+# LOCAL ATUAL
+# ================================================================================================
+
+def get_location():
+    """
+    Devolve o identificador do local atual.
+
+    Returns:
+        str: Identificador do local (chave de settings.LOCATIONS).
+    """
+    return _current_location.get()
+
+
+def location_database(location=None):
+    """
+    Devolve o alias da base de dados de um local.
+
+    Args:
+        location (str | None): Identificador do local (o local atual, se None).
+
+    Returns:
+        str: Alias em settings.DATABASES.
+    """
+    return LOCATIONS[location or get_location()]['database']
+
+
+@contextmanager
+def use_location(location):
+    """
+    Executa o bloco com 'location' como local atual.
+
+    Args:
+        location (str): Identificador do local.
+
+    Raises:
+        KeyError: Se o local não estiver configurado.
+    """
+    if location not in LOCATIONS:
+        raise KeyError(location)
+
+    token = _current_location.set(location)
+    try:
+        yield
+    finally:
+        _current_location.reset(token)
+
+# ================================================================================================
+# ROUTER
+# ================================================================================================
+
+class LocationRouter:
+    """
+    Encaminha os modelos de cada local para a base de dados do local atual.
+    """
+
+    def _is_sharded(self, model):
+        # Tabelas intermédias das relações ManyToMany (ex.: Mesa.adjacent): as do modelo de origem.
+        # Os modelos sem app (ex.: a tabela da DatabaseCache) não têm 'auto_created'
+        if getattr(model._meta, 'auto_created', False):
+            model = model._meta.auto_created
+        return model._meta.app_label == 'api' and model._meta.model_name in SHARDED_MODELS
+
+    def db_for_read(self, model, **hints):
+        if not self._is_sharded(model):
+            return None
+        # Objetos relacionados (ex.: booking.mesa) ficam na base de dados da instância de origem
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return location_database()
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._is_sharded(type(obj1)) or self._is_sharded(type(obj2)):
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default':
+            return None
+        # Bases de dados dos locais: apenas os modelos de cada local (e migrações de dados da app)
+        if app_label != 'api':
+            return False
+        return model_name is None or model_name in SHARDED_MODELS
@@ -0,0 +1,41 @@
+"""
+materialise_recurrences.py
+
+Cria, em massa, as reservas das reservas recorrentes de todos os locais para as próximas
+semanas (ver api/recurrence.py) e remove as regras terminadas há mais do que o período
+de expiração das reservas. Deve ser executado diariamente (ex.: cron), para que a janela
+de reservas criadas avance sem custo para os pedidos.
+
+Execução:
+    python manage.py materialise_recurrences [--days 28]
+"""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.locations import LOCATIONS, use_location
+from api.recurrence import RECURRENCE_WINDOW_DAYS, materialise_recurrences, prune_recurrences
+from api.views import BOOKING_EXPIERY_DAYS
+
+
+class Command(BaseCommand):
+    help = "Cria as reservas das reservas recorrentes de todos os locais para os próximos dias."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=RECURRENCE_WINDOW_DAYS,
+            help=f"Dias, a partir de hoje, com as reservas criadas (por defeito: {RECURRENCE_WINDOW_DAYS}).",
+        )
+
+    def handle(self, *args, **options):
+        through = date.today() + timedelta(days=max(options['days'], RECURRENCE_WINDOW_DAYS))
+
+        for location, config in LOCATIONS.items():
+            with use_location(location):
+                pruned = prune_recurrences(date.today() - timedelta(days=BOOKING_EXPIERY_DAYS))
+                created, skipped = materialise_recurrences(through)
+            self.stdout.write(
+                f"{config['name']}: {created} reserva(s) criada(s) até {through}, "
+                f"{len(skipped)} data(s) ignorada(s), {pruned} regra(s) terminada(s) removida(s)."
+            )
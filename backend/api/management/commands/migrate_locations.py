@@ -0,0 +1,26 @@
+"""
+migrate_locations.py
+
+Aplica as migrações à base de dados 'default' e às bases de dados de todos os locais.
+
+Execução:
+    python manage.py migrate_locations [--noinput]
+"""
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Aplica as migrações à base de dados 'default' e às bases de dados de todos os locais (settings.LOCATIONS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        databases = dict.fromkeys(['default', *(config['database'] for config in settings.LOCATIONS.values())])
+
+        for database in databases:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Base de dados '{database}':"))
+            call_command('migrate', database=database, interactive=options['interactive'], verbosity=options['verbosity'])
@@ -0,0 +1,22 @@
+"""
+prune_idempotency_keys.py
+
+Remove as chaves 'Idempotency-Key' expiradas (ver api/idempotency.py). Deve ser
+executado periodicamente (ex.: cron, diariamente), para que a tabela não cresça sem
+custo para os pedidos, que apenas ignoram as chaves expiradas.
+
+Execução:
+    python manage.py prune_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.idempotency import prune_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Remove as chaves 'Idempotency-Key' expiradas."
+
+    def handle(self, *args, **options):
+        removed = prune_idempotency_keys()
+        self.stdout.write(f"{removed} chave(s) expirada(s) removida(s).")
@@ -0,0 +1,27 @@
+"""
+rebuild_search_index.py
+
+Volta a criar o índice de pesquisa das reservas (ver api/search.py) na base de dados
+'default' e nas bases de dados de todos os locais, e indexa todas as reservas. Necessário
+depois de uma migração que recrie a tabela das reservas no SQLite (remove os triggers).
+
+Execução:
+    python manage.py rebuild_search_index
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = "Volta a criar o índice de pesquisa das reservas em todas as bases de dados e indexa as reservas existentes."
+
+    def handle(self, *args, **options):
+        databases = dict.fromkeys(['default', *(config['database'] for config in settings.LOCATIONS.values())])
+
+        for database in databases:
+            install_search_index(connections[database])
+            self.stdout.write(f"Base de dados '{database}': índice de pesquisa reconstruído.")
@@ -0,0 +1,138 @@
+"""
+replay_capture.py
+
+Reproduz tráfego registado com DJANGO_CAPTURE=1 (ver api/capture.py) contra o código
+atual e uma cópia de uma base de dados, e compara latências e respostas por rota
+(ver api/replay.py).
+
+A base de dados indicada nunca é alterada: é copiada para uma diretoria temporária,
+atualizada com as migrações do código atual e deslocada no tempo, tal como os pedidos.
+
+Execução:
+    python manage.py replay_capture data/captures --snapshot backup/db.sqlite3
+    python manage.py replay_capture data/captures --snapshot backup/db.sqlite3 --speed 10 --concurrency 8 --json relatorio.json
+"""
+
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.capture import read_capture
+from api.replay import SKIPPED_ROUTES, Replayer, shift_database, shift_weeks, summarise
+
+
+class Command(BaseCommand):
+    help = (
+        "Reproduz um registo de tráfego da API contra o código atual e uma cópia de uma base de dados, "
+        "ao ritmo original ou acelerado, e compara latências e respostas por rota."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('captures', nargs='+', help="Ficheiros ou diretorias de registo (*.msgpack.zst).")
+        parser.add_argument('--snapshot', required=True, help="Cópia (ou backup) da base de dados 'default' (SQLite).")
+        parser.add_argument(
+            '--locations-snapshot',
+            help="Diretoria com as bases de dados dos locais (location_<local>.sqlite3). Sem ela, os locais começam vazios.",
+        )
+        parser.add_argument('--speed', type=float, default=1.0, help="Fator de aceleração (1 = ritmo original, 0 = sem pausas).")
+        parser.add_argument('--concurrency', type=int, default=1, help="Pedidos simultâneos (1 = ordem exata do registo).")
+        parser.add_argument('--shift-days', type=int, help="Dias a somar às datas (por defeito: semanas desde o registo).")
+        parser.add_argument('--json', help="Grava o relatório neste ficheiro (JSON).")
+
+    def handle(self, *args, **options):
+        try:
+            records = read_capture(options['captures'])
+        except OSError as e:
+            raise CommandError(str(e))
+        if not records:
+            raise CommandError("O registo não contém pedidos.")
+
+        snapshot = Path(options['snapshot'])
+        if not snapshot.is_file():
+            raise CommandError(f"Base de dados não encontrada: {snapshot}")
+
+        with tempfile.TemporaryDirectory(prefix='replay-') as directory:
+            self._prepare_databases(snapshot, options['locations_snapshot'], Path(directory))
+
+            shift_days = options['shift_days'] if options['shift_days'] is not None else shift_weeks(records)
+            shift_database(shift_days)
+
+            skipped = sum(record.get('r') in SKIPPED_ROUTES for record in records)
+            self.stdout.write(
+                f"{len(records) - skipped} pedidos a reproduzir ({skipped} ignorados: {', '.join(sorted(SKIPPED_ROUTES))}), "
+                f"datas deslocadas {shift_days} dias, velocidade {options['speed'] or 'máxima'}\n"
+            )
+
+            replayer = Replayer(speed=options['speed'], concurrency=max(1, options['concurrency']), shift_days=shift_days)
+            results = replayer.run(records, progress=lambda done: self.stdout.write(f"  {done} pedidos reproduzidos"))
+            connections.close_all()
+
+        summary = summarise(results)
+        if not summary:
+            self.stdout.write("Nenhum pedido reproduzido.")
+            return
+
+        headers = ['Rota', 'Pedidos', 'Original p50 (ms)', 'Original p95 (ms)', 'Reprodução p50 (ms)',
+                   'Reprodução p95 (ms)', 'Variação p50', 'Estado diferente', 'Resposta diferente']
+        rows = [
+            [
+                item['route'],
+                item['requests'],
+                f"{item['original_p50']:.1f}",
+                f"{item['original_p95']:.1f}",
+                f"{item['replay_p50']:.1f}",
+                f"{item['replay_p95']:.1f}",
+                f"{item['change']:+.0%}" if item['change'] is not None else '-',
+                item['status_mismatches'],
+                item['body_mismatches'],
+            ]
+            for item in summary
+        ]
+        self._print_table(headers, rows)
+
+        if options['json']:
+            Path(options['json']).write_text(json.dumps(summary, indent=4))
+
+    def _prepare_databases(self, snapshot, locations_snapshot, directory):
+        """Copia as bases de dados para 'directory', aponta as ligações para as cópias e aplica as migrações."""
+        aliases = dict.fromkeys(['default', *(config['database'] for config in settings.LOCATIONS.values())])
+
+        for alias in aliases:
+            if alias == 'default':
+                source = snapshot
+            elif locations_snapshot:
+                source = Path(locations_snapshot) / f'{alias}.sqlite3'
+            else:
+                source = None
+
+            target = directory / f'{alias}.sqlite3'
+            if source is not None and source.is_file():
+                # API de backup do SQLite: cópia consistente mesmo de uma base de dados em uso
+                origin, copy = sqlite3.connect(source), sqlite3.connect(target)
+                try:
+                    origin.backup(copy)
+                finally:
+                    origin.close()
+                    copy.close()
+
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = str(target)
+
+        call_command('migrate_locations', interactive=False, verbosity=0)
+
+    def _print_table(self, headers, rows):
+        """Imprime os resultados em formato de tabela."""
+        rows = [[str(cell) for cell in row] for row in rows]
+        widths = [max(len(header), *(len(row[i]) for row in rows)) for i, header in enumerate(headers)]
+        line = '  '.join(header.ljust(width) for header, width in zip(headers, widths))
+        self.stdout.write(line)
+        self.stdout.write('-' * len(line))
+        for row in rows:
+            self.stdout.write('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,110 @@
+"""
+simulate_capacity.py
+
+Simula o efeito de alterações à duração das reservas, ao horário de funcionamento, às
+mesas ou à estratégia de alocação, reproduzindo pedidos de reserva em memória
+(ver api/simulation.py).
+
+Execução:
+    python manage.py simulate_capacity --days 365 --requests-per-day 150 \\
+        --policy "name=atual" --policy "name=90min,duration=90" --policy "name=best-fit,strategy=best_fit"
+
+    python manage.py simulate_capacity --input pedidos.csv --tables 6x2+6x4+2x6 --policy "name=atual"
+"""
+
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from api.locations import use_location
+from api.models import Booking, Mesa
+from api.simulation import load_requests, order_requests, parse_policy, parse_tables, simulate_policies, synthetic_requests
+from benchmarks import print_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Reproduz pedidos de reserva (sintéticos, de um CSV ou das reservas existentes) com uma ou mais "
+        "políticas de alocação e apresenta a taxa de aceitação, a utilização dos lugares e o tempo de alocação."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--input', help="CSV com as colunas date, time, number_of_guests e (opcional) requested_at.")
+        source.add_argument('--from-db', action='store_true', help="Reproduz as reservas existentes do local.")
+
+        parser.add_argument('--days', type=int, default=365, help="Dias de pedidos sintéticos (por defeito: 365).")
+        parser.add_argument('--requests-per-day', type=float, default=80, help="Pedidos sintéticos por dia (por defeito: 80).")
+        parser.add_argument('--start', type=date.fromisoformat, help="Primeiro dia dos pedidos sintéticos (por defeito: amanhã).")
+        parser.add_argument('--seed', type=int, default=0, help="Semente dos pedidos sintéticos.")
+        parser.add_argument('--tables', help="Mesas, ex.: 4x2+6x4+2x6 (por defeito: as mesas do local).")
+        parser.add_argument('--location', help="Local cujas mesas/reservas são usadas (por defeito: o principal).")
+        parser.add_argument(
+            '--policy', action='append', default=[],
+            help="Política a simular (repetível), ex.: \"name=90min,duration=90,open=09:00,close=23:00,closed=0+6,"
+                 "strategy=best_fit,tables=6x2+6x4\". Por defeito: a política atual.",
+        )
+        parser.add_argument('--jobs', type=int, help="Número de processos (por defeito: um por CPU).")
+
+    def handle(self, *args, **options):
+        try:
+            if options['location']:
+                with use_location(options['location']):
+                    tables, requests = self._load(options)
+            else:
+                tables, requests = self._load(options)
+        except KeyError:
+            raise CommandError(f"Local desconhecido: '{options['location']}'.")
+
+        try:
+            policies = [parse_policy(spec, tables) for spec in options['policy'] or ['name=atual']]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if any(not policy.tables for policy in policies):
+            raise CommandError("Não existem mesas para simular. Indique-as com --tables (ex.: 4x2+6x4+2x6).")
+
+        self.stdout.write(f"{len(requests)} pedidos, {len(policies)} política(s)\n")
+        results = simulate_policies(policies, requests, options['jobs'])
+
+        headers = ['Política', 'Aceites', 'Fechado', 'Sem mesa', 'Utilização', 'Ocupação das mesas',
+                   'Alocação (µs, média)', 'Alocação (µs, p99)', 'Tempo (s)']
+        rows = [
+            [
+                result['policy'],
+                f"{result['acceptance']:.1%}",
+                result['rejected_closed'],
+                result['rejected_full'],
+                f"{result['utilisation']:.1%}",
+                f"{result['fill']:.1%}",
+                f"{result['alloc_mean_us']:.1f}",
+                f"{result['alloc_p99_us']:.1f}",
+                f"{result['elapsed']:.2f}",
+            ]
+            for result in results
+        ]
+        print_table(headers, rows)
+
+    def _load(self, options):
+        """Obtém as mesas e o fluxo de pedidos a simular."""
+        try:
+            if options['tables']:
+                tables = parse_tables(options['tables'])
+            else:
+                tables = list(Mesa.objects.order_by('pk').values_list('id', 'lugares'))
+
+            if options['input']:
+                requests = load_requests(options['input'])
+            elif options['from_db']:
+                # Sem o momento do pedido, as reservas são reproduzidas pela ordem de criação
+                rows = Booking.objects.order_by('pk').values_list('date', 'start_time', 'number_of_guests')
+                requests = order_requests([(None, datetime.combine(day, start), guests) for day, start, guests in rows])
+            else:
+                start = options['start'] or date.today() + timedelta(days=1)
+                requests = synthetic_requests(start, options['days'], options['requests_per_day'], options['seed'])
+        except (OSError, ValueError, DatabaseError) as e:
+            raise CommandError(str(e))
+
+        return tables, requests
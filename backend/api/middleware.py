@@ -0,0 +1,242 @@
+"""
+middleware.py
+
+Middleware da API.
+
+    - CompressionMiddleware: compressão das respostas da API (zstd ou gzip, negociada pelo
+      cabeçalho Accept-Encoding) acima de um tamanho mínimo.
+    - LocationMiddleware: seleção do local (café) do pedido e da respetiva base de dados.
+    - ProfilingMiddleware: perfil de pedidos individuais (apenas instalado com PROFILING_ENABLED).
+    - CaptureMiddleware: registo anonimizado do tráfego da API (apenas instalado com CAPTURE_ENABLED).
+"""
+
+import gzip
+import random
+import re
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from .locations import DEFAULT_LOCATION, LOCATION_COOKIE, LOCATION_HEADER, LOCATIONS, use_location
+from .profiling import MODES, SAMPLE, RequestProfile
+from .capture import CAPTURE_MAX_BODY, CaptureLog, build_record
+from .tokens import token_user
+
+try:
+    import zstandard
+except ImportError:  # Dependência opcional
+    zstandard = None
+
+# Respostas mais pequenas do que este tamanho (bytes) não são comprimidas
+API_COMPRESSION_MIN_SIZE = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+
+# Prefixos dos caminhos cujas respostas podem ser comprimidas
+API_COMPRESSION_PATHS = getattr(settings, 'API_COMPRESSION_PATHS', ('/api/',))
+
+# Níveis de compressão (equilíbrio entre CPU e tamanho)
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Cabeçalho com que os administradores pedem o perfil de um pedido (valor: 'sample' ou 'cprofile')
+PROFILING_HEADER = 'X-Profile'
+
+# Fração dos pedidos analisados por amostragem aleatória (0 = apenas com o cabeçalho)
+PROFILING_SAMPLE_RATE = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+
+
+class CompressionMiddleware:
+    """
+    Comprime as respostas da API com zstd (se suportado pelo cliente e instalado) ou gzip.
+
+    Apenas são comprimidas respostas não-streaming, ainda sem Content-Encoding, dos
+    caminhos em API_COMPRESSION_PATHS e com pelo menos API_COMPRESSION_MIN_SIZE bytes.
+    As páginas HTML do admin (com tokens CSRF) ficam de fora, evitando ataques do tipo BREACH.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard else None
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not request.path.startswith(API_COMPRESSION_PATHS)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if len(response.content) < API_COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = self.select_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if encoding == 'zstd':
+            compressed = self.zstd_compressor.compress(response.content)
+        else:
+            compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+
+        # Só compensa se a resposta comprimida for efetivamente mais pequena
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # O ETag deixa de corresponder byte a byte ao conteúdo original
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+
+        return response
+
+    def select_encoding(self, accept_encoding):
+        """
+        Escolhe a codificação a usar a partir do cabeçalho Accept-Encoding.
+
+        Args:
+            accept_encoding (str): Valor do cabeçalho (ex.: "gzip, deflate, br, zstd").
+
+        Returns:
+            str | None: 'zstd', 'gzip' ou None se nenhuma for aceite.
+        """
+        accepted = {}
+        for part in accept_encoding.split(','):
+            token, _, params = part.strip().partition(';')
+            quality = 1.0
+            match = re.search(r'q=([0-9.]+)', params)
+            if match:
+                try:
+                    quality = float(match.group(1))
+                except ValueError:
+                    quality = 0.0
+            accepted[token.strip().lower()] = quality
+
+        if self.zstd_compressor is not None and accepted.get('zstd', 0) > 0:
+            return 'zstd'
+        if accepted.get('gzip', 0) > 0:
+            return 'gzip'
+        return None
+
+
+class LocationMiddleware:
+    """
+    Define o local (café) do pedido a partir do cabeçalho 'X-Location' ou do cookie 'location'.
+
+    As queries às mesas e reservas feitas durante o pedido são encaminhadas para a base
+    de dados desse local (ver api/locations.py). Um local desconhecido no cabeçalho
+    resulta em 404; um cookie com um local que deixou de existir é ignorado.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        location = request.headers.get(LOCATION_HEADER)
+        if location is None:
+            location = request.COOKIES.get(LOCATION_COOKIE)
+            if location not in LOCATIONS:
+                location = DEFAULT_LOCATION
+        elif location not in LOCATIONS:
+            return JsonResponse(
+                {"detail": f"Local desconhecido: '{location}'. Locais disponíveis: {', '.join(LOCATIONS)}."},
+                status=404
+            )
+
+        request.location = location
+        with use_location(location):
+            response = self.get_response(request)
+
+        patch_vary_headers(response, ('X-Location',))
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Grava o perfil (pilhas de chamadas e alocações) de pedidos individuais (ver api/profiling.py).
+
+    São analisados os pedidos de administradores com o cabeçalho 'X-Profile' e uma
+    fração PROFILING_SAMPLE_RATE dos restantes. O identificador do perfil é devolvido no
+    cabeçalho 'X-Profile-Id' da resposta.
+
+    Deve ficar depois do AuthenticationMiddleware. Só é instalado com PROFILING_ENABLED
+    (core/settings.py), pelo que, desativado, não tem qualquer custo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = self.select_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        profile = RequestProfile(request, mode)
+        if not profile.start():
+            return self.get_response(request)
+
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop(response)
+
+        response['X-Profile-Id'] = profile.id
+        return response
+
+    def select_mode(self, request):
+        """
+        Decide se o pedido é analisado e em que modo.
+
+        Args:
+            request (HttpRequest): Pedido atual.
+
+        Returns:
+            str | None: Modo de análise (ver api/profiling.py::MODES), ou None.
+        """
+        requested = request.headers.get(PROFILING_HEADER)
+        if requested is not None:
+            # O utilizador só é carregado (token ou sessão) quando o cabeçalho está presente
+            user = token_user(request) or request.user
+            if not (user.is_authenticated and user.is_staff):
+                return None
+            requested = requested.strip().lower()
+            return requested if requested in MODES else SAMPLE
+
+        if PROFILING_SAMPLE_RATE and random.random() < PROFILING_SAMPLE_RATE:
+            return SAMPLE
+        return None
+
+
+class CaptureMiddleware:
+    """
+    Regista os pedidos à API, anonimizados, para reprodução com 'replay_capture' (ver api/capture.py).
+
+    Deve ficar depois do AuthenticationMiddleware. Só é instalado com CAPTURE_ENABLED
+    (core/settings.py), pelo que, desativado, não tem qualquer custo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.log = CaptureLog()
+
+    def __call__(self, request):
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        # Lê o corpo antes da view, para que continue disponível depois de processado pelo DRF
+        if int(request.META.get('CONTENT_LENGTH') or 0) <= CAPTURE_MAX_BODY:
+            request.body
+
+        started = time.time()
+        timer = time.perf_counter()
+        response = self.get_response(request)
+        self.log.append(build_record(request, response, started, time.perf_counter() - timer))
+        return response
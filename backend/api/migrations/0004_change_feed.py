@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:17
+
+from django.db import migrations, models
+
+
+def sequence_existing_rows(apps, schema_editor):
+    """Atribui o número de sequência 1 às linhas existentes (incluídas em ?since=0)."""
+    db_alias = schema_editor.connection.alias
+    apps.get_model('api', 'ChangeSequence').objects.using(db_alias).create(pk=1, value=1)
+    apps.get_model('api', 'Booking').objects.using(db_alias).update(seq=1)
+    apps.get_model('api', 'Mesa').objects.using(db_alias).update(seq=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('horizon', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('booking', 'Reserva'), ('mesa', 'Mesa')], max_length=10)),
+                ('object_id', models.IntegerField()),
+                ('seq', models.BigIntegerField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(sequence_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:28
+
+import api.models
+import datetime
+
+from django.db import migrations, models
+
+
+def create_default_hours(apps, schema_editor):
+    """Regista o horário que estava definido no código: segunda a sábado, das 08:30 às 00:30."""
+    db_alias = schema_editor.connection.alias
+    OpeningHours = apps.get_model('api', 'OpeningHours')
+    OpeningHours.objects.using(db_alias).bulk_create([
+        OpeningHours(weekday=weekday, opening=datetime.time(8, 30), closing=datetime.time(0, 30))
+        for weekday in range(6)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('opening', models.TimeField(validators=[api.models.validate_slot_time])),
+                ('closing', models.TimeField(validators=[api.models.validate_slot_time])),
+            ],
+            options={
+                'verbose_name': 'horário semanal',
+                'verbose_name_plural': 'horário semanal',
+                'ordering': ['weekday', 'opening'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SpecialHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('opening', models.TimeField(validators=[api.models.validate_slot_time])),
+                ('closing', models.TimeField(validators=[api.models.validate_slot_time])),
+                ('note', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'verbose_name': 'horário especial',
+                'verbose_name_plural': 'horários especiais',
+                'ordering': ['date', 'opening'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Closure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('reason', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'verbose_name': 'encerramento',
+                'verbose_name_plural': 'encerramentos',
+                'ordering': ['start'],
+                'indexes': [models.Index(fields=['end', 'start'], name='closure_end_start_idx')],
+            },
+        ),
+        migrations.RunPython(create_default_hours, migrations.RunPython.noop),
+    ]
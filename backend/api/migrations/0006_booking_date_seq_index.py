@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_opening_hours'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'seq'], name='booking_date_seq_idx'),
+        ),
+    ]
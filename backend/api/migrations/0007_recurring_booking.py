@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_booking_date_seq_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('phone', models.CharField(max_length=12)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('number_of_guests', models.IntegerField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('first_date', models.DateField()),
+                ('interval_weeks', models.PositiveSmallIntegerField(choices=[(1, 'Semanal'), (2, 'Quinzenal')], default=1)),
+                ('until', models.DateField(blank=True, null=True)),
+                ('materialised_until', models.DateField(editable=False)),
+                ('mesa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_recorrentes', to='api.mesa')),
+            ],
+            options={
+                'verbose_name': 'reserva recorrente',
+                'verbose_name_plural': 'reservas recorrentes',
+                'ordering': ['first_date', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='api.recurringbooking'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringbooking',
+            index=models.Index(fields=['materialised_until'], name='recurring_materialised_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_recurring_booking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='party',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='adjacent',
+            field=models.ManyToManyField(blank=True, to='api.mesa'),
+        ),
+        migrations.AddField(
+            model_name='mesa',
+            name='joinable',
+            field=models.BooleanField(default=False),
+        ),
+    ]
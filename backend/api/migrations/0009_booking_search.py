@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:20
+
+from django.db import migrations
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL executado apenas nas bases de dados de um fabricante (ex.: 'sqlite')."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_joinable_tables'),
+    ]
+
+    # Índice de pesquisa das reservas (FTS5 no SQLite, trigramas no Postgres), com o SQL de
+    # api/search.py à data desta migração: alterações posteriores ao módulo não a afetam
+    operations = [
+        VendorRunSQL(
+            'sqlite',
+            sql=[
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS api_booking_search USING fts5(
+                    name, phone, content='api_booking', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS api_booking_search_insert AFTER INSERT ON api_booking BEGIN
+                    INSERT INTO api_booking_search(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS api_booking_search_delete AFTER DELETE ON api_booking BEGIN
+                    INSERT INTO api_booking_search(api_booking_search, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS api_booking_search_update AFTER UPDATE OF name, phone ON api_booking BEGIN
+                    INSERT INTO api_booking_search(api_booking_search, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+                    INSERT INTO api_booking_search(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+                END
+                """,
+                # Indexa as reservas existentes
+                "INSERT INTO api_booking_search(api_booking_search) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS api_booking_search_insert",
+                "DROP TRIGGER IF EXISTS api_booking_search_delete",
+                "DROP TRIGGER IF EXISTS api_booking_search_update",
+                "DROP TABLE IF EXISTS api_booking_search",
+            ],
+        ),
+        VendorRunSQL(
+            'postgresql',
+            sql=[
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                "CREATE INDEX IF NOT EXISTS booking_name_trgm_idx ON api_booking USING gin (name gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS booking_phone_trgm_idx ON api_booking USING gin (phone gin_trgm_ops)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS booking_name_trgm_idx",
+                "DROP INDEX IF EXISTS booking_phone_trgm_idx",
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_recurring_table(apps, schema_editor):
+    """
+    Cria a tabela das reservas recorrentes nas bases de dados dos locais já existentes.
+
+    A tabela passou a pertencer a cada local (api/locations.py::SHARDED_MODELS); as bases
+    de dados dos locais migradas antes desta alteração não a criaram na migração 0007.
+    """
+    model = apps.get_model('api', 'RecurringBooking')
+    if model._meta.db_table not in schema_editor.connection.introspection.table_names():
+        schema_editor.create_model(model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_revoked_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_recurring_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_recurring_booking_locations'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_phone_idx',
+        ),
+    ]
@@ -2,24 +2,106 @@
 models.py
 
 Define os modelos de dados para o sistema de gestão de reservas do Café.
-Este módulo contém as entidades principais: Mesa e Booking (Reserva).
+Este módulo contém as entidades principais: Mesa, Booking (Reserva) e RecurringBooking
+(Reserva recorrente), o horário de funcionamento (OpeningHours, SpecialHours, Closure), bem como entidades auxiliares de
+suporte à API (IdempotencyKey, ChangeSequence, Tombstone).
 """
 
-from django.db import models
+from datetime import timedelta
 
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import F
 
-class Mesa(models.Model):
+from .allocation import SLOT_MINUTES
+
+
+def validate_slot_time(value):
+    """Garante que uma hora coincide com o início de um intervalo do calendário (SLOT_MINUTES)."""
+    if (value.hour * 60 + value.minute) % SLOT_MINUTES or value.second or value.microsecond:
+        raise ValidationError(f'Indique uma hora em múltiplos de {SLOT_MINUTES} minutos (ex.: 08:30).')
+
+
+class ChangeSequence(models.Model):
+    """
+    Contador global e monotónico das alterações a mesas e reservas (linha única).
+
+    Cada gravação de uma mesa ou reserva, e cada remoção, recebe o valor seguinte do
+    contador, permitindo que os clientes peçam apenas o que mudou desde a última
+    sincronização (/api/changes/?since=<seq>).
+
+    Attributes:
+        value (int): Último número de sequência atribuído.
+        horizon (int): Maior número de sequência cujas remoções já foram esquecidas
+            (tombstones apagados por antiguidade).
+    """
+    value = models.BigIntegerField(default=0)
+    horizon = models.BigIntegerField(default=0)
+
+    @classmethod
+    def advance(cls, using=None):
+        """
+        Atribui o número de sequência seguinte.
+
+        Deve ser chamado dentro da transação que grava a alteração: a linha do contador
+        fica bloqueada até ao commit, pelo que as alterações ficam visíveis pela ordem
+        dos seus números de sequência.
+
+        Args:
+            using (str | None): Base de dados (a do local atual, se None).
+
+        Returns:
+            int: Novo número de sequência.
+        """
+        using = using or router.db_for_write(cls)
+        counter = cls.objects.using(using)
+        with transaction.atomic(using=using):
+            if not counter.filter(pk=1).update(value=F('value') + 1):
+                counter.create(pk=1, value=1)
+            return counter.values_list('value', flat=True).get(pk=1)
+
+
+class SequencedModel(models.Model):
+    """
+    Modelo base com número de sequência da última alteração (campo 'seq').
+
+    O número é atualizado em cada save(); operações em massa (QuerySet.update) devem
+    atualizar 'seq' explicitamente com ChangeSequence.advance().
+    """
+    seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            self.seq = ChangeSequence.advance(using)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'seq'}
+            super().save(*args, **kwargs)
+
+
+class Mesa(SequencedModel):
     """
     Representa uma mesa do Café.
     
+    Mesas juntáveis podem ser juntas às mesas adjacentes (também juntáveis) para receber
+    grupos maiores do que qualquer mesa (ver api/allocation.py::find_table_group).
+    
     Attributes:
         lugares (int): Capacidade máxima de pessoas que a mesa comporta.
         existe_reserva (bool): Indica se a mesa possui pelo menos uma reserva ativa.
+        joinable (bool): Indica se a mesa pode ser junta a outras.
+        adjacent (ManyToManyField): Mesas adjacentes, às quais pode ser junta (relação simétrica).
+        seq (int): Número de sequência da última alteração.
     """
     lugares = models.IntegerField()
     existe_reserva = models.BooleanField(default=False)
+    joinable = models.BooleanField(default=False)
+    adjacent = models.ManyToManyField('self', blank=True)
 
-class Booking(models.Model):
+class Booking(SequencedModel):
     """
     Representa uma reserva de mesa no Café.
     
@@ -32,6 +114,10 @@ class Booking(models.Model):
         end_time (time): Horário de término da reserva (calculado automaticamente como start_time + 1h15min).
         number_of_guests (int): Número de convidados para a reserva.
         notes (str): Observações adicionais sobre a reserva (campo opcional).
+        recurrence (ForeignKey): Reserva recorrente que gerou a reserva (opcional).
+        party (UUID): Grupo em mesas juntas: as reservas de cada mesa do grupo partilham o
+            mesmo identificador e são canceladas em conjunto (vazio numa única mesa).
+        seq (int): Número de sequência da última alteração.
     """
     mesa = models.ForeignKey(Mesa, on_delete=models.CASCADE, related_name='reservas')
     name = models.CharField(max_length=100)
@@ -40,4 +126,207 @@ class Booking(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     number_of_guests = models.IntegerField()
-    notes = models.TextField(blank=True, null=True)
\ No newline at end of file
+    notes = models.TextField(blank=True, null=True)
+    recurrence = models.ForeignKey(
+        'RecurringBooking', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences',
+    )
+    party = models.UUIDField(null=True, blank=True, db_index=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Filtros por data (date_hierarchy, list_filter, verificação de duplicados)
+            models.Index(fields=['date', 'start_time'], name='booking_date_start_idx'),
+            # Reservas de uma mesa numa data (verificação de conflitos, filtro por mesa)
+            models.Index(fields=['mesa', 'date'], name='booking_mesa_date_idx'),
+            # Impressão digital das reservas de cada data (cache da ocupação das mesas, api/suggestions.py)
+            models.Index(fields=['date', 'seq'], name='booking_date_seq_idx'),
+        ]
+
+class RecurringBooking(models.Model):
+    """
+    Reserva que se repete todas as semanas (ou de duas em duas semanas) na mesma mesa e hora.
+
+    A regra é gravada uma única vez; as reservas (Booking) de cada data são criadas em
+    massa apenas para as próximas semanas (ver api/recurrence.py), à medida que o
+    período coberto avança.
+
+    Attributes:
+        mesa (ForeignKey): Mesa reservada.
+        name (str): Nome do cliente.
+        phone (str): Telefone do cliente.
+        start_time (time): Hora de início.
+        end_time (time): Hora de término (calculada automaticamente: start_time + 1h15min).
+        number_of_guests (int): Número de convidados.
+        notes (str): Observações (opcional).
+        first_date (date): Data da primeira reserva (define o dia da semana).
+        interval_weeks (int): Semanas entre reservas (1 = semanal, 2 = quinzenal).
+        until (date): Data da última reserva possível (sem limite, se vazio).
+        materialised_until (date): Última data para a qual as reservas já foram criadas.
+    """
+    WEEKLY = 1
+    BIWEEKLY = 2
+    INTERVAL_CHOICES = [(WEEKLY, 'Semanal'), (BIWEEKLY, 'Quinzenal')]
+
+    mesa = models.ForeignKey(Mesa, on_delete=models.CASCADE, related_name='reservas_recorrentes')
+    name = models.CharField(max_length=100)
+    phone = models.CharField(max_length=12)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    number_of_guests = models.IntegerField()
+    notes = models.TextField(blank=True, null=True)
+    first_date = models.DateField()
+    interval_weeks = models.PositiveSmallIntegerField(choices=INTERVAL_CHOICES, default=WEEKLY)
+    until = models.DateField(null=True, blank=True)
+    materialised_until = models.DateField(editable=False)
+
+    class Meta:
+        ordering = ['first_date', 'start_time']
+        indexes = [
+            # Regras com reservas por criar até uma data (api/recurrence.py::due_rules)
+            models.Index(fields=['materialised_until'], name='recurring_materialised_idx'),
+        ]
+        verbose_name = 'reserva recorrente'
+        verbose_name_plural = 'reservas recorrentes'
+
+    def clean(self):
+        if self.first_date and self.until and self.until < self.first_date:
+            raise ValidationError({'until': 'A data final tem de ser igual ou posterior à primeira data.'})
+
+    def save(self, *args, **kwargs):
+        if self.materialised_until is None:
+            self.materialised_until = self.first_date - timedelta(days=1)
+        super().save(*args, **kwargs)
+
+class IdempotencyKey(models.Model):
+    """
+    Regista o resultado de um pedido mutável identificado por um cabeçalho 'Idempotency-Key'.
+
+    Permite que repetições do mesmo pedido (ex.: clientes móveis com ligações instáveis)
+    devolvam a resposta original sem voltar a executar a lógica do endpoint.
+
+    Attributes:
+        key (str): Chave única composta pelo endpoint, utilizador e valor do cabeçalho.
+        request_hash (str): Hash (SHA-256) do método, caminho e corpo do pedido original.
+        status_code (int): Código HTTP da resposta armazenada (nulo enquanto o pedido está em curso).
+        response_body (str): Corpo JSON da resposta armazenada.
+        created_at (datetime): Momento em que o primeiro pedido foi recebido.
+        expires_at (datetime): Momento a partir do qual a chave deixa de ser válida.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+class RevokedToken(models.Model):
+    """
+    Token de autenticação (api/tokens.py) revogado antes de expirar: logout de um
+    dispositivo ou token de renovação já usado.
+
+    Attributes:
+        jti (str): Identificador único do token.
+        expires_at (datetime): Fim da validade do token (a partir daí o registo pode ser removido).
+    """
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+class Tombstone(models.Model):
+    """
+    Regista a remoção de uma mesa ou reserva, para que os clientes sincronizados a
+    possam remover localmente (/api/changes/?since=<seq>).
+
+    Attributes:
+        model (str): Tipo do objeto removido ('booking' ou 'mesa').
+        object_id (int): Identificador do objeto removido.
+        seq (int): Número de sequência da remoção.
+        created_at (datetime): Momento da remoção (tombstones antigos são apagados).
+    """
+    BOOKING = 'booking'
+    MESA = 'mesa'
+    MODEL_CHOICES = [(BOOKING, 'Reserva'), (MESA, 'Mesa')]
+
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    seq = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+class OpeningHours(models.Model):
+    """
+    Horário semanal de funcionamento: uma linha por turno (um dia pode ter vários turnos).
+
+    Os dias da semana sem nenhuma linha são dias de encerramento. A hora de fecho pode
+    ser igual ou anterior à de abertura, indicando que o turno termina no dia seguinte
+    (ex.: 08:30 às 00:30). As reservas podem começar entre a abertura e o fecho, inclusive.
+
+    Attributes:
+        weekday (int): Dia da semana (0 = segunda-feira, 6 = domingo).
+        opening (time): Hora de abertura.
+        closing (time): Hora de fecho.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'),
+        (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo'),
+    ]
+
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    opening = models.TimeField(validators=[validate_slot_time])
+    closing = models.TimeField(validators=[validate_slot_time])
+
+    class Meta:
+        ordering = ['weekday', 'opening']
+        verbose_name = 'horário semanal'
+        verbose_name_plural = 'horário semanal'
+
+class SpecialHours(models.Model):
+    """
+    Horário especial de uma data (ex.: véspera de feriado), que substitui o horário semanal.
+
+    Se existir pelo menos uma linha para uma data, o horário semanal desse dia é ignorado.
+
+    Attributes:
+        date (date): Data a que se aplica.
+        opening (time): Hora de abertura.
+        closing (time): Hora de fecho (igual ou anterior à abertura: termina no dia seguinte).
+        note (str): Descrição (opcional).
+    """
+    date = models.DateField(db_index=True)
+    opening = models.TimeField(validators=[validate_slot_time])
+    closing = models.TimeField(validators=[validate_slot_time])
+    note = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['date', 'opening']
+        verbose_name = 'horário especial'
+        verbose_name_plural = 'horários especiais'
+
+class Closure(models.Model):
+    """
+    Período em que não são aceites reservas (feriado, férias, evento privado, obras).
+
+    São recusadas as reservas que se sobreporiam ao período, incluindo as que começam
+    antes do início e terminariam já dentro dele.
+
+    Attributes:
+        start (datetime): Início do período.
+        end (datetime): Fim do período (exclusivo).
+        reason (str): Motivo (opcional).
+    """
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    reason = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['start']
+        indexes = [models.Index(fields=['end', 'start'], name='closure_end_start_idx')]
+        verbose_name = 'encerramento'
+        verbose_name_plural = 'encerramentos'
+
+    def clean(self):
+        if self.start and self.end:
+            if self.end <= self.start:
+                raise ValidationError({'end': 'O fim tem de ser posterior ao início.'})
+            for field in ('start', 'end'):
+                moment = getattr(self, field)
+                if moment.minute % SLOT_MINUTES or moment.second or moment.microsecond:
+                    raise ValidationError({field: f'Indique uma hora em múltiplos de {SLOT_MINUTES} minutos.'})
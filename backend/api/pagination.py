@@ -0,0 +1,259 @@
+"""
+pagination.py
+
+Paginação escalável para as listagens do painel administrativo (changelists).
+
+O Paginator por defeito do Django executa um COUNT(*) completo em cada página e obtém
+as linhas com LIMIT/OFFSET, o que obriga a base de dados a percorrer todas as linhas
+anteriores à página pedida. Com tabelas de milhões de reservas, ambos os custos crescem
+com o tamanho da tabela. O LargeTablePaginator:
+
+    - conta as linhas apenas até um limite e, acima dele, usa uma estimativa
+      (estatísticas do Postgres ou extremos da chave primária no SQLite; com filtros, no
+      SQLite, uma página para além do limite). Como a estimativa pode ficar abaixo do
+      total, as páginas seguintes continuam acessíveis: cada página completa estende o
+      total até, pelo menos, à página seguinte, e uma página incompleta fixa o total;
+    - navega entre páginas consecutivas por keyset (WHERE sobre os valores de ordenação
+      da última linha da página anterior, guardados na cache);
+    - quando o keyset não está disponível (salto direto para uma página), percorre
+      apenas o índice da chave primária e obtém as linhas completas por id.
+
+As fronteiras guardadas expiram ao fim de KEYSET_CACHE_TTL segundos e são renovadas
+sempre que a página correspondente é visitada; entre alterações à tabela, a página
+seguinte reflete o estado da tabela no momento em que é pedida.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils.functional import cached_property
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Acima deste número de linhas, o total apresentado passa a ser uma estimativa
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Tempo de vida (segundos) das fronteiras de página guardadas na cache
+KEYSET_CACHE_TTL = 300
+
+# ================================================================================================
+# PAGINATOR
+# ================================================================================================
+
+class LargeTablePaginator(Paginator):
+    """
+    Paginator com contagem estimada e navegação por keyset.
+
+    Utilizado pelos ModelAdmin através do atributo 'paginator'. Assume que a ordenação
+    do queryset é determinística (o Django admin acrescenta sempre '-pk').
+    """
+
+    @cached_property
+    def count(self):
+        """
+        Devolve o número de linhas, exato até ESTIMATED_COUNT_THRESHOLD e estimado acima disso.
+
+        Returns:
+            int: Número (exato ou estimado) de linhas do queryset.
+        """
+        queryset = self.object_list.order_by()
+        bounded = queryset[:ESTIMATED_COUNT_THRESHOLD + 1].count()
+
+        if bounded <= ESTIMATED_COUNT_THRESHOLD:
+            return bounded
+
+        # Pelo menos uma página para além das linhas já contadas
+        return max(self._estimate_count(queryset), bounded + self.per_page)
+
+    @property
+    def estimated(self):
+        """Indica se o total (count) é uma estimativa."""
+        return self.count > ESTIMATED_COUNT_THRESHOLD
+
+    def validate_number(self, number):
+        """
+        Valida o número de página; com o total estimado, aceita páginas para além da estimativa.
+
+        Raises:
+            PageNotAnInteger | EmptyPage: Número inválido ou página fora dos limites
+            (as páginas para além da estimativa são verificadas em page()).
+        """
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.estimated or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        """
+        Devolve a página 'number' sem percorrer as linhas das páginas anteriores.
+
+        Args:
+            number (int): Número da página (a partir de 1).
+
+        Returns:
+            Page: Página com as linhas pedidas.
+        """
+        number = self.validate_number(number)
+        queryset = self.object_list
+        ordering = self._keyset_ordering()
+
+        boundary = None
+        if number > 1 and ordering is not None:
+            boundary = cache.get(self._boundary_key(number - 1))
+
+        if number == 1:
+            rows = list(queryset[:self.per_page])
+        elif boundary is not None:
+            # Keyset: continua imediatamente a seguir à última linha da página anterior
+            rows = list(queryset.filter(self._seek_filter(ordering, boundary))[:self.per_page])
+        else:
+            # Sem fronteira conhecida: percorre apenas a chave primária e obtém as linhas por id
+            bottom = (number - 1) * self.per_page
+            pks = list(queryset.values_list('pk', flat=True)[bottom:bottom + self.per_page])
+            by_pk = {obj.pk: obj for obj in queryset.filter(pk__in=pks)}
+            rows = [by_pk[pk] for pk in pks if pk in by_pk]
+
+        if self.estimated:
+            self._extend_count(number, len(rows))
+
+        if rows and ordering is not None:
+            last = rows[-1]
+            cache.set(
+                self._boundary_key(number),
+                [getattr(last, attname) for attname, _ in ordering],
+                KEYSET_CACHE_TTL,
+            )
+
+        return self._get_page(rows, number, self)
+
+    # --------------------------------------------------------------------------------------------
+    # Funções auxiliares
+    # --------------------------------------------------------------------------------------------
+
+    def _extend_count(self, number, rows):
+        """
+        Ajusta o total estimado às linhas de uma página obtida.
+
+        Args:
+            number (int): Número da página.
+            rows (int): Número de linhas da página.
+
+        Raises:
+            EmptyPage: Se a página (para além da primeira) não tiver linhas.
+        """
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+
+        seen = (number - 1) * self.per_page + rows
+        # Página completa: existe, pelo menos, mais uma; página incompleta: é a última
+        count = max(self.count, seen + self.per_page) if rows == self.per_page else seen
+        if count != self.count:
+            self.count = count
+            self.__dict__.pop('num_pages', None)
+
+    def _estimate_count(self, queryset):
+        """
+        Estima o número de linhas sem percorrer a tabela.
+
+        Args:
+            queryset (QuerySet): Queryset sem ordenação.
+
+        Returns:
+            int: Estimativa do número de linhas.
+        """
+        connection = connections[queryset.db]
+
+        if connection.vendor == 'postgresql':
+            # O planner do Postgres estima as linhas a partir das estatísticas da tabela
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+
+        if not queryset.query.where:
+            # Extremos da chave primária: duas pesquisas no índice (ignora ids removidos)
+            bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+            if bounds['first'] is not None:
+                return bounds['last'] - bounds['first'] + 1
+
+        return ESTIMATED_COUNT_THRESHOLD
+
+    def _keyset_ordering(self):
+        """
+        Converte a ordenação do queryset em pares (atributo, descendente).
+
+        Returns:
+            list[tuple[str, bool]] | None: Campos de ordenação, ou None se a ordenação
+            incluir expressões, relações ou campos que admitem NULL.
+        """
+        query = self.object_list.query
+        opts = self.object_list.model._meta
+        ordering = []
+
+        for item in query.order_by:
+            if not isinstance(item, str) or '__' in item or item == '?':
+                return None
+
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+
+            if field.null or not field.concrete:
+                return None
+
+            ordering.append((field.attname, descending))
+
+        return ordering or None
+
+    def _seek_filter(self, ordering, values):
+        """
+        Constrói a condição lexicográfica "linha seguinte à fronteira" para a ordenação dada.
+
+        Args:
+            ordering (list[tuple[str, bool]]): Campos de ordenação.
+            values (list): Valores desses campos na última linha da página anterior.
+
+        Returns:
+            Q: Condição a aplicar ao queryset.
+        """
+        condition = Q()
+        equal = {}
+
+        for (attname, descending), value in zip(ordering, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{attname}__{lookup}': value})
+            equal[attname] = value
+
+        # Restrição redundante sobre o primeiro campo, para que o planner use o índice
+        first_attname, first_descending = ordering[0]
+        first_lookup = 'lte' if first_descending else 'gte'
+
+        return Q(**{f'{first_attname}__{first_lookup}': values[0]}) & condition
+
+    def _boundary_key(self, number):
+        """
+        Chave de cache da fronteira (última linha) de uma página deste queryset.
+
+        Inclui a base de dados do queryset: a mesma listagem em locais diferentes (mesmo
+        SQL) tem fronteiras diferentes.
+
+        Args:
+            number (int): Número da página.
+
+        Returns:
+            str: Chave de cache.
+        """
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.sha256(f'{self.object_list.db}|{sql}|{params!r}|{self.per_page}'.encode()).hexdigest()
+        return f'admin_keyset_{digest}_{number}'
@@ -0,0 +1,271 @@
+"""
+profiling.py
+
+Perfis de pedidos individuais em produção, a pedido dos administradores.
+
+Com PROFILING_ENABLED, o ProfilingMiddleware (api/middleware.py) analisa os pedidos de
+administradores com o cabeçalho 'X-Profile' e uma fração aleatória (PROFILING_SAMPLE_RATE)
+dos restantes. Sem PROFILING_ENABLED o middleware não é instalado, pelo que os pedidos
+não têm qualquer custo adicional.
+
+Cada perfil é guardado em PROFILING_DIR com:
+
+    - <id>.folded: pilhas de chamadas amostradas no formato "folded" (uma pilha por linha,
+      com o número de amostras), aceite por flamegraph.pl, speedscope e inferno;
+      ou <id>.prof: estatísticas do cProfile (X-Profile: cprofile), aceites por snakeviz;
+    - <id>.alloc.txt: linhas de código com mais memória alocada durante o pedido (tracemalloc);
+    - <id>.json: método, caminho, estado, duração e ficheiros do perfil.
+
+Apenas os PROFILING_MAX_PROFILES perfis mais recentes são mantidos. Os perfis são
+listados em /api/profiles/.
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Diretoria dos perfis e número máximo de perfis mantidos
+PROFILING_DIR = Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'data' / 'profiles'))
+PROFILING_MAX_PROFILES = getattr(settings, 'PROFILING_MAX_PROFILES', 50)
+
+# Intervalo entre amostras das pilhas de chamadas (segundos)
+PROFILING_INTERVAL = getattr(settings, 'PROFILING_INTERVAL', 0.005)
+
+# Número de linhas de código no resumo de alocações
+PROFILING_ALLOCATION_TOP = 30
+
+# Modos de análise (valor do cabeçalho X-Profile)
+SAMPLE = 'sample'      # Amostragem das pilhas de chamadas (baixo custo)
+CPROFILE = 'cprofile'  # cProfile (todas as chamadas, custo mais elevado)
+MODES = (SAMPLE, CPROFILE)
+
+# Formato dos identificadores dos perfis (usados nos nomes dos ficheiros)
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9]{6}-[a-z0-9_-]+$')
+
+# Extensões dos ficheiros de cada perfil (tipo -> extensão)
+PROFILE_FILES = {'folded': '.folded', 'prof': '.prof', 'alloc': '.alloc.txt'}
+
+# Apenas um pedido é analisado de cada vez em cada processo (o tracemalloc é global)
+_profile_lock = threading.Lock()
+
+# ================================================================================================
+# AMOSTRAGEM
+# ================================================================================================
+
+class StackSampler:
+    """
+    Amostra periodicamente a pilha de chamadas de uma thread, a partir de outra thread.
+
+    A thread analisada não é instrumentada: o custo é o de ler sys._current_frames()
+    a cada PROFILING_INTERVAL segundos.
+    """
+
+    def __init__(self, thread_id, interval=PROFILING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """Pilhas amostradas no formato "folded" (raiz primeiro, separadas por ';')."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename):
+    """Caminho de um ficheiro relativo ao projeto ou ao diretório de pacotes mais próximo."""
+    for prefix in sorted({str(settings.BASE_DIR), *filter(None, sys.path)}, key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+# ================================================================================================
+# PERFIL DE UM PEDIDO
+# ================================================================================================
+
+class RequestProfile:
+    """
+    Perfil de um pedido: amostragem (ou cProfile) e rastreio de alocações.
+
+    Usado pelo ProfilingMiddleware em torno do processamento do pedido:
+
+        profile = RequestProfile(request, mode)
+        if profile.start():
+            response = get_response(request)
+            profile.stop(response)
+    """
+
+    def __init__(self, request, mode=SAMPLE):
+        self.method = request.method
+        self.path = request.path
+        self.mode = mode
+        self.created_at = datetime.now()
+        slug = re.sub(r'[^a-z0-9]+', '-', request.path.lower()).strip('-')[:60] or 'root'
+        self.id = f"{self.created_at:%Y%m%dT%H%M%S-%f}-{self.method.lower()}-{slug}"
+
+    def start(self):
+        """
+        Inicia a análise do pedido.
+
+        Returns:
+            bool: False se outro pedido estiver a ser analisado neste processo (o pedido
+            é processado normalmente, sem perfil).
+        """
+        if not _profile_lock.acquire(blocking=False):
+            return False
+
+        # O tracemalloc pode já estar ativo (ex.: PYTHONTRACEMALLOC)
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self._snapshot = tracemalloc.take_snapshot()
+
+        if self.mode == CPROFILE:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident())
+            self._profiler.start()
+        self._started = time.perf_counter()
+        return True
+
+    def stop(self, response):
+        """
+        Termina a análise e grava o perfil em PROFILING_DIR.
+
+        Args:
+            response (HttpResponse | None): Resposta do pedido (None se o pedido falhou com uma exceção).
+        """
+        duration = time.perf_counter() - self._started
+        if self.mode == CPROFILE:
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+        # Sem as alocações do próprio perfil (amostras, snapshots)
+        ignored = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        allocations = tracemalloc.take_snapshot().filter_traces(ignored).compare_to(
+            self._snapshot.filter_traces(ignored), 'lineno'
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        _profile_lock.release()
+
+        PROFILING_DIR.mkdir(parents=True, exist_ok=True)
+        base = PROFILING_DIR / self.id
+        files = ['alloc']
+
+        if self.mode == CPROFILE:
+            self._profiler.dump_stats(f'{base}.prof')
+            files.append('prof')
+            samples = None
+        else:
+            Path(f'{base}.folded').write_text(self._profiler.folded())
+            files.append('folded')
+            samples = sum(self._profiler.stacks.values())
+
+        lines = [f'{self.method} {self.path} - {duration * 1000:.1f} ms, pico de memória {peak / 1024:.1f} KiB', '']
+        lines += [str(stat) for stat in allocations[:PROFILING_ALLOCATION_TOP]]
+        Path(f'{base}.alloc.txt').write_text('\n'.join(lines) + '\n')
+
+        Path(f'{base}.json').write_text(json.dumps({
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'method': self.method,
+            'path': self.path,
+            'status': getattr(response, 'status_code', None),
+            'mode': self.mode,
+            'duration_ms': round(duration * 1000, 2),
+            'samples': samples,
+            'peak_memory_kib': round(peak / 1024, 1),
+            'files': sorted(files),
+        }))
+
+        rotate_profiles()
+
+# ================================================================================================
+# CONSULTA E ROTAÇÃO
+# ================================================================================================
+
+def list_profiles():
+    """
+    Lista os perfis guardados, do mais recente para o mais antigo.
+
+    Returns:
+        list[dict]: Metadados de cada perfil (ver RequestProfile.stop).
+    """
+    profiles = []
+    for path in sorted(PROFILING_DIR.glob('*.json'), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # Perfil removido ou ainda a ser gravado
+    return profiles
+
+
+def profile_file(profile_id, kind):
+    """
+    Devolve o caminho de um ficheiro de um perfil.
+
+    Args:
+        profile_id (str): Identificador do perfil.
+        kind (str): Tipo do ficheiro ('folded', 'prof' ou 'alloc').
+
+    Returns:
+        Path | None: Caminho do ficheiro, ou None se não existir.
+    """
+    if not PROFILE_ID_RE.match(profile_id) or kind not in PROFILE_FILES:
+        return None
+    path = PROFILING_DIR / f'{profile_id}{PROFILE_FILES[kind]}'
+    return path if path.is_file() else None
+
+
+def rotate_profiles(keep=PROFILING_MAX_PROFILES):
+    """
+    Remove os perfis mais antigos, mantendo os 'keep' mais recentes.
+
+    Args:
+        keep (int): Número de perfis a manter.
+    """
+    for path in sorted(PROFILING_DIR.glob('*.json'), reverse=True)[keep:]:
+        profile_id = path.name[:-len('.json')]
+        for suffix in ('.json', *PROFILE_FILES.values()):
+            try:
+                (PROFILING_DIR / f'{profile_id}{suffix}').unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,306 @@
+"""
+recurrence.py
+
+Reservas recorrentes (api/models.py::RecurringBooking): clientes habituais que reservam
+a mesma mesa, à mesma hora, todas as semanas ou de duas em duas semanas.
+
+Cada regra é gravada uma única vez. As reservas (Booking) das datas da regra só são
+criadas, em massa, para as próximas RECURRENCE_WINDOW_DAYS (materialização): pelo
+comando 'python manage.py materialise_recurrences', executado diariamente, e, quando
+necessário, no próprio pedido (extend_recurrences). A partir daí são reservas como as
+outras: a verificação de conflitos de create_booking, a disponibilidade, as sugestões
+de horários e a remoção de reservas expiradas não precisam de consultar as regras.
+
+Os pedidos nunca criam reservas para além da janela, qualquer que seja a data pedida.
+Para as datas mais distantes, as regras são verificadas em memória (recurring_intervals,
+uma query), sem gravar nada: os horários das regras contam como ocupados.
+
+Cada regra guarda a última data para a qual as reservas já foram criadas
+('materialised_until', com índice), pelo que só as regras com reservas por criar são
+lidas. A data até à qual todas as regras de um local estão materializadas fica em
+cache: os pedidos dentro desse período não executam nenhuma query.
+
+As datas em que a mesa já está ocupada ou o local está encerrado são ignoradas (e
+registadas no log), tal como um pedido de reserva recusado.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from . import writer
+from .allocation import RESERVATION_DURATION
+from .bulk import recompute_mesa_occupancy
+from .events import publish
+from .locations import get_location, location_database
+from .models import Booking, ChangeSequence, RecurringBooking
+from .slots import is_bookable, occupied_slots
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Número de dias, a partir de hoje, com as reservas das regras já criadas
+RECURRENCE_WINDOW_DAYS = getattr(settings, 'RECURRENCE_WINDOW_DAYS', 28)
+
+# Tempo de vida (segundos) na cache da data até à qual as regras estão materializadas
+RECURRENCE_CACHE_TIMEOUT = 60 * 60
+
+# Chave de cache da data até à qual as regras de um local estão materializadas
+RECURRENCE_HORIZON_KEY = 'recurrence_horizon_%(location)s'
+
+# Chave de cache da data limite da última remoção das regras terminadas de um local
+RECURRENCE_PRUNED_KEY = 'recurrence_pruned_%(location)s'
+
+# ================================================================================================
+# DATAS DAS REGRAS
+# ================================================================================================
+
+def occurrence_dates(rule, after, through):
+    """
+    Datas de uma regra num período.
+
+    Args:
+        rule (RecurringBooking): Regra.
+        after (date): Início do período (exclusivo).
+        through (date): Fim do período (inclusive).
+
+    Returns:
+        list[date]: Datas da regra, por ordem cronológica.
+    """
+    step = 7 * rule.interval_weeks
+    last = min(through, rule.until) if rule.until else through
+    current = max(after + timedelta(days=1), rule.first_date)
+    # Avança até à primeira data alinhada com a primeira reserva da regra
+    offset = (current - rule.first_date).days % step
+    if offset:
+        current += timedelta(days=step - offset)
+
+    dates = []
+    while current <= last:
+        dates.append(current)
+        current += timedelta(days=step)
+    return dates
+
+
+def due_rules(through):
+    """
+    Regras do local atual com reservas por criar até 'through' (inclusive).
+
+    Args:
+        through (date): Data final.
+
+    Returns:
+        QuerySet: Regras ainda não materializadas até essa data e não terminadas.
+    """
+    return RecurringBooking.objects.filter(materialised_until__lt=through).exclude(until__lte=F('materialised_until'))
+
+# ================================================================================================
+# MATERIALIZAÇÃO
+# ================================================================================================
+
+def materialise_recurrences(through, rules=None, now=None):
+    """
+    Cria, em massa, as reservas das regras do local atual até à data indicada.
+
+    As reservas criadas partilham um único número de sequência e as mesas afetadas são
+    recalculadas com um único UPDATE (ver api/bulk.py). Datas passadas não são criadas.
+
+    Args:
+        through (date): Última data a materializar (inclusive).
+        rules (Iterable[int] | None): Limita a materialização a estas regras.
+        now (datetime | None): Instante atual.
+
+    Returns:
+        tuple[int, list[tuple[RecurringBooking, date]]]: Número de reservas criadas e
+        datas ignoradas (mesa ocupada ou local encerrado).
+    """
+    now = now or datetime.now()
+
+    with transaction.atomic(using=location_database()):
+        due = due_rules(through)
+        if rules is not None:
+            due = due.filter(pk__in=rules)
+        due = list(due)
+        if not due:
+            return 0, []
+
+        yesterday = now.date() - timedelta(days=1)
+        planned = [
+            (rule, day)
+            for rule in due
+            for day in occurrence_dates(rule, max(rule.materialised_until, yesterday), through)
+        ]
+
+        # Reservas existentes das mesas das regras, nas datas a criar (uma query)
+        busy = defaultdict(list)
+        for mesa_id, day, start, end in Booking.objects.filter(
+            mesa_id__in={rule.mesa_id for rule, _ in planned},
+            date__in={day for _, day in planned},
+        ).values_list('mesa_id', 'date', 'start_time', 'end_time'):
+            busy[mesa_id, day].append((datetime.combine(day, start), datetime.combine(day, end)))
+
+        bookings, skipped = [], []
+        seq = ChangeSequence.advance() if planned else None
+        for rule, day in planned:
+            start = datetime.combine(day, rule.start_time)
+            end = start + RESERVATION_DURATION
+            # Sobreposição: a nova reserva começa antes do fim de uma existente e termina depois do seu início
+            occupied = any(start < booking_end and end > booking_start for booking_start, booking_end in busy[rule.mesa_id, day])
+            if start < now or occupied or not is_bookable(start):
+                skipped.append((rule, day))
+                continue
+
+            busy[rule.mesa_id, day].append((start, end))
+            bookings.append(Booking(
+                mesa_id=rule.mesa_id,
+                name=rule.name,
+                phone=rule.phone,
+                date=day,
+                start_time=rule.start_time,
+                end_time=end.time(),
+                number_of_guests=rule.number_of_guests,
+                notes=rule.notes,
+                recurrence=rule,
+                seq=seq,
+            ))
+
+        Booking.objects.bulk_create(bookings, batch_size=500)
+        RecurringBooking.objects.filter(pk__in=[rule.pk for rule in due]).update(materialised_until=through)
+
+        if bookings:
+            mesas = sorted({booking.mesa_id for booking in bookings})
+            recompute_mesa_occupancy(mesas)
+            publish('bookings.created', mesas=mesas)
+
+    for rule, day in skipped:
+        print(f"[INFO] Reserva recorrente {rule.pk} (mesa {rule.mesa_id}, {rule.name}, {rule.start_time}) não criada em {day}: mesa ocupada, horário passado ou local encerrado.")
+
+    return len(bookings), skipped
+
+
+def recurrence_horizon():
+    """Última data (inclusive) com as reservas das regras criadas: hoje + RECURRENCE_WINDOW_DAYS."""
+    return date.today() + timedelta(days=RECURRENCE_WINDOW_DAYS)
+
+
+def extend_recurrences():
+    """
+    Garante que as reservas das regras do local atual existem até ao fim da janela
+    (recurrence_horizon).
+
+    A data até à qual as regras estão materializadas fica em cache, pelo que a chamada
+    não executa queries depois da primeira em cada dia. Sem cache (ou com a mudança de
+    dia), é lida apenas a lista de regras com reservas por criar e, se existirem, as
+    reservas são criadas através do coordenador de escritas. Regras criadas noutro
+    processo são materializadas pelo comando diário; até lá, contam como ocupadas nas
+    datas posteriores à janela (ver recurring_intervals).
+
+    Returns:
+        int: Número de reservas criadas.
+    """
+    key = RECURRENCE_HORIZON_KEY % {'location': get_location()}
+    window = recurrence_horizon()
+    if cache.get(key) == window:
+        return 0
+
+    created = 0
+    if due_rules(window).exists():
+        created, _ = writer.run(materialise_recurrences, window)
+
+    cache.set(key, window, RECURRENCE_CACHE_TIMEOUT)
+    return created
+
+
+def recurring_intervals(days):
+    """
+    Horários das regras do local atual nas datas posteriores à janela (sem reservas criadas).
+
+    As datas dentro da janela não executam queries (as reservas das regras já existem);
+    para as restantes, as regras ativas no período são lidas com uma query e as datas de
+    cada regra são calculadas em memória (occurrence_dates).
+
+    Args:
+        days (Iterable[date]): Datas.
+
+    Returns:
+        dict[date, dict[int, list[tuple[datetime, datetime]]]]: Intervalos ocupados de
+        cada mesa em cada data, no formato das reservas de api/allocation.py::find_table.
+    """
+    horizon = recurrence_horizon()
+    days = {day for day in days if day > horizon}
+    if not days:
+        return {}
+
+    first, last = min(days), max(days)
+    rules = RecurringBooking.objects.filter(first_date__lte=last, materialised_until__lt=last).exclude(until__lt=first)
+    intervals = defaultdict(lambda: defaultdict(list))
+    for rule in rules:
+        for day in occurrence_dates(rule, max(first - timedelta(days=1), rule.materialised_until), last):
+            if day in days:
+                start = datetime.combine(day, rule.start_time)
+                intervals[day][rule.mesa_id].append((start, start + RESERVATION_DURATION))
+    return intervals
+
+
+def with_recurrences(occupancy):
+    """
+    Acrescenta as regras das datas posteriores à janela aos horários ocupados de cada mesa.
+
+    Args:
+        occupancy (Mapping[date, Mapping[int, int]]): Horários ocupados de cada mesa em
+            cada data (ver api/suggestions.py::get_occupancy).
+
+    Returns:
+        dict[date, Mapping[int, int]]: Horários ocupados, incluindo as regras.
+    """
+    recurring = recurring_intervals(occupancy)
+    if not recurring:
+        return occupancy
+
+    occupancy = dict(occupancy)
+    for day, mesas in recurring.items():
+        occupancy[day] = dict(occupancy[day])
+        for mesa_id, intervals in mesas.items():
+            occupancy[day][mesa_id] = occupancy[day].get(mesa_id, 0) | occupied_slots(day, intervals)
+    return occupancy
+
+
+def prune_recurrences(before):
+    """
+    Remove as regras terminadas antes de uma data (as reservas já criadas mantêm-se).
+
+    Args:
+        before (date): Data limite (exclusiva).
+
+    Returns:
+        int: Número de regras removidas.
+    """
+    removed, _ = RecurringBooking.objects.filter(until__lt=before).delete()
+    return removed
+
+
+def prune_expired_recurrences(before):
+    """
+    Remove as regras terminadas antes de uma data, uma vez por data limite em cada local.
+
+    A data limite da última remoção fica em cache, pelo que a chamada não executa queries
+    depois da primeira em cada dia (usada pela limpeza das reservas expiradas, em cada pedido).
+
+    Args:
+        before (date): Data limite (exclusiva).
+
+    Returns:
+        int: Número de regras removidas.
+    """
+    key = RECURRENCE_PRUNED_KEY % {'location': get_location()}
+    if cache.get(key) == before:
+        return 0
+
+    removed = prune_recurrences(before)
+    cache.set(key, before, RECURRENCE_CACHE_TIMEOUT)
+    return removed
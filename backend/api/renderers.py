@@ -0,0 +1,78 @@
+"""
+renderers.py
+
+Renderers da API (Django REST Framework).
+
+    - FastJSONRenderer: serialização JSON com orjson (datas e horas tratadas nativamente),
+      com fallback para o JSONRenderer do DRF se o orjson não estiver instalado.
+    - MessagePackRenderer: formato binário MessagePack, selecionado com
+      'Accept: application/msgpack' (requer o pacote msgpack).
+"""
+
+from datetime import date, datetime, time
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Dependência opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Dependência opcional
+    msgpack = None
+
+
+def _default(obj):
+    """
+    Converte tipos não suportados nativamente (ex.: Decimal, strings traduzidas, querysets)
+    usando as mesmas regras do encoder JSON do DRF.
+    """
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON baseado em orjson.
+
+    Produz o mesmo JSON compacto (UTF-8, sem escapes) que o JSONRenderer do DRF com as
+    definições por defeito, mas com serialização nativa de datas, horas e dicionários.
+    Pedidos com indentação (ex.: 'Accept: application/json; indent=4') usam o renderer do DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        # OPT_UTC_Z: datas/horas em UTC terminadas em 'Z', como no encoder do DRF
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer MessagePack (binário, mais compacto que JSON).
+
+    Datas e horas são enviadas no formato ISO 8601, tal como no JSON.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_default(obj):
+    """Converte datas e horas para ISO 8601 e delega os restantes tipos em _default."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    return _default(obj)
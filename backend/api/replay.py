@@ -0,0 +1,283 @@
+"""
+replay.py
+
+Reprodução de tráfego registado (api/capture.py) contra o código atual.
+
+Os pedidos são executados em processo (django.test.Client), pela ordem e com os
+intervalos originais (ou acelerados), sobre uma cópia de uma base de dados de produção.
+Para cada pedido é medida a latência e comparados o código de estado e a impressão
+digital da resposta com os registados.
+
+As datas dos pedidos e da cópia da base de dados são deslocadas pelo mesmo número de
+semanas (os dias da semana e, portanto, o horário mantêm-se), para que reservas que
+eram futuras no momento do registo o continuem a ser na reprodução.
+
+Utilizado pelo comando 'python manage.py replay_capture'.
+"""
+
+import json
+import math
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.test import Client
+
+from .capture import STAFF, response_digest, shift_dates
+from .locations import LOCATIONS, use_location
+from .models import Booking, Closure, SpecialHours
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Rotas não reproduzidas: a sessão dos administradores é criada pela reprodução (a palavra-passe
+# não é registada) e o canal de eventos não termina
+SKIPPED_ROUTES = {'admin_login', 'admin_logout', 'token_refresh', 'stream'}
+
+# Prefixo dos utilizadores criados para reproduzir os pedidos de administradores
+REPLAY_USER_PREFIX = 'replay_'
+
+# ================================================================================================
+# PREPARAÇÃO
+# ================================================================================================
+
+def shift_weeks(records, today=None):
+    """
+    Número de dias (múltiplo de 7) a somar às datas do registo para que o primeiro
+    pedido registado fique na data atual ou na semana seguinte.
+
+    Args:
+        records (list[dict]): Registos (ver api/capture.py::build_record).
+        today (date | None): Data atual.
+
+    Returns:
+        int: Número de dias.
+    """
+    if not records:
+        return 0
+    today = today or date.today()
+    captured = datetime.fromtimestamp(records[0]['t']).date()
+    return max(0, math.ceil((today - captured).days / 7)) * 7
+
+
+def shift_database(days):
+    """
+    Desloca as datas das reservas, horários especiais e encerramentos de todos os locais.
+
+    Args:
+        days (int): Número de dias.
+    """
+    if not days:
+        return
+    delta = timedelta(days=days)
+    for location in LOCATIONS:
+        with use_location(location), transaction.atomic(using=LOCATIONS[location]['database']):
+            for model, fields in ((Booking, ('date',)), (SpecialHours, ('date',)), (Closure, ('start', 'end'))):
+                objects = list(model.objects.only('pk', *fields))
+                for obj in objects:
+                    for field in fields:
+                        setattr(obj, field, getattr(obj, field) + delta)
+                # Sem alterar 'seq': não são alterações do ponto de vista dos clientes
+                model.objects.bulk_update(objects, fields, batch_size=500)
+
+# ================================================================================================
+# REPRODUÇÃO
+# ================================================================================================
+
+class Replayer:
+    """
+    Reproduz registos de tráfego.
+
+    Cada cliente registado (identificador opaco) tem o seu próprio IP fictício, pelo que
+    o rate limiting se comporta como no tráfego original; os pedidos de administradores
+    são feitos com um utilizador de reprodução por administrador original.
+
+    Attributes:
+        speed (float): Fator de aceleração (1 = ritmo original, 0 = sem pausas).
+        concurrency (int): Número de pedidos simultâneos.
+        shift_days (int): Dias somados às datas dos pedidos.
+    """
+
+    def __init__(self, speed=1.0, concurrency=1, shift_days=0, host=None):
+        self.speed = speed
+        self.concurrency = concurrency
+        self.shift_days = shift_days
+        self.host = host or next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith(('*', '.'))), 'localhost')
+        self._local = threading.local()
+        self._users = {}
+        self._users_lock = threading.Lock()
+        self._holds = {}
+
+    def run(self, records, progress=None):
+        """
+        Reproduz os registos e devolve os resultados.
+
+        Args:
+            records (list[dict]): Registos, por ordem cronológica.
+            progress (callable | None): Chamada com o número de pedidos reproduzidos (a cada 100).
+
+        Returns:
+            list[dict]: Por pedido: 'record', 'latency' (ms), 'status' e 'digest'.
+        """
+        records = [record for record in records if record.get('r') not in SKIPPED_ROUTES]
+        results = [None] * len(records)
+        if not records:
+            return []
+
+        next_index = iter(range(len(records)))
+        index_lock = threading.Lock()
+        started = time.perf_counter()
+        first = records[0]['t']
+        done = [0]
+
+        def worker():
+            while True:
+                with index_lock:
+                    index = next(next_index, None)
+                if index is None:
+                    break
+                record = records[index]
+                if self.speed:
+                    delay = (record['t'] - first) / self.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                results[index] = self.replay(record)
+                with index_lock:
+                    done[0] += 1
+                    if progress and done[0] % 100 == 0:
+                        progress(done[0])
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker, name=f'replay-{n}') for n in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def replay(self, record):
+        """
+        Reproduz um pedido.
+
+        Args:
+            record (dict): Registo (ver api/capture.py::build_record).
+
+        Returns:
+            dict: 'record', 'latency' (ms), 'status' e 'digest' da resposta.
+        """
+        client = self._client(record)
+        query = shift_dates(record.get('q') or {}, self.shift_days)
+        body = shift_dates(record.get('b'), self.shift_days)
+        # Holds (api/holds.py): o código registado é substituído pelo código criado na reprodução
+        if isinstance(body, dict) and body.get('hold') in self._holds:
+            body = {**body, 'hold': self._holds[body['hold']]}
+        headers = {
+            'HTTP_' + name.upper().replace('-', '_'): value
+            for name, value in (record.get('h') or {}).items()
+        }
+
+        path = record['p']
+        if record.get('r') == 'hold_cancel':
+            path = '/'.join(self._holds.get(part, part) for part in path.split('/'))
+        path += '?' + urlencode(query) if query else ''
+
+        timer = time.perf_counter()
+        response = client.generic(
+            record['m'], path, data=b'' if body is None else json.dumps(body),
+            content_type='application/json', HTTP_HOST=self.host,
+            REMOTE_ADDR=_address(record['c']), **headers,
+        )
+        latency = (time.perf_counter() - timer) * 1000
+
+        if record.get('k') and isinstance(getattr(response, 'data', None), dict) and response.data.get('hold'):
+            self._holds[record['k']] = response.data['hold']
+
+        return {
+            'record': record,
+            'latency': latency,
+            'status': response.status_code,
+            'digest': response_digest(response, self.shift_days),
+        }
+
+    def _client(self, record):
+        """Cliente HTTP do cliente registado (um por thread, com sessão própria para administradores)."""
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+
+        key = (record['c'], record['a'] == STAFF)
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = Client(raise_request_exception=False)
+            if record['a'] == STAFF:
+                client.force_login(self._staff_user(record['c']))
+        return client
+
+    def _staff_user(self, ident):
+        """Utilizador de reprodução de um administrador registado (criado na cópia da base de dados)."""
+        with self._users_lock:
+            user = self._users.get(ident)
+            if user is None:
+                username = f'{REPLAY_USER_PREFIX}{ident[:12]}'
+                user = User.objects.filter(username=username).first() or User.objects.create_superuser(username, None, None)
+                self._users[ident] = user
+            return user
+
+
+def _address(ident):
+    """IP fictício (10.x.x.x) de um cliente registado."""
+    number = int(ident[:6], 16)
+    return f'10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}'
+
+# ================================================================================================
+# RELATÓRIO
+# ================================================================================================
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarise(results):
+    """
+    Agrupa os resultados por rota (nome em api/urls.py).
+
+    Args:
+        results (list[dict]): Resultados de Replayer.run.
+
+    Returns:
+        list[dict]: Por rota: pedidos, latências registadas e reproduzidas (p50, p95),
+        variação da mediana, códigos de estado diferentes e respostas diferentes.
+    """
+    routes = defaultdict(list)
+    for result in results:
+        routes[result['record'].get('r') or result['record']['p']].append(result)
+
+    summary = []
+    for route, items in sorted(routes.items()):
+        original = [item['record']['d'] for item in items]
+        replayed = [item['latency'] for item in items]
+        original_p50 = statistics.median(original)
+        replayed_p50 = statistics.median(replayed)
+        summary.append({
+            'route': route,
+            'requests': len(items),
+            'original_p50': original_p50,
+            'original_p95': _percentile(original, 0.95),
+            'replay_p50': replayed_p50,
+            'replay_p95': _percentile(replayed, 0.95),
+            'change': (replayed_p50 - original_p50) / original_p50 if original_p50 else None,
+            'status_mismatches': sum(item['status'] != item['record']['s'] for item in items),
+            'body_mismatches': sum(
+                item['status'] == item['record']['s'] and item['digest'] != item['record'].get('x')
+                for item in items
+            ),
+        })
+    return summary
@@ -0,0 +1,199 @@
+"""
+search.py
+
+Pesquisa de reservas por nome ou telefone do cliente, com índice.
+
+No SQLite, as reservas são indexadas numa tabela virtual FTS5 ('api_booking_search',
+com o conteúdo lido de 'api_booking', sem duplicar o texto), mantida por triggers: as
+criações, alterações e remoções em massa (bulk_create, update, delete) também atualizam
+o índice. O tokenizador unicode61 com remove_diacritics ignora maiúsculas e acentos
+("joao" encontra "João") e cada termo pesquisado é um prefixo de uma palavra do nome ou
+do telefone ("mar silv" encontra "Maria da Silva"). Os resultados são ordenados por
+relevância (bm25) e, em caso de empate, das reservas mais recentes para as mais antigas.
+Apenas as SEARCH_RANK_CANDIDATES reservas mais recentes que correspondem à pesquisa são
+ordenadas por relevância: um apelido frequente corresponde a uma grande parte das
+reservas e calcular a relevância de todas custaria centenas de milissegundos com um
+milhão de reservas.
+
+No Postgres, o índice é um GIN de trigramas (pg_trgm) sobre o nome e o telefone, usado
+pelas pesquisas ILIKE '%...%'; os resultados são ordenados por semelhança. Nas restantes
+bases de dados, a pesquisa é feita sem índice.
+
+As migrações que recriem a tabela 'api_booking' no SQLite (alterações de colunas) removem
+os triggers: 'python manage.py rebuild_search_index' volta a criá-los e reconstrói o índice.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Tabela virtual FTS5 com o índice das reservas (SQLite)
+SEARCH_TABLE = 'api_booking_search'
+
+# Número máximo de reservas (as mais recentes) ordenadas por relevância numa pesquisa (SQLite)
+SEARCH_RANK_CANDIDATES = getattr(settings, 'SEARCH_RANK_CANDIDATES', 1000)
+
+# Criação da tabela virtual e dos triggers que a mantêm sincronizada com 'api_booking' (SQLite)
+SQLITE_SEARCH_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        name, phone, content='api_booking', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON api_booking BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON api_booking BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF name, phone ON api_booking BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone);
+        INSERT INTO {SEARCH_TABLE}(rowid, name, phone) VALUES (new.id, new.name, new.phone);
+    END
+    """,
+]
+
+# Índices de trigramas (Postgres)
+POSTGRES_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS booking_name_trgm_idx ON api_booking USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS booking_phone_trgm_idx ON api_booking USING gin (phone gin_trgm_ops)",
+]
+
+# ================================================================================================
+# ÍNDICE
+# ================================================================================================
+
+def install_search_index(connection):
+    """
+    Cria o índice de pesquisa (e os triggers, no SQLite) numa base de dados e indexa as
+    reservas existentes. Pode ser repetido.
+
+    Args:
+        connection: Ligação à base de dados (ex.: schema_editor.connection).
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for sql in SQLITE_SEARCH_SQL:
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for sql in POSTGRES_SEARCH_SQL:
+                cursor.execute(sql)
+
+
+def remove_search_index(connection):
+    """
+    Remove o índice de pesquisa de uma base de dados.
+
+    Args:
+        connection: Ligação à base de dados.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for suffix in ('insert', 'delete', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS booking_name_trgm_idx")
+            cursor.execute("DROP INDEX IF EXISTS booking_phone_trgm_idx")
+
+# ================================================================================================
+# PESQUISA
+# ================================================================================================
+
+def search_terms(query):
+    """
+    Termos de uma pesquisa: palavras do nome ou, sem letras, os dígitos do telefone.
+
+    Args:
+        query (str): Texto pesquisado (ex.: "maria silva", "912 345").
+
+    Returns:
+        list[str]: Termos (vazio se a pesquisa não tiver letras nem dígitos).
+    """
+    if not re.search(r'[^\W\d_]', query):
+        digits = re.sub(r'\D', '', query)
+        return [digits] if digits else []
+    return re.findall(r'[^\W_]+', query)
+
+
+def _match_expression(terms):
+    """Expressão MATCH do FTS5: todos os termos, cada um como prefixo de uma palavra."""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_bookings(queryset, query):
+    """
+    Filtra um queryset de reservas pelas que correspondem a uma pesquisa (usado pelo painel).
+
+    Args:
+        queryset (QuerySet): Reservas.
+        query (str): Texto pesquisado.
+
+    Returns:
+        QuerySet: Reservas encontradas (a ordenação do queryset mantém-se).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if connections[queryset.db].vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [_match_expression(terms)]
+        ))
+
+    for term in terms:
+        queryset = queryset.filter(Q(name__icontains=term) | Q(phone__contains=term))
+    return queryset
+
+
+def ranked_booking_ids(queryset, query, limit, offset=0):
+    """
+    Identificadores das reservas que correspondem a uma pesquisa, da mais para a menos relevante.
+
+    Args:
+        queryset (QuerySet): Reservas (apenas a base de dados é usada).
+        query (str): Texto pesquisado.
+        limit (int): Número máximo de resultados.
+        offset (int): Resultados a saltar (paginação).
+
+    Returns:
+        list[int]: Identificadores das reservas.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            # As reservas mais recentes são obtidas pela ordem do índice (rowid), sem calcular a relevância
+            cursor.execute(
+                f"SELECT rowid FROM (SELECT rowid, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY rowid DESC LIMIT %s) ORDER BY rank, rowid DESC LIMIT %s OFFSET %s",
+                [_match_expression(terms), max(SEARCH_RANK_CANDIDATES, offset + limit), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    matches = search_bookings(queryset, query)
+    if connection.vendor == 'postgresql':
+        matches = matches.annotate(
+            similarity=RawSQL("GREATEST(similarity(name, %s), similarity(phone, %s))", [query, query])
+        ).order_by('-similarity', '-id')
+    else:
+        matches = matches.order_by('-id')
+    return list(matches.values_list('id', flat=True)[offset:offset + limit])
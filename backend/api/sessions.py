@@ -0,0 +1,29 @@
+"""
+sessions.py
+
+Motor de sessões em base de dados com as escritas feitas pelo coordenador de escritas
+(api/writer.py).
+
+Com SESSION_SAVE_EVERY_REQUEST, cada pedido autenticado grava a sessão; as gravações
+concorrentes são agrupadas em transações com as restantes escritas da base de dados
+'default', em vez de disputarem o bloqueio de escrita do SQLite.
+
+Configuração: SESSION_ENGINE = 'api.sessions'.
+"""
+
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.db import router
+
+from . import writer
+
+
+class SessionStore(DatabaseSessionStore):
+    """
+    SessionStore da base de dados cujas gravações e remoções passam pelo coordenador de escritas.
+    """
+
+    def save(self, must_create=False):
+        writer.run(super().save, must_create, using=router.db_for_write(self.model))
+
+    def delete(self, session_key=None):
+        writer.run(super().delete, session_key, using=router.db_for_write(self.model))
@@ -0,0 +1,354 @@
+"""
+simulation.py
+
+Simulador de capacidade: reproduz fluxos de pedidos de reserva (históricos ou sintéticos)
+através das regras de alocação de create_booking (api/allocation.py), inteiramente em
+memória, sem HTTP nem base de dados.
+
+Cada política define a duração das reservas, o horário de funcionamento, as mesas
+disponíveis e a estratégia de escolha da mesa. Os pedidos são processados por ordem de
+chegada (simulação de eventos discretos) e, para cada política, são medidos a taxa de
+aceitação, a utilização dos lugares e o tempo de alocação por pedido. Várias políticas
+podem ser simuladas em paralelo, uma por processo.
+
+Como em create_booking, as reservas de cada mesa são agrupadas pela data de início e
+comparadas em minutos desde a meia-noite desse dia: uma reserva que termina depois da
+meia-noite não ocupa os horários do dia seguinte.
+
+Utilizado pelo comando 'python manage.py simulate_capacity'.
+"""
+
+import csv
+import math
+import random
+import time as timer
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from .allocation import (
+    CLOSED_WEEKDAYS, CLOSING_TIME, EXACT_FIRST, OPENING_TIME, RESERVATION_DURATION, SLOT_MINUTES, STRATEGIES, find_table,
+    is_open,
+)
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Distribuição do tamanho dos grupos nos pedidos sintéticos (pessoas -> peso)
+PARTY_SIZES = {1: 8, 2: 38, 3: 14, 4: 22, 5: 6, 6: 7, 8: 4, 10: 1}
+
+# Picos de procura nos pedidos sintéticos (hora média, desvio em minutos, peso); o resto é uniforme
+DEMAND_PEAKS = ((time(12, 45), 45, 0.35), (time(20, 15), 60, 0.45))
+
+# Antecedência média dos pedidos sintéticos em relação à reserva (dias)
+MEAN_LEAD_DAYS = 2
+
+# ================================================================================================
+# POLÍTICAS
+# ================================================================================================
+
+class Policy:
+    """
+    Política de alocação a simular.
+
+    Attributes:
+        name (str): Nome apresentado nos resultados.
+        tables (list[tuple[int, int]]): Mesas (id, lugares), pela ordem de preferência.
+        duration (timedelta): Duração de cada reserva.
+        opening (time): Hora de abertura.
+        closing (time): Hora de fecho.
+        closed_weekdays (frozenset[int]): Dias da semana encerrados (0 = segunda).
+        strategy (str): Estratégia de escolha da mesa (api/allocation.py).
+    """
+
+    def __init__(self, name, tables, duration=RESERVATION_DURATION, opening=OPENING_TIME, closing=CLOSING_TIME,
+                 closed_weekdays=CLOSED_WEEKDAYS, strategy=EXACT_FIRST):
+        self.name = name
+        self.tables = list(tables)
+        self.duration = duration
+        self.opening = opening
+        self.closing = closing
+        self.closed_weekdays = frozenset(closed_weekdays)
+        self.strategy = strategy
+
+    @property
+    def open_minutes(self):
+        """Minutos em que o café está aberto num dia de funcionamento."""
+        opening = self.opening.hour * 60 + self.opening.minute
+        closing = self.closing.hour * 60 + self.closing.minute
+        return closing - opening if closing > opening else 24 * 60 - (opening - closing)
+
+
+def parse_tables(spec):
+    """
+    Interpreta uma configuração de mesas no formato "<quantidade>x<lugares>+...".
+
+    Args:
+        spec (str): Ex.: "4x2+6x4+2x6" (quatro mesas de 2 lugares, seis de 4 e duas de 6).
+
+    Returns:
+        list[tuple[int, int]]: Mesas (id, lugares), numeradas a partir de 1.
+
+    Raises:
+        ValueError: Se o formato for inválido.
+    """
+    tables = []
+    for group in spec.split('+'):
+        count, _, seats = group.strip().partition('x')
+        if int(count) < 1 or int(seats) < 1:
+            raise ValueError(f"Grupo de mesas inválido: '{group}'.")
+        first = len(tables) + 1
+        tables.extend((first + i, int(seats)) for i in range(int(count)))
+    return tables
+
+
+def parse_policy(spec, default_tables):
+    """
+    Interpreta uma política no formato "chave=valor,chave=valor".
+
+    Chaves aceites: name, tables (ver parse_tables), duration (minutos), open e close
+    (HH:MM), closed (dias encerrados, ex.: "6" ou "0+6"; vazio para nenhum) e strategy.
+    As chaves omitidas mantêm os valores atuais da API.
+
+    Args:
+        spec (str): Ex.: "name=90min,duration=90" ou "strategy=best_fit,tables=6x2+6x4".
+        default_tables (list[tuple[int, int]]): Mesas usadas quando 'tables' é omitido.
+
+    Returns:
+        Policy: Política interpretada.
+
+    Raises:
+        ValueError: Se a especificação for inválida.
+    """
+    options = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        key, separator, value = item.partition('=')
+        if not separator:
+            raise ValueError(f"Opção inválida: '{item}'. Use chave=valor.")
+        options[key.strip()] = value.strip()
+
+    unknown = set(options) - {'name', 'tables', 'duration', 'open', 'close', 'closed', 'strategy'}
+    if unknown:
+        raise ValueError(f"Opções desconhecidas: {', '.join(sorted(unknown))}.")
+
+    strategy = options.get('strategy', EXACT_FIRST)
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Estratégia desconhecida: '{strategy}'. Use uma de: {', '.join(STRATEGIES)}.")
+
+    return Policy(
+        name=options.get('name') or spec or 'atual',
+        tables=parse_tables(options['tables']) if 'tables' in options else default_tables,
+        duration=timedelta(minutes=int(options['duration'])) if 'duration' in options else RESERVATION_DURATION,
+        opening=time.fromisoformat(options['open']) if 'open' in options else OPENING_TIME,
+        closing=time.fromisoformat(options['close']) if 'close' in options else CLOSING_TIME,
+        closed_weekdays={int(day) for day in options['closed'].split('+') if day} if 'closed' in options else CLOSED_WEEKDAYS,
+        strategy=strategy,
+    )
+
+# ================================================================================================
+# FLUXOS DE PEDIDOS
+# ================================================================================================
+
+def synthetic_requests(start, days, requests_per_day, seed=0):
+    """
+    Gera um fluxo sintético de pedidos de reserva.
+
+    Para cada dia, o número de pedidos segue aproximadamente uma distribuição de Poisson;
+    as horas pedidas concentram-se no almoço e no jantar e os pedidos chegam com uma
+    antecedência exponencial (média MEAN_LEAD_DAYS).
+
+    Args:
+        start (date): Primeiro dia das reservas.
+        days (int): Número de dias.
+        requests_per_day (float): Número médio de pedidos por dia.
+        seed (int): Semente do gerador (resultados reprodutíveis).
+
+    Returns:
+        list[tuple[datetime, datetime, int]]: Pedidos (chegada, início pedido, pessoas),
+        ordenados pela chegada.
+    """
+    rng = random.Random(seed)
+    sizes, weights = list(PARTY_SIZES), list(PARTY_SIZES.values())
+    slots_per_day = 24 * 60 // SLOT_MINUTES
+    requests = []
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        midnight = datetime.combine(day, time())
+        count = max(0, round(rng.gauss(requests_per_day, math.sqrt(requests_per_day))))
+
+        for guests in rng.choices(sizes, weights, k=count):
+            # Hora pedida: picos de almoço e jantar ou uniforme ao longo do dia
+            draw, minute = rng.random(), None
+            for peak, deviation, weight in DEMAND_PEAKS:
+                if draw < weight:
+                    minute = peak.hour * 60 + peak.minute + rng.gauss(0, deviation)
+                    break
+                draw -= weight
+            slot = round(minute / SLOT_MINUTES) if minute is not None else rng.randrange(slots_per_day)
+            requested_start = midnight + timedelta(minutes=min(max(slot, 0), slots_per_day - 1) * SLOT_MINUTES)
+
+            requested_at = requested_start - timedelta(days=rng.expovariate(1 / MEAN_LEAD_DAYS))
+            requests.append((requested_at, requested_start, guests))
+
+    requests.sort(key=lambda request: request[0])
+    return requests
+
+
+def load_requests(path):
+    """
+    Lê um fluxo de pedidos de um ficheiro CSV.
+
+    Colunas: 'date' (YYYY-MM-DD), 'time' (HH:MM), 'number_of_guests' e, opcionalmente,
+    'requested_at' (ISO 8601). Sem 'requested_at', a ordem do ficheiro é a ordem de chegada.
+
+    Args:
+        path (str): Caminho do ficheiro.
+
+    Returns:
+        list[tuple[datetime, datetime, int]]: Pedidos (chegada, início pedido, pessoas),
+        ordenados pela chegada.
+
+    Raises:
+        ValueError: Se uma linha for inválida.
+    """
+    requests = []
+    with open(path, newline='', encoding='utf-8') as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            try:
+                requested_start = datetime.combine(date.fromisoformat(row['date']), time.fromisoformat(row['time']))
+                requested_at = datetime.fromisoformat(row['requested_at']) if row.get('requested_at') else None
+                requests.append((requested_at, requested_start, int(row['number_of_guests'])))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Linha {line} inválida: {e}") from e
+
+    return order_requests(requests)
+
+
+def order_requests(requests):
+    """
+    Ordena pedidos pela chegada, preservando a ordem original quando esta é desconhecida.
+
+    Args:
+        requests (list[tuple[datetime | None, datetime, int]]): Pedidos (chegada, início, pessoas).
+
+    Returns:
+        list[tuple[datetime, datetime, int]]: Pedidos ordenados; chegadas desconhecidas são
+        substituídas pelo início pedido.
+    """
+    if all(requested_at is None for requested_at, _, _ in requests):
+        return [(requested_start, requested_start, guests) for _, requested_start, guests in requests]
+    requests = [(requested_at or requested_start, requested_start, guests) for requested_at, requested_start, guests in requests]
+    return sorted(requests, key=lambda request: request[0])
+
+# ================================================================================================
+# SIMULAÇÃO
+# ================================================================================================
+
+def simulate(policy, requests):
+    """
+    Reproduz um fluxo de pedidos com uma política de alocação.
+
+    Args:
+        policy (Policy): Política a simular.
+        requests (list[tuple[datetime, datetime, int]]): Pedidos ordenados pela chegada.
+
+    Returns:
+        dict: Métricas da simulação ('policy', 'requests', 'accepted', 'acceptance',
+        'rejected_closed', 'rejected_full', 'utilisation', 'fill', 'alloc_mean_us',
+        'alloc_p99_us' e 'elapsed').
+    """
+    started = timer.perf_counter()
+    duration = int(policy.duration.total_seconds() // 60)
+    seats = dict(policy.tables)
+    bookings = defaultdict(dict)  # data de início -> mesa -> [(início, fim)] em minutos desde a meia-noite dessa data
+    timings = []
+    accepted = rejected_closed = rejected_full = guests_seated = seats_used = 0
+
+    for _, requested_start, guests in requests:
+        allocation_started = timer.perf_counter_ns()
+
+        if not is_open(requested_start, policy.opening, policy.closing, policy.closed_weekdays):
+            timings.append(timer.perf_counter_ns() - allocation_started)
+            rejected_closed += 1
+            continue
+
+        day = bookings[requested_start.date()]
+        start = requested_start.hour * 60 + requested_start.minute
+        table = find_table(start, start + duration, guests, policy.tables, day, policy.strategy)
+        if table is not None:
+            day.setdefault(table, []).append((start, start + duration))
+
+        timings.append(timer.perf_counter_ns() - allocation_started)
+
+        if table is None:
+            rejected_full += 1
+        else:
+            accepted += 1
+            guests_seated += guests
+            seats_used += seats[table]
+
+    # Lugares x minutos disponíveis nos dias de funcionamento do período simulado
+    if requests:
+        first = min(requested_start for _, requested_start, _ in requests).date()
+        last = max(requested_start for _, requested_start, _ in requests).date()
+        open_days = sum(
+            (first + timedelta(days=offset)).weekday() not in policy.closed_weekdays
+            for offset in range((last - first).days + 1)
+        )
+    else:
+        open_days = 0
+    capacity = sum(seats.values()) * policy.open_minutes * open_days
+
+    timings.sort()
+    return {
+        'policy': policy.name,
+        'requests': len(requests),
+        'accepted': accepted,
+        'acceptance': accepted / len(requests) if requests else 0.0,
+        'rejected_closed': rejected_closed,
+        'rejected_full': rejected_full,
+        'utilisation': guests_seated * duration / capacity if capacity else 0.0,
+        'fill': guests_seated / seats_used if seats_used else 0.0,
+        'alloc_mean_us': sum(timings) / len(timings) / 1000 if timings else 0.0,
+        'alloc_p99_us': timings[int(len(timings) * 0.99)] / 1000 if timings else 0.0,
+        'elapsed': timer.perf_counter() - started,
+    }
+
+
+def simulate_policies(policies, requests, jobs=None):
+    """
+    Simula várias políticas sobre o mesmo fluxo de pedidos, em paralelo (um processo por política).
+
+    Args:
+        policies (list[Policy]): Políticas a simular.
+        requests (list[tuple[datetime, datetime, int]]): Pedidos ordenados pela chegada.
+        jobs (int | None): Número máximo de processos (1 para simular no processo atual).
+
+    Returns:
+        list[dict]: Métricas de cada política (ver simulate), pela ordem recebida.
+    """
+    if jobs == 1 or len(policies) == 1:
+        return [simulate(policy, requests) for policy in policies]
+
+    # O fluxo de pedidos é enviado uma única vez a cada processo
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_set_requests, initargs=(requests,)) as executor:
+        return list(executor.map(_simulate_worker, policies))
+
+# ================================================================================================
+# FUNÇÕES AUXILIARES
+# ================================================================================================
+
+_worker_requests = None
+
+
+def _set_requests(requests):
+    """Guarda o fluxo de pedidos no processo de trabalho."""
+    global _worker_requests
+    _worker_requests = requests
+
+
+def _simulate_worker(policy):
+    """Simula uma política no processo de trabalho."""
+    return simulate(policy, _worker_requests)
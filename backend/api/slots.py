@@ -0,0 +1,207 @@
+"""
+slots.py
+
+Calendário de horários reserváveis de cada local.
+
+O horário semanal, os horários especiais e os encerramentos (api/models.py) são
+configurados no painel administrativo e compilados, para cada data, num mapa de bits
+com um bit por intervalo de SLOT_MINUTES minutos: o bit i indica se uma reserva pode
+começar às 00:00 + i * SLOT_MINUTES. O mapa é guardado na cache e verificar um horário
+é uma consulta de bits, sem queries nem conversões de datas.
+
+Os mapas em cache ficam associados a uma versão por local; qualquer alteração no painel
+descarta a versão (invalidate_calendar), pelo que as datas voltam a ser compiladas
+no pedido seguinte. A versão é guardada, sem expiração, na cache partilhada pelos workers
+(CACHES em core/settings.py; o gunicorn recusa arrancar com vários workers e uma cache por
+processo), pelo que uma alteração no painel é vista por todos os processos. Se a versão
+for removida da cache (ex.: memória esgotada no Redis), é criada uma nova e as datas são
+apenas compiladas de novo.
+"""
+
+import time as clock
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .allocation import RESERVATION_DURATION, SLOT_MINUTES
+from .locations import get_location
+from .models import Closure, OpeningHours, SpecialHours
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Intervalos por dia (o mapa de cada data tem mais um bit: as 00:00 do dia seguinte)
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOT = timedelta(minutes=SLOT_MINUTES)
+
+# Tempo de vida (segundos) do mapa de cada data na cache
+CALENDAR_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Chaves de cache: versão do calendário de um local e mapa de uma data
+CALENDAR_VERSION_KEY = 'slots_version_%(location)s'
+CALENDAR_KEY = 'slots_%(location)s_%(version)s_%(date)s'
+
+# ================================================================================================
+# COMPILAÇÃO
+# ================================================================================================
+
+def _mask(day, start, end, include_start, include_end):
+    """Bits dos intervalos de 'day' (e das 00:00 seguintes) que começam entre 'start' e 'end'."""
+    midnight = datetime.combine(day, time.min)
+    # Índices do primeiro e do último intervalo dentro dos limites
+    first = -((midnight - start) // SLOT) if include_start else (start - midnight) // SLOT + 1
+    last = (end - midnight) // SLOT if include_end else -((midnight - end) // SLOT) - 1
+    first, last = max(first, 0), min(last, SLOTS_PER_DAY)
+    if last < first:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def compile_day(day, weekly, special, closures, duration=RESERVATION_DURATION):
+    """
+    Compila o mapa de horários reserváveis de uma data.
+
+    Args:
+        day (date): Data a compilar.
+        weekly (Mapping[int, Iterable[tuple[time, time]]]): Turnos (abertura, fecho) de cada dia da semana.
+        special (Mapping[date, Iterable[tuple[time, time]]]): Turnos especiais por data (substituem os semanais).
+        closures (Iterable[tuple[datetime, datetime]]): Encerramentos (início, fim), em hora local.
+        duration (timedelta): Duração de uma reserva (recusadas as que se sobreporiam a um encerramento).
+
+    Returns:
+        int: Mapa de bits (bit i: pode começar uma reserva às 00:00 + i * SLOT_MINUTES).
+    """
+    bits = 0
+
+    # Turnos do próprio dia, do anterior (fecho depois da meia-noite) e do seguinte (00:00)
+    for offset in (-1, 0, 1):
+        shift_day = day + timedelta(days=offset)
+        shifts = special[shift_day] if shift_day in special else weekly.get(shift_day.weekday(), ())
+        for opening, closing in shifts:
+            start = datetime.combine(shift_day, opening)
+            end = datetime.combine(shift_day, closing)
+            if closing <= opening:
+                end += timedelta(days=1)
+            bits |= _mask(day, start, end, include_start=True, include_end=True)
+
+    return bits & ~occupied_slots(day, closures, duration)
+
+
+def occupied_slots(day, intervals, duration=RESERVATION_DURATION):
+    """
+    Intervalos de uma data em que uma nova reserva se sobreporia a um dos intervalos indicados.
+
+    Uma reserva que comece em s sobrepõe-se a (início, fim) se s < fim e s + duration > início.
+
+    Args:
+        day (date): Data.
+        intervals (Iterable[tuple[datetime, datetime]]): Intervalos ocupados (início, fim), em hora local.
+        duration (timedelta): Duração da nova reserva.
+
+    Returns:
+        int: Mapa de bits (bit i: uma reserva às 00:00 + i * SLOT_MINUTES sobrepõe-se a um intervalo).
+    """
+    bits = 0
+    for start, end in intervals:
+        bits |= _mask(day, start - duration, end, include_start=False, include_end=False)
+    return bits
+
+
+def _load_day(day):
+    """Lê o horário e os encerramentos relevantes para uma data (três queries) e compila o mapa."""
+    weekly = defaultdict(list)
+    for weekday, opening, closing in OpeningHours.objects.values_list('weekday', 'opening', 'closing'):
+        weekly[weekday].append((opening, closing))
+
+    special = defaultdict(list)
+    rows = SpecialHours.objects.filter(date__range=(day - timedelta(days=1), day + timedelta(days=1)))
+    for special_day, opening, closing in rows.values_list('date', 'opening', 'closing'):
+        special[special_day].append((opening, closing))
+
+    # Encerramentos que se sobrepõem às reservas que podem começar nesta data
+    window_start = timezone.make_aware(datetime.combine(day, time.min))
+    window_end = window_start + timedelta(days=1) + RESERVATION_DURATION
+    closures = [
+        (timezone.localtime(start).replace(tzinfo=None), timezone.localtime(end).replace(tzinfo=None))
+        for start, end in Closure.objects.filter(end__gt=window_start, start__lt=window_end).values_list('start', 'end')
+    ]
+
+    return compile_day(day, weekly, special, closures)
+
+# ================================================================================================
+# CONSULTA
+# ================================================================================================
+
+def get_calendar(day):
+    """
+    Devolve o mapa de horários reserváveis de uma data no local atual (compilado se necessário).
+
+    Args:
+        day (date): Data.
+
+    Returns:
+        int: Mapa de bits (ver compile_day).
+    """
+    location = get_location()
+    version = cache.get_or_set(CALENDAR_VERSION_KEY % {'location': location}, clock.time_ns, None)
+    key = CALENDAR_KEY % {'location': location, 'version': version, 'date': day.isoformat()}
+
+    bits = cache.get(key)
+    if bits is None:
+        bits = _load_day(day)
+        cache.set(key, bits, CALENDAR_CACHE_TIMEOUT)
+    return bits
+
+
+def is_bookable(moment, bits=None):
+    """
+    Verifica se uma reserva pode começar no instante indicado.
+
+    Como o horário e os encerramentos estão alinhados com os intervalos, um instante
+    dentro de um intervalo é reservável se o início desse intervalo e o do seguinte o forem.
+
+    Args:
+        moment (datetime): Início da reserva (hora local).
+        bits (int | None): Mapa da data, se já obtido com get_calendar.
+
+    Returns:
+        bool: True se o local estiver aberto e sem encerramentos nesse instante.
+    """
+    if bits is None:
+        bits = get_calendar(moment.date())
+
+    slot, remainder = divmod(moment.hour * 60 + moment.minute, SLOT_MINUTES)
+    if remainder or moment.second:
+        return (bits >> slot) & 0b11 == 0b11
+    return bool((bits >> slot) & 1)
+
+
+def bookable_slots(day, bits=None):
+    """
+    Lista os horários em que podem começar reservas numa data.
+
+    Args:
+        day (date): Data.
+        bits (int | None): Mapa da data, se já obtido com get_calendar.
+
+    Returns:
+        list[time]: Inícios dos intervalos reserváveis (sem as 00:00 do dia seguinte).
+    """
+    if bits is None:
+        bits = get_calendar(day)
+
+    midnight = datetime.combine(day, time.min)
+    return [(midnight + slot * SLOT).time() for slot in range(SLOTS_PER_DAY) if (bits >> slot) & 1]
+
+
+def invalidate_calendar(location=None):
+    """
+    Descarta os mapas em cache de um local (após alterar horários ou encerramentos).
+
+    Args:
+        location (str | None): Identificador do local (o local atual, se None).
+    """
+    cache.delete(CALENDAR_VERSION_KEY % {'location': location or get_location()})
@@ -0,0 +1,343 @@
+"""
+slowqueries.py
+
+Registo das queries lentas, com o plano de execução, para identificar as queries do ORM
+que são lentas com os dados reais.
+
+Com SLOW_QUERY_ENABLED, cada ligação à base de dados é instrumentada (execute wrapper do
+Django, instalado em api/apps.py quando a ligação é aberta). As queries que demoram pelo
+menos SLOW_QUERY_THRESHOLD_MS milissegundos são gravadas, uma por linha (JSON), em
+SLOW_QUERY_LOG, com:
+
+    - a instrução normalizada (literais e listas IN substituídos por '?'), que agrupa
+      as execuções da mesma query com parâmetros diferentes, e a respetiva impressão digital;
+    - a impressão digital dos parâmetros (HMAC com a SECRET_KEY; os valores não são
+      gravados e, sem a chave, não podem ser obtidos testando valores prováveis, como
+      números de telefone);
+    - a origem: a linha de api/views.py ou api/admin.py (ou, na falta destas, do primeiro
+      ficheiro da aplicação) que executou a query;
+    - o plano de execução (EXPLAIN QUERY PLAN no SQLite, EXPLAIN no Postgres). O plano é
+      obtido uma vez por instrução normalizada e por processo (SLOW_QUERY_PLAN_CACHE
+      instruções).
+
+As queries mais rápidas do que o limite custam apenas a medição do tempo. Sem
+SLOW_QUERY_ENABLED as ligações não são instrumentadas. /api/slow-queries/ resume as
+queries com maior tempo total.
+
+Cada processo escreve no seu próprio ficheiro (SLOW_QUERY_LOG com o PID, ex.:
+slow_queries.1234.jsonl), com rotação (SLOW_QUERY_MAX_BYTES por ficheiro,
+SLOW_QUERY_BACKUPS ficheiros antigos): com vários workers, nenhum processo escreve ou
+roda um ficheiro de outro. O resumo junta os ficheiros de todos os processos. Os
+ficheiros de processos terminados (ex.: workers reciclados pelo gunicorn) sem alterações
+há mais de SLOW_QUERY_RETENTION_DAYS dias são removidos quando um processo abre o seu.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Registo ativo (instalado em api/apps.py)
+SLOW_QUERY_ENABLED = getattr(settings, 'SLOW_QUERY_ENABLED', False)
+
+# Duração (milissegundos) a partir da qual uma query é registada
+SLOW_QUERY_THRESHOLD_MS = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+
+# Ficheiro de registo e rotação (tamanho máximo de cada ficheiro e número de ficheiros antigos)
+SLOW_QUERY_LOG = Path(getattr(settings, 'SLOW_QUERY_LOG', settings.BASE_DIR / 'data' / 'slow_queries.jsonl'))
+SLOW_QUERY_MAX_BYTES = getattr(settings, 'SLOW_QUERY_MAX_BYTES', 5 * 1024 * 1024)
+SLOW_QUERY_BACKUPS = getattr(settings, 'SLOW_QUERY_BACKUPS', 3)
+
+# Dias sem alterações ao fim dos quais os ficheiros de processos terminados são removidos
+SLOW_QUERY_RETENTION_DAYS = getattr(settings, 'SLOW_QUERY_RETENTION_DAYS', 7)
+
+# Número máximo de planos de execução guardados em memória (por processo)
+SLOW_QUERY_PLAN_CACHE = 256
+
+# Ficheiros cujas linhas identificam a origem das queries (por ordem de preferência)
+APP_DIR = Path(__file__).resolve().parent
+SLOW_QUERY_SOURCES = (str(APP_DIR / 'views.py'), str(APP_DIR / 'admin.py'))
+
+# Instruções com plano de execução
+EXPLAINED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?(?![\w"])')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+# ================================================================================================
+# NORMALIZAÇÃO
+# ================================================================================================
+
+def normalise_sql(sql):
+    """
+    Normaliza uma instrução SQL: literais e parâmetros passam a '?' e as listas de
+    parâmetros (ex.: IN (?, ?, ?)) passam a '(...)'.
+
+    Args:
+        sql (str): Instrução, como executada pelo Django (parâmetros '%s').
+
+    Returns:
+        str: Instrução normalizada.
+    """
+    sql = sql.replace('%s', '?')
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(value):
+    """Impressão digital curta (hexadecimal) de uma instrução normalizada."""
+    return hashlib.blake2b(repr(value).encode(), digest_size=8).hexdigest()
+
+
+def params_fingerprint(params):
+    """Impressão digital curta (hexadecimal) dos parâmetros de uma query (HMAC com a SECRET_KEY)."""
+    return hmac.new(settings.SECRET_KEY.encode(), f'params:{params!r}'.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def query_origin():
+    """
+    Linha de código que executou a query atual.
+
+    Returns:
+        str | None: "api/views.py:123 create_booking" (api/views.py ou api/admin.py ou, na
+        falta destes, o primeiro ficheiro da aplicação na pilha), ou None.
+    """
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename in SLOW_QUERY_SOURCES:
+            return _frame_label(frame)
+        if fallback is None and filename.startswith(str(APP_DIR)) and filename != __file__:
+            fallback = frame
+        frame = frame.f_back
+    return _frame_label(fallback) if fallback is not None else None
+
+
+def _frame_label(frame):
+    path = Path(frame.f_code.co_filename).relative_to(APP_DIR.parent).as_posix()
+    return f'{path}:{frame.f_lineno} {frame.f_code.co_name}'
+
+# ================================================================================================
+# REGISTO
+# ================================================================================================
+
+class SlowQueryLog:
+    """
+    Execute wrapper do Django que regista as queries lentas (ver connection.execute_wrapper).
+    """
+
+    def __init__(self, path=SLOW_QUERY_LOG, threshold_ms=SLOW_QUERY_THRESHOLD_MS):
+        self.path = Path(path)
+        self.threshold = threshold_ms / 1000
+        self._handler = None
+        self._pid = None
+        self._handler_lock = threading.Lock()
+        self._plans = {}
+        self._local = threading.local()
+
+    def __call__(self, execute, sql, params, many, context):
+        # As queries do próprio EXPLAIN não são medidas
+        if getattr(self._local, 'explaining', False):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration >= self.threshold:
+            self.record(context['connection'], sql, params, many, duration)
+        return result
+
+    def record(self, connection, sql, params, many, duration):
+        """
+        Grava uma query lenta.
+
+        Args:
+            connection: Ligação à base de dados que executou a query.
+            sql (str): Instrução executada.
+            params: Parâmetros da query (lista de listas se 'many').
+            many (bool): Query executada com executemany.
+            duration (float): Duração (segundos).
+        """
+        statement = normalise_sql(sql)
+        statement_fp = fingerprint(statement)
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'database': connection.alias,
+            'duration_ms': round(duration * 1000, 3),
+            'statement': statement,
+            'fingerprint': statement_fp,
+            'params': params_fingerprint(params),
+            'many': many,
+            'origin': query_origin(),
+            'plan': None if many else self.explain(connection, sql, params, statement_fp),
+        }
+        self.write(entry)
+
+    def explain(self, connection, sql, params, statement_fp):
+        """
+        Plano de execução de uma query (guardado por instrução normalizada).
+
+        Returns:
+            list[str] | None: Linhas do plano, ou None se a instrução não tiver plano.
+        """
+        key = (connection.alias, statement_fp)
+        if key in self._plans:
+            return self._plans[key]
+        if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return None
+
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        self._local.explaining = True
+        try:
+            # Num savepoint: um EXPLAIN inválido não interrompe a transação do pedido (Postgres)
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+            plan = [row[-1] for row in rows]
+        except DatabaseError as exc:
+            plan = [f'EXPLAIN falhou: {exc}']
+        finally:
+            self._local.explaining = False
+
+        if len(self._plans) >= SLOW_QUERY_PLAN_CACHE:
+            self._plans.clear()
+        self._plans[key] = plan
+        return plan
+
+    def write(self, entry):
+        """Acrescenta um registo ao ficheiro do processo atual (com rotação)."""
+        # O registo pode ser criado antes do fork dos workers: cada processo abre o seu ficheiro
+        if self._pid != os.getpid():
+            with self._handler_lock:
+                if self._pid != os.getpid():
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    remove_stale_logs(self.path)
+                    self._handler = RotatingFileHandler(
+                        process_log_path(self.path, os.getpid()), maxBytes=SLOW_QUERY_MAX_BYTES,
+                        backupCount=SLOW_QUERY_BACKUPS, encoding='utf-8', delay=True,
+                    )
+                    self._pid = os.getpid()
+        self._handler.handle(logging.makeLogRecord({'msg': json.dumps(entry, ensure_ascii=False)}))
+
+
+def process_log_path(path, pid):
+    """Ficheiro de registo de um processo (ex.: slow_queries.jsonl -> slow_queries.1234.jsonl)."""
+    return path.with_name(f'{path.stem}.{pid}{path.suffix}')
+
+
+def log_files(path):
+    """Ficheiros de registo de todos os processos (incluindo os antigos da rotação)."""
+    return sorted(path.parent.glob(f'{path.stem}.*{path.suffix}*'))
+
+
+def remove_stale_logs(path):
+    """Remove os ficheiros de registo sem alterações há mais de SLOW_QUERY_RETENTION_DAYS dias."""
+    limit = time.time() - timedelta(days=SLOW_QUERY_RETENTION_DAYS).total_seconds()
+    for file in log_files(path):
+        try:
+            if file.stat().st_mtime < limit:
+                file.unlink()
+        except FileNotFoundError:
+            continue  # Removido por outro processo
+
+
+_slow_query_log = None
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Instala o registo das queries lentas numa ligação (sinal connection_created).
+
+    Args:
+        connection: Ligação à base de dados aberta.
+    """
+    global _slow_query_log
+    if _slow_query_log is None:
+        _slow_query_log = SlowQueryLog()
+    # A mesma ligação volta a emitir o sinal quando é reaberta
+    if _slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_slow_query_log)
+
+# ================================================================================================
+# RESUMO
+# ================================================================================================
+
+def read_slow_queries(path=None):
+    """
+    Lê os registos de queries lentas de todos os processos.
+
+    Args:
+        path (Path | None): Ficheiro de registo (por defeito, SLOW_QUERY_LOG), a partir do
+            qual são encontrados os ficheiros de cada processo.
+
+    Yields:
+        dict: Registo (ver SlowQueryLog.record), sem ordem entre ficheiros.
+    """
+    path = Path(path or SLOW_QUERY_LOG)
+    for file in log_files(path):
+        try:
+            with open(file, encoding='utf-8') as lines:
+                for line in lines:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Linha incompleta (gravação interrompida)
+        except FileNotFoundError:
+            continue
+
+
+def summarise_slow_queries(limit=20, path=None):
+    """
+    Agrupa as queries lentas por instrução normalizada, por tempo total decrescente.
+
+    Args:
+        limit (int): Número máximo de instruções devolvidas.
+        path (Path | None): Ficheiro de registo (por defeito, SLOW_QUERY_LOG).
+
+    Returns:
+        list[dict]: {"statement", "fingerprint", "count", "total_ms", "mean_ms", "max_ms",
+        "origins": {origem ('-' se desconhecida): execuções}, "plan", "last_seen"} de cada instrução.
+    """
+    groups = {}
+    for entry in read_slow_queries(path):
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'statement': entry['statement'], 'fingerprint': entry['fingerprint'],
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'origins': Counter(),
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['origins'][entry.get('origin') or '-'] += 1
+        group['plan'] = entry.get('plan') or group.get('plan')
+        # Os ficheiros dos vários processos não estão ordenados entre si
+        group['last_seen'] = max(group.get('last_seen', entry['time']), entry['time'])
+
+    top = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+    for group in top:
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['origins'] = dict(group['origins'].most_common())
+    return top
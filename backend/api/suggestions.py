@@ -0,0 +1,282 @@
+"""
+suggestions.py
+
+Horários livres mais próximos de um pedido de reserva recusado por falta de mesa.
+
+Para cada data é construído um mapa de bits com um bit por intervalo de SLOT_MINUTES
+minutos (o mesmo formato do calendário de api/slots.py): o bit i indica se uma reserva
+para o grupo pode começar às 00:00 + i * SLOT_MINUTES, ou seja, se o local está aberto
+e se pelo menos uma das mesas candidatas (api/allocation.py::candidate_tables), ou um
+dos conjuntos de mesas juntáveis (api/allocation.py::table_groups), não tem reservas
+que se sobreponham. O mapa resulta de uma operação de bits por mesa sobre os
+horários ocupados de cada mesa (get_occupancy, em cache por data, acrescida das mesas
+guardadas por holds, ver api/holds.py), sem repetir a alocação para cada horário.
+
+Os horários mais próximos de uma hora pedida são os bits mais próximos do bit dessa
+hora, encontrados com operações sobre o inteiro. A pesquisa está limitada a
+SUGGESTION_SEARCH_DAYS datas, pelo que o custo não depende da ocupação dos dias.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .allocation import MAX_JOINED_TABLES, candidate_tables, table_groups
+from .holds import with_holds
+from .locations import get_location
+from .models import Booking, Mesa
+from .recurrence import extend_recurrences, with_recurrences
+from .slots import SLOT, SLOTS_PER_DAY, get_calendar, occupied_slots
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Número de horários sugeridos antes e depois da hora pedida e em cada uma das datas seguintes
+SUGGESTION_LIMIT = getattr(settings, 'SUGGESTION_LIMIT', 3)
+
+# Número de datas seguintes (com horários livres) incluídas nas sugestões
+SUGGESTION_NEXT_DAYS = getattr(settings, 'SUGGESTION_NEXT_DAYS', 2)
+
+# Número máximo de datas analisadas (a data pedida e as seguintes)
+SUGGESTION_SEARCH_DAYS = getattr(settings, 'SUGGESTION_SEARCH_DAYS', 7)
+
+# Tempo de vida (segundos) da ocupação das mesas de cada data na cache
+OCCUPANCY_CACHE_TIMEOUT = 60 * 60
+
+# Chave de cache da ocupação das mesas de uma data (com a impressão digital das reservas)
+OCCUPANCY_KEY = 'occupancy_%(location)s_%(date)s_%(count)s_%(seq)s'
+
+# Intervalos de uma data (sem as 00:00 do dia seguinte, que pertencem à data seguinte)
+DAY_SLOTS = (1 << SLOTS_PER_DAY) - 1
+
+# ================================================================================================
+# OCUPAÇÃO DAS MESAS
+# ================================================================================================
+
+def get_occupancy(days):
+    """
+    Devolve, para cada data, os horários em que cada mesa está ocupada.
+
+    O mapa de cada data (mesa -> occupied_slots das suas reservas) é guardado na cache com
+    uma impressão digital das reservas da data (número de reservas e maior 'seq'): qualquer
+    criação, alteração ou remoção muda a impressão digital, pelo que não é necessário
+    invalidar a cache. As impressões digitais de todas as datas são lidas com uma query
+    agregada; as reservas são lidas (uma query) apenas para as datas sem mapa em cache.
+
+    Args:
+        days (Sequence[date]): Datas.
+
+    Returns:
+        dict[date, dict[int, int]]: Mapa de bits das mesas com reservas em cada data.
+    """
+    location = get_location()
+    fingerprints = {
+        day: (count, seq)
+        for day, count, seq in Booking.objects.filter(date__in=days)
+        .values('date').annotate(count=Count('id'), seq=Max('seq')).values_list('date', 'count', 'seq')
+    }
+
+    def cache_key(day, fingerprint):
+        return OCCUPANCY_KEY % {'location': location, 'date': day.isoformat(), 'count': fingerprint[0], 'seq': fingerprint[1]}
+
+    keys = {day: cache_key(day, fingerprint) for day, fingerprint in fingerprints.items()}
+    cached = cache.get_many(keys.values())
+    occupancy = {day: cached.get(keys[day], {}) if day in keys else {} for day in days}
+
+    missing = [day for day in keys if keys[day] not in cached]
+    if missing:
+        intervals = defaultdict(lambda: defaultdict(list))
+        seqs = defaultdict(list)
+        for mesa_id, day, start, end, seq in Booking.objects.filter(date__in=missing).values_list(
+            'mesa_id', 'date', 'start_time', 'end_time', 'seq'
+        ):
+            intervals[day][mesa_id].append((datetime.combine(day, start), datetime.combine(day, end)))
+            seqs[day].append(seq)
+
+        computed = {}
+        for day in missing:
+            occupancy[day] = {mesa_id: occupied_slots(day, booked) for mesa_id, booked in intervals[day].items()}
+            # Impressão digital das reservas efetivamente lidas (podem ter mudado desde a primeira query)
+            if seqs[day]:
+                computed[cache_key(day, (len(seqs[day]), max(seqs[day])))] = occupancy[day]
+        cache.set_many(computed, OCCUPANCY_CACHE_TIMEOUT)
+
+    return occupancy
+
+# ================================================================================================
+# MESAS JUNTÁVEIS
+# ================================================================================================
+
+def get_adjacency():
+    """
+    Mesas adjacentes de cada mesa do local atual (uma query).
+
+    Returns:
+        dict[int, set[int]]: Mesas adjacentes de cada mesa.
+    """
+    adjacency = defaultdict(set)
+    for from_id, to_id in Mesa.adjacent.through.objects.values_list('from_mesa_id', 'to_mesa_id'):
+        adjacency[from_id].add(to_id)
+    return adjacency
+
+
+def joinable_groups(guests, mesas):
+    """
+    Conjuntos de mesas juntáveis que podem receber um grupo (ver api/allocation.py::table_groups).
+
+    A adjacência só é lida se existirem pelo menos duas mesas juntáveis.
+
+    Args:
+        guests (int): Número de convidados.
+        mesas (Iterable[tuple[int, int, bool]]): Mesas (id, lugares, juntável).
+
+    Returns:
+        list[tuple[int, ...]]: Conjuntos de mesas, do menor para o maior.
+    """
+    joinable = [(mesa_id, lugares) for mesa_id, lugares, is_joinable in mesas if is_joinable]
+    if len(joinable) < 2:
+        return []
+    return table_groups(guests, joinable, get_adjacency(), MAX_JOINED_TABLES)
+
+# ================================================================================================
+# HORÁRIOS LIVRES
+# ================================================================================================
+
+def free_slots(bits, tables, occupancy, groups=()):
+    """
+    Horários de uma data em que uma reserva tem pelo menos uma mesa (ou conjunto de mesas) livre.
+
+    Args:
+        bits (int): Calendário da data (api/slots.py::get_calendar).
+        tables (Iterable[int]): Identificadores das mesas candidatas.
+        occupancy (Mapping[int, int]): Horários ocupados de cada mesa na data (ver get_occupancy).
+        groups (Iterable[Iterable[int]]): Conjuntos de mesas juntáveis (ver joinable_groups).
+
+    Returns:
+        int: Mapa de bits (bit i: há mesa livre para uma reserva às 00:00 + i * SLOT_MINUTES).
+    """
+    bits &= DAY_SLOTS
+    free = 0
+    for table_id in tables:
+        free |= bits & ~occupancy.get(table_id, 0)
+        if free == bits:
+            return free  # Todos os horários abertos já têm mesa livre
+
+    # Horários em que todas as mesas de um conjunto estão livres
+    for group in groups:
+        available = bits
+        for table_id in group:
+            available &= ~occupancy.get(table_id, 0)
+        free |= available
+        if free == bits:
+            break
+    return free
+
+
+def nearest_slots(free, slot, limit):
+    """
+    Intervalos livres mais próximos de um intervalo.
+
+    Args:
+        free (int): Mapa de horários livres (ver free_slots).
+        slot (int): Intervalo de referência (não incluído no resultado).
+        limit (int): Número máximo de intervalos em cada sentido.
+
+    Returns:
+        tuple[list[int], list[int]]: Intervalos anteriores (do mais próximo para o mais
+        afastado) e posteriores (idem).
+    """
+    earlier = []
+    below = free & ((1 << slot) - 1)
+    while below and len(earlier) < limit:
+        index = below.bit_length() - 1
+        earlier.append(index)
+        below ^= 1 << index
+
+    later = []
+    above = free >> (slot + 1) << (slot + 1)
+    while above and len(later) < limit:
+        lowest = above & -above
+        later.append(lowest.bit_length() - 1)
+        above ^= lowest
+
+    return earlier, later
+
+# ================================================================================================
+# SUGESTÕES
+# ================================================================================================
+
+def suggest_slots(moment, guests, now=None):
+    """
+    Sugere os horários livres mais próximos para um grupo no local atual.
+
+    Args:
+        moment (datetime): Início pedido (hora local).
+        guests (int): Número de convidados.
+        now (datetime | None): Instante atual (horários anteriores não são sugeridos).
+
+    Returns:
+        dict: {
+            "earlier": list[datetime] - Horários livres antes da hora pedida, na mesma data,
+            "later": list[datetime] - Horários livres depois da hora pedida, na mesma data,
+            "next_days": list[tuple[date, list[datetime]]] - Horários mais próximos da hora
+                pedida nas datas seguintes com mesa livre
+        }
+    """
+    now = now or datetime.now()
+    day = moment.date()
+    suggestions = {"earlier": [], "later": [], "next_days": []}
+
+    mesas = list(Mesa.objects.values_list("id", "lugares", "joinable"))
+    tables = [table_id for table_id, _ in candidate_tables(guests, [(mesa_id, lugares) for mesa_id, lugares, _ in mesas])]
+    groups = joinable_groups(guests, mesas)
+    if not tables and not groups:
+        return suggestions
+    mesa_ids = [mesa_id for mesa_id, _, _ in mesas]
+
+    # Ocupação das mesas em todas as datas analisadas (incluindo as reservas recorrentes)
+    extend_recurrences()
+    occupancy = with_recurrences(get_occupancy([day + timedelta(days=offset) for offset in range(SUGGESTION_SEARCH_DAYS)]))
+
+    # Intervalo da hora pedida (arredondado para baixo) e primeiro intervalo ainda não passado
+    midnight = datetime.combine(day, time.min)
+    slot = (moment - midnight) // SLOT
+    first_slot = -((midnight - now) // SLOT)
+
+    for offset in range(SUGGESTION_SEARCH_DAYS):
+        if len(suggestions["next_days"]) >= SUGGESTION_NEXT_DAYS:
+            break
+        current = day + timedelta(days=offset)
+        bits = get_calendar(current)
+        if not bits:
+            continue  # Encerrado
+
+        free = free_slots(bits, tables, with_holds(current, occupancy[current], mesa_ids), groups)
+        start = first_slot - offset * SLOTS_PER_DAY
+        if start > 0:
+            free &= ~((1 << start) - 1)
+        if not free:
+            continue
+
+        base = midnight + timedelta(days=offset)
+        if offset == 0:
+            earlier, later = nearest_slots(free, slot, SUGGESTION_LIMIT)
+            # A própria hora pedida, se estiver livre no início do intervalo (ex.: pedido às 20:05, livre às 20:00)
+            if free >> slot & 1 and moment != midnight + slot * SLOT:
+                earlier.insert(0, slot)
+                earlier = earlier[:SUGGESTION_LIMIT]
+            suggestions["earlier"] = [base + index * SLOT for index in reversed(earlier)]
+            suggestions["later"] = [base + index * SLOT for index in later]
+        else:
+            # Nas datas seguintes: os horários mais próximos da mesma hora, por ordem cronológica
+            earlier, later = nearest_slots(free, slot, SUGGESTION_LIMIT)
+            if free >> slot & 1:
+                earlier.insert(0, slot)
+            closest = sorted(earlier + later, key=lambda index: (abs(index - slot), index))[:SUGGESTION_LIMIT]
+            suggestions["next_days"].append((current, [base + index * SLOT for index in sorted(closest)]))
+
+    return suggestions
@@ -0,0 +1,133 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.locations import location_database, use_location
+from api.models import Booking, Mesa
+from api.pagination import LargeTablePaginator
+
+
+class AdminChangelistQueryCountTests(TestCase):
+    """
+    Garante que as listagens do painel administrativo executam um número fixo de
+    queries por página, independentemente do número de reservas na tabela.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.mesas = [Mesa.objects.create(lugares=4) for _ in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def seed_bookings(self, count):
+        Booking.objects.bulk_create([
+            Booking(
+                mesa=self.mesas[i % len(self.mesas)],
+                name='Cliente',
+                phone='912345678',
+                date=date(2030, 1, 1) + timedelta(days=i % 20),
+                start_time=time(12, 0),
+                end_time=time(13, 15),
+                number_of_guests=2,
+            )
+            for i in range(count)
+        ])
+
+    def changelist_query_counts(self, url, pages):
+        counts = []
+        for page in range(1, pages + 1):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'p': page})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        return counts
+
+    def test_booking_changelist_query_count_is_constant(self):
+        self.seed_bookings(250)
+        small = self.changelist_query_counts('/admin/api/booking/', pages=3)
+
+        self.seed_bookings(1000)
+        large = self.changelist_query_counts('/admin/api/booking/', pages=3)
+
+        # sessão, utilizador, filtro de mesas, contagem, linhas, date_hierarchy (2) e gravação da sessão (3)
+        self.assertEqual(small, [10, 10, 10])
+        self.assertEqual(large, small)
+
+    def test_booking_changelist_does_not_query_mesa_per_row(self):
+        self.seed_bookings(300)
+
+        with self.assertNumQueries(10):
+            self.client.get('/admin/api/booking/')
+
+    def test_mesa_changelist_query_count(self):
+        with self.assertNumQueries(7):
+            self.client.get('/admin/api/mesa/')
+
+
+    @mock.patch('api.pagination.ESTIMATED_COUNT_THRESHOLD', 20)
+    def test_filtered_changelist_pages_past_the_estimate(self):
+        self.seed_bookings(55)
+        queryset = Booking.objects.filter(number_of_guests=2).order_by('-pk')
+        paginator = LargeTablePaginator(queryset, 10)
+
+        # Com filtros, o total exato só é conhecido até ao limite: uma página para além dele
+        self.assertEqual(paginator.count, 31)
+        self.assertEqual(paginator.num_pages, 4)
+
+        # Cada página completa dá acesso à seguinte
+        pages = [paginator.page(number) for number in range(1, 7)]
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 10, 5])
+        self.assertTrue(pages[4].has_next())
+        self.assertFalse(pages[5].has_next())
+        self.assertEqual(paginator.count, 55)
+        self.assertEqual(len({booking.pk for page in pages for booking in page}), 55)
+
+        with self.assertRaises(EmptyPage):
+            paginator.page(7)
+
+
+class ChangelistLocationTests(TestCase):
+    """
+    Garante que as fronteiras de página guardadas na cache de um local não são usadas na
+    mesma listagem de outro local.
+    """
+
+    databases = {'default', location_database(settings.TEST_LOCATION)}
+
+    def seed_bookings(self, count):
+        mesa = Mesa.objects.create(lugares=4)
+        Booking.objects.bulk_create([
+            Booking(
+                mesa=mesa, name='Cliente', phone='912345678', date=date(2030, 1, 1),
+                start_time=time(12, 0), end_time=time(13, 15), number_of_guests=2,
+            )
+            for _ in range(count)
+        ])
+
+    def page_ids(self, number):
+        paginator = LargeTablePaginator(Booking.objects.order_by('-pk'), 10)
+        return [booking.pk for booking in paginator.page(number)]
+
+    def test_keyset_boundaries_are_kept_per_location(self):
+        cache.clear()
+        self.seed_bookings(40)
+        with use_location(settings.TEST_LOCATION):
+            self.seed_bookings(25)
+
+        # Página 1 do local principal: guarda a fronteira da página
+        self.assertEqual(len(self.page_ids(1)), 10)
+
+        with use_location(settings.TEST_LOCATION):
+            ids = list(Booking.objects.order_by('-pk').values_list('pk', flat=True))
+            self.assertEqual(self.page_ids(2), ids[10:20])
+            self.assertEqual(self.page_ids(3), ids[20:])
@@ -0,0 +1,113 @@
+import threading
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+
+from api import views
+from api.models import Booking, Mesa
+
+
+class BatchEndpointTests(TestCase):
+    """
+    Garante que /api/batch/ executa os sub-pedidos com as permissões de cada endpoint,
+    pela ordem indicada, e que conta como um único acesso ponderado ao rate limiting.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.mesa = Mesa.objects.create(lugares=4)
+
+    def batch(self, *requests):
+        return self.client.post('/api/batch/', {'requests': list(requests)}, content_type='application/json')
+
+    def test_subrequests_share_session_and_keep_permissions(self):
+        response = self.batch(
+            {'id': 'mesas', 'path': '/api/mesas/list/?fields=id_mesa'},
+            {'id': 'status', 'path': '/api/admin/status/'},
+        )
+        self.assertEqual(response.status_code, 200)
+        mesas, session = response.json()['responses']
+        self.assertEqual((mesas['id'], mesas['status'], mesas['body']), ('mesas', 200, [{'id_mesa': self.mesa.pk}]))
+        self.assertEqual(session['status'], 403)
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        session = self.batch({'path': '/api/admin/status/'}).json()['responses'][0]
+        self.assertEqual((session['status'], session['body']['username']), (200, 'admin'))
+
+    def test_writes_are_applied_in_order(self):
+        responses = self.batch(
+            {'path': '/api/bookings/list/'},
+            {'method': 'POST', 'path': '/api/bookings/create/', 'body': {
+                'name': 'Cliente', 'phone': '912345678', 'date': '2030-01-08',
+                'time': '20:00', 'number_of_guests': '2',
+            }},
+            {'path': '/api/bookings/list/'},
+        ).json()['responses']
+        self.assertEqual([r['status'] for r in responses], [200, 201, 200])
+        self.assertEqual((len(responses[0]['body']), len(responses[2]['body'])), (0, 1))
+
+    def test_charged_as_one_weighted_hit(self):
+        # public_read: 60 pedidos por minuto, 10 por pedido agregado
+        for _ in range(6):
+            self.assertEqual(self.batch(*[{'path': '/api/mesas/list/'}] * 10).status_code, 200)
+        response = self.batch({'path': '/api/mesas/list/'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_rejects_invalid_and_unsupported_routes(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch({'path': '/api/inexistente/'}).status_code, 400)
+        self.assertEqual(self.batch({'path': '/api/stream/'}).status_code, 400)
+        self.assertEqual(self.batch({'method': 'POST', 'path': '/api/admin/login/'}).status_code, 400)
+        self.assertEqual(self.batch(*[{'path': '/api/mesas/list/'}] * 11).status_code, 400)
+
+    def test_unexpected_errors_are_reported_per_subrequest(self):
+        with mock.patch('api.views._project', side_effect=RuntimeError('falha')), self.assertLogs('django.request', 'ERROR'):
+            response = self.batch({'path': '/api/mesas/list/'}, {'path': '/api/admin/status/'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.json()['responses']], [500, 403])
+
+
+class BatchParallelReadTests(TransactionTestCase):
+    """
+    Garante que os sub-pedidos GET executados em paralelo não escrevem na base de dados:
+    as reservas expiradas são removidas uma única vez, pelo pedido agregado.
+
+    Usa TransactionTestCase: dentro da transação de um TestCase, os sub-pedidos são
+    executados um a um (ver api/batch.py::execute).
+    """
+
+    def test_expired_bookings_are_removed_once(self):
+        cache.clear()
+        mesa = Mesa.objects.create(lugares=4, existe_reserva=True)
+        Booking.objects.create(
+            mesa=mesa, name='Cliente', phone='912345678', date=date.today() - timedelta(days=60),
+            start_time=time(20, 0), end_time=time(21, 15), number_of_guests=2,
+        )
+
+        calls, sweeps = [], []
+        original = views.update_expired_objects
+
+        def sweep():
+            calls.append(threading.current_thread().name)
+            if not views._expired_objects_updated.get():
+                sweeps.append(threading.current_thread().name)
+            original()
+
+        with mock.patch('api.views.update_expired_objects', side_effect=sweep) as update:
+            response = self.client.post('/api/batch/', {'requests': [
+                {'path': '/api/mesas/list/'}, {'path': '/api/bookings/list/'}, {'path': '/api/mesas/list/'},
+            ]}, content_type='application/json')
+
+        self.assertEqual([r['status'] for r in response.json()['responses']], [200, 200, 200])
+        # Os sub-pedidos correm nas threads do executor, onde a limpeza não é repetida
+        self.assertEqual(update.call_count, 4)
+        self.assertTrue(all(name.startswith('batch') for name in calls[1:]))
+        self.assertEqual(sweeps, [threading.current_thread().name])
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Mesa.objects.get().existe_reserva)
@@ -0,0 +1,72 @@
+import uuid
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import Booking, Mesa, Tombstone
+
+
+class BulkBookingTests(TestCase):
+    """
+    Garante que o cancelamento e a mudança de mesa em massa atuam sobre todas as reservas
+    selecionadas (incluindo as restantes mesas de um grupo de mesas juntas) e que a mudança
+    é recusada, sem alterações, sem capacidade ou com conflitos de horário.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.mesas = [Mesa.objects.create(lugares=lugares, existe_reserva=True) for lugares in (4, 4, 2, 6)]
+        self.day = date(2030, 1, 8)
+
+    def book(self, mesa, start, guests=2, day=None, party=None):
+        return Booking.objects.create(
+            mesa=mesa, name='Cliente', phone='912345678', date=day or self.day, start_time=start,
+            end_time=time(start.hour + 1, start.minute + 15), number_of_guests=guests, party=party,
+        )
+
+    def post(self, path, data):
+        return self.client.post(f'/api/bookings/bulk/{path}/', data, content_type='application/json')
+
+    def test_cancel_expands_parties_and_frees_tables(self):
+        party = uuid.uuid4()
+        joined = [self.book(self.mesas[0], time(20, 0), guests=8, party=party), self.book(self.mesas[1], time(20, 0), guests=8, party=party)]
+        other_day = self.book(self.mesas[2], time(12, 0), day=date(2030, 1, 9))
+
+        # Apenas uma das mesas do grupo é selecionada
+        response = self.post('cancel', {'ids': [joined[0].id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cancelled'], 2)
+
+        self.assertEqual(list(Booking.objects.values_list('id', flat=True)), [other_day.id])
+        self.assertEqual(
+            set(Tombstone.objects.filter(model=Tombstone.BOOKING).values_list('object_id', flat=True)),
+            {booking.id for booking in joined},
+        )
+        self.assertFalse(Mesa.objects.filter(pk__in=[self.mesas[0].pk, self.mesas[1].pk], existe_reserva=True).exists())
+
+        # Critérios combinados: data e mesa
+        self.assertEqual(self.post('cancel', {'date_from': '2030-01-09', 'mesa': self.mesas[3].id}).json()['cancelled'], 0)
+        self.assertEqual(self.post('cancel', {}).status_code, 400)
+
+    def test_move_checks_capacity_and_conflicts(self):
+        lunch = self.book(self.mesas[0], time(12, 0), guests=4)
+        dinner = self.book(self.mesas[0], time(20, 0), guests=2)
+        self.book(self.mesas[3], time(20, 30))
+
+        # Sem lugares para a reserva de 4 pessoas
+        response = self.post('move', {'ids': [lunch.id, dinner.id], 'to_mesa': self.mesas[2].id})
+        self.assertEqual(response.status_code, 400)
+        # O jantar sobrepõe-se a uma reserva da mesa de destino
+        response = self.post('move', {'ids': [lunch.id, dinner.id], 'to_mesa': self.mesas[3].id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(Booking.objects.filter(pk__in=[lunch.id, dinner.id]).values_list('mesa_id', flat=True)), {self.mesas[0].id})
+
+        response = self.post('move', {'mesa': self.mesas[0].id, 'date_from': '2030-01-08', 'date_to': '2030-01-08', 'to_mesa': self.mesas[1].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['moved'], 2)
+        self.assertFalse(Booking.objects.filter(mesa=self.mesas[0]).exists())
+        self.assertFalse(Mesa.objects.get(pk=self.mesas[0].pk).existe_reserva)
+        self.assertEqual(self.post('move', {'ids': [lunch.id], 'to_mesa': 999}).status_code, 404)
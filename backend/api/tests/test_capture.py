@@ -0,0 +1,81 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, modify_settings
+
+from api.capture import CaptureLog, pseudonym, read_capture, sanitise
+from api.models import Booking, Mesa
+from api.replay import Replayer
+
+
+class TrafficCaptureTests(TestCase):
+    """
+    Garante que o registo de tráfego não guarda dados pessoais, sobrevive a um bloco
+    incompleto e que os pedidos registados se reproduzem, com as datas deslocadas, com o
+    mesmo código de estado e a mesma impressão digital da resposta.
+    """
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_personal_fields_are_pseudonymised(self):
+        body = sanitise({'name': 'Maria Silva', 'phone': '912 345 678', 'password': 'segredo', 'date': '2030-01-08'})
+
+        self.assertNotIn('password', body)
+        self.assertEqual(body['date'], '2030-01-08')
+        self.assertNotIn('Maria', body['name'])
+        self.assertRegex(body['phone'], r'^9\d{8}$')
+        # Determinístico: o mesmo cliente tem sempre o mesmo pseudónimo
+        self.assertEqual(body['name'], pseudonym('name', 'Maria Silva'))
+
+        # Pesquisas do painel (nome ou telefone do cliente)
+        query = sanitise({'q': 'Maria Silva', 'page': '2'})
+        self.assertNotIn('Maria', query['q'])
+        self.assertEqual(query['page'], '2')
+        self.assertNotIn('912', sanitise({'q': '912345678'})['q'])
+
+    def test_truncated_block_keeps_previous_records(self):
+        log = CaptureLog(self.directory)
+        log.append({'t': 2.0, 'r': 'mesa_list'})
+        log.flush()
+        log.append({'t': 1.0, 'r': 'availability'})
+        log.flush()
+        with open(log.path, 'ab') as file:
+            file.write(b'\x28\xb5\x2f\xfd\x00')  # Início de um frame zstd interrompido
+
+        self.assertEqual([record['r'] for record in read_capture([self.directory])], ['availability', 'mesa_list'])
+
+    def test_replay_matches_capture(self):
+        Mesa.objects.create(lugares=2)
+        logs = []
+
+        def capture_log():
+            logs.append(CaptureLog(self.directory))
+            return logs[-1]
+
+        with modify_settings(MIDDLEWARE={'append': 'api.middleware.CaptureMiddleware'}), \
+                mock.patch('api.middleware.CaptureLog', capture_log):
+            self.client.post('/api/bookings/create/', {
+                'name': 'Maria Silva', 'phone': '912345678', 'date': '2030-01-08',
+                'time': '20:00', 'number_of_guests': '2',
+            }, content_type='application/json')
+            self.client.get('/api/availability/', {'date': '2030-01-08', 'guests': '2'})
+        logs[0].flush()
+
+        self.assertNotIn(b'Maria', logs[0].path.read_bytes())
+        records = read_capture([self.directory])
+        self.assertEqual([(record['r'], record['s']) for record in records], [('booking_create', 201), ('availability', 200)])
+
+        # Reprodução uma semana depois, sobre a base de dados antes do registo
+        Booking.objects.all().delete()
+        cache.clear()
+        replayer = Replayer(speed=0, shift_days=7)
+        for record in records:
+            result = replayer.replay(record)
+            self.assertEqual((result['status'], result['digest']), (record['s'], record['x']))
+        self.assertEqual(Booking.objects.get().date.isoformat(), '2030-01-15')
@@ -0,0 +1,112 @@
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from api.bulk import recompute_mesa_occupancy
+from api.changes import collect_changes, prune_tombstones
+from api.models import Booking, ChangeSequence, Mesa, Tombstone
+
+
+class ChangeFeedTests(TestCase):
+    """
+    Garante que /api/changes/?since= devolve apenas o que mudou desde o último número de
+    sequência (incluindo as remoções, através dos tombstones), que as páginas terminam num
+    número de sequência completo e que clientes anteriores aos tombstones apagados
+    recebem 410.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.mesas = [Mesa.objects.create(lugares=lugares) for lugares in (2, 4)]
+        self.booking = Booking.objects.create(
+            mesa=self.mesas[1], name='Maria Silva', phone='912345678', date=date(2030, 1, 8),
+            start_time=time(20, 0), end_time=time(21, 15), number_of_guests=2,
+        )
+
+    def changes(self, since):
+        return self.client.get('/api/changes/', {'since': since})
+
+    def test_incremental_sync_returns_updates_and_deletions(self):
+        full = self.changes(0).json()
+        self.assertEqual({mesa['id_mesa'] for mesa in full['mesas']}, {mesa.id for mesa in self.mesas})
+        self.assertEqual([booking['name'] for booking in full['bookings']], ['Maria Silva'])
+        self.assertFalse(full['more'])
+
+        # Nada mudou: resposta vazia com o mesmo número de sequência
+        self.assertEqual(self.changes(full['since']).json(), {
+            'since': full['since'], 'more': False, 'bookings': [], 'mesas': [],
+            'deleted': {'bookings': [], 'mesas': []},
+        })
+
+        self.booking.notes = 'Janela'
+        self.booking.save()
+        response = self.client.delete(f'/api/mesas/delete/{self.mesas[0].id}/')
+        self.assertEqual(response.status_code, 204)
+
+        changes = self.changes(full['since']).json()
+        self.assertGreater(changes['since'], full['since'])
+        self.assertEqual([booking['notes'] for booking in changes['bookings']], ['Janela'])
+        self.assertEqual(changes['mesas'], [])
+        self.assertEqual(changes['deleted'], {'bookings': [], 'mesas': [self.mesas[0].id]})
+
+        # Cancelamento: a reserva passa a constar das remoções
+        self.client.post('/api/bookings/bulk/cancel/', {'ids': [self.booking.id]}, content_type='application/json')
+        changes = self.changes(changes['since']).json()
+        self.assertEqual(changes['bookings'], [])
+        self.assertEqual(changes['deleted']['bookings'], [self.booking.id])
+
+        self.assertEqual(self.changes(-1).status_code, 400)
+        self.assertEqual(self.changes('ontem').status_code, 400)
+
+    def test_pages_end_on_a_complete_sequence_number(self):
+        for lugares in (6, 8, 2):
+            Mesa.objects.create(lugares=lugares)
+
+        since, seen = 0, []
+        while True:
+            page = collect_changes(since, ['id'], ['id'], limit=2)
+            self.assertLessEqual(len(page['mesas']), 2)
+            seen += [row[0] for row in page['mesas']]
+            since = page['until']
+            if not page['more']:
+                break
+
+        self.assertEqual(sorted(seen), sorted(Mesa.objects.values_list('id', flat=True)))
+
+    def test_clients_older_than_the_pruned_tombstones_must_resync(self):
+        since = self.changes(0).json()['since']
+        self.client.post('/api/bookings/bulk/cancel/', {'ids': [self.booking.id]}, content_type='application/json')
+        Tombstone.objects.update(created_at=timezone.now() - timedelta(days=60))
+        Mesa.objects.create(lugares=6)
+
+        self.assertEqual(prune_tombstones(), 1)
+        self.assertFalse(Tombstone.objects.exists())
+
+        self.assertEqual(self.changes(since).status_code, 410)
+        full = self.changes(0)
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.json()['bookings'], [])
+        self.assertEqual(len(full.json()['mesas']), 3)
+
+    def test_occupancy_recompute_only_sequences_changed_mesas(self):
+        def current():
+            return ChangeSequence.objects.get().value
+
+        # A reserva foi gravada diretamente: só a mesa 2 muda de estado
+        before = current()
+        self.assertEqual(recompute_mesa_occupancy(), 1)
+        self.assertEqual(current(), before + 1)
+        self.assertEqual(Mesa.objects.get(pk=self.mesas[1].pk).seq, current())
+        self.assertLess(Mesa.objects.get(pk=self.mesas[0].pk).seq, before + 1)
+
+        # Sem alterações: nenhuma escrita e nenhum número de sequência consumido
+        with self.assertNumQueries(1):
+            self.assertEqual(recompute_mesa_occupancy(), 0)
+        self.assertEqual(current(), before + 1)
+
+        changes = self.changes(before).json()
+        self.assertEqual([(mesa['id_mesa'], mesa['existe_reserva']) for mesa in changes['mesas']], [(self.mesas[1].id, True)])
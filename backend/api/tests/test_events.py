@@ -0,0 +1,123 @@
+import asyncio
+import json
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.events import EVENTS_QUEUE_SIZE, RESYNC, Broker, broker
+from api.models import Mesa
+
+
+class EventBrokerTests(TestCase):
+    """
+    Garante que os eventos chegam às ligações SSE do processo e dos restantes workers,
+    que uma ligação lenta recebe um pedido de ressincronização em vez de acumular eventos
+    e que os eventos publicados pelos endpoints não incluem dados pessoais. O endpoint só
+    abre ligações no servidor ASGI.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_events_reach_subscribers_until_they_leave(self):
+        async def scenario():
+            broker = Broker()
+            first, second = broker.subscribe(), broker.subscribe()
+            self.assertEqual(broker.subscriber_count, 2)
+
+            broker.publish(b'{"type":"mesa.created"}')
+            await asyncio.sleep(0)
+            self.assertEqual(first.get_nowait(), b'{"type":"mesa.created"}')
+            self.assertEqual(second.get_nowait(), b'{"type":"mesa.created"}')
+
+            broker.unsubscribe(first)
+            broker.publish(b'{"type":"mesa.deleted"}')
+            await asyncio.sleep(0)
+            self.assertTrue(first.empty())
+            self.assertEqual(second.get_nowait(), b'{"type":"mesa.deleted"}')
+
+            # Ligação lenta: os eventos pendentes são trocados por um pedido de ressincronização
+            for n in range(EVENTS_QUEUE_SIZE + 1):
+                broker.publish(b'{"n":%d}' % n)
+            await asyncio.sleep(0)
+            self.assertEqual(second.qsize(), 1)
+            self.assertEqual(second.get_nowait(), RESYNC)
+
+            broker.unsubscribe(second)
+            self.assertEqual(broker.subscriber_count, 0)
+
+        asyncio.run(scenario())
+
+    def test_events_are_shared_between_workers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        async def scenario():
+            # Dois workers com a mesma diretoria de sockets
+            worker, other = Broker(directory.name), Broker(directory.name)
+            queue = other.subscribe()
+            try:
+                worker.publish(b'{"type":"booking.created"}')
+                self.assertEqual(await asyncio.wait_for(queue.get(), 1), b'{"type":"booking.created"}')
+            finally:
+                other.unsubscribe(queue)
+                asyncio.get_running_loop().remove_reader(other._socket.fileno())
+                other._close()
+
+        asyncio.run(scenario())
+
+    def test_booking_events_are_published_after_commit_without_personal_data(self):
+        Mesa.objects.create(lugares=2)
+
+        with mock.patch('api.events.broker.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                response = self.client.post('/api/bookings/create/', {
+                    'name': 'Maria Silva', 'phone': '912345678', 'date': '2030-01-08',
+                    'time': '20:00', 'number_of_guests': '2', 'notes': 'Aniversário',
+                }, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+            publish.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+
+        events = [json.loads(call.args[0]) for call in publish.call_args_list]
+        created = next(event for event in events if event['type'] == 'booking.created')
+        self.assertEqual(created['date'], '2030-01-08')
+        self.assertEqual(created['start_time'], '20:00:00')
+        self.assertFalse({'name', 'phone', 'notes'} & set(created))
+        self.assertNotIn(b'Maria', b''.join(call.args[0] for call in publish.call_args_list))
+
+    def test_stream_is_refused_under_wsgi(self):
+        # Sem a verificação, o pedido ficaria preso na thread do worker: executado noutra thread, com limite
+        responses = []
+        request = threading.Thread(target=lambda: responses.append(self.client.get('/api/stream/')), daemon=True)
+        request.start()
+        request.join(5)
+
+        self.assertFalse(request.is_alive(), "/api/stream/ bloqueou a thread do servidor WSGI")
+        self.assertEqual(responses[0].status_code, 501)
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_stream_is_served_under_asgi(self):
+        response = await self.async_client.get('/api/stream/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        self.assertEqual(broker.subscriber_count, 1)
+
+        broker.publish(b'{"type":"mesa.created"}')
+        self.assertEqual(await anext(chunks), b'data: {"type":"mesa.created"}\n\n')
+
+        # Cliente desligado: o servidor ASGI cancela a tarefa que aguarda o evento seguinte
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(broker.subscriber_count, 0)
@@ -0,0 +1,51 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Booking, Mesa
+
+
+class FieldProjectionTests(TestCase):
+    """
+    Garante que '?fields=' devolve apenas os campos pedidos, lendo só as colunas
+    correspondentes, e que os clientes públicos não podem pedir dados pessoais.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.mesa = Mesa.objects.create(lugares=4, existe_reserva=True)
+        Booking.objects.create(
+            mesa=self.mesa, name='Maria Silva', phone='912345678', date=date(2030, 1, 8),
+            start_time=time(20, 0), end_time=time(21, 15), number_of_guests=2, notes='Janela',
+        )
+
+    def test_admin_projection_reads_only_requested_columns(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/list/', {'fields': 'mesa, date,mesa'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'mesa': self.mesa.id, 'date': '2030-01-08'}])
+        listing = next(query['sql'] for query in queries if query['sql'].startswith('SELECT "api_booking"."mesa_id"'))
+        self.assertNotIn('"name"', listing)
+        self.assertNotIn('"phone"', listing)
+
+        # Sem o parâmetro: todos os campos
+        self.assertEqual(self.client.get('/api/bookings/list/').json()[0]['name'], 'Maria Silva')
+
+    def test_public_listing_cannot_request_personal_fields(self):
+        self.assertEqual(self.client.get('/api/bookings/list/').json(), [{'mesa': self.mesa.id, 'date': '2030-01-08', 'end_time': '21:15:00'}])
+
+        response = self.client.get('/api/bookings/list/', {'fields': 'mesa,phone'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('phone', response.json()['detail'])
+
+    def test_mesa_projection(self):
+        self.assertEqual(self.client.get('/api/mesas/list/', {'fields': 'lugares'}).json(), [{'lugares': 4}])
+        self.assertEqual(self.client.get('/api/mesas/list/', {'fields': 'lugares,cor'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/mesas/list/', {'fields': ','}).status_code, 400)
@@ -0,0 +1,95 @@
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.holds import HOLD_DAY_KEY, get_hold, place_hold
+from api.locations import get_location
+from core.warmup import check_shared_cache
+from api.models import Booking, Mesa
+
+
+class SlotHoldTests(TestCase):
+    """
+    Garante que um horário guardado (hold) ocupa a mesa para os restantes pedidos, sem
+    escrever na base de dados, e que fica livre para a reserva que apresenta o código.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 1, 8)  # Terça-feira
+        self.mesa = Mesa.objects.create(lugares=2)
+
+    def hold(self):
+        return self.client.post('/api/holds/', {
+            'date': self.day.isoformat(), 'time': '20:00', 'number_of_guests': '2',
+        }, content_type='application/json')
+
+    def create(self, **fields):
+        return self.client.post('/api/bookings/create/', {
+            'name': 'Maria Silva', 'phone': '912345678', 'date': self.day.isoformat(),
+            'time': '20:30', 'number_of_guests': '2', **fields,
+        }, content_type='application/json')
+
+    def test_overlapping_holds_are_exclusive(self):
+        start = datetime.combine(self.day, time(20, 0))
+
+        self.assertIsNotNone(place_hold(start, [self.mesa.id]))
+        self.assertIsNone(place_hold(datetime.combine(self.day, time(21, 0)), [self.mesa.id]))
+        # Começa quando o primeiro termina: não se sobrepõe
+        self.assertIsNotNone(place_hold(datetime.combine(self.day, time(21, 15)), [self.mesa.id]))
+
+    def test_hold_blocks_other_bookings_until_used(self):
+        response = self.hold()
+        self.assertEqual(response.status_code, 201)
+        token = response.json()['hold']
+        self.assertFalse(Booking.objects.exists())
+
+        # Outro cliente: a mesa está guardada
+        self.assertEqual(self.create().status_code, 400)
+        self.assertEqual(self.hold().status_code, 400)
+        slots = self.client.get('/api/availability/', {'date': self.day.isoformat(), 'guests': '2'}).json()['slots']
+        self.assertNotIn('20:30', slots)
+        self.assertIn('18:00', slots)
+
+        # O cliente do hold reserva a mesa e o hold é libertado
+        self.assertEqual(self.create(time='20:00', hold=token).status_code, 201)
+        self.assertIsNone(get_hold(token))
+
+    def test_cancelled_hold_frees_the_table(self):
+        token = self.hold().json()['hold']
+
+        self.assertEqual(self.client.delete(f'/api/holds/{token}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/holds/{token}/').status_code, 404)
+        self.assertEqual(self.create().status_code, 201)
+
+    def test_day_key_is_set_before_the_slots(self):
+        day_key = HOLD_DAY_KEY % {'location': get_location(), 'date': self.day.isoformat()}
+        add = cache.add
+
+        def add_slot(*args, **kwargs):
+            # Um pedido que leia este intervalo tem de encontrar a chave da data
+            self.assertTrue(cache.get(day_key))
+            return add(*args, **kwargs)
+
+        with mock.patch.object(cache, 'add', side_effect=add_slot) as patched:
+            self.assertIsNotNone(place_hold(datetime.combine(self.day, time(20, 0)), [self.mesa.id]))
+        self.assertTrue(patched.called)
+
+
+class SharedCacheTests(SimpleTestCase):
+    """
+    Garante que o servidor recusa arrancar com vários workers e uma cache por processo.
+    """
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_requires_a_single_worker(self):
+        check_shared_cache(1)
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache(3)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}})
+    def test_shared_cache_allows_several_workers(self):
+        check_shared_cache(3)
@@ -0,0 +1,90 @@
+import io
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from api.idempotency import _request_fingerprint, _scoped_key
+from api.models import Booking, IdempotencyKey, Mesa
+
+
+class IdempotencyKeyTests(TestCase):
+    """
+    Garante que as repetições com o mesmo 'Idempotency-Key' devolvem a resposta original
+    sem criar novos registos, e que chaves reutilizadas com outro pedido ou ainda em
+    curso são recusadas. As chaves expiradas são ignoradas pelos pedidos e removidas
+    periodicamente.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.mesa = Mesa.objects.create(lugares=2)
+        self.body = {
+            'name': 'Maria Silva', 'phone': '912345678', 'date': '2030-01-08',
+            'time': '20:30', 'number_of_guests': '2',
+        }
+
+    def create(self, body, key='pedido-1'):
+        return self.client.post('/api/bookings/create/', body, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeated_request_replays_the_first_response(self):
+        first = self.create(self.body)
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        replay = self.create(self.body)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(Booking.objects.count(), 1)
+
+        # Outra chave: novo pedido (a mesa já está ocupada)
+        self.assertEqual(self.create(self.body, key='pedido-2').status_code, 400)
+
+    def test_key_reused_with_another_request_is_rejected(self):
+        self.assertEqual(self.create(self.body).status_code, 201)
+
+        response = self.create({**self.body, 'time': '12:00'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @mock.patch('api.idempotency.IDEMPOTENCY_WAIT_TIMEOUT', 0)
+    def test_request_in_progress_returns_conflict(self):
+        # Primeiro pedido com a mesma chave ainda sem resposta (noutro processo)
+        request = SimpleNamespace(user=AnonymousUser(), method='POST', path='/api/bookings/create/', data=self.body)
+        IdempotencyKey.objects.create(
+            key=_scoped_key(request, 'create_booking', 'pedido-1'),
+            request_hash=_request_fingerprint(request),
+            expires_at='2100-01-01T00:00:00Z',
+        )
+
+        response = self.create(self.body)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_expired_keys_are_ignored_and_pruned_periodically(self):
+        self.assertEqual(self.create(self.body).status_code, 201)
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        Booking.objects.all().delete()
+
+        # A chave expirada não é reposta: o pedido é executado de novo e a chave renovada
+        response = self.create(self.body)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertGreater(IdempotencyKey.objects.get().expires_at, timezone.now())
+
+        # Os pedidos não removem as chaves expiradas de outros clientes; o comando periódico sim
+        IdempotencyKey.objects.create(key='antiga', request_hash='-', expires_at=timezone.now() - timedelta(days=1))
+        self.create({**self.body, 'time': '12:00'}, key='pedido-2')
+        self.assertTrue(IdempotencyKey.objects.filter(key='antiga').exists())
+
+        output = io.StringIO()
+        call_command('prune_idempotency_keys', stdout=output)
+        self.assertIn('1 chave(s)', output.getvalue())
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
@@ -0,0 +1,116 @@
+from datetime import date
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.allocation import table_groups
+from api.locations import location_database, use_location
+from api.models import Booking, Mesa
+from api.suggestions import get_adjacency
+
+
+class JoinedTablesTests(TestCase):
+    """
+    Garante que um grupo maior do que qualquer mesa ocupa o menor conjunto de mesas
+    juntáveis e adjacentes livres, numa única operação, e que é cancelado em conjunto.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 1, 8)  # Terça-feira
+        self.small = Mesa.objects.create(lugares=4)
+        self.left = Mesa.objects.create(lugares=6, joinable=True)
+        self.right = Mesa.objects.create(lugares=6, joinable=True)
+        self.far = Mesa.objects.create(lugares=8, joinable=True)
+        self.left.adjacent.add(self.right)
+
+    def create(self, guests, phone='912345678'):
+        return self.client.post('/api/bookings/create/', {
+            'name': 'Grupo Grande', 'phone': phone, 'date': self.day.isoformat(),
+            'time': '20:00', 'number_of_guests': str(guests),
+        }, content_type='application/json')
+
+    def test_table_groups_are_minimal_and_ordered(self):
+        tables = [(1, 6), (2, 6), (3, 2), (4, 8), (5, 4)]
+        adjacency = {1: [2, 3], 2: [1, 4], 3: [1], 4: [2, 5], 5: [4]}
+
+        groups = table_groups(10, tables, adjacency)
+        self.assertEqual(groups[:3], [(1, 2), (4, 5), (2, 4)])
+        # Nenhum conjunto contém outro que já sente o grupo
+        self.assertNotIn((1, 2, 3), groups)
+        self.assertEqual(table_groups(30, tables, adjacency), [])
+
+        # Sem limite de mesas por defeito; com limite, os conjuntos maiores são ignorados
+        self.assertEqual([sorted(group) for group in table_groups(26, tables, adjacency)], [[1, 2, 3, 4, 5]])
+        self.assertEqual(table_groups(26, tables, adjacency, max_tables=4), [])
+        self.assertTrue(all(len(group) <= 2 for group in table_groups(10, tables, adjacency, max_tables=2)))
+
+    def test_large_party_uses_adjacent_tables(self):
+        response = self.create(10)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['mesas'], sorted([self.left.id, self.right.id]))
+        bookings = list(Booking.objects.order_by('mesa_id'))
+        self.assertEqual(len({booking.party for booking in bookings}), 1)
+        self.assertIsNotNone(bookings[0].party)
+        self.assertEqual(sorted(booking.number_of_guests for booking in bookings), [4, 6])
+
+        # A disponibilidade conta com o conjunto até estar ocupado
+        slots = self.client.get('/api/availability/', {'date': self.day.isoformat(), 'guests': '10'}).json()['slots']
+        self.assertIn('18:00', slots)
+        self.assertNotIn('20:00', slots)
+        self.assertEqual(self.create(10).status_code, 400)
+
+    def test_joined_tables_limit_is_reported(self):
+        self.right.adjacent.add(self.far)
+        self.assertEqual(self.create(20).json()['mesas'], sorted([self.left.id, self.right.id, self.far.id]))
+        Booking.objects.all().delete()
+
+        with mock.patch('api.views.MAX_JOINED_TABLES', 2), mock.patch('api.suggestions.MAX_JOINED_TABLES', 2):
+            response = self.create(20)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['max_joined_tables'], 2)
+
+            # Dentro do limite: sem mesas livres, a resposta habitual com sugestões
+            self.assertEqual(self.create(14).status_code, 201)
+            response = self.create(14, phone='913456789')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('suggestions', response.json())
+
+    def test_cancelling_one_table_cancels_the_party(self):
+        self.create(10)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        response = self.client.delete(f'/api/bookings/cancel/{Booking.objects.first().id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Mesa.objects.filter(existe_reserva=True).exists())
+
+
+class JoinedTablesLocationTests(TestCase):
+    """
+    Garante que a adjacência das mesas é lida da base de dados do local do pedido.
+    """
+
+    databases = {'default', location_database(settings.TEST_LOCATION)}
+
+    def test_adjacency_is_read_from_the_location(self):
+        cache.clear()
+        with use_location(settings.TEST_LOCATION):
+            left = Mesa.objects.create(lugares=6, joinable=True)
+            right = Mesa.objects.create(lugares=6, joinable=True)
+            left.adjacent.add(right)
+            self.assertEqual(get_adjacency(), {left.id: {right.id}, right.id: {left.id}})
+        self.assertEqual(get_adjacency(), {})
+
+        response = self.client.post('/api/bookings/create/', {
+            'name': 'Grupo Grande', 'phone': '912345678', 'date': '2030-01-08',
+            'time': '20:00', 'number_of_guests': '10',
+        }, content_type='application/json', HTTP_X_LOCATION=settings.TEST_LOCATION)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['mesas'], [left.id, right.id])
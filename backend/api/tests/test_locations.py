@@ -0,0 +1,97 @@
+from datetime import date, time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.locations import DEFAULT_LOCATION, LocationRouter, location_database, use_location
+from api.models import Booking, Mesa
+
+
+class LocationRoutingTests(TestCase):
+    """
+    Garante que as mesas e reservas de cada local ficam na base de dados do local do pedido
+    (cabeçalho 'X-Location' ou cookie 'location'), que os locais não partilham dados nem
+    entradas da cache e que os restantes modelos continuam na base de dados 'default'.
+    """
+
+    databases = {'default', location_database(settings.TEST_LOCATION)}
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.shard = location_database(settings.TEST_LOCATION)
+
+    def mesas(self, **headers):
+        return [mesa['lugares'] for mesa in self.client.get('/api/mesas/list/', headers=headers).json()]
+
+    def test_header_and_cookie_select_the_location_database(self):
+        response = self.client.post(
+            '/api/mesas/create/', {'lugares': 8}, content_type='application/json',
+            headers={'x-location': settings.TEST_LOCATION},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('X-Location', response['Vary'])
+        Mesa.objects.create(lugares=2)
+
+        self.assertEqual(list(Mesa.objects.using(self.shard).values_list('lugares', flat=True)), [8])
+        self.assertEqual(list(Mesa.objects.using('default').values_list('lugares', flat=True)), [2])
+
+        self.assertEqual(self.mesas(), [2])
+        self.assertEqual(self.mesas(x_location=settings.TEST_LOCATION), [8])
+        self.client.cookies['location'] = settings.TEST_LOCATION
+        self.assertEqual(self.mesas(), [8])
+
+        # Cookie de um local que deixou de existir: local por defeito; cabeçalho desconhecido: 404
+        self.client.cookies['location'] = 'encerrado'
+        self.assertEqual(self.mesas(), [2])
+        self.assertEqual(self.client.get('/api/mesas/list/', headers={'x-location': 'encerrado'}).status_code, 404)
+
+        locations = self.client.get('/api/locations/', headers={'x-location': settings.TEST_LOCATION}).json()
+        self.assertEqual([location['id'] for location in locations if location['current']], [settings.TEST_LOCATION])
+
+    def test_locations_do_not_share_bookings_or_cached_availability(self):
+        Mesa.objects.create(lugares=2)
+        with use_location(settings.TEST_LOCATION):
+            Mesa.objects.create(lugares=2)
+
+        body = {'name': 'Maria Silva', 'phone': '912345678', 'date': '2030-01-08', 'time': '20:00', 'number_of_guests': '2'}
+        query = {'date': '2030-01-08', 'guests': 2}
+        self.assertIn('20:00', self.client.get('/api/availability/', query).json()['slots'])
+        self.assertIn('20:00', self.client.get('/api/availability/', query, headers={'x-location': settings.TEST_LOCATION}).json()['slots'])
+
+        # A mesma mesa e horário estão livres em cada local
+        self.assertEqual(self.client.post('/api/bookings/create/', body, content_type='application/json').status_code, 201)
+        self.assertEqual(self.client.post(
+            '/api/bookings/create/', body, content_type='application/json', headers={'x-location': settings.TEST_LOCATION},
+        ).status_code, 201)
+        self.assertEqual(Booking.objects.using('default').count(), 1)
+        self.assertEqual(Booking.objects.using(self.shard).count(), 1)
+
+        # A disponibilidade em cache de um local não é servida ao outro
+        self.assertNotIn('20:00', self.client.get('/api/availability/', query).json()['slots'])
+        self.assertNotIn('20:00', self.client.get('/api/availability/', query, headers={'x-location': settings.TEST_LOCATION}).json()['slots'])
+
+    def test_router_keeps_shared_models_and_related_objects_in_place(self):
+        router = LocationRouter()
+        self.assertIsNone(router.db_for_read(User))
+        self.assertEqual(router.db_for_write(Mesa), location_database(DEFAULT_LOCATION))
+
+        with use_location(settings.TEST_LOCATION):
+            mesa = Mesa.objects.create(lugares=4)
+            self.assertEqual(router.db_for_read(Booking), self.shard)
+            self.assertEqual(router.db_for_read(Mesa.adjacent.through), self.shard)
+
+        # Objetos relacionados são lidos da base de dados da instância de origem
+        booking = Booking.objects.using(self.shard).create(
+            mesa=mesa, name='Cliente', phone='912345678', date=date(2030, 1, 8),
+            start_time=time(12, 0), end_time=time(13, 15), number_of_guests=2,
+        )
+        self.assertEqual(Booking.objects.using(self.shard).get(pk=booking.pk).mesa.lugares, 4)
+        self.assertFalse(router.allow_relation(mesa, Mesa.objects.create(lugares=2)))
+
+        self.assertFalse(router.allow_migrate(self.shard, 'auth', 'user'))
+        self.assertTrue(router.allow_migrate(self.shard, 'api', 'booking'))
+        self.assertFalse(router.allow_migrate(self.shard, 'api', 'idempotencykey'))
+        self.assertIsNone(router.allow_migrate('default', 'api', 'booking'))
@@ -0,0 +1,182 @@
+"""
+Testes de regressão de desempenho da API.
+
+Cada endpoint é chamado com volumes de dados crescentes e o número de queries SQL tem
+de ser exatamente o indicado em QUERY_BUDGETS, em todos os volumes: um endpoint que
+passe a executar uma query por reserva ou por mesa (N+1) faz falhar os testes.
+
+Com PERF_CHECK_LATENCY=1, o tempo de resposta no maior volume é comparado com
+performance_baseline.json (mediana de várias chamadas, com uma margem de PERF_TOLERANCE
+vezes o valor de referência mais PERF_SLACK_MS). Os tempos dependem da máquina e da carga,
+pelo que esta verificação não é executada por defeito (apenas a do número de queries).
+Para atualizar os valores de referência, depois de uma alteração intencional ou numa
+máquina diferente:
+
+    PERF_UPDATE_BASELINE=1 python manage.py test api.tests.test_performance
+"""
+
+import json
+import os
+import statistics
+import time as clock
+from datetime import date, time, timedelta
+from pathlib import Path
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Booking, Mesa
+
+# Volumes de dados (mesas, reservas)
+SIZES = [(5, 50), (20, 500), (50, 2000)]
+
+# Número exato de queries de cada endpoint (igual em todos os volumes), com a cache vazia
+# (inclui as queries feitas uma vez por dia, ex.: remoção das regras recorrentes terminadas)
+QUERY_BUDGETS = {
+    'bookings_list_public': 6,
+    'bookings_list_admin': 11,
+    'bookings_search': 7,
+    'mesas_list': 6,
+    'availability': 8,
+    'changes': 12,
+    'bookings_create': 27,
+    'bookings_cancel': 21,
+    'locations': 0,
+    'batch': 13,
+}
+
+# Valores de referência dos tempos de resposta (milissegundos, maior volume)
+BASELINE_PATH = Path(__file__).with_name('performance_baseline.json')
+PERF_TOLERANCE = float(os.environ.get('PERF_TOLERANCE', 3))
+PERF_SLACK_MS = float(os.environ.get('PERF_SLACK_MS', 10))
+PERF_REPEAT = 5
+
+# Verificação dos tempos de resposta (ou atualização dos valores de referência)
+PERF_CHECK_LATENCY = bool(os.environ.get('PERF_CHECK_LATENCY') or os.environ.get('PERF_UPDATE_BASELINE'))
+
+
+class ApiPerformanceTests(TestCase):
+    """
+    Garante que o número de queries de cada endpoint não depende do número de linhas
+    e que os tempos de resposta não regridem face aos valores de referência.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.day = date.today() + timedelta(days=30)
+        while cls.day.weekday() == 6:
+            cls.day += timedelta(days=1)
+
+    def setUp(self):
+        self.public = Client()
+        self.staff = Client()
+        self.staff.force_login(self.admin)
+        self.mesas = []
+        self.booking_ids = []
+        self.created = 0
+
+    def seed(self, mesas, bookings):
+        """Acrescenta mesas e reservas futuras até ao volume indicado."""
+        self.mesas += Mesa.objects.bulk_create([
+            Mesa(lugares=2 + 2 * (i % 3), existe_reserva=True) for i in range(mesas - len(self.mesas))
+        ])
+        existing = Booking.objects.count()
+        self.booking_ids += [booking.pk for booking in Booking.objects.bulk_create([
+            Booking(
+                mesa=self.mesas[i % len(self.mesas)],
+                name='Cliente',
+                phone='912345678',
+                date=self.day + timedelta(days=(i // len(self.mesas)) % 10),
+                start_time=time(9 + (i // 100) % 12, 0),
+                end_time=time(10 + (i // 100) % 12, 15),
+                number_of_guests=2,
+            )
+            for i in range(existing, bookings)
+        ])]
+
+    def endpoints(self):
+        """Pedidos a medir (nome -> função que executa o pedido)."""
+
+        def create_booking():
+            # Cada reserva numa data diferente (sem reservas), para que haja sempre mesa livre
+            self.created += 1
+            day = self.day + timedelta(days=20 + self.created)
+            if day.weekday() == 6:
+                day += timedelta(days=1)
+            return self.public.post('/api/bookings/create/', {
+                'name': 'Cliente',
+                'phone': f'91{self.created:07d}',
+                'date': day.isoformat(),
+                'time': '22:00',
+                'number_of_guests': '2',
+            }, content_type='application/json')
+
+        def cancel_booking():
+            return self.staff.delete(f'/api/bookings/cancel/{self.booking_ids.pop()}/')
+
+        return {
+            'bookings_list_public': lambda: self.public.get('/api/bookings/list/'),
+            'bookings_list_admin': lambda: self.staff.get('/api/bookings/list/'),
+            'bookings_search': lambda: self.staff.get('/api/bookings/search/', {'q': 'client 912'}),
+            'mesas_list': lambda: self.public.get('/api/mesas/list/'),
+            'availability': lambda: self.public.get('/api/availability/', {'date': self.day.isoformat(), 'guests': '2'}),
+            'changes': lambda: self.staff.get('/api/changes/', {'since': '0'}),
+            'bookings_create': create_booking,
+            'bookings_cancel': cancel_booking,
+            'locations': lambda: self.public.get('/api/locations/'),
+            'batch': lambda: self.staff.post('/api/batch/', {'requests': [
+                {'path': '/api/mesas/list/'}, {'path': '/api/bookings/list/'}, {'path': '/api/admin/status/'},
+            ]}, content_type='application/json'),
+        }
+
+    def call(self, endpoint):
+        """Executa um pedido com a cache vazia (sem efeito de rate limiting) e devolve a resposta."""
+        cache.clear()
+        response = endpoint()
+        self.assertLess(response.status_code, 300, getattr(response, 'content', b'')[:200])
+        return response
+
+    def test_query_count_does_not_grow_with_rows(self):
+        counts = {name: [] for name in QUERY_BUDGETS}
+
+        for mesas, bookings in SIZES:
+            self.seed(mesas, bookings)
+            for name, endpoint in self.endpoints().items():
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.call(endpoint)
+                counts[name].append(len(queries))
+
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertEqual(counts[name], [budget] * len(SIZES))
+
+    @skipUnless(PERF_CHECK_LATENCY, 'Tempos de resposta verificados apenas com PERF_CHECK_LATENCY=1.')
+    def test_response_time_within_baseline(self):
+        self.seed(*SIZES[-1])
+
+        timings = {}
+        for name, endpoint in self.endpoints().items():
+            self.call(endpoint)  # aquecimento
+            samples = []
+            for _ in range(PERF_REPEAT):
+                started = clock.perf_counter()
+                self.call(endpoint)
+                samples.append((clock.perf_counter() - started) * 1000)
+            timings[name] = round(statistics.median(samples), 2)
+
+        if os.environ.get('PERF_UPDATE_BASELINE'):
+            BASELINE_PATH.write_text(json.dumps(timings, indent=4, sort_keys=True) + '\n')
+            self.skipTest(f'Valores de referência atualizados em {BASELINE_PATH.name}.')
+
+        baseline = json.loads(BASELINE_PATH.read_text())
+        for name, elapsed in timings.items():
+            with self.subTest(endpoint=name):
+                self.assertIn(name, baseline, 'Endpoint sem valor de referência (use PERF_UPDATE_BASELINE=1).')
+                limit = baseline[name] * PERF_TOLERANCE + PERF_SLACK_MS
+                self.assertLessEqual(elapsed, limit, f'{elapsed:.1f} ms (referência: {baseline[name]:.1f} ms)')
@@ -0,0 +1,69 @@
+import json
+import pstats
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, modify_settings
+
+from api.profiling import profile_file, rotate_profiles
+
+
+@modify_settings(MIDDLEWARE={'append': 'api.middleware.ProfilingMiddleware'})
+class RequestProfilingTests(TestCase):
+    """
+    Garante que os pedidos de administradores com 'X-Profile' gravam um perfil (pilhas ou
+    cProfile e alocações) que pode ser listado e descarregado, que os restantes clientes
+    não conseguem ativar a análise e que apenas os perfis mais recentes são mantidos.
+    """
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        patcher = mock.patch('api.profiling.PROFILING_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_admin_request_is_profiled_and_downloadable(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get('/api/mesas/list/', headers={'x-profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        metadata = json.loads((self.directory / f'{profile_id}.json').read_text())
+        self.assertEqual((metadata['method'], metadata['path'], metadata['status']), ('GET', '/api/mesas/list/', 200))
+        self.assertEqual((metadata['mode'], metadata['files']), ('sample', ['alloc', 'folded']))
+        self.assertEqual([profile['id'] for profile in self.client.get('/api/profiles/').json()], [profile_id])
+
+        allocations = self.client.get(f'/api/profiles/{profile_id}/alloc/')
+        self.assertEqual(allocations.status_code, 200)
+        self.assertIn(b'GET /api/mesas/list/', b''.join(allocations.streaming_content))
+        self.assertEqual(self.client.get(f'/api/profiles/{profile_id}/prof/').status_code, 404)
+        self.assertEqual(self.client.get('/api/profiles/..%2F..%2Fsettings/alloc/').status_code, 404)
+
+    def test_cprofile_mode_and_clients_without_permission(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/mesas/list/', headers={'x-profile': 'cprofile'}))
+        self.assertFalse(any(self.directory.iterdir()))
+
+        self.client.force_login(self.admin)
+        profile_id = self.client.get('/api/mesas/list/', headers={'x-profile': 'cprofile'})['X-Profile-Id']
+
+        stats = pstats.Stats(str(profile_file(profile_id, 'prof')))
+        self.assertTrue(any(function == 'list_mesas' for _, _, function in stats.stats))
+        self.assertIsNone(profile_file(profile_id, 'folded'))
+
+    def test_only_the_newest_profiles_are_kept(self):
+        self.client.force_login(self.admin)
+        ids = [self.client.get('/api/mesas/list/', headers={'x-profile': 'sample'})['X-Profile-Id'] for _ in range(3)]
+
+        rotate_profiles(keep=2)
+
+        self.assertEqual(sorted(path.name for path in self.directory.glob('*.json')), [f'{ids[1]}.json', f'{ids[2]}.json'])
+        self.assertIsNone(profile_file(ids[0], 'alloc'))
+        self.assertIsNotNone(profile_file(ids[2], 'alloc'))
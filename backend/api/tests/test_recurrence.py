@@ -0,0 +1,122 @@
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.locations import location_database, use_location
+from api.models import Booking, Mesa, RecurringBooking
+from api.recurrence import RECURRENCE_WINDOW_DAYS, extend_recurrences, materialise_recurrences, occurrence_dates
+from api.views import update_expired_objects
+
+
+class RecurringBookingTests(TestCase):
+    """
+    Garante que as reservas recorrentes são criadas apenas para as próximas semanas, em
+    massa, sem sobrepor reservas existentes, e que entram na verificação de conflitos.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.mesa = Mesa.objects.create(lugares=2)
+        self.first = date.today() + timedelta(days=1)
+        while self.first.weekday() == 6:  # Encerrado ao domingo
+            self.first += timedelta(days=1)
+
+    def rule(self, **fields):
+        return RecurringBooking.objects.create(**{
+            'mesa': self.mesa, 'name': 'Cliente Habitual', 'phone': '912345678', 'start_time': time(20, 0),
+            'end_time': time(21, 15), 'number_of_guests': 2, 'first_date': self.first, **fields,
+        })
+
+    def test_occurrence_dates_follow_interval_and_end(self):
+        rule = self.rule(interval_weeks=RecurringBooking.BIWEEKLY, until=self.first + timedelta(days=40))
+        dates = occurrence_dates(rule, self.first + timedelta(days=1), self.first + timedelta(days=90))
+        self.assertEqual(dates, [self.first + timedelta(days=14), self.first + timedelta(days=28)])
+
+    def test_only_the_window_is_materialised(self):
+        rule = self.rule()
+        Booking.objects.create(
+            mesa=self.mesa, name='Cliente', phone='919999999', date=self.first + timedelta(days=7),
+            start_time=time(20, 30), end_time=time(21, 45), number_of_guests=2,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            created, skipped = materialise_recurrences(date.today() + timedelta(days=RECURRENCE_WINDOW_DAYS))
+        # Todas as reservas com um único INSERT
+        self.assertEqual(sum(query['sql'].startswith('INSERT INTO "api_booking"') for query in queries), 1)
+
+        expected = occurrence_dates(rule, date.today(), date.today() + timedelta(days=RECURRENCE_WINDOW_DAYS))
+        self.assertEqual([day for _, day in skipped], [self.first + timedelta(days=7)])
+        self.assertEqual(created, len(expected) - 1)
+        self.assertEqual(Booking.objects.filter(recurrence=rule).count(), created)
+
+        # Nada por criar: a janela em cache evita qualquer query
+        extend_recurrences()
+        with self.assertNumQueries(0):
+            self.assertEqual(extend_recurrences(), 0)
+
+    def test_ended_rules_are_pruned_without_expired_bookings(self):
+        ended = self.rule(first_date=date(2020, 1, 6), until=date(2020, 3, 30))
+        active = self.rule()
+        self.assertFalse(Booking.objects.exists())
+
+        update_expired_objects()
+        self.assertFalse(RecurringBooking.objects.filter(pk=ended.pk).exists())
+        self.assertTrue(RecurringBooking.objects.filter(pk=active.pk).exists())
+
+    def test_booking_beyond_window_sees_recurrence(self):
+        self.rule()
+        day = self.first + timedelta(days=7 * 12)
+
+        response = self.client.post('/api/bookings/create/', {
+            'name': 'Cliente', 'phone': '919999999', 'date': day.isoformat(),
+            'time': '20:30', 'number_of_guests': '2',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('20:30', self.client.get('/api/availability/', {'date': day.isoformat(), 'guests': '2'}).json()['slots'])
+        # A regra é verificada em memória: nenhuma reserva é criada para além da janela
+        horizon = date.today() + timedelta(days=RECURRENCE_WINDOW_DAYS)
+        self.assertFalse(Booking.objects.filter(date__gt=horizon).exists())
+        self.assertTrue(Booking.objects.filter(recurrence__isnull=False, date__lte=horizon).exists())
+
+
+class RecurringBookingLocationTests(TestCase):
+    """
+    Garante que as regras ficam na base de dados do respetivo local e que cada local só
+    materializa as suas regras.
+    """
+
+    databases = {'default', location_database(settings.TEST_LOCATION)}
+
+    def setUp(self):
+        cache.clear()
+        self.first = date.today() + timedelta(days=1)
+        while self.first.weekday() == 6:  # Encerrado ao domingo
+            self.first += timedelta(days=1)
+
+    def rule(self, name):
+        return RecurringBooking.objects.create(
+            mesa=Mesa.objects.create(lugares=2), name=name, phone='912345678', start_time=time(20, 0),
+            end_time=time(21, 15), number_of_guests=2, first_date=self.first,
+        )
+
+    def test_rules_are_materialised_in_their_location(self):
+        self.rule('Cliente Principal')
+        with use_location(settings.TEST_LOCATION):
+            rule = self.rule('Cliente Teste')
+        self.assertEqual(rule._state.db, location_database(settings.TEST_LOCATION))
+
+        response = self.client.get(
+            '/api/availability/', {'date': self.first.isoformat(), 'guests': '2'},
+            HTTP_X_LOCATION=settings.TEST_LOCATION,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('20:30', response.json()['slots'])
+        with use_location(settings.TEST_LOCATION):
+            self.assertEqual(set(Booking.objects.values_list('name', flat=True)), {'Cliente Teste'})
+        self.assertFalse(Booking.objects.exists())
@@ -0,0 +1,68 @@
+import gzip
+import json
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+import msgpack
+import zstandard
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Mesa
+from api.renderers import FastJSONRenderer
+
+
+class ResponseFormatTests(TestCase):
+    """
+    Garante que o JSON do orjson é igual ao do DRF, que o MessagePack é selecionado pelo
+    cabeçalho Accept e que as respostas grandes da API são comprimidas conforme o
+    Accept-Encoding do cliente.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def mesas(self, **headers):
+        return self.client.get('/api/mesas/list/', headers=headers)
+
+    def test_fast_json_matches_drf_json(self):
+        data = {
+            'date': date(2030, 1, 8), 'time': time(20, 30), 'price': Decimal('12.50'), 'name': 'João',
+            'created': datetime(2030, 1, 8, 20, 30, 15, 123456, tzinfo=timezone.utc), 'mesas': [1, 2], 'notes': None,
+        }
+        fast = FastJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(data)))
+        self.assertIn('"João"'.encode(), fast)
+
+    def test_msgpack_is_negotiated_with_accept(self):
+        for lugares in (2, 4, 6):
+            Mesa.objects.create(lugares=lugares)
+
+        as_json = self.mesas()
+        as_msgpack = self.mesas(accept='application/msgpack')
+
+        self.assertEqual(as_json['Content-Type'], 'application/json')
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), as_json.json())
+        self.assertLess(len(as_msgpack.content), len(as_json.content))
+
+    def test_large_responses_are_compressed(self):
+        Mesa.objects.bulk_create([Mesa(lugares=4) for _ in range(60)])
+        plain = self.mesas()
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertGreater(len(plain.content), 1024)
+
+        compressed = self.mesas(accept_encoding='gzip, deflate, br, zstd')
+        self.assertEqual(compressed['Content-Encoding'], 'zstd')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(zstandard.ZstdDecompressor().decompressobj().decompress(compressed.content), plain.content)
+
+        compressed = self.mesas(accept_encoding='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+        # Respostas pequenas não são comprimidas
+        Mesa.objects.all().delete()
+        self.assertNotIn('Content-Encoding', self.mesas(accept_encoding='gzip'))
@@ -0,0 +1,72 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import Booking, Mesa
+from api.views import SEARCH_PAGE_SIZE
+
+
+class BookingSearchTests(TestCase):
+    """
+    Garante que o índice de pesquisa acompanha as criações, alterações e remoções de
+    reservas (incluindo em massa) e que a pesquisa ignora maiúsculas e acentos.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.mesa = Mesa.objects.create(lugares=4)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def book(self, name, phone='912345678'):
+        return Booking(
+            mesa=self.mesa, name=name, phone=phone, date=date(2030, 1, 8),
+            start_time=time(20, 0), end_time=time(21, 15), number_of_guests=2,
+        )
+
+    def search(self, query, **params):
+        return self.client.get('/api/bookings/search/', {'q': query, **params})
+
+    def names(self, query):
+        return [row['name'] for row in self.search(query).json()['results']]
+
+    def test_index_follows_writes(self):
+        joao = self.book('João da Silva')
+        joao.save()
+        Booking.objects.bulk_create([self.book('Maria Conceição', '961112233'), self.book('Ana Sousa', '933000111')])
+
+        self.assertEqual(self.names('joao silv'), ['João da Silva'])
+        self.assertEqual(self.names('CONCEICAO'), ['Maria Conceição'])
+        self.assertEqual(self.names('961 11'), ['Maria Conceição'])
+
+        Booking.objects.filter(pk=joao.pk).update(name='João Pereira')
+        self.assertEqual(self.names('silva'), [])
+        self.assertEqual(self.names('pereira'), ['João Pereira'])
+
+        Booking.objects.filter(name__startswith='Ana').delete()
+        self.assertEqual(self.names('sousa'), [])
+
+    def test_results_are_ranked_and_paginated(self):
+        Booking.objects.bulk_create([self.book(f'Cliente Silva {n}') for n in range(SEARCH_PAGE_SIZE + 5)])
+        self.book('Silva Silva').save()
+
+        first = self.search('silva', fields='name').json()
+        self.assertEqual(first['results'][0], {'name': 'Silva Silva'})
+        self.assertEqual((len(first['results']), first['next']), (SEARCH_PAGE_SIZE, 2))
+
+        second = self.search('silva', page=2).json()
+        self.assertEqual((len(second['results']), second['next']), (6, None))
+        self.assertEqual(self.search('!?').status_code, 400)
+
+    def test_admin_changelist_uses_index(self):
+        Booking.objects.bulk_create([self.book('Inês Gonçalves'), self.book('Rui Costa')])
+
+        response = self.client.get('/admin/api/booking/', {'q': 'ines goncal'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([booking.name for booking in response.context['cl'].result_list], ['Inês Gonçalves'])
@@ -0,0 +1,77 @@
+import io
+from contextlib import redirect_stdout
+from datetime import datetime, time, timedelta
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from api.allocation import BEST_FIT
+from api.simulation import Policy, parse_policy, parse_tables, simulate, simulate_policies, synthetic_requests
+
+
+class CapacitySimulationTests(SimpleTestCase):
+    """
+    Garante que o simulador aplica as regras de alocação da API (horário, lugares e
+    conflitos por mesa, agrupados pela data de início), que as políticas são interpretadas
+    a partir da linha de comandos e que a simulação em paralelo dá os mesmos resultados.
+    """
+
+    def request(self, moment, guests=2):
+        return (moment - timedelta(days=1), moment, guests)
+
+    def test_requests_are_accepted_or_rejected_like_the_api(self):
+        policy = Policy('teste', parse_tables('1x2+1x4'), opening=time(12, 0), closing=time(22, 0), closed_weekdays={0})
+        requests = [
+            self.request(datetime(2030, 1, 8, 20, 0)),              # mesa de 2 lugares
+            self.request(datetime(2030, 1, 8, 20, 30), guests=3),   # mesa de 4 lugares
+            self.request(datetime(2030, 1, 8, 21, 0)),              # mesa de 2 ocupada (a de 4 só sem mesas de 2)
+            self.request(datetime(2030, 1, 8, 21, 15)),             # a primeira reserva já terminou
+            self.request(datetime(2030, 1, 8, 20, 0), guests=6),    # nenhuma mesa com lugares
+            self.request(datetime(2030, 1, 8, 23, 0)),              # depois do fecho
+            self.request(datetime(2030, 1, 7, 20, 0)),              # segunda-feira encerrada
+        ]
+
+        result = simulate(policy, requests)
+
+        self.assertEqual((result['accepted'], result['rejected_full'], result['rejected_closed']), (3, 2, 2))
+        self.assertAlmostEqual(result['acceptance'], 3 / 7)
+        self.assertAlmostEqual(result['fill'], 7 / 8)
+
+    def test_bookings_are_grouped_by_start_date(self):
+        policy = Policy('noite', parse_tables('1x2'), opening=time(18, 0), closing=time(0, 30), closed_weekdays=())
+        result = simulate(policy, [
+            self.request(datetime(2030, 1, 8, 23, 30)),
+            # Como na API, a reserva da véspera (até às 00:45) não ocupa a mesa no dia seguinte
+            self.request(datetime(2030, 1, 9, 0, 15)),
+            self.request(datetime(2030, 1, 9, 0, 30)),
+        ])
+
+        self.assertEqual((result['accepted'], result['rejected_full']), (2, 1))
+
+    def test_policies_from_the_command_line(self):
+        policy = parse_policy('name=90min,duration=90,open=09:00,close=23:00,closed=0+6,strategy=best_fit', [(1, 4)])
+        self.assertEqual((policy.duration, policy.opening, policy.closed_weekdays, policy.strategy, policy.tables),
+                         (timedelta(minutes=90), time(9, 0), frozenset({0, 6}), BEST_FIT, [(1, 4)]))
+        self.assertEqual(parse_tables('2x2+1x6'), [(1, 2), (2, 2), (3, 6)])
+        for spec in ('duracao=90', 'strategy=aleatoria', 'name'):
+            with self.assertRaises(ValueError):
+                parse_policy(spec, [])
+
+        requests = synthetic_requests(datetime(2030, 1, 7).date(), days=7, requests_per_day=40, seed=1)
+        policies = [parse_policy(spec, parse_tables('4x2+4x4')) for spec in ('name=atual', 'name=90min,duration=90')]
+        serial = simulate_policies(policies, requests, jobs=1)
+        parallel = simulate_policies(policies, requests, jobs=2)
+        for metrics in (serial, parallel):
+            for result in metrics:
+                for timing in ('alloc_mean_us', 'alloc_p99_us', 'elapsed'):
+                    del result[timing]
+        self.assertEqual(parallel, serial)
+        self.assertGreaterEqual(serial[0]['accepted'], serial[1]['accepted'])
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            call_command('simulate_capacity', '--days', '7', '--tables', '4x2+4x4', '--jobs', '1',
+                         '--policy', 'name=atual', '--policy', 'name=best-fit,strategy=best_fit', stdout=output)
+        self.assertIn('best-fit', output.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('simulate_capacity', '--days', '1', '--tables', '4x2', '--policy', 'strategy=aleatoria')
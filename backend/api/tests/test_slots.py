@@ -0,0 +1,79 @@
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from api.models import Closure
+from api.slots import compile_day, is_bookable
+
+
+class SlotCalendarTests(TestCase):
+    """
+    Garante que o calendário de horários reserváveis respeita o horário e os
+    encerramentos e que, depois de compilado, é consultado sem queries.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_compile_day_with_overnight_hours_and_closure(self):
+        monday = date(2030, 1, 7)
+        weekly = {0: [(time(8, 30), time(0, 30))], 6: [(time(10, 0), time(14, 0))]}
+        closures = [(datetime(2030, 1, 7, 14, 0), datetime(2030, 1, 7, 18, 0))]
+        bits = compile_day(monday, weekly, {}, closures, duration=timedelta(hours=1))
+
+        def bookable(hour, minute):
+            return is_bookable(datetime.combine(monday, time(hour, minute)), bits)
+
+        # Domingo termina às 14:00 (sem turno depois da meia-noite); segunda abre às 08:30
+        self.assertFalse(bookable(0, 15))
+        self.assertFalse(bookable(8, 15))
+        self.assertTrue(bookable(8, 30))
+        self.assertTrue(bookable(8, 40))
+        # Reservas de 1 hora que se sobreporiam ao encerramento (14:00 às 18:00)
+        self.assertTrue(bookable(13, 0))
+        self.assertFalse(bookable(13, 5))
+        self.assertFalse(bookable(17, 45))
+        self.assertTrue(bookable(18, 0))
+        # Fecho às 00:30 de terça (inclusive)
+        self.assertTrue(bookable(23, 50))
+        self.assertEqual(bits >> 96 & 1, 1)
+
+    def test_lookup_is_cached_until_calendar_changes(self):
+        moment = datetime(2030, 1, 8, 12, 0)
+        self.assertTrue(is_bookable(moment))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(is_bookable(moment))
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/api/closure/add/', {
+                'start_0': '08/01/2030', 'start_1': '11:00',
+                'end_0': '08/01/2030', 'end_1': '15:00',
+            })
+
+        self.assertEqual(Closure.objects.count(), 1)
+        self.assertFalse(is_bookable(moment))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'api_cache'}})
+    def test_calendar_version_lives_in_the_shared_cache(self):
+        call_command('createcachetable', database='default')
+        moment = datetime(2030, 1, 8, 12, 0)
+        self.assertTrue(is_bookable(moment))
+
+        # A versão e o mapa estão na tabela partilhada, não na memória do processo
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT cache_key FROM api_cache WHERE cache_key LIKE '%%slots_version_%%'")
+            self.assertEqual(len(cursor.fetchall()), 1)
+
+        Closure.objects.create(start=datetime(2030, 1, 8, 11, 0), end=datetime(2030, 1, 8, 15, 0))
+        self.assertTrue(is_bookable(moment))
+        # Outro processo (ex.: o worker que gravou a alteração no painel) descarta a versão
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM api_cache WHERE cache_key LIKE '%%slots_version_%%'")
+        self.assertFalse(is_bookable(moment))
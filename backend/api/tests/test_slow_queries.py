@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from api.models import Mesa
+from api.slowqueries import SlowQueryLog, normalise_sql, params_fingerprint, process_log_path
+
+
+class SlowQueryLogTests(TestCase):
+    """
+    Garante que as queries lentas são registadas com a instrução normalizada, a linha de
+    api/views.py que as executou e o plano de execução, e que o resumo junta os ficheiros
+    de todos os processos e as ordena por tempo total.
+    """
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'slow_queries.jsonl'
+
+    def test_statements_are_normalised(self):
+        first = normalise_sql('SELECT "U0"."id" FROM "api_mesa" U0 WHERE "U0"."id" IN (%s, %s) AND lugares > 4 LIMIT 21')
+        second = normalise_sql("SELECT  \"U0\".\"id\" FROM \"api_mesa\" U0\nWHERE \"U0\".\"id\" IN (%s, %s, %s) AND lugares > 8 LIMIT 5")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, 'SELECT "U0"."id" FROM "api_mesa" U0 WHERE "U0"."id" IN (...) AND lugares > ? LIMIT ?')
+        self.assertEqual(normalise_sql("WHERE name = 'O''Neil'"), 'WHERE name = ?')
+
+    def test_slow_query_records_origin_and_plan(self):
+        Mesa.objects.create(lugares=4)
+        log = SlowQueryLog(self.path, threshold_ms=0)
+
+        with connection.execute_wrapper(log):
+            self.assertEqual(self.client.get('/api/mesas/list/').status_code, 200)
+
+        # Ficheiro do processo atual
+        entries = [json.loads(line) for line in process_log_path(self.path, os.getpid()).read_text().splitlines()]
+        mesas = next(entry for entry in entries if 'FROM "api_mesa"' in entry['statement'])
+        self.assertRegex(mesas['origin'], r'^api/views\.py:\d+ ')
+        self.assertTrue(any('api_mesa' in line for line in mesas['plan']))
+        self.assertRegex(mesas['params'], r'^[0-9a-f]{16}$')
+        # Impressão digital dos parâmetros com chave: depende da SECRET_KEY
+        digest = params_fingerprint([912345678])
+        with override_settings(SECRET_KEY='outra-chave'):
+            self.assertNotEqual(params_fingerprint([912345678]), digest)
+        # As queries do EXPLAIN não são registadas
+        self.assertFalse(any('EXPLAIN' in entry['statement'] for entry in entries))
+
+    def test_summary_merges_processes_and_orders_by_total_time(self):
+        log = SlowQueryLog(self.path)
+        entries = (('SELECT a', 150.0), ('SELECT b', 120.0), ('SELECT b', 110.0))
+        for statement, duration in entries:
+            log.write({
+                'time': '2030-01-08T20:00:00.000+00:00', 'database': 'default', 'duration_ms': duration,
+                'statement': statement, 'fingerprint': statement, 'params': '0', 'many': False,
+                'origin': 'api/views.py:1 view', 'plan': None,
+            })
+        # Registo de outro worker, no seu próprio ficheiro
+        process_log_path(self.path, 1).write_text(json.dumps({
+            'time': '2030-01-08T19:00:00.000+00:00', 'database': 'default', 'duration_ms': 100.0,
+            'statement': 'SELECT b', 'fingerprint': 'SELECT b', 'params': '0', 'many': False,
+            'origin': 'api/views.py:2 view', 'plan': None,
+        }) + '\n')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        with mock.patch('api.slowqueries.SLOW_QUERY_LOG', self.path):
+            response = self.client.get('/api/slow-queries/', {'limit': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['queries'], [{
+            'statement': 'SELECT b', 'fingerprint': 'SELECT b', 'count': 3, 'total_ms': 330.0, 'mean_ms': 110.0,
+            'max_ms': 120.0, 'origins': {'api/views.py:1 view': 2, 'api/views.py:2 view': 1}, 'plan': None,
+            'last_seen': '2030-01-08T20:00:00.000+00:00',
+        }])
+        self.assertEqual(self.client.get('/api/slow-queries/', {'limit': 0}).status_code, 400)
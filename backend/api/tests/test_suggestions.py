@@ -0,0 +1,77 @@
+import random
+from collections import defaultdict
+from datetime import date, datetime, time
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.allocation import RESERVATION_DURATION, candidate_tables, find_table
+from api.models import Booking, Mesa
+from api.slots import bookable_slots, get_calendar
+from api.suggestions import free_slots, get_occupancy
+
+
+class SlotSuggestionTests(TestCase):
+    """
+    Garante que os horários livres calculados com mapas de bits coincidem com a alocação
+    de create_booking e que uma reserva recusada inclui os horários livres mais próximos.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 1, 8)  # Terça-feira
+
+    def book(self, mesa, start):
+        end = datetime.combine(self.day, start) + RESERVATION_DURATION
+        return Booking.objects.create(
+            mesa=mesa, name='Cliente', phone='912345678', date=self.day,
+            start_time=start, end_time=end.time(), number_of_guests=2,
+        )
+
+    def test_free_slots_match_find_table(self):
+        mesas = [Mesa.objects.create(lugares=2 + 2 * (i % 3)) for i in range(8)]
+        rng = random.Random(7)
+        for _ in range(60):
+            self.book(rng.choice(mesas), time(rng.randrange(9, 23), rng.randrange(60)))
+
+        tables = list(Mesa.objects.values_list('id', 'lugares'))
+        bookings = defaultdict(list)
+        for mesa_id, start, end in Booking.objects.values_list('mesa_id', 'start_time', 'end_time'):
+            bookings[mesa_id].append((datetime.combine(self.day, start), datetime.combine(self.day, end)))
+
+        bits = get_calendar(self.day)
+        occupancy = get_occupancy([self.day])[self.day]
+        for guests in (2, 3, 6, 7):
+            with self.subTest(guests=guests):
+                starts = [datetime.combine(self.day, slot) for slot in bookable_slots(self.day, bits)]
+                expected = [s for s in starts if find_table(s, s + RESERVATION_DURATION, guests, tables, bookings)]
+                candidates = [table_id for table_id, _ in candidate_tables(guests, tables)]
+                free = free_slots(bits, candidates, occupancy)
+                self.assertEqual([datetime.combine(self.day, slot) for slot in bookable_slots(self.day, free)], expected)
+
+    def test_occupancy_cache_follows_booking_changes(self):
+        mesa = Mesa.objects.create(lugares=2)
+        booking = self.book(mesa, time(20, 0))
+        self.assertTrue(get_occupancy([self.day])[self.day][mesa.pk])
+
+        with self.assertNumQueries(1):
+            get_occupancy([self.day])
+
+        booking.delete()
+        self.assertEqual(get_occupancy([self.day])[self.day], {})
+
+    def test_rejected_booking_includes_nearest_slots(self):
+        mesa = Mesa.objects.create(lugares=2)
+        self.book(mesa, time(20, 0))
+
+        response = self.client.post('/api/bookings/create/', {
+            'name': 'Cliente', 'phone': '919999999', 'date': self.day.isoformat(),
+            'time': '20:30', 'number_of_guests': '2',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        suggestions = response.json()['suggestions']
+        # Livre até às 18:45 (reserva de 1h15 que termina às 20:00) e a partir das 21:15
+        self.assertEqual(suggestions['earlier'], ['18:15', '18:30', '18:45'])
+        self.assertEqual(suggestions['later'], ['21:15', '21:30', '21:45'])
+        self.assertEqual(suggestions['next_days'][0], {'date': '2030-01-09', 'slots': ['20:15', '20:30', '20:45']})
@@ -0,0 +1,125 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+
+from api.throttling import TokenBucketThrottle
+
+
+class MinuteThrottle(TokenBucketThrottle):
+    scope = 'teste'
+    rate = '4/minute'
+
+
+class TokenBucketThrottleTests(TestCase):
+    """
+    Garante que os baldes de tokens são reabastecidos de forma contínua, que os pedidos
+    recusados indicam quando tentar de novo, que a contenção num balde nunca recusa
+    pedidos e que cada scope tem o seu próprio balde.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.throttle = MinuteThrottle()
+        self.throttle.timer = lambda: self.now
+
+    def test_bucket_refills_continuously(self):
+        for _ in range(4):
+            self.assertTrue(self.throttle.consume('balde', 1))
+        self.assertFalse(self.throttle.consume('balde', 1))
+        self.assertAlmostEqual(self.throttle.wait(), 15)
+
+        # Um token a cada 15 segundos (4 por minuto)
+        self.now += 15
+        self.assertTrue(self.throttle.consume('balde', 1))
+        self.assertFalse(self.throttle.consume('balde', 1))
+
+        # Ao fim de um minuto o balde volta a estar cheio, sem exceder a capacidade
+        self.now += 600
+        self.assertFalse(self.throttle.consume('balde', 5))
+        self.assertTrue(self.throttle.consume('balde', 4))
+
+    def test_contention_never_rejects_requests(self):
+        # Balde em uso por outro pedido (noutro processo): permitido, sem esperar nem consumir tokens
+        cache.add('balde_lock', True, 1)
+        self.assertTrue(self.throttle.consume('balde', 1))
+        self.assertIsNone(self.throttle.wait())
+        self.assertIsNone(cache.get('balde'))
+        cache.delete('balde_lock')
+
+        # Pedidos simultâneos: nenhum é recusado enquanto há tokens e nenhum token é gasto duas vezes
+        results = []
+        barrier = threading.Barrier(4)
+
+        def request():
+            throttle = MinuteThrottle()
+            throttle.timer = lambda: self.now
+            barrier.wait()
+            results.append(throttle.consume('balde', 1))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 4)
+        tokens, _ = cache.get('balde')
+        self.assertGreaterEqual(tokens, 0)
+        self.assertIsNone(cache.get('balde_lock'))
+
+    @mock.patch.object(TokenBucketThrottle, 'timer', lambda throttle: 1000.0)
+    def test_rejected_requests_get_retry_after_per_scope(self):
+        # 'login': 10 pedidos por minuto
+        for _ in range(10):
+            response = self.client.post('/api/admin/login/', {'username': 'x', 'password': 'y'}, content_type='application/json')
+            self.assertNotEqual(response.status_code, 429)
+
+        response = self.client.post('/api/admin/login/', {'username': 'x', 'password': 'y'}, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '6')
+
+        # As leituras públicas têm um balde próprio
+        self.assertEqual(self.client.get('/api/mesas/list/').status_code, 200)
+
+
+@unittest.skipUnless(os.environ.get('DJANGO_REDIS_URL'), "Requer um servidor Redis (DJANGO_REDIS_URL)")
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ.get('DJANGO_REDIS_URL'),
+}})
+class RedisTokenBucketTests(TestCase):
+    """
+    Garante que, com Redis, o balde é atualizado atomicamente por um único script.
+    """
+
+    def setUp(self):
+        caches['default'].delete('balde')
+        self.now = 1000.0
+
+    def test_concurrent_requests_do_not_share_tokens(self):
+        results = []
+        barrier = threading.Barrier(12)
+
+        def request():
+            throttle = MinuteThrottle()
+            throttle.timer = lambda: self.now
+            barrier.wait()
+            results.append(throttle.consume('balde', 1))
+
+        threads = [threading.Thread(target=request) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 4)
+
+        throttle = MinuteThrottle()
+        throttle.timer = lambda: self.now + 15
+        self.assertTrue(throttle.consume('balde', 1))
+        self.assertFalse(throttle.consume('balde', 1))
+        self.assertAlmostEqual(throttle.wait(), 15)
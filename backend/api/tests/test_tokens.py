@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.tokens import _revocations
+
+
+class StaffTokenTests(TestCase):
+    """
+    Garante que os tokens de acesso autenticam sem consultar a base de dados, que cada
+    token de renovação só pode ser usado uma vez e que o logout revoga os tokens.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('rececao', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        _revocations.clear()
+
+    def login(self):
+        response = self.client.post('/api/admin/login/', {
+            'username': 'rececao', 'password': 'password', 'session': False,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('sessionid', response.cookies)
+        return response.json()
+
+    def status(self, access):
+        return self.client.get('/api/admin/status/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def refresh(self, token):
+        return self.client.post('/api/admin/token/refresh/', {'refresh': token}, content_type='application/json')
+
+    def test_access_token_authenticates_without_queries(self):
+        tokens = self.login()
+        self.status(tokens['access'])  # Primeira leitura da lista de revogação
+
+        with self.assertNumQueries(0):
+            response = self.status(tokens['access'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'rececao')
+        self.assertEqual(self.status('invalido').status_code, 401)
+        # Sem token, os pedidos não autenticados continuam a receber 403
+        self.assertEqual(self.client.get('/api/admin/status/').status_code, 403)
+
+    def test_refresh_token_is_single_use(self):
+        tokens = self.login()
+
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.status(response.json()['access']).status_code, 200)
+
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(tokens['access']).status_code, 401)
+
+        User.objects.filter(username='rececao').update(is_staff=False)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, 401)
+
+    def test_session_login_does_not_issue_tokens(self):
+        response = self.client.post('/api/admin/login/', {
+            'username': 'rececao', 'password': 'password',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sessionid', response.cookies)
+        self.assertNotIn('access', response.json())
+        self.assertNotIn('refresh', response.json())
+
+    def test_logout_revokes_tokens(self):
+        tokens = self.login()
+
+        response = self.client.post(
+            '/api/admin/logout/', {'refresh': tokens['refresh']},
+            content_type='application/json', HTTP_AUTHORIZATION=f"Bearer {tokens['access']}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.status(tokens['access']).status_code, 401)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        # Outro processo relê a lista de revogação da base de dados
+        _revocations.clear()
+        self.assertEqual(self.status(tokens['access']).status_code, 401)
@@ -0,0 +1,70 @@
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.test import TransactionTestCase
+
+from api.models import Mesa
+from api.writer import WriteCoordinator
+
+
+class WriteCoordinatorTests(TransactionTestCase):
+    """
+    Garante que o coordenador de escritas agrupa as operações pendentes numa única
+    transação e que uma operação que falha não afeta as restantes do lote.
+
+    Usa TransactionTestCase: dentro da transação de um TestCase, writer.run executa as
+    operações diretamente, sem passar pela thread de escrita.
+    """
+
+    def setUp(self):
+        self.coordinator = WriteCoordinator('default')
+        self.release = threading.Event()
+
+    def blocked(self):
+        """Ocupa a thread de escrita até 'release', para que as operações seguintes fiquem em fila."""
+        started = threading.Event()
+
+        def wait():
+            started.set()
+            self.release.wait(5)
+
+        future = self.coordinator.submit(wait)
+        started.wait(5)
+        return future
+
+    def test_pending_operations_share_one_transaction(self):
+        first = self.blocked()
+        futures = [self.coordinator.submit(Mesa.objects.create, lugares=lugares) for lugares in range(2, 7)]
+        self.release.set()
+
+        mesas = [future.result(5) for future in futures]
+        first.result(5)
+
+        self.assertEqual((self.coordinator.batches, self.coordinator.operations), (2, 6))
+        self.assertEqual(sorted(Mesa.objects.values_list('id', flat=True)), [mesa.id for mesa in mesas])
+
+    def test_failed_operation_is_isolated(self):
+        def fail():
+            Mesa.objects.create(lugares=99)
+            raise ValueError('operação inválida')
+
+        first = self.blocked()
+        before = self.coordinator.submit(Mesa.objects.create, lugares=2)
+        failed = self.coordinator.submit(fail)
+        after = self.coordinator.submit(Mesa.objects.create, lugares=4)
+        self.release.set()
+        first.result(5)
+
+        with self.assertRaises(ValueError):
+            failed.result(5)
+        self.assertEqual(before.result(5).lugares, 2)
+        self.assertEqual(after.result(5).lugares, 4)
+        # O savepoint da operação que falhou foi desfeito
+        self.assertEqual(sorted(Mesa.objects.values_list('lugares', flat=True)), [2, 4])
+
+    def test_sqlite_transactions_take_the_write_lock_upfront(self):
+        for alias in settings.DATABASES:
+            if connections[alias].vendor == 'sqlite':
+                with self.subTest(alias=alias):
+                    self.assertEqual(connections[alias].settings_dict['OPTIONS'].get('transaction_mode'), 'IMMEDIATE')
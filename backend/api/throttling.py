@@ -0,0 +1,212 @@
+"""
+throttling.py
+
+Rate limiting da API baseado em token bucket.
+
+Ao contrário do SimpleRateThrottle do DRF, que guarda em cache uma lista crescente de
+timestamps por cliente e a reescreve a cada pedido, cada balde ocupa um estado de tamanho
+constante (tokens disponíveis e instante da última atualização). O custo por pedido é
+O(1), independentemente da taxa configurada.
+
+Os baldes são guardados na cache partilhada pelos workers (ver CACHES em core/settings.py).
+Com Redis, cada pedido atualiza o balde numa única operação atómica (script Lua,
+executado no servidor): dois pedidos simultâneos do mesmo cliente, em processos
+diferentes, nunca consomem o mesmo token. Nos restantes backends, a leitura-modificação-
+escrita é feita sob um bloqueio criado com cache.add (atómico em todos os backends); um
+pedido que encontra o balde bloqueado por outro pedido do mesmo cliente é permitido sem
+esperar (fail open), em vez de ser recusado com tokens disponíveis.
+
+Scopes disponíveis (taxas definidas em REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']):
+    - bookings_write : criação de reservas (endpoint público mais custoso)
+    - public_read    : leituras públicas (listagem de mesas e reservas)
+    - admin          : endpoints de gestão reservados a administradores
+    - login          : tentativas de login (proteção contra força bruta)
+"""
+
+import hashlib
+import math
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils.connection import ConnectionProxy
+from rest_framework.throttling import SimpleRateThrottle
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Duração máxima (segundos) do bloqueio de um balde (expira se o processo que o detém terminar)
+BUCKET_LOCK_SECONDS = 1
+
+# Atualização atómica de um balde no Redis (hash com 'tokens' e 'ts'). Devolve '' se os tokens
+# foram consumidos ou, caso contrário, os segundos até existirem tokens suficientes (texto,
+# porque o Redis converte os números do Lua em inteiros)
+BUCKET_SCRIPT = """
+local capacity, rate, now, cost, ttl = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+if tokens < cost then
+    return tostring((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - cost), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return ''
+"""
+BUCKET_SCRIPT_SHA = hashlib.sha1(BUCKET_SCRIPT.encode()).hexdigest()
+
+# ================================================================================================
+# CLASSE BASE
+# ================================================================================================
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttle de token bucket com estado O(1) por chave.
+
+    A taxa 'N/período' define um balde com capacidade N que é reabastecido de forma
+    contínua a N tokens por período. Cada pedido consome um token; sem tokens
+    disponíveis, o pedido é recusado e wait() indica quando o próximo token fica
+    disponível (enviado pelo DRF no cabeçalho 'Retry-After').
+
+    O estado é guardado na cache como (tokens, timestamp). Com Redis, a atualização é um
+    único script Lua; nos restantes backends é feita sob um bloqueio na cache (chave
+    '<balde>_lock', criada com cache.add), tornando-a atómica entre processos.
+    """
+    cache_format = 'throttle_bucket_%(scope)s_%(ident)s'
+
+    def get_cache_key(self, request, view):
+        """
+        Identifica o cliente: utilizador autenticado ou, em alternativa, o IP de origem.
+
+        Args:
+            request: Pedido DRF atual.
+            view: View que está a ser executada.
+
+        Returns:
+            str: Chave de cache do balde.
+        """
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        """
+        Consome um token do balde do cliente.
+
+        Returns:
+            bool: True se o pedido for permitido, False caso contrário.
+        """
+        if self.rate is None:
+            return True
+
+        # Sub-pedidos de /api/batch/: os tokens já foram consumidos pelo pedido agregado
+        if getattr(request, 'batched', False):
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        return self.consume(self.key, 1)
+
+    def consume(self, key, cost):
+        """
+        Retira 'cost' tokens do balde identificado por 'key', se existirem.
+
+        Sem Redis, se o balde estiver bloqueado por outro pedido simultâneo do mesmo
+        cliente, o pedido é permitido sem consumir tokens: o rate limiting nunca recusa
+        um pedido por contenção, nem o faz esperar.
+
+        Args:
+            key (str): Chave de cache do balde.
+            cost (int): Número de tokens a consumir.
+
+        Returns:
+            bool: True se o pedido é permitido, False se o balde não tem tokens suficientes.
+        """
+        backend = caches[DEFAULT_CACHE_ALIAS] if isinstance(self.cache, ConnectionProxy) else self.cache
+        if isinstance(backend, RedisCache):
+            return self._take_atomic(backend, key, cost)
+
+        lock = f'{key}_lock'
+        if not self.cache.add(lock, True, BUCKET_LOCK_SECONDS):
+            self._wait = None
+            return True
+        try:
+            return self._take(key, cost)
+        finally:
+            self.cache.delete(lock)
+
+    def _take_atomic(self, backend, key, cost):
+        """Reabastece o balde e retira 'cost' tokens numa única operação no Redis."""
+        from redis.exceptions import NoScriptError
+
+        key = backend.make_and_validate_key(key)
+        client = backend._cache.get_client(key, write=True)
+        args = (self.num_requests, self.num_requests / self.duration, self.timer(), cost, math.ceil(self.duration))
+        try:
+            wait = client.evalsha(BUCKET_SCRIPT_SHA, 1, key, *args)
+        except NoScriptError:
+            # Primeira execução neste servidor Redis: o script fica guardado para as seguintes
+            wait = client.eval(BUCKET_SCRIPT, 1, key, *args)
+
+        if isinstance(wait, bytes):
+            wait = wait.decode()
+        self._wait = float(wait) if wait else None
+        return not wait
+
+    def _take(self, key, cost):
+        """Reabastece o balde e retira 'cost' tokens (com o bloqueio do balde obtido)."""
+        capacity = self.num_requests
+        refill_rate = self.num_requests / self.duration
+
+        now = self.timer()
+        tokens, last = self.cache.get(key, (capacity, now))
+
+        # Reabastece os tokens acumulados desde a última atualização
+        tokens = min(capacity, tokens + (now - last) * refill_rate)
+
+        if tokens < cost:
+            self._wait = (cost - tokens) / refill_rate
+            return False
+
+        # O balde fica cheio ao fim de 'duration' segundos, pelo que a entrada pode expirar
+        self.cache.set(key, (tokens - cost, now), self.duration)
+        self._wait = None
+        return True
+
+    def wait(self):
+        """
+        Devolve o número de segundos até existirem tokens suficientes.
+
+        Returns:
+            float | None: Segundos de espera recomendados.
+        """
+        return getattr(self, '_wait', None)
+
+# ================================================================================================
+# SCOPES DA API
+# ================================================================================================
+
+class BookingWriteThrottle(TokenBucketThrottle):
+    """Limite para a criação de reservas."""
+    scope = 'bookings_write'
+
+
+class PublicReadThrottle(TokenBucketThrottle):
+    """Limite para leituras públicas (mesas e reservas)."""
+    scope = 'public_read'
+
+
+class AdminThrottle(TokenBucketThrottle):
+    """Limite para os endpoints de gestão reservados a administradores."""
+    scope = 'admin'
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Limite para tentativas de login (proteção contra força bruta)."""
+    scope = 'login'
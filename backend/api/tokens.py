@@ -0,0 +1,281 @@
+"""
+tokens.py
+
+Autenticação sem estado dos dispositivos dos funcionários (ex.: tablets da receção) com
+tokens assinados (JWT, HS256).
+
+admin_login com "session": false devolve, em vez da sessão, um token de acesso de curta
+duração (TOKEN_ACCESS_SECONDS) e um token de renovação (TOKEN_REFRESH_SECONDS). Os logins
+com sessão (browser) não recebem tokens: o logout da sessão não teria como os revogar. Os pedidos com
+'Authorization: Bearer <token de acesso>' são autenticados apenas pela verificação da
+assinatura e da validade: o utilizador (id, nome, is_staff, is_superuser) vem do próprio
+token, sem ler a sessão nem a tabela de utilizadores, e nada é gravado no pedido.
+
+Os tokens revogados (logout e renovação) ficam registados em RevokedToken até expirarem.
+Cada processo mantém em memória os identificadores revogados, relidos da base de dados no
+máximo a cada TOKEN_REVOCATION_REFRESH segundos: um token revogado noutro processo deixa
+de ser aceite, no máximo, ao fim desse período. A renovação (/api/admin/token/refresh/)
+consulta a base de dados: verifica se o utilizador continua ativo e administrador
+(alterações de permissões aplicam-se, assim, no máximo ao fim da duração de um token de
+acesso), revoga o token usado (um token de renovação só pode ser usado uma vez) e emite
+um novo par.
+
+A autenticação por sessão mantém-se para o browser (painel administrativo e frontend).
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+from . import writer
+from .models import RevokedToken
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Duração (segundos) dos tokens de acesso e de renovação
+TOKEN_ACCESS_SECONDS = getattr(settings, 'TOKEN_ACCESS_SECONDS', 5 * 60)
+TOKEN_REFRESH_SECONDS = getattr(settings, 'TOKEN_REFRESH_SECONDS', 12 * 60 * 60)
+
+# Intervalo máximo (segundos) entre leituras da lista de tokens revogados
+TOKEN_REVOCATION_REFRESH = getattr(settings, 'TOKEN_REVOCATION_REFRESH', 30)
+
+# Algoritmo e chave de assinatura
+TOKEN_ALGORITHM = 'HS256'
+TOKEN_SIGNING_KEY = getattr(settings, 'TOKEN_SIGNING_KEY', settings.SECRET_KEY)
+
+# Tipos de token
+ACCESS, REFRESH = 'access', 'refresh'
+
+# Prefixo do cabeçalho Authorization
+AUTH_HEADER_PREFIX = 'Bearer'
+
+# ================================================================================================
+# EMISSÃO E VERIFICAÇÃO
+# ================================================================================================
+
+def _encode(user, kind, lifetime, now):
+    payload = {
+        'typ': kind,
+        'jti': uuid.uuid4().hex,
+        'sub': str(user.pk),
+        'iat': now,
+        'exp': now + lifetime,
+    }
+    if kind == ACCESS:
+        payload.update(name=user.username, staff=user.is_staff, su=user.is_superuser)
+    return jwt.encode(payload, TOKEN_SIGNING_KEY, algorithm=TOKEN_ALGORITHM)
+
+
+def issue_tokens(user):
+    """
+    Emite um par de tokens (acesso e renovação) para um utilizador.
+
+    Args:
+        user (User): Utilizador autenticado.
+
+    Returns:
+        dict: {"access": str, "refresh": str, "expires_in": int - Duração do token de acesso (segundos)}.
+    """
+    now = int(time.time())
+    return {
+        'access': _encode(user, ACCESS, TOKEN_ACCESS_SECONDS, now),
+        'refresh': _encode(user, REFRESH, TOKEN_REFRESH_SECONDS, now),
+        'expires_in': TOKEN_ACCESS_SECONDS,
+    }
+
+
+def decode_token(token, kind):
+    """
+    Verifica a assinatura, a validade, o tipo e a revogação de um token.
+
+    Args:
+        token (str): Token.
+        kind (str): Tipo esperado (ACCESS ou REFRESH).
+
+    Returns:
+        dict: Conteúdo do token.
+
+    Raises:
+        jwt.InvalidTokenError: Token inválido, expirado, de outro tipo ou revogado.
+    """
+    payload = jwt.decode(token, TOKEN_SIGNING_KEY, algorithms=[TOKEN_ALGORITHM], options={'require': ['exp', 'jti', 'sub']})
+    if payload.get('typ') != kind:
+        raise jwt.InvalidTokenError('Tipo de token inválido.')
+    if _revocations.contains(payload['jti']):
+        raise jwt.InvalidTokenError('Token revogado.')
+    return payload
+
+
+def refresh_tokens(token):
+    """
+    Troca um token de renovação por um novo par de tokens (o token usado é revogado).
+
+    Args:
+        token (str): Token de renovação.
+
+    Returns:
+        dict: Novo par de tokens (ver issue_tokens).
+
+    Raises:
+        jwt.InvalidTokenError: Token inválido ou utilizador que deixou de ser administrador ativo.
+    """
+    payload = decode_token(token, REFRESH)
+    user = User.objects.filter(pk=payload['sub'], is_active=True, is_staff=True).first()
+    if user is None:
+        raise jwt.InvalidTokenError('Utilizador inativo ou sem permissões.')
+    # A revogação é feita pelo coordenador de escritas: se o token já tiver sido usado
+    # (noutro processo ou num pedido simultâneo), apenas a primeira renovação é aceite
+    if not revoke_token(payload):
+        raise jwt.InvalidTokenError('Token revogado.')
+    return issue_tokens(user)
+
+
+def revoke_token(payload):
+    """
+    Revoga um token até ao fim da sua validade (os registos de tokens já expirados são removidos).
+
+    Args:
+        payload (dict): Conteúdo do token (ver decode_token).
+
+    Returns:
+        bool: True se o token ainda não estava revogado.
+    """
+    expires_at = datetime.fromtimestamp(payload['exp'], tz=dt_timezone.utc)
+
+    def revoke():
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        return RevokedToken.objects.get_or_create(jti=payload['jti'], defaults={'expires_at': expires_at})[1]
+
+    created = writer.run(revoke, using='default')
+    _revocations.add(payload['jti'])
+    return created
+
+# ================================================================================================
+# LISTA DE REVOGAÇÃO
+# ================================================================================================
+
+class RevocationList:
+    """
+    Identificadores dos tokens revogados ainda válidos, em memória e relidos periodicamente.
+    """
+
+    def __init__(self, refresh=TOKEN_REVOCATION_REFRESH):
+        self.refresh = refresh
+        self._jtis = frozenset()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def contains(self, jti):
+        """Indica se o token foi revogado (relê a lista se tiver mais de 'refresh' segundos)."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh:
+            self.load()
+        return jti in self._jtis
+
+    def load(self):
+        """Lê os identificadores dos tokens revogados ainda válidos (uma query)."""
+        jtis = frozenset(
+            RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+        )
+        with self._lock:
+            self._jtis = jtis
+            self._loaded_at = time.monotonic()
+
+    def add(self, jti):
+        """Acrescenta um token revogado neste processo (sem esperar pela próxima leitura)."""
+        with self._lock:
+            self._jtis = self._jtis | {jti}
+
+    def clear(self):
+        """Esquece a lista (é relida no próximo pedido)."""
+        with self._lock:
+            self._jtis = frozenset()
+            self._loaded_at = None
+
+
+_revocations = RevocationList()
+
+# ================================================================================================
+# AUTENTICAÇÃO
+# ================================================================================================
+
+class TokenUser:
+    """
+    Utilizador autenticado por um token de acesso (sem acesso à base de dados).
+
+    Expõe os atributos usados pelas permissões, rate limiting e idempotência.
+    """
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, payload):
+        self.pk = self.id = int(payload['sub'])
+        self.username = payload.get('name', '')
+        self.is_staff = bool(payload.get('staff'))
+        self.is_superuser = bool(payload.get('su'))
+
+    def __str__(self):
+        return self.username
+
+    def get_username(self):
+        return self.username
+
+
+def bearer_token(request):
+    """Token do cabeçalho 'Authorization: Bearer <token>', ou None."""
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0] == AUTH_HEADER_PREFIX:
+        return header[1]
+    return None
+
+
+class StaffTokenAuthentication(BaseAuthentication):
+    """
+    Autenticação do DRF pelos tokens de acesso (cabeçalho 'Authorization: Bearer <token>').
+
+    Pedidos sem o cabeçalho seguem para as restantes autenticações (sessão).
+    """
+
+    def authenticate(self, request):
+        token = bearer_token(request)
+        if token is None:
+            return None
+        try:
+            payload = decode_token(token, ACCESS)
+        except jwt.InvalidTokenError:
+            raise exceptions.AuthenticationFailed('Token inválido ou expirado.')
+        return TokenUser(payload), payload
+
+    def authenticate_header(self, request):
+        # Apenas os pedidos com token recebem 401 (token expirado: renovar); os restantes mantêm 403
+        return AUTH_HEADER_PREFIX if bearer_token(request) else None
+
+
+def token_user(request):
+    """
+    Utilizador de um pedido com token de acesso válido, fora das views do DRF (ex.: middleware).
+
+    Args:
+        request (HttpRequest): Pedido.
+
+    Returns:
+        TokenUser | None: Utilizador do token, ou None sem token válido.
+    """
+    token = bearer_token(request)
+    if token is None:
+        return None
+    try:
+        return TokenUser(decode_token(token, ACCESS))
+    except jwt.InvalidTokenError:
+        return None
@@ -10,12 +10,23 @@ Estrutura de endpoints:
     - /admin/login/                             : Login de administradores
     - /admin/logout/                            : Logout de administradores
     - /admin/status/                            : Status da sessão do admin
+    - /admin/token/refresh/                     : Renovação dos tokens de acesso (dispositivos dos funcionários)
     - /bookings/create/                         : Criação de reservas
     - /bookings/list/                           : Listagem de reservas
     - /bookings/cancel/<booking_id>/            : Cancelamento de reservas
+    - /bookings/bulk/cancel/                    : Cancelamento de reservas em massa
+    - /bookings/bulk/move/                      : Mudança de mesa de reservas em massa
     - /mesas/create/                            : Criação de mesas
     - /mesas/list/                              : Listagem de mesas
     - /mesas/delete/<mesa_id>/                  : Remoção de mesas
+    - /availability/?date=<YYYY-MM-DD>          : Horários disponíveis para reserva numa data
+    - /locations/                               : Listagem dos locais (cafés)
+    - /changes/?since=<seq>                     : Alterações desde um número de sequência (sincronização incremental)
+    - /profiles/                                : Perfis de pedidos gravados (X-Profile)
+    - /profiles/<id>/<tipo>/                    : Ficheiro de um perfil (folded, prof, alloc)
+    - /slow-queries/                            : Resumo das queries lentas (DJANGO_SLOW_QUERIES)
+    - /batch/                                   : Vários pedidos à API num único pedido
+    - /stream/                                  : Eventos em tempo real (Server-Sent Events, ASGI)
 """
 
 from django.urls import path
@@ -33,13 +44,23 @@ urlpatterns = [
     path('admin/login/', views.admin_login, name='admin_login'),
     path('admin/logout/', views.admin_logout, name='admin_logout'),
     path('admin/status/', views.admin_status, name='admin_status'),
+    path('admin/token/refresh/', views.token_refresh, name='token_refresh'),
 
     # -------------------------------------------------------------------------
     # Gestão de Reservas (Bookings)
     # -------------------------------------------------------------------------
     path('bookings/create/', views.create_booking, name='booking_create'),
     path('bookings/list/', views.view_bookings, name='booking_list'),
+    path('bookings/search/', views.search_bookings, name='booking_search'),
     path('bookings/cancel/<int:booking_id>/', views.cancel_booking, name='booking_cancel'),
+    path('bookings/bulk/cancel/', views.bulk_cancel_bookings, name='booking_bulk_cancel'),
+    path('bookings/bulk/move/', views.bulk_move_bookings, name='booking_bulk_move'),
+
+    # -------------------------------------------------------------------------
+    # Horários Guardados (Holds)
+    # -------------------------------------------------------------------------
+    path('holds/', views.create_hold, name='hold_create'),
+    path('holds/<str:hold>/', views.cancel_hold, name='hold_cancel'),
 
     # -------------------------------------------------------------------------
     # Gestão de Mesas
@@ -47,4 +68,36 @@ urlpatterns = [
     path('mesas/create/', views.create_mesa, name='mesa_create'),
     path('mesas/list/', views.list_mesas, name='mesa_list'),
     path('mesas/delete/<int:mesa_id>/', views.delete_mesa, name='mesa_delete'),
-]
+
+    # -------------------------------------------------------------------------
+    # Disponibilidade
+    # -------------------------------------------------------------------------
+    path('availability/', views.list_availability, name='availability'),
+
+    # -------------------------------------------------------------------------
+    # Locais
+    # -------------------------------------------------------------------------
+    path('locations/', views.list_locations, name='location_list'),
+
+    # -------------------------------------------------------------------------
+    # Sincronização
+    # -------------------------------------------------------------------------
+    path('changes/', views.list_changes, name='changes'),
+
+    # -------------------------------------------------------------------------
+    # Diagnóstico
+    # -------------------------------------------------------------------------
+    path('profiles/', views.list_profiles, name='profile_list'),
+    path('profiles/<str:profile_id>/<str:kind>/', views.download_profile, name='profile_download'),
+    path('slow-queries/', views.slow_queries, name='slow_queries'),
+
+    # -------------------------------------------------------------------------
+    # Pedidos Agregados
+    # -------------------------------------------------------------------------
+    path('batch/', views.batch, name='batch'),
+
+    # -------------------------------------------------------------------------
+    # Tempo Real
+    # -------------------------------------------------------------------------
+    path('stream/', views.stream, name='stream'),
+]
\ No newline at end of file
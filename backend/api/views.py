@@ -12,29 +12,90 @@ from rest_framework.decorators import api_view, permission_classes, throttle_cla
 from rest_framework.permissions import AllowAny, IsAdminUser # Permissões de acesso
 from rest_framework.response import Response # Respostas HTTP
 from rest_framework import status # Códigos de status HTTP
-from .models import Booking as BookingTable, Mesa as MesaTable # Bases de dados
+from .models import Booking as BookingTable, ChangeSequence, Mesa as MesaTable, Tombstone # Bases de dados
+from .changes import collect_changes, prune_tombstones, record_deletions, record_mesa_deletions # Registo incremental de alterações
+from .idempotency import idempotent # Suporte ao cabeçalho Idempotency-Key
+from . import writer # Coordenador de escritas (group commit)
+from . import batch as batch_requests # Pedidos agregados (/api/batch/)
+from .bulk import BulkMoveError, bulk_cancel, bulk_move, filter_bookings, recompute_mesa_occupancy # Operações em massa
+from .locations import LOCATIONS, location_database # Locais (cafés) configurados
+from .allocation import MAX_JOINED_TABLES, RESERVATION_DURATION, SLOT_MINUTES, candidate_tables, exceeds_joined_limit, find_table, find_table_group, split_guests # Regras de alocação de mesas
+from .suggestions import free_slots, get_adjacency, get_occupancy, joinable_groups, suggest_slots # Horários livres mais próximos (reservas recusadas)
+from .search import ranked_booking_ids, search_terms # Pesquisa de reservas por nome ou telefone (índice de texto)
+from .holds import HOLD_SECONDS, held_intervals, place_hold, release_hold, with_holds # Horários guardados temporariamente (holds)
+from .recurrence import extend_recurrences, prune_expired_recurrences, recurring_intervals, with_recurrences # Reservas recorrentes (criadas para as próximas semanas)
+from .slots import bookable_slots, get_calendar, is_bookable # Calendário de horários reserváveis (horário e encerramentos)
+from .events import booking_event_data, broker, publish, EVENTS_MAX_SUBSCRIBERS, HEARTBEAT # Eventos em tempo real (SSE)
+from .profiling import list_profiles as stored_profiles, profile_file # Perfis de pedidos (X-Profile)
+from .slowqueries import SLOW_QUERY_ENABLED, SLOW_QUERY_THRESHOLD_MS, summarise_slow_queries # Registo das queries lentas (DJANGO_SLOW_QUERIES)
+from .tokens import REFRESH, decode_token, issue_tokens, refresh_tokens, revoke_token # Tokens assinados dos dispositivos dos funcionários
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse # Respostas HTTP (endpoints Django não-DRF)
+from django.core.handlers.asgi import ASGIRequest # Pedidos servidos pela aplicação ASGI (/api/stream/)
 from django.contrib.auth import authenticate, login, logout # Autenticação de usuários
+from django.db import transaction # Reservas em mesas juntas (gravadas numa única transação)
+from django.db.models import Q # Filtro das reservas expiradas
+from collections import defaultdict # Agrupamento das reservas por mesa
+from contextvars import ContextVar # Limpeza de reservas expiradas uma única vez por pedido agregado
 from datetime import datetime, timedelta # Manipulação de datas e horas 
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle # API Rate Limiting
+from .throttling import AdminThrottle, BookingWriteThrottle, LoginThrottle, PublicReadThrottle # API Rate Limiting (token bucket)
 import re # Regex para validação de input
+import uuid # Identificador dos grupos em mesas juntas
+import time # Validade restante dos tokens de acesso
+import jwt # Erros de verificação dos tokens (PyJWT)
 
 # ================================================================================================
 # CONSTANTES DE CONFIGURAÇÃO
 # ================================================================================================
 
-# Duração padrão de cada reserva (1 hora e 15 minutos)
-RESERVATION_DURATION = timedelta(hours=1, minutes=15)
+# Duração padrão de cada reserva (RESERVATION_DURATION): ver api/allocation.py
+# Horário de funcionamento e encerramentos: configurados no painel administrativo (ver api/slots.py)
 
 # Período após o qual reservas passadas são consideradas expiradas e removidas do sistema
 BOOKING_EXPIERY_DAYS = 16
 
+# Número de resultados por página da pesquisa de reservas
+SEARCH_PAGE_SIZE = 20
+
+# Tentativas de guardar um horário quando outro pedido guarda a mesma mesa em simultâneo
+HOLD_ATTEMPTS = 3
+
+# Número máximo de instruções no resumo das queries lentas
+SLOW_QUERY_SUMMARY_MAX = 100
+
+# Dentro de um pedido agregado (/api/batch/), a limpeza de reservas expiradas já foi feita
+_expired_objects_updated = ContextVar("expired_objects_updated", default=False)
+
+# Campos disponíveis nas listagens (nome na resposta -> coluna na base de dados)
+BOOKING_ADMIN_FIELDS = {
+    "id": "id",
+    "mesa": "mesa_id",
+    "name": "name",
+    "phone": "phone",
+    "date": "date",
+    "start_time": "start_time",
+    "end_time": "end_time",
+    "number_of_guests": "number_of_guests",
+    "notes": "notes",
+}
+BOOKING_PUBLIC_FIELDS = {
+    "mesa": "mesa_id",
+    "date": "date",
+    "end_time": "end_time",
+}
+MESA_FIELDS = {
+    "id_mesa": "id",
+    "lugares": "lugares",
+    "existe_reserva": "existe_reserva",
+}
+
 # ================================================================================================
 # ENDPOINTS - GESTÃO DE RESERVAS (BOOKINGS)
 # ================================================================================================
 
 @api_view(['POST'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([BookingWriteThrottle])
 @permission_classes([AllowAny])
+@idempotent
 def create_booking(request):
     """
     Cria uma nova reserva no sistema.
@@ -49,6 +110,9 @@ def create_booking(request):
     Permissions:
         AllowAny - Endpoint público, não requer autenticação.
     
+    Headers:
+        Idempotency-Key (opcional): Repetições com a mesma chave devolvem a resposta original.
+    
     Request Body (JSON):
         {
             "name": str - Nome completo do cliente (obrigatório),
@@ -56,20 +120,37 @@ def create_booking(request):
             "date": str - Data da reserva no formato "YYYY-MM-DD" (obrigatório),
             "time": str - Horário de início no formato "HH:MM" (obrigatório),
             "number_of_guests": str|int - Número de convidados (obrigatório),
-            "notes": str - Observações adicionais (opcional)
+            "notes": str - Observações adicionais (opcional),
+            "hold": str - Código devolvido por create_hold (opcional)
         }
     
     Returns:
         Response:
             - 201 CREATED: Reserva criada com sucesso
+                Em mesas juntas, inclui as mesas reservadas: {"detail": str, "mesas": [int]}
             - 400 BAD REQUEST: Parâmetros inválidos, conflito de horário ou mesa indisponível
+                Sem mesa disponível, inclui os horários livres mais próximos para o mesmo grupo:
+                {
+                    "detail": str,
+                    "suggestions": {
+                        "earlier": [str] - Horários "HH:MM" anteriores, na mesma data,
+                        "later": [str] - Horários "HH:MM" posteriores, na mesma data,
+                        "next_days": [{"date": str, "slots": [str]}] - Datas seguintes com mesa livre
+                    }
+                }
             - 500 INTERNAL SERVER ERROR: Erro ao salvar a reserva no banco de dados
     
     Rules:
         - Não permite reservas em datas/horários passados
+        - Apenas dentro do horário de funcionamento e fora dos encerramentos (configurados no painel)
         - Reservas têm duração fixa de 1h15min
         - Sistema seleciona automaticamente a mesa mais adequada
-        - Detecta e previne conflitos de horário entre reservas
+        - Sem mesa com lugares suficientes livre, junta o menor conjunto de mesas juntáveis
+          e adjacentes livres (uma reserva por mesa, criadas na mesma transação)
+        - Detecta e previne conflitos de horário entre reservas (incluindo reservas recorrentes)
+        - Mesas guardadas por outros pedidos (holds) são tratadas como ocupadas; o hold do
+          próprio pedido ('hold') é ignorado na verificação e libertado após a reserva
+        - Sem mesa disponível, sugere os horários livres mais próximos
     """
     
     # -------------------------------------------------------------------------
@@ -103,6 +184,7 @@ def create_booking(request):
         raw_phone = request.data.get("phone", "")
         number_of_guests = int(request.data.get("number_of_guests"))
         notes = request.data.get("notes", "").strip() if request.data.get("notes") else ""
+        hold = str(request.data.get("hold") or "")
     except (ValueError, TypeError, AttributeError):
         return Response(
             {"detail": "Requisição inválida. Verifique o formato da data (YYYY-MM-DD) e hora (HH:MM)."}, 
@@ -167,10 +249,10 @@ def create_booking(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Valida horário de funcionamento (08:30 às 00:30, exceto domingos)
-    if datetime.strptime("00:30", "%H:%M").time() < horario_reserva.time() < datetime.strptime("08:30", "%H:%M").time() or horario_reserva.date().weekday() == 6:
+    # Valida horário de funcionamento e encerramentos (consulta ao calendário em cache)
+    if not is_bookable(horario_reserva):
         return Response(
-            {"detail": "Horário inválido. O horário de funcionamento do café é todos os dias menos domingo, das 08:30 às 00:30."}, 
+            {"detail": "Horário inválido. O café não aceita reservas na data e hora solicitadas (fora do horário de funcionamento ou encerrado)."}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
@@ -186,111 +268,213 @@ def create_booking(request):
     # -------------------------------------------------------------------------
     # Define início e término com base na duração padrão (1h15min)
     end_time = horario_reserva + RESERVATION_DURATION
+
+    # Garante que as reservas recorrentes da janela já existem, para que entrem na
+    # verificação de conflitos (para datas posteriores, ver _find_tables)
+    extend_recurrences()
     
     # -------------------------------------------------------------------------
-    # FASE 5: Verificação de duplicidade de reserva
+    # FASES 5 a 10: Escrita (executada pelo coordenador de escritas)
     # -------------------------------------------------------------------------
-    # Impede a duplicidade de reservas para o mesmo telefone na mesma data e horário
-    reservas_existentes = BookingTable.objects.filter(date=date)
+    # A verificação de disponibilidade e a criação da reserva são executadas em série com
+    # as restantes escritas da base de dados e confirmadas em grupo (ver api/writer.py)
+    def reserve():
+        # -------------------------------------------------------------------------
+        # FASE 5: Verificação de duplicidade de reserva
+        # -------------------------------------------------------------------------
+        # Impede a duplicidade de reservas para o mesmo telefone na mesma data e horário
+        reservas_existentes = BookingTable.objects.filter(date=date)
+
+        if reservas_existentes.filter(phone=phone, start_time=time).exists():
+            return Response(
+                {"detail": "Já existe uma reserva registrada para este telefone na data solicitada e horário."}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # -------------------------------------------------------------------------
+        # FASES 6 e 7: Busca de mesa disponível e verificação de conflitos de horário
+        # -------------------------------------------------------------------------
+        # Escolhe, em memória, a mesa livre mais adequada ou, sem nenhuma, o menor conjunto
+        # de mesas juntáveis livres (ver _find_tables)
+        mesas, mesa_id, mesas_juntas = _find_tables(horario_reserva, end_time, number_of_guests, hold)
+        mesa_adequada = mesas.get(mesa_id)
+
+        # Sem mesa disponível: a resposta (com sugestões) é preparada fora do coordenador de escritas
+        if not mesa_adequada and not mesas_juntas:
+            return None
+
+        # -------------------------------------------------------------------------
+        # FASE 8: Criação da reserva
+        # -------------------------------------------------------------------------
+        # Prepara os dados da nova reserva
+        booking_data = {
+            "mesa": mesa_adequada,
+            "name": name,
+            "phone": phone,
+            "date": date,
+            "start_time": time,
+            "end_time": end_time.time(),
+            "number_of_guests": number_of_guests,
+            "notes": request.data.get("notes", "")
+        }
+
+        # Mesas juntas: uma reserva por mesa, gravadas e confirmadas em conjunto
+        if mesas_juntas:
+            return _create_joined_booking(mesas_juntas, mesas, booking_data)
+
+        # Persiste a reserva no banco de dados com tratamento de exceções
+        try:
+            new_booking = BookingTable.objects.create(**booking_data)
+        except Exception as e:
+            return Response(
+                {"detail": f"Erro ao criar reserva no banco de dados: {str(e)}"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        # -------------------------------------------------------------------------
+        # FASE 9: Limpeza de reservas expiradas e atualização do status das mesas
+        # -------------------------------------------------------------------------
+        # Limpa reservas expiradas e atualiza o status das mesas
+        update_expired_objects()
+
+        # -------------------------------------------------------------------------
+        # FASE 10: Atualização do status da mesa
+        # -------------------------------------------------------------------------
+        # Marca a mesa como tendo reservas ativas
+        mesa_adequada.existe_reserva = True
+        mesa_adequada.save()
+
+        # Notifica as ligações em tempo real
+        publish("booking.created", **booking_event_data(new_booking))
 
-    if reservas_existentes.filter(phone=phone, start_time=time).exists():
         return Response(
-            {"detail": "Já existe uma reserva registrada para este telefone na data solicitada e horário."}, 
-            status=status.HTTP_400_BAD_REQUEST
+            {"detail": "Reserva criada com sucesso."}, 
+            status=status.HTTP_201_CREATED
         )
 
-    # -------------------------------------------------------------------------
-    # FASE 6: Busca de mesa disponível
-    # -------------------------------------------------------------------------
-    # Procura mesas com capacidade adequada, priorizando match exato
-    mesas_disponiveis = []
-    
-    # Prioridade 1: Mesa com capacidade exata
-    if MesaTable.objects.filter(lugares=number_of_guests).exists():
-        mesas_disponiveis = MesaTable.objects.filter(lugares=number_of_guests)
-    else:
-        # Prioridade 2: Mesa com capacidade maior que a necessária
-        mesas_disponiveis = MesaTable.objects.filter(lugares__gte=number_of_guests)
+    response = writer.run(reserve)
+    if response is not None:
+        # O horário guardado pelo cliente deixa de ser necessário
+        if hold and response.status_code == status.HTTP_201_CREATED:
+            release_hold(hold)
+        return response
 
     # -------------------------------------------------------------------------
-    # FASE 7: Verificação de conflitos de horário
+    # FASE 11: Sugestão de horários alternativos
     # -------------------------------------------------------------------------
-    # Itera sobre mesas candidatas para encontrar uma sem conflitos
-    mesa_adequada = None
+    # Horários livres mais próximos para o mesmo número de convidados (ver api/suggestions.py)
+    return _no_table_response(horario_reserva, number_of_guests)
+
+
+@api_view(['POST'])
+@throttle_classes([BookingWriteThrottle])
+@permission_classes([AllowAny])
+@idempotent
+def create_hold(request):
+    """
+    Guarda temporariamente uma mesa para uma reserva (hold), enquanto o cliente preenche o formulário.
     
-    for mesa in mesas_disponiveis:
-        # Obtém todas as reservas existentes para esta mesa na data solicitada
-        reservas_mesa = reservas_existentes.filter(mesa=mesa)
-        conflito_encontrado = False
-        
-        # Verifica sobreposição de horários com cada reserva existente
-        for reserva in reservas_mesa:
-            reserva_start = datetime.combine(reserva.date, reserva.start_time)
-            reserva_end = datetime.combine(reserva.date, reserva.end_time)
-            
-            # Detecta sobreposição: nova reserva começa antes do fim da existente
-            # E termina depois do início da existente
-            if horario_reserva < reserva_end and end_time > reserva_start:
-                conflito_encontrado = True
-                break
-        
-        # Se não houver conflito, esta mesa pode ser utilizada
-        if not conflito_encontrado:
-            mesa_adequada = mesa
-            break
+    A mesa (ou conjunto de mesas juntas) é escolhida como em create_booking e fica
+    guardada durante HOLD_SECONDS segundos, na cache e sem escrever na base de dados (ver
+    api/holds.py): outros pedidos de reserva, a disponibilidade e as sugestões de horários
+    tratam-na como ocupada. O hold expira sozinho; é libertado pela reserva que apresenta
+    o código devolvido ou por cancel_hold.
+    
+    Permissions:
+        AllowAny - Endpoint público, não requer autenticação.
+    
+    Request Body (JSON):
+        {
+            "date": str - Data da reserva no formato "YYYY-MM-DD" (obrigatório),
+            "time": str - Horário de início no formato "HH:MM" (obrigatório),
+            "number_of_guests": str|int - Número de convidados (obrigatório)
+        }
+    
+    Returns:
+        Response:
+            - 201 CREATED: {"hold": str - Código a enviar em create_booking, "expires_in": int - Segundos}
+            - 400 BAD REQUEST: Parâmetros inválidos ou mesa indisponível (com "suggestions",
+              como em create_booking)
+            - 409 CONFLICT: Mesas guardadas em simultâneo por outros pedidos (pode ser repetido)
+    """
+    try:
+        date = datetime.strptime(request.data.get("date"), "%Y-%m-%d").date()
+        time = datetime.strptime(request.data.get("time"), "%H:%M").time()
+        number_of_guests = int(request.data.get("number_of_guests"))
+    except (ValueError, TypeError):
+        return Response(
+            {"detail": "Requisição inválida. Verifique a data (YYYY-MM-DD), a hora (HH:MM) e o número de convidados."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    # Retorna erro se nenhuma mesa disponível foi encontrada
-    if not mesa_adequada:
+    horario_reserva = datetime.combine(date, time)
+    if horario_reserva < datetime.now():
         return Response(
-            {"detail": "Não há mesas disponíveis para o horário e capacidade solicitados."}, 
+            {"detail": "Data e horário inválidos. Não é possível criar reservas no passado."}, 
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # -------------------------------------------------------------------------
-    # FASE 8: Criação da reserva
-    # -------------------------------------------------------------------------
-    # Prepara os dados da nova reserva
-    booking_data = {
-        "mesa": mesa_adequada,
-        "name": name,
-        "phone": phone,
-        "date": date,
-        "start_time": time,
-        "end_time": end_time.time(),
-        "number_of_guests": number_of_guests,
-        "notes": request.data.get("notes", "")
-    }
+    if not is_bookable(horario_reserva):
+        return Response(
+            {"detail": "Horário inválido. O café não aceita reservas na data e hora solicitadas (fora do horário de funcionamento ou encerrado)."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    # Persiste a reserva no banco de dados com tratamento de exceções
-    try:
-        BookingTable.objects.create(**booking_data)
-    except Exception as e:
+    if number_of_guests < 1:
         return Response(
-            {"detail": f"Erro ao criar reserva no banco de dados: {str(e)}"}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {"detail": "Número de convidados inválido. Deve ser no mínimo 1."}, 
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-    # -------------------------------------------------------------------------
-    # FASE 9: Limpeza de reservas expiradas e atualização do status das mesas
-    # -------------------------------------------------------------------------
-    # Limpa reservas expiradas e atualiza o status das mesas
-    update_expired_objects()
+    end_time = horario_reserva + RESERVATION_DURATION
+    extend_recurrences()
 
-    # -------------------------------------------------------------------------
-    # FASE 10: Atualização do status da mesa
-    # -------------------------------------------------------------------------
-    # Marca a mesa como tendo reservas ativas
-    mesa_adequada.existe_reserva = True
-    mesa_adequada.save()
+    # Se outro pedido guardar a mesma mesa entre a escolha e o hold, a escolha é repetida
+    # (a mesa passa a constar dos holds lidos por _find_tables)
+    for _ in range(HOLD_ATTEMPTS):
+        _, mesa_id, mesas_juntas = _find_tables(horario_reserva, end_time, number_of_guests)
+        if not mesa_id and not mesas_juntas:
+            return _no_table_response(horario_reserva, number_of_guests)
+
+        hold = place_hold(horario_reserva, mesas_juntas or (mesa_id,), end_time)
+        if hold:
+            return Response(
+                {"hold": hold, "expires_in": HOLD_SECONDS}, 
+                status=status.HTTP_201_CREATED
+            )
 
     return Response(
-        {"detail": "Reserva criada com sucesso."}, 
-        status=status.HTTP_201_CREATED
+        {"detail": "O horário está a ser reservado por outros clientes. Tente novamente."}, 
+        status=status.HTTP_409_CONFLICT
     )
 
 
+@api_view(['DELETE'])
+@throttle_classes([BookingWriteThrottle])
+@permission_classes([AllowAny])
+def cancel_hold(request, hold):
+    """
+    Liberta um horário guardado por create_hold antes de expirar (ex.: formulário fechado).
+    
+    Permissions:
+        AllowAny - Endpoint público; o código do hold identifica o pedido.
+    
+    Returns:
+        Response:
+            - 204 NO CONTENT: Hold libertado
+            - 404 NOT FOUND: Hold inexistente ou já expirado
+    """
+    if not release_hold(hold):
+        return Response(
+            {"detail": "Hold não encontrado ou expirado."}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @api_view(['GET'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([PublicReadThrottle])
 @permission_classes([AllowAny])
 def view_bookings(request):
     """
@@ -303,6 +487,10 @@ def view_bookings(request):
     Permissions:
         AllowAny - Endpoint acessível publicamente, mas com dados limitados para não-admins.
     
+    Query Parameters:
+        fields (str, opcional): Lista de campos separados por vírgulas (ex.: "?fields=mesa,date").
+            Apenas as colunas pedidas são lidas da base de dados.
+    
     Returns:
         Response (200 OK):
             Para administradores (autenticados com is_staff=True):
@@ -330,37 +518,27 @@ def view_bookings(request):
                         "end_time": str
                     }
                 ]
+            
+            Campos desconhecidos em 'fields' resultam em 400 BAD REQUEST.
     """
     
     user = request.user
-    bookings_data = []
 
     # Administradores têm acesso completo a todas as reservas
     if user.is_authenticated and user.is_staff:
         bookings = BookingTable.objects.all()
-        
-        for booking in bookings:
-            bookings_data.append({
-                "id": booking.id,
-                "mesa": booking.mesa.id,
-                "name": booking.name,
-                "phone": booking.phone,
-                "date": booking.date,
-                "start_time": booking.start_time,
-                "end_time": booking.end_time,
-                "number_of_guests": booking.number_of_guests,
-                "notes": booking.notes
-            })
+        allowed_fields = BOOKING_ADMIN_FIELDS
     else:
         # Usuários públicos visualizam apenas informações básicas de mesas ocupadas
         bookings = BookingTable.objects.filter(mesa__existe_reserva=True)
-        
-        for booking in bookings:
-            bookings_data.append({
-                "mesa": booking.mesa.id,
-                "date": booking.date,
-                "end_time": booking.end_time
-            })
+        allowed_fields = BOOKING_PUBLIC_FIELDS
+
+    fields, error = _parse_fields(request, allowed_fields)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Projeção apenas das colunas pedidas (sem instâncias do modelo nem JOIN para obter a mesa)
+    bookings_data = _project(bookings, fields, allowed_fields)
     
     # Limpa reservas expiradas e atualiza o status das mesas
     update_expired_objects()
@@ -368,15 +546,88 @@ def view_bookings(request):
     return Response(bookings_data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+def search_bookings(request):
+    """
+    Pesquisa reservas por nome ou telefone do cliente, por ordem de relevância.
+    
+    A pesquisa usa o índice de texto das reservas (ver api/search.py): ignora maiúsculas
+    e acentos, e cada palavra pesquisada é o início de uma palavra do nome ou do telefone
+    (ex.: "joao silv" encontra "João da Silva"; "912 34" encontra "912345678"). O custo
+    não depende do número de reservas.
+    
+    Permissions:
+        IsAdminUser - Apenas administradores (dados pessoais).
+    
+    Query Parameters:
+        q (str): Texto pesquisado (obrigatório).
+        page (int, opcional): Página (por defeito, 1), com SEARCH_PAGE_SIZE resultados.
+        fields (str, opcional): Campos devolvidos, como em view_bookings.
+    
+    Returns:
+        Response:
+            - 200 OK:
+                {
+                    "results": [dict] - Reservas, da mais para a menos relevante,
+                    "page": int,
+                    "next": int | null - Página seguinte, se existir
+                }
+            - 400 BAD REQUEST: Pesquisa vazia, página ou campos inválidos
+    """
+    query = request.query_params.get("q", "")
+    if not search_terms(query):
+        return Response(
+            {"detail": "Pesquisa inválida. Indique parte do nome ou do telefone do cliente."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        page = int(request.query_params.get("page", 1))
+        if page < 1:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {"detail": "Página inválida. Deve ser um inteiro positivo."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    fields, error = _parse_fields(request, BOOKING_ADMIN_FIELDS)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    bookings = BookingTable.objects.all()
+    # Mais um resultado do que a página, para saber se existe uma página seguinte (sem COUNT)
+    ids = ranked_booking_ids(bookings, query, SEARCH_PAGE_SIZE + 1, (page - 1) * SEARCH_PAGE_SIZE)
+
+    # Reservas da página, lidas por id (apenas as colunas pedidas) e devolvidas pela ordem de relevância
+    rows = {
+        row[0]: dict(zip(fields, row[1:]))
+        for row in bookings.filter(pk__in=ids[:SEARCH_PAGE_SIZE]).values_list("id", *(BOOKING_ADMIN_FIELDS[field] for field in fields))
+    }
+
+    return Response(
+        {
+            "results": [rows[booking_id] for booking_id in ids[:SEARCH_PAGE_SIZE] if booking_id in rows],
+            "page": page,
+            "next": page + 1 if len(ids) > SEARCH_PAGE_SIZE else None,
+        }, 
+        status=status.HTTP_200_OK
+    )
+
+
 @api_view(['DELETE'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([AdminThrottle])
 @permission_classes([IsAdminUser])
+@idempotent
 def cancel_booking(request, booking_id):
     """
     Cancela uma reserva existente no sistema.
     
     Remove a reserva especificada e atualiza o status da mesa caso não haja
-    outras reservas associadas a ela.
+    outras reservas associadas a ela. Uma reserva em mesas juntas é cancelada em
+    todas as mesas do grupo.
     
     Permissions:
         IsAdminUser - Apenas administradores autenticados podem cancelar reservas.
@@ -402,30 +653,139 @@ def cancel_booking(request, booking_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Busca a reserva no banco de dados
-    try:
-        booking = BookingTable.objects.get(id=booking_id)
-    except BookingTable.DoesNotExist:
+    # Escrita executada pelo coordenador de escritas (ver api/writer.py)
+    def cancel():
+        # Busca a reserva no banco de dados
+        try:
+            booking = BookingTable.objects.get(id=booking_id)
+        except BookingTable.DoesNotExist:
+            return Response(
+                {'detail': 'Reserva não encontrada no sistema.'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Reserva em mesas juntas: cancela as reservas de todas as mesas do grupo
+        if booking.party:
+            bulk_cancel(BookingTable.objects.filter(party=booking.party))
+            update_expired_objects()
+            return Response(
+                {'detail': 'Reserva cancelada com sucesso.'}, 
+                status=status.HTTP_204_NO_CONTENT
+            )
+
+        # Verifica se esta é a única reserva da mesa
+        # Se sim, marca a mesa como disponível
+        if BookingTable.objects.filter(mesa=booking.mesa).count() == 1:
+            booking.mesa.existe_reserva = False
+            booking.mesa.save()
+    
+        # Remove a reserva do sistema (deixando um tombstone para os clientes sincronizados)
+        booking.delete()
+        record_deletions(Tombstone.BOOKING, [booking_id])
+        publish("booking.cancelled", **booking_event_data(booking))
+    
+        # Limpa reservas expiradas e atualiza o status das mesas
+        update_expired_objects()
+
         return Response(
-            {'detail': 'Reserva não encontrada no sistema.'}, 
-            status=status.HTTP_404_NOT_FOUND
+            {'detail': 'Reserva cancelada com sucesso.'}, 
+            status=status.HTTP_204_NO_CONTENT
         )
 
-    # Verifica se esta é a única reserva da mesa
-    # Se sim, marca a mesa como disponível
-    if BookingTable.objects.filter(mesa=booking.mesa).count() == 1:
-        booking.mesa.existe_reserva = False
-        booking.mesa.save()
+    return writer.run(cancel)
+
+
+@api_view(['POST'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+@idempotent
+def bulk_cancel_bookings(request):
+    """
+    Cancela em massa as reservas que correspondem aos critérios indicados.
     
-    # Remove a reserva do sistema
-    booking.delete()
+    Todas as reservas selecionadas são removidas com um único DELETE numa transação,
+    seguido de um único recálculo do estado das mesas afetadas.
     
-    # Limpa reservas expiradas e atualiza o status das mesas
-    update_expired_objects()
+    Permissions:
+        IsAdminUser - Apenas administradores autenticados podem cancelar reservas.
+    
+    Request Body (JSON):
+        {
+            "ids": list[int] - Identificadores das reservas (opcional),
+            "date_from": str - Data inicial "YYYY-MM-DD", inclusive (opcional),
+            "date_to": str - Data final "YYYY-MM-DD", inclusive (opcional),
+            "mesa": int - Identificador da mesa (opcional)
+        }
+        Pelo menos um critério é obrigatório; os critérios são combinados (AND).
+    
+    Returns:
+        Response:
+            - 200 OK: Reservas canceladas ({"detail": str, "cancelled": int})
+            - 400 BAD REQUEST: Critérios em falta ou inválidos
+    """
+    criteria, error = _parse_bulk_criteria(request.data)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    cancelled = bulk_cancel(filter_bookings(BookingTable.objects.all(), **criteria))
 
     return Response(
-        {'detail': 'Reserva cancelada com sucesso.'}, 
-        status=status.HTTP_204_NO_CONTENT
+        {"detail": f"{cancelled} reserva(s) cancelada(s) com sucesso.", "cancelled": cancelled},
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['POST'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+@idempotent
+def bulk_move_bookings(request):
+    """
+    Move em massa as reservas que correspondem aos critérios indicados para outra mesa.
+    
+    A mudança é feita com um único UPDATE numa transação, depois de verificar que a
+    mesa de destino tem capacidade suficiente e que não existem conflitos de horário.
+    
+    Permissions:
+        IsAdminUser - Apenas administradores autenticados podem mover reservas.
+    
+    Request Body (JSON):
+        {
+            "to_mesa": int - Identificador da mesa de destino (obrigatório),
+            "ids" / "date_from" / "date_to" / "mesa": critérios de seleção (ver bulk_cancel_bookings)
+        }
+    
+    Returns:
+        Response:
+            - 200 OK: Reservas movidas ({"detail": str, "moved": int})
+            - 400 BAD REQUEST: Critérios inválidos, capacidade insuficiente ou conflito de horário
+            - 404 NOT FOUND: Mesa de destino não encontrada no sistema
+    """
+    criteria, error = _parse_bulk_criteria(request.data)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        target_mesa = MesaTable.objects.get(id=int(request.data.get("to_mesa")))
+    except (TypeError, ValueError):
+        return Response(
+            {"detail": "Parâmetros inválidos. Campo 'to_mesa' é obrigatório e deve ser um inteiro."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except MesaTable.DoesNotExist:
+        return Response(
+            {"detail": "Mesa de destino não encontrada no sistema."}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        moved = bulk_move(filter_bookings(BookingTable.objects.all(), **criteria), target_mesa)
+    except BulkMoveError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {"detail": f"{moved} reserva(s) movida(s) para a mesa {target_mesa.id}.", "moved": moved},
+        status=status.HTTP_200_OK
     )
 
 
@@ -434,8 +794,9 @@ def cancel_booking(request, booking_id):
 # ================================================================================================
 
 @api_view(['POST'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([AdminThrottle])
 @permission_classes([IsAdminUser])
+@idempotent
 def create_mesa(request):
     """
     Cria uma nova mesa no sistema do Café.
@@ -466,6 +827,7 @@ def create_mesa(request):
 
     # Cria a nova mesa no banco de dados
     new_mesa = MesaTable.objects.create(lugares=request.data.get("lugares"))
+    publish("mesa.created", id=new_mesa.id, lugares=new_mesa.lugares)
     
     # Limpa reservas expiradas e atualiza o status das mesas
     update_expired_objects()
@@ -483,7 +845,7 @@ def create_mesa(request):
 
 
 @api_view(['GET'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([PublicReadThrottle])
 @permission_classes([AllowAny])
 def list_mesas(request):
     """
@@ -495,6 +857,9 @@ def list_mesas(request):
     Permissions:
         AllowAny - Endpoint público, acessível sem autenticação.
     
+    Query Parameters:
+        fields (str, opcional): Lista de campos separados por vírgulas (ex.: "?fields=id_mesa,lugares").
+    
     Returns:
         Response (200 OK):
             Array de objetos representando mesas:
@@ -507,16 +872,11 @@ def list_mesas(request):
             ]
     """
 
-    lista_mesas = []
-    mesas = MesaTable.objects.all()
-    
-    for mesa in mesas:
-        data_mesa = {
-            "id_mesa": mesa.id,
-            "lugares": mesa.lugares,
-            "existe_reserva": mesa.existe_reserva
-        }
-        lista_mesas.append(data_mesa)
+    fields, error = _parse_fields(request, MESA_FIELDS)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    lista_mesas = _project(MesaTable.objects.all(), fields, MESA_FIELDS)
 
     # Limpa reservas expiradas e atualiza o status das mesas
     update_expired_objects()
@@ -525,8 +885,9 @@ def list_mesas(request):
 
 
 @api_view(['DELETE'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([AdminThrottle])
 @permission_classes([IsAdminUser])
+@idempotent
 def delete_mesa(request, mesa_id):
     """
     Remove uma mesa do sistema do Café.
@@ -574,8 +935,11 @@ def delete_mesa(request, mesa_id):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Remove a mesa do sistema
+    # Remove a mesa do sistema (deixando um tombstone para os clientes sincronizados)
+    mesa_id = mesa.id
+    record_mesa_deletions([mesa_id])
     mesa.delete()
+    publish("mesa.deleted", id=mesa_id)
     
     # Limpa reservas expiradas e atualiza o status das mesas
     update_expired_objects()
@@ -587,91 +951,227 @@ def delete_mesa(request, mesa_id):
 
 
 # ================================================================================================
-# ENDPOINTS - AUTENTICAÇÃO
+# ENDPOINTS - DISPONIBILIDADE
 # ================================================================================================
 
-@api_view(['POST'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@api_view(['GET'])
+@throttle_classes([PublicReadThrottle])
 @permission_classes([AllowAny])
-def admin_login(request):
+def list_availability(request):
     """
-    Autentica um usuário administrador via sessão.
+    Lista os horários em que é possível começar uma reserva numa data.
     
-    Valida credenciais de login e cria uma sessão para o usuário.
+    Os horários resultam do calendário do local (horário semanal, horários especiais e
+    encerramentos configurados no painel), compilado e guardado em cache por data. Com o
+    parâmetro 'guests', são devolvidos apenas os horários com uma mesa (ou um conjunto de
+    mesas juntáveis) livre para esse número de convidados; as mesas guardadas por holds
+    (create_hold) contam como ocupadas.
     
     Permissions:
-        AllowAny - Endpoint público para permitir login.
+        AllowAny - Endpoint público, acessível sem autenticação.
     
-    Request Body (JSON):
-        {
-            "username": str - Nome de usuário,
-            "password": str - Senha do usuário
-        }
+    Query Parameters:
+        date (str): Data no formato "YYYY-MM-DD" (obrigatório).
+        guests (int, opcional): Número de convidados.
     
     Returns:
         Response:
-            - 200 OK: Autenticação bem-sucedida
+            - 200 OK:
                 {
-                    "detail": "Login realizado com sucesso",
-                    "username": str,
-                    "is_staff": bool
+                    "date": str,
+                    "slot_minutes": int - Intervalo entre horários,
+                    "slots": [str] - Horários "HH:MM" disponíveis
                 }
-            - 400 BAD REQUEST: Parâmetros insuficientes
-            - 401 UNAUTHORIZED: Credenciais inválidas ou usuário não é admin
+            - 400 BAD REQUEST: Data ou número de convidados inválidos
     """
-    username = request.data.get('username')
-    password = request.data.get('password')
+    try:
+        day = datetime.strptime(request.query_params.get("date", ""), "%Y-%m-%d").date()
+        guests = int(request.query_params["guests"]) if request.query_params.get("guests") else None
+    except ValueError:
+        return Response(
+            {"detail": "Parâmetros inválidos. Indique a data no formato YYYY-MM-DD e o número de convidados como inteiro."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    # Validação de parâmetros obrigatórios
-    if not username or not password:
+    if guests is not None and guests < 1:
         return Response(
-            {"detail": "Parâmetros insuficientes. 'username' e 'password' são obrigatórios."}, 
+            {"detail": "Número de convidados inválido. Deve ser no mínimo 1."}, 
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Tenta autenticar o usuário com as credenciais fornecidas
-    user = authenticate(request, username=username, password=password)
-    
-    if user is not None:
-        # Verifica se o usuário é admin/staff
-        if not user.is_staff:
-            return Response(
-                {"detail": "Acesso negado. Apenas administradores podem fazer login."}, 
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        
-        # Cria sessão para o usuário
-        login(request, user)
-        
-        data = {
-            'detail': 'Login realizado com sucesso.',
-            'username': user.username,
-            'Session Timeout': request.session.get_expiry_age(),
-        }
-        return Response(data, status=status.HTTP_200_OK)
+    bits = get_calendar(day)
+
+    if guests is not None and bits:
+        # Reservas recorrentes da janela (ver api/recurrence.py)
+        extend_recurrences()
+
+        # Mesas candidatas e respetiva ocupação na data (em cache); os horários com mesa
+        # livre são obtidos com operações de bits (ver api/suggestions.py::free_slots)
+        mesas = list(MesaTable.objects.values_list("id", "lugares", "joinable"))
+        tables = [mesa_id for mesa_id, _ in candidate_tables(guests, [(mesa_id, lugares) for mesa_id, lugares, _ in mesas])]
+        occupancy = with_holds(day, with_recurrences(get_occupancy([day]))[day], [mesa_id for mesa_id, _, _ in mesas])
+        bits = free_slots(bits, tables, occupancy, joinable_groups(guests, mesas))
+
+    now = datetime.now()
+    starts = [datetime.combine(day, slot) for slot in bookable_slots(day, bits)]
+    starts = [start for start in starts if start >= now]
 
-    # Credenciais inválidas
     return Response(
-        {"detail": "Credenciais inválidas. Verifique username e password."}, 
-        status=status.HTTP_401_UNAUTHORIZED
+        {
+            "date": day,
+            "slot_minutes": SLOT_MINUTES,
+            "slots": [start.strftime("%H:%M") for start in starts],
+        }, 
+        status=status.HTTP_200_OK
     )
 
 
-@api_view(['POST'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
-@permission_classes([IsAdminUser])
-def admin_logout(request):
+# ================================================================================================
+# ENDPOINTS - LOCAIS
+# ================================================================================================
+
+@api_view(['GET'])
+@throttle_classes([PublicReadThrottle])
+@permission_classes([AllowAny])
+def list_locations(request):
     """
-    Encerra a sessão do administrador.
+    Lista os locais (cafés) disponíveis.
+    
+    Os restantes endpoints operam sobre o local indicado no cabeçalho 'X-Location'
+    (ou no cookie 'location'); sem indicação, é usado o local principal.
+    
+    Permissions:
+        AllowAny - Endpoint público, acessível sem autenticação.
+    
+    Returns:
+        Response (200 OK):
+            [
+                {
+                    "id": str - Valor a enviar no cabeçalho 'X-Location',
+                    "name": str,
+                    "current": bool - Local do pedido atual
+                }
+            ]
+    """
+    return Response(
+        [
+            {"id": location, "name": config["name"], "current": location == request.location}
+            for location, config in LOCATIONS.items()
+        ], 
+        status=status.HTTP_200_OK
+    )
+
+
+# ================================================================================================
+# ENDPOINTS - AUTENTICAÇÃO
+# ================================================================================================
+
+@api_view(['POST'])
+@throttle_classes([LoginThrottle])
+@permission_classes([AllowAny])
+def admin_login(request):
+    """
+    Autentica um usuário administrador via sessão ou tokens assinados.
+    
+    Valida credenciais de login e cria uma sessão para o usuário (browser) ou, com
+    "session": false, emite um par de tokens (acesso e renovação) para os dispositivos dos
+    funcionários (ver api/tokens.py). Os tokens nunca são emitidos com a sessão: um login
+    no browser não expõe ao JavaScript um token de renovação que o logout da sessão não revogaria.
+    
+    Permissions:
+        AllowAny - Endpoint público para permitir login.
+    
+    Request Body (JSON):
+        {
+            "username": str - Nome de usuário,
+            "password": str - Senha do usuário,
+            "session": bool (opcional) - false para receber tokens em vez de criar uma sessão
+        }
+    
+    Returns:
+        Response:
+            - 200 OK: Autenticação bem-sucedida
+                {
+                    "detail": "Login realizado com sucesso",
+                    "username": str,
+                    "Session Timeout": int | None - None sem sessão,
+                    "access": str - Token de acesso ('Authorization: Bearer <token>'), apenas sem sessão,
+                    "refresh": str - Token de renovação (/api/admin/token/refresh/), apenas sem sessão,
+                    "expires_in": int - Validade do token de acesso (segundos), apenas sem sessão
+                }
+            - 400 BAD REQUEST: Parâmetros insuficientes
+            - 401 UNAUTHORIZED: Credenciais inválidas ou usuário não é admin
+    """
+    username = request.data.get('username')
+    password = request.data.get('password')
+
+    # Validação de parâmetros obrigatórios
+    if not username or not password:
+        return Response(
+            {"detail": "Parâmetros insuficientes. 'username' e 'password' são obrigatórios."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Tenta autenticar o usuário com as credenciais fornecidas
+    user = authenticate(request, username=username, password=password)
+    
+    if user is not None:
+        # Verifica se o usuário é admin/staff
+        if not user.is_staff:
+            return Response(
+                {"detail": "Acesso negado. Apenas administradores podem fazer login."}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        data = {
+            'detail': 'Login realizado com sucesso.',
+            'username': user.username,
+        }
+        # Browser: sessão; dispositivos dos funcionários ("session": false): tokens
+        if request.data.get('session') is not False:
+            login(request, user)
+            data['Session Timeout'] = request.session.get_expiry_age()
+        else:
+            data.update({'Session Timeout': None, **issue_tokens(user)})
+        return Response(data, status=status.HTTP_200_OK)
+
+    # Credenciais inválidas
+    return Response(
+        {"detail": "Credenciais inválidas. Verifique username e password."}, 
+        status=status.HTTP_401_UNAUTHORIZED
+    )
+
+
+@api_view(['POST'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+def admin_logout(request):
+    """
+    Encerra a sessão do administrador ou revoga os seus tokens.
+    
+    Com autenticação por token, o token de acesso usado é revogado, bem como o token de
+    renovação indicado no corpo do pedido.
     
     Permissions:
         IsAdminUser - Apenas administradores autenticados podem fazer logout.
     
+    Request Body (JSON, opcional):
+        {
+            "refresh": str - Token de renovação a revogar
+        }
+    
     Returns:
         Response:
             - 200 OK: Logout realizado com sucesso
     """
-    logout(request)
+    if isinstance(request.auth, dict):
+        revoke_token(request.auth)
+        try:
+            revoke_token(decode_token(request.data.get('refresh') or '', REFRESH))
+        except jwt.InvalidTokenError:
+            pass
+    else:
+        logout(request)
     return Response(
         {"detail": "Logout realizado com sucesso."}, 
         status=status.HTTP_200_OK
@@ -679,7 +1179,7 @@ def admin_logout(request):
 
 
 @api_view(['GET'])
-@throttle_classes([UserRateThrottle, AnonRateThrottle])
+@throttle_classes([AdminThrottle])
 @permission_classes([IsAdminUser])
 def admin_status(request):
     """
@@ -694,44 +1194,640 @@ def admin_status(request):
                 {
                     "authenticated": true,
                     "username": str,
-                    "is_staff": bool
+                    "Session Timeout": int - Validade restante da sessão ou do token de acesso (segundos)
                 }
     """
+    # Com token de acesso, a sessão não é lida (nenhuma query)
+    if isinstance(request.auth, dict):
+        timeout = max(request.auth['exp'] - int(time.time()), 0)
+    else:
+        timeout = request.session.get_expiry_age()
     return Response(
         {
             "authenticated": True,
             "username": request.user.username,
-            "Session Timeout": request.session.get_expiry_age(),
+            "Session Timeout": timeout,
+        }, 
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['POST'])
+@throttle_classes([LoginThrottle])
+@permission_classes([AllowAny])
+def token_refresh(request):
+    """
+    Troca um token de renovação por um novo par de tokens.
+    
+    O token de renovação usado é revogado (só pode ser usado uma vez) e o utilizador tem
+    de continuar ativo e administrador.
+    
+    Permissions:
+        AllowAny - O token de renovação é a credencial.
+    
+    Request Body (JSON):
+        {
+            "refresh": str - Token de renovação
+        }
+    
+    Returns:
+        Response:
+            - 200 OK: Novo par de tokens
+                {
+                    "access": str,
+                    "refresh": str,
+                    "expires_in": int
+                }
+            - 401 UNAUTHORIZED: Token inválido, expirado, já usado ou utilizador sem permissões
+    """
+    try:
+        tokens = refresh_tokens(request.data.get('refresh') or '')
+    except jwt.InvalidTokenError:
+        return Response(
+            {"detail": "Token de renovação inválido ou expirado."},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    return Response(tokens, status=status.HTTP_200_OK)
+
+# ================================================================================================
+# ENDPOINTS - SINCRONIZAÇÃO
+# ================================================================================================
+
+@api_view(['GET'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+def list_changes(request):
+    """
+    Lista as reservas e mesas alteradas ou removidas desde um número de sequência.
+    
+    Permite ao painel manter-se sincronizado sem voltar a descarregar as listagens:
+    o primeiro pedido usa since=0 (todas as reservas e mesas) e cada pedido seguinte
+    usa o valor 'since' da resposta anterior.
+    
+    Permissions:
+        IsAdminUser - Apenas administradores autenticados.
+    
+    Query Parameters:
+        since (int, opcional): Último número de sequência recebido (0 por defeito).
+    
+    Returns:
+        Response (200 OK):
+            {
+                "since": int - Número de sequência a usar no pedido seguinte,
+                "more": bool - Existem mais alterações (repetir o pedido de imediato),
+                "bookings": [ ... ] - Reservas criadas ou alteradas (mesmos campos de view_bookings),
+                "mesas": [ ... ] - Mesas criadas ou alteradas (mesmos campos de list_mesas),
+                "deleted": {"bookings": [int], "mesas": [int]} - Identificadores removidos
+            }
+        
+        - 400 BAD REQUEST: 'since' não é um inteiro não negativo
+        - 410 GONE: 'since' é anterior às remoções ainda registadas (voltar a pedir com since=0)
+    """
+    try:
+        since = int(request.query_params.get("since", 0))
+        if since < 0:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {"detail": "Parâmetro 'since' inválido. Deve ser um inteiro não negativo."}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    changes = collect_changes(since, list(BOOKING_ADMIN_FIELDS.values()), list(MESA_FIELDS.values()))
+    if changes is None:
+        return Response(
+            {"detail": "Histórico de alterações indisponível para este 'since'. Volte a sincronizar com since=0."}, 
+            status=status.HTTP_410_GONE
+        )
+
+    return Response(
+        {
+            "since": changes["until"],
+            "more": changes["more"],
+            "bookings": [dict(zip(BOOKING_ADMIN_FIELDS, row)) for row in changes["bookings"]],
+            "mesas": [dict(zip(MESA_FIELDS, row)) for row in changes["mesas"]],
+            "deleted": {
+                "bookings": changes["deleted"][Tombstone.BOOKING],
+                "mesas": changes["deleted"][Tombstone.MESA],
+            },
         }, 
         status=status.HTTP_200_OK
     )
 
+
+# ================================================================================================
+# ENDPOINTS - DIAGNÓSTICO
+# ================================================================================================
+
+@api_view(['GET'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+def list_profiles(request):
+    """
+    Lista os perfis de pedidos gravados (cabeçalho 'X-Profile' ou amostragem aleatória).
+    
+    Os perfis só são gravados com DJANGO_PROFILING=1 (ver api/profiling.py).
+    
+    Permissions:
+        IsAdminUser - Apenas administradores autenticados.
+    
+    Returns:
+        Response (200 OK):
+            [
+                {
+                    "id": str,
+                    "created_at": str,
+                    "method": str,
+                    "path": str,
+                    "status": int,
+                    "mode": str - "sample" ou "cprofile",
+                    "duration_ms": float,
+                    "samples": int | null,
+                    "peak_memory_kib": float,
+                    "files": [str] - Tipos disponíveis em /api/profiles/<id>/<tipo>/
+                }
+            ]
+    """
+    return Response(stored_profiles(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+def download_profile(request, profile_id, kind):
+    """
+    Descarrega um ficheiro de um perfil.
+    
+    Permissions:
+        IsAdminUser - Apenas administradores autenticados.
+    
+    Args:
+        profile_id (str): Identificador do perfil.
+        kind (str): "folded" (pilhas para flamegraph.pl/speedscope), "prof" (cProfile)
+            ou "alloc" (resumo de alocações do tracemalloc).
+    
+    Returns:
+        FileResponse: Conteúdo do ficheiro.
+        Response (404 NOT FOUND): Perfil ou ficheiro inexistente.
+    """
+    path = profile_file(profile_id, kind)
+    if path is None:
+        return Response(
+            {"detail": "Perfil não encontrado."}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    content_type = "application/octet-stream" if kind == "prof" else "text/plain; charset=utf-8"
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name, content_type=content_type)
+
+
+@api_view(['GET'])
+@throttle_classes([AdminThrottle])
+@permission_classes([IsAdminUser])
+def slow_queries(request):
+    """
+    Resume as queries lentas registadas, por tempo total decrescente.
+    
+    As queries só são registadas com DJANGO_SLOW_QUERIES=1 (ver api/slowqueries.py).
+    
+    Permissions:
+        IsAdminUser - Apenas administradores autenticados.
+    
+    Query Parameters:
+        limit (int, opcional): Número máximo de instruções (1 a SLOW_QUERY_SUMMARY_MAX, por defeito 20).
+    
+    Returns:
+        Response:
+            - 200 OK:
+                {
+                    "enabled": bool,
+                    "threshold_ms": float,
+                    "queries": [
+                        {
+                            "statement": str - Instrução normalizada,
+                            "fingerprint": str,
+                            "count": int,
+                            "total_ms": float,
+                            "mean_ms": float,
+                            "max_ms": float,
+                            "origins": {str: int} - Linhas de código que executaram a query,
+                            "plan": [str] | null - Plano de execução,
+                            "last_seen": str
+                        }
+                    ]
+                }
+            - 400 BAD REQUEST: 'limit' inválido
+    """
+    try:
+        limit = int(request.query_params.get('limit', 20))
+        if not 1 <= limit <= SLOW_QUERY_SUMMARY_MAX:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {"detail": f"'limit' deve ser um inteiro entre 1 e {SLOW_QUERY_SUMMARY_MAX}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(
+        {
+            "enabled": SLOW_QUERY_ENABLED,
+            "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+            "queries": summarise_slow_queries(limit),
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+# ================================================================================================
+# ENDPOINTS - PEDIDOS AGREGADOS
+# ================================================================================================
+
+@api_view(['POST'])
+@throttle_classes([])  # Custo calculado por sub-pedido (batch_requests.charge_throttles)
+@permission_classes([AllowAny])
+def batch(request):
+    """
+    Executa vários pedidos à API numa única chamada.
+    
+    Permite ao frontend obter, por exemplo, mesas, reservas e estado da sessão com um
+    único pedido. A sessão e o utilizador são resolvidos uma vez e as reservas expiradas
+    (e as reservas recorrentes da janela) são tratadas uma vez, antes dos sub-pedidos,
+    pelo que os sub-pedidos GET não escrevem na base de dados; cada sub-pedido é
+    executado pela view do respetivo endpoint, com as permissões desse endpoint.
+    Sub-pedidos GET consecutivos são executados em paralelo; os restantes são executados
+    um a um, pela ordem indicada. Um erro inesperado num sub-pedido é devolvido como
+    500 no respetivo resultado, sem afetar os restantes.
+    
+    O pedido conta como um único acesso ao rate limiting, com um custo de um token por
+    sub-pedido no scope do respetivo endpoint.
+    
+    Permissions:
+        AllowAny - Cada sub-pedido é sujeito às permissões do seu endpoint.
+    
+    Request Body:
+        {
+            "requests": [
+                {
+                    "id": str | int (opcional) - Identificador devolvido no resultado (por defeito, a posição),
+                    "method": str (opcional) - "GET" (por defeito), "POST", "PUT", "PATCH" ou "DELETE",
+                    "path": str - Caminho do endpoint, com query string (ex.: "/api/bookings/list/?fields=mesa,date"),
+                    "body": object (opcional) - Corpo JSON do sub-pedido,
+                    "headers": object (opcional) - Cabeçalhos adicionais (ex.: "Idempotency-Key")
+                }
+            ]
+        }
+    
+    Returns:
+        Response (200 OK):
+            {
+                "responses": [
+                    {
+                        "id": str | int,
+                        "status": int - Código HTTP do sub-pedido,
+                        "body": object | list | null - Corpo da resposta do sub-pedido,
+                        "headers": object - Cabeçalhos relevantes (ex.: "Idempotent-Replayed")
+                    }
+                ]
+            }
+        
+        - 400 BAD REQUEST: Sub-pedidos inválidos, endpoint inexistente ou não suportado
+        - 429 TOO MANY REQUESTS: Tokens insuficientes para o conjunto dos sub-pedidos
+    """
+    subrequests, error = batch_requests.parse_subrequests(request.data)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    batch_requests.charge_throttles(request, subrequests)
+
+    # Escritas feitas pelos endpoints de leitura: uma vez, antes dos sub-pedidos em paralelo
+    # (nos sub-pedidos, a limpeza é ignorada e as reservas recorrentes já estão em cache)
+    update_expired_objects()
+    extend_recurrences()
+    token = _expired_objects_updated.set(True)
+    try:
+        responses = batch_requests.execute(request, subrequests)
+    finally:
+        _expired_objects_updated.reset(token)
+
+    return Response({"responses": responses}, status=status.HTTP_200_OK)
+
+
+# ================================================================================================
+# ENDPOINTS - TEMPO REAL
+# ================================================================================================
+
+async def stream(request):
+    """
+    Canal Server-Sent Events com alterações de disponibilidade em tempo real.
+    
+    Envia um evento compacto (JSON) sempre que uma reserva é criada, cancelada, movida
+    ou expira, ou quando uma mesa é criada ou removida. Os eventos não incluem dados
+    pessoais. Ligações inativas recebem um comentário de heartbeat periódico.
+    
+    Este endpoint é assíncrono e só é servido pela aplicação ASGI (core/asgi.py). Na
+    aplicação WSGI (gunicorn, runserver) a ligação ocuparia uma thread do worker enquanto
+    estivesse aberta, pelo que o pedido é recusado.
+    
+    Permissions:
+        AllowAny - Endpoint público.
+    
+    Returns:
+        StreamingHttpResponse (200 OK, text/event-stream):
+            data: {"type": "booking.created", "mesa": int, "date": str, "start_time": str, "end_time": str}
+            data: {"type": "booking.cancelled" | "booking.expired", ...mesmos campos}
+            data: {"type": "bookings.created" | "bookings.cancelled" | "bookings.moved", "mesas": list[int]}
+            data: {"type": "mesa.created", "id": int, "lugares": int}
+            data: {"type": "mesa.deleted", "id": int}
+            data: {"type": "resync"} - o cliente perdeu eventos e deve voltar a carregar as listagens
+        
+        - 501 NOT IMPLEMENTED: Pedido servido pela aplicação WSGI
+        - 503 SERVICE UNAVAILABLE: Número máximo de ligações atingido
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Os eventos em tempo real só estão disponíveis no servidor ASGI (core/asgi.py)."}, 
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    if broker.subscriber_count >= EVENTS_MAX_SUBSCRIBERS:
+        return JsonResponse(
+            {"detail": "Número máximo de ligações em tempo real atingido. Tente novamente mais tarde."}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    queue = broker.subscribe()
+
+    async def event_stream():
+        try:
+            # Intervalo de reconexão sugerido ao cliente (ms)
+            yield b"retry: 5000\n\n"
+            while True:
+                message = await queue.get()
+                if message == HEARTBEAT:
+                    yield b": ping\n\n"
+                else:
+                    yield b"data: " + message + b"\n\n"
+        finally:
+            broker.unsubscribe(queue)
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Desativa o buffering em reverse proxies (nginx)
+    return response
+
+
 # ================================================================================================
 # FUNÇÕES AUXILIARES
 # ================================================================================================
 
+def _parse_fields(request, allowed_fields):
+    """
+    Interpreta o parâmetro '?fields=' das listagens.
+    
+    Args:
+        request: Pedido DRF atual.
+        allowed_fields (dict): Campos disponíveis (nome na resposta -> coluna).
+    
+    Returns:
+        tuple[list[str], str | None]: Campos pedidos (todos, se o parâmetro estiver ausente)
+        e mensagem de erro, se existir.
+    """
+    raw_fields = request.query_params.get("fields")
+    if not raw_fields:
+        return list(allowed_fields), None
+
+    fields = list(dict.fromkeys(field.strip() for field in raw_fields.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in allowed_fields]
+
+    if unknown or not fields:
+        return [], f"Campos inválidos: {', '.join(unknown) or raw_fields}. Campos disponíveis: {', '.join(allowed_fields)}."
+
+    return fields, None
+
+
+def _project(queryset, fields, allowed_fields):
+    """
+    Serializa um queryset lendo apenas as colunas correspondentes aos campos pedidos.
+    
+    Args:
+        queryset (QuerySet): Queryset a serializar.
+        fields (list[str]): Campos pedidos (nomes na resposta).
+        allowed_fields (dict): Correspondência entre nomes na resposta e colunas.
+    
+    Returns:
+        list[dict]: Uma entrada por linha, com os campos pedidos.
+    """
+    columns = [allowed_fields[field] for field in fields]
+    return [dict(zip(fields, row)) for row in queryset.values_list(*columns)]
+
+
+def _find_tables(start, end, guests, hold=None):
+    """
+    Escolhe a mesa, ou o conjunto de mesas juntas, para uma reserva no local atual.
+    
+    Carrega as mesas e as reservas da data (duas queries; mais uma com as reservas
+    recorrentes, para datas posteriores à janela materializada) e escolhe a mesa em memória,
+    priorizando mesas com a capacidade exata (ver api/allocation.py::find_table). Sem
+    mesa única livre, procura o menor conjunto de mesas juntáveis e adjacentes livres
+    (ver api/allocation.py::find_table_group); a adjacência só é lida neste caso. As
+    mesas guardadas por holds de outros pedidos contam como ocupadas.
+    
+    Args:
+        start (datetime): Início da reserva.
+        end (datetime): Fim da reserva.
+        guests (int): Número de convidados.
+        hold (str | None): Código do hold do próprio pedido (ignorado na verificação).
+    
+    Returns:
+        tuple[dict[int, Mesa], int | None, tuple[int, ...] | None]: Mesas do local, mesa
+        escolhida e conjunto de mesas juntas (no máximo um dos dois).
+    """
+    mesas = {mesa.id: mesa for mesa in MesaTable.objects.all()}
+
+    # Horários ocupados de cada mesa na data: reservas, reservas recorrentes posteriores à
+    # janela materializada e holds de outros pedidos
+    reservas_por_mesa = defaultdict(list)
+    for mesa_id, reserva_start, reserva_end in BookingTable.objects.filter(date=start.date()).values_list("mesa_id", "start_time", "end_time"):
+        reservas_por_mesa[mesa_id].append((datetime.combine(start.date(), reserva_start), datetime.combine(start.date(), reserva_end)))
+    for mesa_id, intervals in recurring_intervals([start.date()]).get(start.date(), {}).items():
+        reservas_por_mesa[mesa_id].extend(intervals)
+    for mesa_id, intervals in held_intervals(start, end, mesas, exclude=hold).items():
+        reservas_por_mesa[mesa_id].extend(intervals)
+
+    mesa_id = find_table(start, end, guests, [(mesa.id, mesa.lugares) for mesa in mesas.values()], reservas_por_mesa)
+    if mesa_id is not None:
+        return mesas, mesa_id, None
+
+    juntaveis = [(mesa.id, mesa.lugares) for mesa in mesas.values() if mesa.joinable]
+    if len(juntaveis) < 2:
+        return mesas, None, None
+    return mesas, None, find_table_group(start, end, guests, juntaveis, reservas_por_mesa, get_adjacency(), MAX_JOINED_TABLES)
+
+
+def _no_table_response(start, guests):
+    """
+    Resposta a um pedido sem mesa livre, com os horários livres mais próximos (ver api/suggestions.py).
+    
+    Se o grupo só couber em mais mesas juntas do que settings.MAX_JOINED_TABLES, não há
+    horários a sugerir e a resposta indica o limite.
+    
+    Args:
+        start (datetime): Início pedido.
+        guests (int): Número de convidados.
+    
+    Returns:
+        Response: 400 BAD REQUEST com "detail" e "suggestions" (ou "max_joined_tables").
+    """
+    if MAX_JOINED_TABLES is not None:
+        juntaveis = list(MesaTable.objects.filter(joinable=True).values_list("id", "lugares"))
+        if exceeds_joined_limit(guests, juntaveis, get_adjacency(), MAX_JOINED_TABLES):
+            return Response(
+                {
+                    "detail": f"O grupo só pode ser sentado em mais do que {MAX_JOINED_TABLES} mesas juntas. Contacte o restaurante.",
+                    "max_joined_tables": MAX_JOINED_TABLES,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    suggestions = suggest_slots(start, guests)
+    return Response(
+        {
+            "detail": "Não há mesas disponíveis para o horário e capacidade solicitados.",
+            "suggestions": {
+                "earlier": [slot.strftime("%H:%M") for slot in suggestions["earlier"]],
+                "later": [slot.strftime("%H:%M") for slot in suggestions["later"]],
+                "next_days": [
+                    {"date": day, "slots": [slot.strftime("%H:%M") for slot in starts]}
+                    for day, starts in suggestions["next_days"]
+                ],
+            },
+        }, 
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def _create_joined_booking(group, mesas, booking_data):
+    """
+    Cria uma reserva em várias mesas juntas.
+    
+    É criada uma reserva por mesa, com os convidados distribuídos pelas mesas e um
+    identificador de grupo comum ('party'), numa única transação: ou ficam todas as mesas
+    reservadas, ou nenhuma. As reservas partilham um único número de sequência.
+    
+    Args:
+        group (tuple[int, ...]): Mesas escolhidas (ver api/allocation.py::find_table_group).
+        mesas (dict[int, Mesa]): Mesas do local.
+        booking_data (dict): Dados da reserva (sem a mesa).
+    
+    Returns:
+        Response: 201 CREATED com as mesas reservadas, ou 500 se a gravação falhar.
+    """
+    guests = split_guests(booking_data["number_of_guests"], group, {mesa_id: mesas[mesa_id].lugares for mesa_id in group})
+    party = uuid.uuid4()
+
+    try:
+        with transaction.atomic(using=location_database()):
+            seq = ChangeSequence.advance()
+            new_bookings = BookingTable.objects.bulk_create([
+                BookingTable(
+                    **{**booking_data, "mesa": mesas[mesa_id], "number_of_guests": guests[mesa_id]},
+                    party=party,
+                    seq=seq,
+                )
+                for mesa_id in group
+            ])
+            recompute_mesa_occupancy(group)
+    except Exception as e:
+        return Response(
+            {"detail": f"Erro ao criar reserva no banco de dados: {str(e)}"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    update_expired_objects()
+
+    for new_booking in new_bookings:
+        publish("booking.created", **booking_event_data(new_booking))
+
+    return Response(
+        {"detail": "Reserva criada com sucesso em mesas juntas.", "mesas": sorted(group)}, 
+        status=status.HTTP_201_CREATED
+    )
+
+
+def _parse_bulk_criteria(data):
+    """
+    Valida e converte os critérios de seleção das operações em massa.
+    
+    Args:
+        data (dict): Corpo do pedido com 'ids', 'date_from', 'date_to' e/ou 'mesa'.
+    
+    Returns:
+        tuple[dict, str | None]: Critérios convertidos (argumentos de filter_bookings)
+        e mensagem de erro, se existir.
+    """
+    criteria = {}
+
+    try:
+        if data.get("ids") is not None:
+            if not isinstance(data.get("ids"), list):
+                raise TypeError
+            criteria["ids"] = [int(booking_id) for booking_id in data.get("ids")]
+        for field in ("date_from", "date_to"):
+            if data.get(field):
+                criteria[field] = datetime.strptime(data.get(field), "%Y-%m-%d").date()
+        if data.get("mesa") is not None:
+            criteria["mesa"] = int(data.get("mesa"))
+    except (ValueError, TypeError):
+        return {}, "Critérios inválidos. Use 'ids' (lista de inteiros), 'date_from'/'date_to' (YYYY-MM-DD) e/ou 'mesa' (inteiro)."
+
+    if not criteria:
+        return {}, "Critérios insuficientes. Indique 'ids', 'date_from', 'date_to' e/ou 'mesa'."
+
+    return criteria, None
+
+
 def update_expired_objects():
     """
     Remove reservas expiradas do sistema e atualiza o status das mesas.
     
-    Esta função identifica reservas cuja data é anterior à data atual menos
-    BOOKING_EXPIERY_DAYS e as remove do banco de dados. Após a remoção,
-    verifica cada mesa associada para atualizar o campo 'existe_reserva'.
+    Esta função identifica reservas cujo término é anterior ao momento atual menos
+    BOOKING_EXPIERY_DAYS e as remove do banco de dados com um único DELETE (registando
+    um tombstone para cada uma), bem como as reservas recorrentes terminadas antes
+    desse momento. Em seguida, marca como livres as mesas das reservas removidas que
+    deixaram de ter reservas. O número de queries não depende do número de reservas ou de mesas.
+    
+    Nos sub-pedidos de um pedido agregado (/api/batch/) não faz nada: a limpeza é feita
+    uma única vez, antes de executar os sub-pedidos.
     """
+    if _expired_objects_updated.get():
+        return
+
     # Remove do sistema todas as reservas cujo término já ultrapassou o período de expiração
-    for booking in BookingTable.objects.all():
-        booking_end_datetime = datetime.combine(booking.date, booking.end_time)
-        expiration_threshold = booking_end_datetime + timedelta(days=BOOKING_EXPIERY_DAYS)
+    expiration_threshold = datetime.now() - timedelta(days=BOOKING_EXPIERY_DAYS)
+    expired = list(
+        BookingTable.objects.filter(
+            Q(date__lt=expiration_threshold.date()) | 
+            Q(date=expiration_threshold.date(), end_time__lt=expiration_threshold.time())
+        ).values("id", "mesa_id", "name", "date", "start_time", "end_time", "number_of_guests", "notes")
+    )
+
+    # Remove as reservas recorrentes terminadas há mais do que o período de expiração
+    # (também quando não existem reservas expiradas; uma vez por dia, ver api/recurrence.py)
+    prune_expired_recurrences(expiration_threshold.date())
+
+    if expired:
+        expired_ids = [booking["id"] for booking in expired]
+        record_deletions(Tombstone.BOOKING, expired_ids)
+        BookingTable.objects.filter(pk__in=expired_ids).delete()
+        for booking in expired:
+            publish("booking.expired", **booking_event_data(booking))
+            print(f"[INFO] A reserva {booking['id']} (detalhes da reserva: mesa {booking['mesa_id']}, {booking['name']}, {booking['date']}, {booking['start_time']}, {booking['end_time']}, {booking['number_of_guests']}, {booking['notes']}) expirada removida do sistema.")
 
-        if expiration_threshold < datetime.now():
-            booking.delete()
-            print(f"[INFO] A reserva {booking.id} (detalhes da reserva: {booking.mesa}, {booking.name}, {booking.date}, {booking.start_time}, {booking.end_time}, {booking.number_of_guests}, {booking.notes}) expirada removida do sistema.")
-    
-    for mesa in MesaTable.objects.all():
         # Se a mesa não tiver mais reservas associadas, marca como sem reserva
-        if not BookingTable.objects.filter(mesa=mesa).exists():
-            mesa.existe_reserva = False
-            mesa.save()
+        # (apenas as mesas cujo estado muda, para não registar alterações inexistentes)
+        recompute_mesa_occupancy({booking["mesa_id"] for booking in expired})
+
+    # Esquece as remoções mais antigas do registo incremental de alterações
+    prune_tombstones()
 
 # ================================================================================================
 # DOCUMENTAÇÃO DA API - RESUMO DE ENDPOINTS
@@ -754,16 +1850,52 @@ RESUMO COMPLETO DOS ENDPOINTS DA API REST
 ├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
 │ view_bookings           │ /api/bookings/list/                      │ GET        │ AllowAny*         │
 │ create_booking          │ /api/bookings/create/                    │ POST       │ AllowAny          │
+│ search_bookings         │ /api/bookings/search/?q=<texto>          │ GET        │ IsAdminUser       │
+│ create_hold             │ /api/holds/                              │ POST       │ AllowAny          │
+│ cancel_hold             │ /api/holds/<str:hold>/                   │ DELETE     │ AllowAny          │
 │ cancel_booking          │ /api/bookings/cancel/<int:booking_id>/   │ DELETE     │ IsAdminUser       │
+│ bulk_cancel_bookings    │ /api/bookings/bulk/cancel/               │ POST       │ IsAdminUser       │
+│ bulk_move_bookings      │ /api/bookings/bulk/move/                 │ POST       │ IsAdminUser       │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ DISPONIBILIDADE                                                                                     │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ list_availability       │ /api/availability/?date=<YYYY-MM-DD>     │ GET        │ AllowAny          │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ SINCRONIZAÇÃO                                                                                       │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ list_changes            │ /api/changes/?since=<seq>                │ GET        │ IsAdminUser       │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ DIAGNÓSTICO                                                                                         │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ list_profiles           │ /api/profiles/                           │ GET        │ IsAdminUser       │
+│ download_profile        │ /api/profiles/<id>/<tipo>/               │ GET        │ IsAdminUser       │
+│ slow_queries            │ /api/slow-queries/                       │ GET        │ IsAdminUser       │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ PEDIDOS AGREGADOS                                                                                   │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ batch                   │ /api/batch/                              │ POST       │ AllowAny**        │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ TEMPO REAL                                                                                          │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ stream                  │ /api/stream/                             │ GET (SSE)  │ AllowAny          │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ LOCAIS                                                                                              │
+├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
+│ list_locations          │ /api/locations/                          │ GET        │ AllowAny          │
 ├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
 │ AUTENTICAÇÃO                                                                                        │
 ├─────────────────────────┼──────────────────────────────────────────┼────────────┼───────────────────┤
 │ admin_login             │ /api/admin/login/                        │ POST       │ AllowAny          │
 │ admin_logout            │ /api/admin/logout/                       │ POST       │ IsAdminUser       │
 │ admin_status            │ /api/admin/status/                       │ GET        │ IsAdminUser       │
+│ token_refresh           │ /api/admin/token/refresh/                │ POST       │ AllowAny          │
 └─────────────────────────┴──────────────────────────────────────────┴────────────┴───────────────────┘
 
 * view_bookings retorna dados completos para admins e limitados para usuários públicos
+** batch aplica a cada sub-pedido as permissões do respetivo endpoint
+
+Todos os endpoints de mesas, reservas e sincronização operam sobre o local indicado no
+cabeçalho "X-Location" (ou cookie "location"); sem indicação, é usado o local principal.
 
 
 DETALHAMENTO DE REQUISIÇÕES
@@ -776,19 +1908,69 @@ create_booking:
         "date": "YYYY-MM-DD" (obrigatório),
         "time": "HH:MM" (obrigatório),
         "number_of_guests": str|int (obrigatório),
-        "notes": str (opcional)
+        "notes": str (opcional),
+        "hold": str (opcional, código devolvido por create_hold)
     }
 
+create_hold:
+    Body: {"date": "YYYY-MM-DD", "time": "HH:MM", "number_of_guests": int} (obrigatórios)
+    Retorna: {"hold": str, "expires_in": int} - mesa guardada durante HOLD_SECONDS segundos
+
+bulk_cancel_bookings:
+    Body: {"ids": list[int], "date_from": "YYYY-MM-DD", "date_to": "YYYY-MM-DD", "mesa": int}
+    (pelo menos um critério; combinados com AND)
+
+bulk_move_bookings:
+    Body: critérios de bulk_cancel_bookings + {"to_mesa": int (obrigatório)}
+
 create_mesa:
     Body: {"lugares": int}
     Requer: Cookie de sessão (autenticação via Django)
 
+view_bookings / list_mesas:
+    Query: ?fields=campo1,campo2 (opcional, apenas os campos pedidos são lidos e devolvidos)
+
+search_bookings:
+    Query: ?q=<nome ou telefone> (obrigatório), ?page=<int> (opcional), ?fields= (opcional)
+    Retorna: {"results": [...], "page", "next"} (por ordem de relevância, 20 por página)
+
+list_availability:
+    Query: ?date=YYYY-MM-DD (obrigatório), ?guests=<int> (opcional, apenas horários com mesa livre)
+    Retorna: {"date", "slot_minutes", "slots": ["HH:MM", ...]}
+
+list_changes:
+    Query: ?since=<seq> (0 no primeiro pedido; depois, o valor "since" da resposta anterior)
+    Retorna: {"since", "more", "bookings", "mesas", "deleted": {"bookings", "mesas"}}
+
 admin_login:
-    Body: {"username": str, "password": str}
-    Retorna: Cookie de sessão
+    Body: {"username": str, "password": str, "session": bool (opcional, false: apenas tokens)}
+    Retorna: Cookie de sessão e {"access", "refresh", "expires_in"}
+
+token_refresh:
+    Body: {"refresh": str}
+    Retorna: {"access", "refresh", "expires_in"} (o token de renovação usado deixa de ser válido)
 
 admin_logout / admin_status / cancel_booking / delete_mesa:
-    Requer: Cookie de sessão (autenticação via Django)
+    Requer: Cookie de sessão (autenticação via Django) ou "Authorization: Bearer <token de acesso>"
+
+list_profiles / download_profile:
+    Perfis gravados com DJANGO_PROFILING=1 para pedidos de administradores com o cabeçalho
+    "X-Profile: sample" (ou "cprofile") e para a fração DJANGO_PROFILING_SAMPLE_RATE dos restantes.
+    Tipos de ficheiro: folded (flamegraph), prof (cProfile), alloc (tracemalloc)
+
+slow_queries:
+    Query: ?limit=<int> (opcional, por defeito 20)
+    Queries registadas com DJANGO_SLOW_QUERIES=1 (acima de DJANGO_SLOW_QUERY_MS), agrupadas por
+    instrução normalizada, com a origem (api/views.py ou api/admin.py) e o plano de execução
+
+batch:
+    Body: {"requests": [{"id", "method", "path", "body", "headers"}, ...]} (máximo de 10 sub-pedidos)
+    Retorna: {"responses": [{"id", "status", "body", "headers"}, ...]} (pela ordem dos sub-pedidos)
+    Não suporta: admin_login, admin_logout, token_refresh, stream, download_profile
+
+create_booking / create_hold / cancel_booking / create_mesa / delete_mesa:
+    Cabeçalho opcional: "Idempotency-Key: <valor único por operação>"
+    Repetições com a mesma chave devolvem a resposta original (cabeçalho "Idempotent-Replayed: true")
 
 
 CÓDIGOS HTTP DE RESPOSTA
@@ -800,5 +1982,7 @@ CÓDIGOS HTTP DE RESPOSTA
     401 UNAUTHORIZED    - Credenciais inválidas ou não autenticado
     403 FORBIDDEN       - Sem permissões suficientes
     404 NOT FOUND       - Recurso não encontrado
+    409 CONFLICT        - Horário guardado em simultâneo por outros pedidos (create_hold)
+    410 GONE            - Histórico de alterações já não disponível (list_changes)
     500 INTERNAL SERVER - Erro no servidor
 """
\ No newline at end of file
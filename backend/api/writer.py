@@ -0,0 +1,174 @@
+"""
+writer.py
+
+Coordenador de escritas com "group commit", uma thread de escrita por base de dados.
+
+Em SQLite só uma ligação pode escrever de cada vez e cada COMMIT implica uma sincronização
+com o disco (fsync). Pedidos concorrentes que escrevem (criação e cancelamento de
+reservas, gravação de sessões) esperam uns pelos outros pelo bloqueio de escrita, ou
+falham com "database is locked".
+
+Com o coordenador, as operações de escrita são postas numa fila e executadas por uma
+única thread por base de dados: todas as operações que chegam enquanto a transação
+anterior está a ser gravada são executadas, por ordem, numa única transação (cada uma
+no seu savepoint) e confirmadas com um único COMMIT. Cada pedido aguarda o resultado
+da sua operação (um Future), entregue apenas depois do COMMIT.
+
+Como as operações de uma base de dados são executadas em série, a verificação de
+disponibilidade e a criação de uma reserva não podem ser intercaladas com outras.
+
+O coordenador atua dentro de cada processo; entre processos (workers do gunicorn)
+o SQLite continua a serializar as escritas. As transações começam com BEGIN IMMEDIATE
+(OPTIONS 'transaction_mode' em core/settings.py): o lote de um worker espera (até ao
+'timeout') que o lote de outro worker termine, em vez de falhar com "database is locked"
+ao passar da leitura para a escrita.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .locations import get_location, location_database, use_location
+
+# ================================================================================================
+# CONSTANTES DE CONFIGURAÇÃO
+# ================================================================================================
+
+# Com False, as operações são executadas diretamente na thread do pedido
+WRITER_ENABLED = getattr(settings, 'WRITER_ENABLED', True)
+
+# Número máximo de operações por transação
+WRITER_MAX_BATCH = getattr(settings, 'WRITER_MAX_BATCH', 64)
+
+# ================================================================================================
+# COORDENADOR
+# ================================================================================================
+
+class WriteCoordinator:
+    """
+    Thread de escrita de uma base de dados, que agrupa as operações pendentes em transações.
+
+    Attributes:
+        using (str): Alias da base de dados.
+        batches (int): Número de transações executadas.
+        operations (int): Número de operações executadas.
+    """
+
+    def __init__(self, using, max_batch=WRITER_MAX_BATCH):
+        self.using = using
+        self.max_batch = max_batch
+        self.pid = os.getpid()
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=f'writer-{using}', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Põe uma operação na fila.
+
+        A operação é executada no local (café) atual, dentro de uma transação da base de
+        dados do coordenador.
+
+        Args:
+            func (callable): Operação a executar.
+            *args, **kwargs: Argumentos da operação.
+
+        Returns:
+            Future: Resultado (ou exceção) da operação, disponível depois do COMMIT.
+        """
+        future = Future()
+        self._queue.put((future, get_location(), func, args, kwargs))
+        return future
+
+    def _run(self):
+        while True:
+            # Aguarda a primeira operação e junta as que entretanto chegaram
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch):
+        """Executa um lote de operações numa transação e entrega os resultados após o COMMIT."""
+        connections[self.using].close_if_unusable_or_obsolete()
+        outcomes = []
+
+        try:
+            with transaction.atomic(using=self.using):
+                for future, location, func, args, kwargs in batch:
+                    # Savepoint por operação: uma operação que falhe não afeta as restantes
+                    try:
+                        with use_location(location), transaction.atomic(using=self.using):
+                            outcomes.append((func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((None, e))
+        except Exception as e:
+            # O COMMIT falhou: nenhuma operação do lote foi gravada
+            outcomes = [(None, e)] * len(batch)
+        finally:
+            self.batches += 1
+            self.operations += len(batch)
+
+        for (future, *_), (result, error) in zip(batch, outcomes):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_coordinators = {}
+_coordinators_lock = threading.Lock()
+
+
+def get_coordinator(using):
+    """
+    Devolve o coordenador de uma base de dados (criado no primeiro uso em cada processo).
+
+    Args:
+        using (str): Alias da base de dados.
+
+    Returns:
+        WriteCoordinator: Coordenador da base de dados.
+    """
+    coordinator = _coordinators.get(using)
+    # Depois de um fork (ex.: gunicorn com preload), a thread de escrita não existe no processo filho
+    if coordinator is None or coordinator.pid != os.getpid():
+        with _coordinators_lock:
+            coordinator = _coordinators.get(using)
+            if coordinator is None or coordinator.pid != os.getpid():
+                coordinator = _coordinators[using] = WriteCoordinator(using)
+    return coordinator
+
+
+def run(func, *args, using=None, **kwargs):
+    """
+    Executa uma operação de escrita através do coordenador e aguarda o resultado.
+
+    Se o coordenador estiver desativado, ou se a thread atual já estiver numa transação
+    da mesma base de dados (ex.: testes, ou uma operação que chama outra), a operação é
+    executada diretamente, dentro dessa transação.
+
+    Args:
+        func (callable): Operação a executar.
+        *args, **kwargs: Argumentos da operação.
+        using (str | None): Alias da base de dados (a do local atual, se None).
+
+    Returns:
+        Resultado da operação.
+
+    Raises:
+        Exception: A exceção lançada pela operação ou pelo COMMIT.
+    """
+    using = using or location_database()
+    if not WRITER_ENABLED or connections[using].in_atomic_block:
+        return func(*args, **kwargs)
+    return get_coordinator(using).submit(func, *args, **kwargs).result()
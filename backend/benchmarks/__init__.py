@@ -0,0 +1,69 @@
+"""
+benchmarks
+
+Microbenchmarks do backend. Cada módulo é executado a partir da pasta 'backend':
+
+    python -m benchmarks.<nome_do_modulo>
+
+A importação deste pacote configura o Django (core.settings), permitindo que os
+benchmarks utilizem diretamente os módulos da app 'api'.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Cria uma base de dados de teste temporária (removida no fim do bloco).
+
+    Evita que os benchmarks escrevam na base de dados de desenvolvimento (data/db.sqlite3).
+    """
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(func, iterations):
+    """
+    Executa 'func' repetidamente e devolve o tempo médio por chamada.
+
+    Args:
+        func (callable): Função sem argumentos a medir.
+        iterations (int): Número de execuções.
+
+    Returns:
+        float: Tempo médio por chamada, em microssegundos.
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def print_table(headers, rows):
+    """
+    Imprime os resultados de um benchmark em formato de tabela.
+
+    Args:
+        headers (list[str]): Cabeçalhos das colunas.
+        rows (list[list]): Linhas de resultados.
+    """
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows)) for i, h in enumerate(headers)]
+    line = '  '.join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print('-' * len(line))
+    for row in rows:
+        print('  '.join(cell.ljust(w) for cell, w in zip(row, widths)))
@@ -0,0 +1,86 @@
+"""
+rendering.py
+
+Compara o tempo de serialização e o tamanho da resposta de uma listagem de 10 000
+reservas (formato devolvido a administradores por view_bookings) com:
+
+    - JSONRenderer do DRF (encoder da biblioteca standard);
+    - FastJSONRenderer (orjson);
+    - MessagePackRenderer;
+
+e o tamanho após compressão gzip e zstd (api/middleware.py).
+
+Execução (a partir da pasta 'backend'):
+    python -m benchmarks.rendering
+"""
+
+import gzip
+from datetime import date, time, timedelta
+
+from benchmarks import measure, print_table
+
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import GZIP_LEVEL, ZSTD_LEVEL
+from api.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BOOKINGS = 10000
+ITERATIONS = 20
+
+
+def _bookings():
+    """Gera reservas com os mesmos tipos de dados devolvidos por view_bookings."""
+    return [
+        {
+            "id": i,
+            "mesa": i % 30 + 1,
+            "name": "Maria João Conceição",
+            "phone": f"91{i:07d}",
+            "date": date(2030, 1, 1) + timedelta(days=i % 16),
+            "start_time": time(8 + i % 15, 30),
+            "end_time": time(9 + i % 15, 45),
+            "number_of_guests": i % 8 + 1,
+            "notes": "Aniversário" if i % 5 == 0 else "",
+        }
+        for i in range(BOOKINGS)
+    ]
+
+
+def main():
+    data = _bookings()
+    renderers = [('DRF JSONRenderer', JSONRenderer())]
+    if orjson is not None:
+        renderers.append(('FastJSONRenderer (orjson)', FastJSONRenderer()))
+    if msgpack is not None:
+        renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+
+    rows = []
+    baseline = None
+    for label, renderer in renderers:
+        payload = renderer.render(data, renderer.media_type, {})
+        elapsed = measure(lambda: renderer.render(data, renderer.media_type, {}), ITERATIONS) / 1000
+        baseline = baseline or elapsed
+
+        gzip_size = len(gzip.compress(payload, compresslevel=GZIP_LEVEL))
+        zstd_size = len(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)) if zstandard else '-'
+
+        rows.append([
+            label,
+            f'{elapsed:.2f}',
+            f'{baseline / elapsed:.1f}x',
+            f'{len(payload) / 1024:.0f}',
+            f'{gzip_size / 1024:.0f}',
+            f'{zstd_size / 1024:.0f}' if zstandard else '-',
+        ])
+
+    print(f'Serialização de {BOOKINGS} reservas\n')
+    print_table(['Renderer', 'Tempo (ms)', 'Ganho', 'KiB', 'KiB (gzip)', 'KiB (zstd)'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+serialization.py
+
+Compara a serialização das listagens de reservas e mesas:
+
+    - antes: instância completa do modelo por linha e cópia manual dos campos para um
+      dicionário (incluindo 'booking.mesa.id', que carrega a mesa de cada reserva);
+    - depois: projeção values_list() apenas das colunas pedidas (api/views.py::_project),
+      com a mesa lida de 'mesa_id'.
+
+Para cada variante mede o tempo, o pico de memória alocada (tracemalloc) e o número de
+queries SQL (em execuções separadas), numa base de dados de teste temporária.
+
+Execução (a partir da pasta 'backend'):
+    python -m benchmarks.serialization
+"""
+
+import time as timer
+import tracemalloc
+from datetime import date, time, timedelta
+
+from benchmarks import print_table, test_database
+
+from django.db import connection
+
+from api.models import Booking, Mesa
+from api.views import BOOKING_ADMIN_FIELDS, BOOKING_PUBLIC_FIELDS, _project
+
+BOOKINGS = 10000
+MESAS = 30
+
+
+def _seed():
+    mesas = Mesa.objects.bulk_create([Mesa(lugares=4, existe_reserva=True) for _ in range(MESAS)])
+    Booking.objects.bulk_create([
+        Booking(
+            mesa=mesas[i % MESAS],
+            name='Maria João',
+            phone=f'91{i:07d}',
+            date=date(2030, 1, 1) + timedelta(days=i % 16),
+            start_time=time(8 + i % 15, 30),
+            end_time=time(9 + i % 15, 45),
+            number_of_guests=i % 4 + 1,
+            notes='',
+        )
+        for i in range(BOOKINGS)
+    ], batch_size=1000)
+
+
+def _admin_before():
+    data = []
+    for booking in Booking.objects.all():
+        data.append({
+            "id": booking.id,
+            "mesa": booking.mesa.id,
+            "name": booking.name,
+            "phone": booking.phone,
+            "date": booking.date,
+            "start_time": booking.start_time,
+            "end_time": booking.end_time,
+            "number_of_guests": booking.number_of_guests,
+            "notes": booking.notes
+        })
+    return data
+
+
+def _public_before():
+    data = []
+    for booking in Booking.objects.filter(mesa__existe_reserva=True):
+        data.append({
+            "mesa": booking.mesa.id,
+            "date": booking.date,
+            "end_time": booking.end_time
+        })
+    return data
+
+
+def _admin_after():
+    return _project(Booking.objects.all(), list(BOOKING_ADMIN_FIELDS), BOOKING_ADMIN_FIELDS)
+
+
+def _public_after():
+    queryset = Booking.objects.filter(mesa__existe_reserva=True)
+    return _project(queryset, list(BOOKING_PUBLIC_FIELDS), BOOKING_PUBLIC_FIELDS)
+
+
+def _public_sparse():
+    queryset = Booking.objects.filter(mesa__existe_reserva=True)
+    return _project(queryset, ['mesa', 'date'], BOOKING_PUBLIC_FIELDS)
+
+
+def _profile(func):
+    """Devolve (tempo em ms, pico de memória em KiB, número de queries)."""
+    started = timer.perf_counter()
+    func()
+    elapsed = (timer.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queries = []
+    with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+        func()
+
+    return elapsed, peak / 1024, len(queries)
+
+
+def main():
+    with test_database():
+        _seed()
+
+        variants = [
+            ('admin (antes)', _admin_before),
+            ('admin (values_list)', _admin_after),
+            ('público (antes)', _public_before),
+            ('público (values_list)', _public_after),
+            ('público ?fields=mesa,date', _public_sparse),
+        ]
+
+        rows = []
+        for label, func in variants:
+            func()  # aquecimento
+            elapsed, peak, queries = _profile(func)
+            rows.append([label, f'{elapsed:.1f}', f'{peak:.0f}', queries])
+
+    print(f'Serialização de {BOOKINGS} reservas\n')
+    print_table(['Variante', 'Tempo (ms)', 'Pico de memória (KiB)', 'Queries'], rows)
+
+
+if __name__ == '__main__':
+    main()
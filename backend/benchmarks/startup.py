@@ -0,0 +1,131 @@
+"""
+startup.py
+
+Compara o arranque do servidor de desenvolvimento usado originalmente no container
+(migrate + runserver_plus) com o servidor de produção (gunicorn com preload_app).
+
+Para cada servidor mede:
+    - tempo até à primeira resposta 200 de /api/mesas/list/;
+    - memória (PSS, que divide as páginas partilhadas copy-on-write entre os processos)
+      total e por worker.
+
+A base de dados de desenvolvimento é copiada para um ficheiro temporário, para que os
+servidores não a alterem. O primeiro servidor aplica as migrações a essa cópia, que o
+gunicorn apenas verifica no arranque. Com vários workers, o gunicorn exige uma cache
+partilhada: é usada uma tabela de cache (DJANGO_CACHE_TABLE) na mesma cópia, como na
+imagem Docker.
+
+Execução (a partir da pasta 'backend'; requer Linux para ler /proc):
+    python -m benchmarks.startup
+"""
+
+import os
+import shutil
+import signal
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from benchmarks import print_table
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PORT = 8765
+URL_PATH = '/api/mesas/list/'
+STARTUP_TIMEOUT = 60
+CACHE_TABLE = 'django_cache'
+
+
+def _process_tree(pid):
+    """Devolve o pid indicado e todos os seus descendentes."""
+    pids = [pid]
+    for task in Path(f'/proc/{pid}/task').iterdir():
+        children = (task / 'children').read_text().split()
+        for child in children:
+            pids.extend(_process_tree(int(child)))
+    return pids
+
+
+def _pss_kib(pid):
+    """Memória PSS (KiB) de um processo."""
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+        if line.startswith('Pss:'):
+            return int(line.split()[1])
+    return 0
+
+
+def _wait_first_response(url, started):
+    """Aguarda pela primeira resposta 200 e devolve o tempo decorrido (segundos)."""
+    context = ssl._create_unverified_context()
+    while time.perf_counter() - started < STARTUP_TIMEOUT:
+        try:
+            with urllib.request.urlopen(url, timeout=1, context=context) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.02)
+    raise TimeoutError(f'O servidor não respondeu em {STARTUP_TIMEOUT}s ({url}).')
+
+
+def _run(label, command, scheme, env):
+    """Arranca um servidor, mede o arranque e a memória e termina-o."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env, shell=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    try:
+        first_request = _wait_first_response(f'{scheme}://127.0.0.1:{PORT}{URL_PATH}', started)
+        time.sleep(0.5)
+
+        pids = [pid for pid in _process_tree(process.pid) if pid != process.pid]
+        pss = {pid: _pss_kib(pid) for pid in pids}
+        server_pid = min(pids)
+        workers = [pid for pid in pids if pid != server_pid] or [server_pid]
+        per_worker = sum(pss[pid] for pid in workers) / len(workers)
+
+        return [label, f'{first_request:.2f}', len(workers), f'{sum(pss.values()) / 1024:.1f}', f'{per_worker / 1024:.1f}']
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    try:
+        database = Path(workdir) / 'db.sqlite3'
+        shutil.copy(BACKEND_DIR / 'data' / 'db.sqlite3', database)
+        base_env = {**os.environ, 'DJANGO_DB_PATH': str(database)}
+        base_env.pop('DJANGO_REDIS_URL', None)
+        python = sys.executable
+        cache_env = {**base_env, 'DJANGO_CACHE_TABLE': CACHE_TABLE, 'DJANGO_DEBUG': '0'}
+        subprocess.run(
+            [python, 'manage.py', 'createcachetable'], cwd=BACKEND_DIR, env=cache_env, check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+        before = _run(
+            'migrate + runserver_plus',
+            f'{python} manage.py migrate --noinput && {python} manage.py runserver_plus '
+            f'--cert-file certs/dev-cert.pem --key-file certs/dev-key.pem 127.0.0.1:{PORT}',
+            'https',
+            {**base_env, 'DJANGO_DEBUG': '1'},
+        )
+        after = _run(
+            'gunicorn (preload_app)',
+            f'{python} -m gunicorn -c gunicorn.conf.py core.wsgi:application --bind 127.0.0.1:{PORT}',
+            'http',
+            cache_env,
+        )
+    finally:
+        shutil.rmtree(workdir)
+
+    print('Arranque do servidor até à primeira resposta\n')
+    print_table(['Servidor', 'Primeira resposta (s)', 'Workers', 'PSS total (MiB)', 'PSS/worker (MiB)'], [before, after])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+stream.py
+
+Teste de carga do endpoint Server-Sent Events (/api/stream/), executado dentro do
+próprio processo: os clientes são ligações ASGI simuladas, entregues diretamente à
+aplicação de core/asgi.py (sem sockets nem servidor HTTP).
+
+Para cada número de clientes ligados e inativos mede:
+    - memória alocada por ligação (tracemalloc, nas últimas 100 ligações), incluindo a
+      tarefa ASGI do Django;
+    - CPU consumido pelo processo enquanto as ligações estão inativas (com heartbeats);
+    - latência até todas as ligações receberem um evento publicado.
+
+Execução (a partir da pasta 'backend'):
+    python -m benchmarks.stream
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks import print_table
+
+from core.asgi import application
+
+from api import events
+from api.events import broker
+
+CLIENTS = (100, 1000, 5000)
+SAMPLE = 100
+IDLE_SECONDS = 5
+HEARTBEAT_INTERVAL = 1
+
+
+class _Client:
+    """Ligação HTTP simulada: regista os chunks recebidos e desliga-se quando pedido."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.received = 0
+        self.waiting_for = None
+        self.disconnect = asyncio.Event()
+        self.requested = False
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            assert message['status'] == 200, message['status']
+        elif message.get('body'):
+            self.received += 1
+            if self.received == 1:
+                self.started.set()
+            elif self.waiting_for is not None and message['body'].startswith(b'data:'):
+                self.waiting_for.set_result(time.perf_counter())
+                self.waiting_for = None
+
+
+def _scope():
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': '/api/stream/',
+        'raw_path': b'/api/stream/',
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 8000),
+    }
+
+
+async def _run(count):
+    loop = asyncio.get_running_loop()
+    clients = [_Client() for _ in range(count)]
+
+    async def connect(batch):
+        tasks = [asyncio.create_task(application(_scope(), c.receive, c.send)) for c in batch]
+        await asyncio.gather(*(c.started.wait() for c in batch))
+        return tasks
+
+    # O tracemalloc torna as ligações muito mais lentas: apenas as últimas SAMPLE são medidas
+    tasks = await connect(clients[:-SAMPLE])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks += await connect(clients[-SAMPLE:])
+    per_client = (tracemalloc.get_traced_memory()[0] - before) / SAMPLE
+    tracemalloc.stop()
+    assert broker.subscriber_count == count
+
+    # Ligações inativas: apenas heartbeats
+    cpu_started = time.process_time()
+    await asyncio.sleep(IDLE_SECONDS)
+    idle_cpu = (time.process_time() - cpu_started) / IDLE_SECONDS * 100
+
+    # Fan-out de um evento para todas as ligações
+    for client in clients:
+        client.waiting_for = loop.create_future()
+    published = time.perf_counter()
+    broker.publish(b'{"type":"booking.created","mesa":1}')
+    delivered = await asyncio.gather(*(c.waiting_for for c in clients))
+    latency = (max(delivered) - published) * 1000
+
+    for client in clients:
+        client.disconnect.set()
+    await asyncio.gather(*tasks)
+    assert broker.subscriber_count == 0
+
+    return per_client / 1024, idle_cpu, latency
+
+
+async def _run_all():
+    # Um único event loop, como num worker ASGI
+    rows = []
+    for count in CLIENTS:
+        per_client, idle_cpu, latency = await _run(count)
+        rows.append([count, f'{per_client:.1f}', f'{idle_cpu:.1f}', f'{latency:.1f}'])
+    return rows
+
+
+def main():
+    events.EVENTS_HEARTBEAT_INTERVAL = HEARTBEAT_INTERVAL
+    rows = asyncio.run(_run_all())
+
+    print(f'Ligações SSE inativas (heartbeat a cada {HEARTBEAT_INTERVAL}s, {IDLE_SECONDS}s de medição)\n')
+    print_table(['Clientes', 'Memória/ligação (KiB)', 'CPU inativo (%)', 'Fan-out (ms)'], rows)
+
+
+if __name__ == '__main__':
+    main()
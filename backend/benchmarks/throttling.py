@@ -0,0 +1,77 @@
+"""
+throttling.py
+
+Compara o custo por pedido dos throttles do DRF (UserRateThrottle/AnonRateThrottle,
+lista de timestamps por cliente) com o TokenBucketThrottle (estado O(1) por cliente).
+
+Para cada taxa N/dia são executados N pedidos consecutivos do mesmo cliente, todos
+permitidos, de modo que o histórico do SimpleRateThrottle cresce de 0 até N entradas.
+
+Execução (a partir da pasta 'backend'):
+    python -m benchmarks.throttling
+"""
+
+from types import SimpleNamespace
+
+from benchmarks import measure, print_table
+
+from django.core.cache import cache
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from api.throttling import TokenBucketThrottle
+
+# Taxas testadas (pedidos por dia), isto é, tamanho máximo do histórico do SimpleRateThrottle
+RATES = [10, 100, 1000, 5000]
+
+
+def _request(authenticated):
+    """Cria um pedido mínimo com os atributos usados pelos throttles."""
+    user = SimpleNamespace(is_authenticated=authenticated, pk=1)
+    return SimpleNamespace(user=user, META={'REMOTE_ADDR': '127.0.0.1'})
+
+
+def _throttle(base, rate, scope):
+    """Cria uma instância de 'base' com taxa fixa (independente das settings)."""
+    return type(base.__name__, (base,), {'rate': rate, 'scope': scope})()
+
+
+def _run(base, rate, authenticated):
+    """Mede o tempo médio por pedido para N pedidos consecutivos do mesmo cliente."""
+    cache.clear()
+    num_requests = int(rate.split('/')[0])
+    throttle = _throttle(base, rate, 'bench')
+    request = _request(authenticated)
+
+    def call():
+        assert throttle.allow_request(request, None)
+
+    return measure(call, num_requests)
+
+
+def main():
+    # Aquecimento (importações e inicialização da cache)
+    _run(TokenBucketThrottle, '10/day', authenticated=True)
+
+    rows = []
+    for num in RATES:
+        rate = f'{num}/day'
+        user = _run(UserRateThrottle, rate, authenticated=True)
+        anon = _run(AnonRateThrottle, rate, authenticated=False)
+        bucket_user = _run(TokenBucketThrottle, rate, authenticated=True)
+        bucket_anon = _run(TokenBucketThrottle, rate, authenticated=False)
+        rows.append([
+            rate,
+            f'{user:.1f}', f'{anon:.1f}',
+            f'{bucket_user:.1f}', f'{bucket_anon:.1f}',
+            f'{user / bucket_user:.1f}x',
+        ])
+
+    print('Custo médio por pedido (µs) -- N pedidos permitidos do mesmo cliente\n')
+    print_table(
+        ['Taxa', 'UserRate', 'AnonRate', 'Bucket (user)', 'Bucket (anon)', 'Ganho (user)'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
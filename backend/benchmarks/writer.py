@@ -0,0 +1,127 @@
+"""
+writer.py
+
+Compara a criação concorrente de reservas (POST /api/bookings/create/) com e sem o
+coordenador de escritas (api/writer.py), numa base de dados SQLite em ficheiro (com
+fsync em cada COMMIT, como em produção).
+
+Para cada número de threads (pedidos simultâneos) mede o débito, a latência (mediana
+e p99), os pedidos falhados (ex.: "database is locked") e o número médio de operações
+por transação.
+
+O ganho depende do custo do fsync no disco usado: indique uma diretoria no disco de
+produção para medir nas mesmas condições (por defeito, uma diretoria temporária).
+
+Execução (a partir da pasta 'backend'):
+    python -m benchmarks.writer [diretoria]
+"""
+
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks import print_table, test_database
+
+from django.db import connection, connections
+from django.test import Client
+
+from api import writer
+from api.models import Booking, Mesa
+
+THREADS = (1, 8, 32)
+REQUESTS_PER_THREAD = 40
+MESAS = 40
+
+
+def _request_data(index):
+    """Dados de uma reserva; cada pedido numa data e hora diferentes (há sempre mesa livre)."""
+    day = date.today() + timedelta(days=7 + index // 8)
+    if day.weekday() == 6:
+        day += timedelta(days=1)
+    return {
+        'name': 'Cliente',
+        'phone': f'91{index:07d}',
+        'date': day.isoformat(),
+        'time': f'{10 + index % 8}:00',
+        'number_of_guests': '2',
+    }
+
+
+def _run(threads):
+    """Executa REQUESTS_PER_THREAD pedidos em cada uma de 'threads' threads simultâneas."""
+    latencies, failures = [], []
+    start_barrier = threading.Barrier(threads)
+
+    def client_thread(number):
+        client = Client(raise_request_exception=False)
+        start_barrier.wait()
+        for i in range(REQUESTS_PER_THREAD):
+            index = number * REQUESTS_PER_THREAD + i
+            started = time.perf_counter()
+            response = client.post(
+                '/api/bookings/create/', _request_data(index),
+                content_type='application/json',
+                HTTP_HOST='localhost',
+                REMOTE_ADDR=f'10.0.{index // 256}.{index % 256}',  # Um IP por pedido (sem rate limiting)
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                failures.append(response.status_code)
+        connections.close_all()
+
+    workers = [threading.Thread(target=client_thread, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started, latencies, failures
+
+
+def main():
+    with tempfile.TemporaryDirectory(dir=sys.argv[1] if len(sys.argv) > 1 else None) as directory:
+        # Base de dados de teste em ficheiro (por defeito, o SQLite de teste fica em memória)
+        connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'benchmark.sqlite3')
+
+        with test_database():
+            Mesa.objects.bulk_create([Mesa(lugares=2 + 2 * (i % 4)) for i in range(MESAS)])
+            connection.close()
+
+            rows = []
+            for threads in THREADS:
+                for enabled in (False, True):
+                    Booking.objects.all().delete()
+                    connection.close()
+
+                    writer.WRITER_ENABLED = enabled
+                    coordinator = writer.get_coordinator('default')
+                    batches, operations = coordinator.batches, coordinator.operations
+
+                    elapsed, latencies, failures = _run(threads)
+                    requests = len(latencies)
+                    batches = coordinator.batches - batches
+                    operations = coordinator.operations - operations
+
+                    rows.append([
+                        threads,
+                        'coordenador' if enabled else 'direto',
+                        f'{requests / elapsed:.0f}',
+                        f'{statistics.median(latencies) * 1000:.1f}',
+                        f'{sorted(latencies)[int(requests * 0.99) - 1] * 1000:.1f}',
+                        len(failures),
+                        f'{operations / batches:.1f}' if enabled and batches else '-',
+                    ])
+
+    print(f'{REQUESTS_PER_THREAD} pedidos por thread, SQLite em ficheiro\n')
+    print_table(
+        ['Threads', 'Escritas', 'Pedidos/s', 'Latência p50 (ms)', 'Latência p99 (ms)', 'Falhados', 'Operações/transação'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
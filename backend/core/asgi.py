@@ -3,6 +3,15 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The real-time endpoint (/api/stream/, Server-Sent Events) is asynchronous and
+is only served through this application, in its own process, e.g.:
+
+    uvicorn core.asgi:application --port 8001 --workers 4
+
+The WSGI server (gunicorn, core/wsgi.py) answers 501 for that endpoint, since each
+open connection would hold one of its threads. Set the same EVENTS_SOCKET_DIR for
+both servers so events published by writes reach every connection.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
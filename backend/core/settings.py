@@ -10,7 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,11 +23,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-xg3f%$4=u21^)m4(13hrs0jameqz61y)9nfm%pq6gdu1^7+r%@'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-xg3f%$4=u21^)m4(13hrs0jameqz61y)9nfm%pq6gdu1^7+r%@')
 
 # SECURITY WARNING: don't run with debug turned on in production!
 # Make DEBUG configurable via environment variable for development
-DEBUG = True # Set to True for development (Allows many features, one of which is static file serving for the Django admin panel)
+DEBUG = os.environ.get('DJANGO_DEBUG', '0') == '1' # Desativado por defeito; o desenvolvimento ativa-o com DJANGO_DEBUG=1 (ver docker-compose.yml)
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'backend', '0.0.0.0']
 
@@ -41,12 +44,20 @@ INSTALLED_APPS = [
     'api', # Connect the api app to the core project
     'rest_framework', # Django REST framework
     'corsheaders', # CORS headers
-    'django_extensions', # Django extensions for development (HTTPS server)
 ]
 
+# Apps apenas de desenvolvimento (não são carregadas em produção)
+if DEBUG:
+    INSTALLED_APPS += [
+        'django_extensions', # Django extensions for development (HTTPS server)
+    ]
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # CORS deve vir primeiro para garantir que cabeçalhos sejam adicionados em todas as respostas
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware', # Ficheiros estáticos (admin) servidos pelo próprio processo, antes das sessões
+    'api.middleware.CompressionMiddleware', # Compressão zstd/gzip das respostas da API
+    'api.middleware.LocationMiddleware', # Local (café) do pedido e respetiva base de dados
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,6 +66,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Perfil de pedidos individuais (api/profiling.py): desativado, o middleware não é instalado
+PROFILING_ENABLED = os.environ.get('DJANGO_PROFILING', '0') == '1'
+if PROFILING_ENABLED:
+    MIDDLEWARE.append('api.middleware.ProfilingMiddleware') # Depois da autenticação (cabeçalho X-Profile apenas para administradores)
+
+# Registo anonimizado do tráfego da API (api/capture.py): desativado, o middleware não é instalado
+CAPTURE_ENABLED = os.environ.get('DJANGO_CAPTURE', '0') == '1'
+if CAPTURE_ENABLED:
+    MIDDLEWARE.append('api.middleware.CaptureMiddleware') # Depois da autenticação (tipo de cliente do pedido)
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -81,6 +102,7 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_AGE = 7200  # 2 horas
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Expirar sessão quando o browser fecha
 SESSION_SAVE_EVERY_REQUEST = True # Salvar sessão a cada request (True) ou apenas quando modificada (False)
+SESSION_ENGINE = 'api.sessions' # Sessões em base de dados, gravadas pelo coordenador de escritas (api/writer.py)
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -88,10 +110,56 @@ SESSION_SAVE_EVERY_REQUEST = True # Salvar sessão a cada request (True) ou apen
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'data' / 'db.sqlite3', # Banco de dados dentro do diretório data
+        'NAME': os.environ.get('DJANGO_DB_PATH', BASE_DIR / 'data' / 'db.sqlite3'), # Banco de dados dentro do diretório data
     }
 }
 
+# Locais (cafés) - cada local tem as mesas e reservas numa base de dados própria (shard)
+# O local principal usa a base de dados 'default', que guarda também os dados partilhados
+# (utilizadores, sessões, chaves de idempotência). Locais adicionais são definidos em
+# DJANGO_LOCATIONS, ex.: "baixa:Café Couraça Baixa,foz:Café Couraça Foz", cada um com o
+# seu ficheiro SQLite em DJANGO_LOCATIONS_DIR. Em PostgreSQL, cada alias pode apontar para
+# a mesma base de dados com um schema próprio (OPTIONS: {'options': '-c search_path=<local>'}).
+DEFAULT_LOCATION = 'principal'
+LOCATIONS = {
+    DEFAULT_LOCATION: {'name': os.environ.get('DJANGO_DEFAULT_LOCATION_NAME', 'Café Couraça'), 'database': 'default'},
+}
+LOCATIONS_DIR = Path(os.environ.get('DJANGO_LOCATIONS_DIR', BASE_DIR / 'data'))
+
+for _entry in filter(None, os.environ.get('DJANGO_LOCATIONS', '').split(',')):
+    _slug, _, _name = _entry.strip().partition(':')
+    LOCATIONS[_slug] = {'name': _name or _slug, 'database': f'location_{_slug}'}
+    DATABASES[f'location_{_slug}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': LOCATIONS_DIR / f'location_{_slug}.sqlite3',
+    }
+
+# Testes: o runner (core/testing.py) acrescenta este local, com base de dados própria (em memória),
+# para que o encaminhamento dos modelos de cada local seja coberto pelos testes
+TEST_RUNNER = 'core.testing.TestRunner'
+TEST_LOCATION = 'teste'
+
+# SQLite: as transações começam com BEGIN IMMEDIATE (bloqueio de escrita obtido no início).
+# Com o BEGIN habitual (DEFERRED), uma transação que lê e depois escreve falha de imediato com
+# "database is locked" quando outro processo (ex.: o coordenador de escritas de outro worker do
+# gunicorn) está a escrever, sem esperar pelo 'timeout'; com IMMEDIATE, espera pelo bloqueio.
+for _database in DATABASES.values():
+    if _database['ENGINE'] == 'django.db.backends.sqlite3':
+        _database.setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
+
+DATABASE_ROUTERS = ['api.locations.LocationRouter']
+
+# Cache partilhada pelos workers do gunicorn (holds, rate limiting, horários e ocupação das mesas):
+# Redis com DJANGO_REDIS_URL ou, em alternativa, uma tabela da base de dados principal com
+# DJANGO_CACHE_TABLE (criada com 'python manage.py createcachetable'). Sem nenhum dos dois, cada
+# processo tem a sua cache em memória e o gunicorn recusa arrancar com mais de um worker.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['DJANGO_REDIS_URL']}}
+elif os.environ.get('DJANGO_CACHE_TABLE'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': os.environ['DJANGO_CACHE_TABLE']}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -113,19 +181,28 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Django REST Framework configuration:
 REST_FRAMEWORK = {
+    # JSON com orjson por defeito; MessagePack com 'Accept: application/msgpack' (se instalado)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
+        'api.tokens.StaffTokenAuthentication',  # tokens assinados dos dispositivos (Authorization: Bearer)
+        'rest_framework.authentication.SessionAuthentication',  # browser (painel e frontend)
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'api.throttling.PublicReadThrottle',
     ],
+    # Taxas dos baldes de tokens (api/throttling.py): capacidade/período, reabastecimento contínuo
     'DEFAULT_THROTTLE_RATES': {
-        'user': '15/minute',  # usuários autenticados
-        'anon': '10/minute',  # usuários anônimos
+        'bookings_write': '10/minute',  # criação de reservas
+        'public_read': '60/minute',  # leituras públicas (mesas e reservas)
+        'admin': '120/minute',  # endpoints de gestão (administradores)
+        'login': '10/minute',  # tentativas de login
     }
 }
 
@@ -150,6 +227,23 @@ STATIC_URL = '/static/'
 # Where collectstatic will put files (useful for production or WhiteNoise)
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Em produção, o collectstatic (executado no build da imagem) gera nomes com hash do conteúdo
+# e variantes gzip/brotli pré-comprimidas. O WhiteNoise serve-as com cabeçalhos de cache
+# "immutable" de longa duração, através de FileResponse (enviado com sendfile pelo gunicorn);
+# em desenvolvimento, os ficheiros são servidos a partir das apps.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Ficheiros sem hash no nome (ex.: referenciados diretamente) ficam em cache durante 1 hora
+WHITENOISE_MAX_AGE = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -166,9 +260,51 @@ CORS_ALLOWED_ORIGINS = [
 # Permitir cookies de sessão entre domínios (necessário para autenticação)
 CORS_ALLOW_CREDENTIALS = True
 
+# Permitir o cabeçalho Idempotency-Key nos pedidos do frontend
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-location', 'x-profile')
+
 # CSRF Trusted Origins (Necessário para requests autenticadas do painel admin do Django exposto via reverse proxy do frontend)
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:5173',
     'http://127.0.0.1:5173',
     'http://frontend:5173',   # Frontend via Docker Compose
 ]
+
+# Idempotência dos endpoints mutáveis (cabeçalho Idempotency-Key)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # Tempo de vida das respostas armazenadas (segundos)
+IDEMPOTENCY_WAIT_TIMEOUT = 10  # Tempo máximo de espera por um pedido concorrente com a mesma chave (segundos)
+
+# Compressão das respostas da API (api/middleware.py)
+API_COMPRESSION_MIN_SIZE = 1024  # Respostas menores do que este tamanho (bytes) não são comprimidas
+
+# Eventos em tempo real (api/events.py, endpoint /api/stream/ servido por core/asgi.py)
+EVENTS_SOCKET_DIR = os.environ.get('EVENTS_SOCKET_DIR') or None  # Diretoria dos sockets de difusão entre workers
+EVENTS_HEARTBEAT_INTERVAL = 15  # Intervalo entre heartbeats das ligações inativas (segundos)
+EVENTS_MAX_SUBSCRIBERS = 10000  # Número máximo de ligações abertas por processo
+
+# Registo incremental de alterações (api/changes.py, endpoint /api/changes/?since=<seq>)
+CHANGES_TOMBSTONE_TTL = 30 * 24 * 60 * 60  # Tempo durante o qual as remoções são mantidas (segundos)
+CHANGES_PAGE_SIZE = 500  # Número máximo de reservas, mesas e remoções devolvidas por pedido
+
+# Perfil de pedidos individuais (api/profiling.py, ativado com DJANGO_PROFILING=1)
+PROFILING_DIR = Path(os.environ.get('DJANGO_PROFILING_DIR', BASE_DIR / 'data' / 'profiles'))  # Diretoria dos perfis
+PROFILING_MAX_PROFILES = 50  # Número de perfis mantidos (os mais antigos são removidos)
+PROFILING_SAMPLE_RATE = float(os.environ.get('DJANGO_PROFILING_SAMPLE_RATE', 0))  # Fração dos pedidos analisados sem o cabeçalho X-Profile
+PROFILING_INTERVAL = 0.005  # Intervalo entre amostras das pilhas de chamadas (segundos)
+
+# Registo do tráfego da API para reprodução (api/capture.py, ativado com DJANGO_CAPTURE=1)
+CAPTURE_DIR = Path(os.environ.get('DJANGO_CAPTURE_DIR', BASE_DIR / 'data' / 'captures'))  # Diretoria dos ficheiros de registo (um por processo)
+CAPTURE_FLUSH_RECORDS = 256  # Registos por bloco comprimido
+CAPTURE_FLUSH_INTERVAL = 5  # Intervalo máximo entre gravações (segundos)
+
+# Registo das queries lentas com o plano de execução (api/slowqueries.py, ativado com DJANGO_SLOW_QUERIES=1)
+SLOW_QUERY_ENABLED = os.environ.get('DJANGO_SLOW_QUERIES', '0') == '1'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('DJANGO_SLOW_QUERY_MS', 100))  # Duração a partir da qual uma query é registada (milissegundos)
+SLOW_QUERY_LOG = Path(os.environ.get('DJANGO_SLOW_QUERY_LOG', BASE_DIR / 'data' / 'slow_queries.jsonl'))  # Ficheiro de registo (JSON, uma query por linha; um ficheiro por processo, com o PID no nome)
+SLOW_QUERY_MAX_BYTES = 5 * 1024 * 1024  # Tamanho máximo de cada ficheiro antes da rotação (bytes)
+SLOW_QUERY_BACKUPS = 3  # Número de ficheiros antigos mantidos
+SLOW_QUERY_RETENTION_DAYS = 7  # Dias sem alterações ao fim dos quais os ficheiros de processos terminados são removidos
+
+# Coordenador de escritas com group commit (api/writer.py)
+WRITER_ENABLED = os.environ.get('DJANGO_WRITER', '1') == '1'  # Escritas de reservas e sessões agrupadas por uma thread por base de dados
+WRITER_MAX_BATCH = 64  # Número máximo de operações por transação
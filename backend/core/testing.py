@@ -0,0 +1,63 @@
+"""
+testing.py
+
+Runner dos testes ('python manage.py test'), configurado em settings.TEST_RUNNER.
+
+Antes de os módulos de teste serem importados, acrescenta um local adicional
+(settings.TEST_LOCATION) com base de dados própria, para que o encaminhamento dos
+modelos de cada local (api/locations.py) seja coberto pelos testes. Os ficheiros
+estáticos usam o storage sem manifest, para que as páginas do admin sejam geradas sem
+executar o collectstatic. Fora dos testes as definições não são alteradas.
+"""
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner com o local de teste (settings.TEST_LOCATION).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        add_test_location()
+        # Com DEBUG desativado, o storage de produção exige o manifest gerado pelo collectstatic
+        self._static_storage = override_settings(STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        self._static_storage.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._static_storage.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def add_test_location(location=None):
+    """
+    Acrescenta um local com base de dados SQLite própria às definições atuais.
+
+    O dicionário settings.LOCATIONS é alterado no próprio objeto (partilhado com
+    api/locations.py) e a base de dados é registada nas ligações do Django, que a criam
+    (em memória) com as restantes bases de dados de teste.
+
+    Args:
+        location (str | None): Identificador do local (settings.TEST_LOCATION, se None).
+    """
+    location = location or settings.TEST_LOCATION
+    if location in settings.LOCATIONS:
+        return
+
+    alias = f'location_{location}'
+    database = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': settings.LOCATIONS_DIR / f'{alias}.sqlite3',
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+    }
+    settings.DATABASES[alias] = database
+    # Valores por defeito das restantes chaves (ATOMIC_REQUESTS, TEST, ...), como nas bases de dados configuradas
+    connections.configure_settings(settings.DATABASES)
+    settings.LOCATIONS[location] = {'name': 'Local de Teste', 'database': alias}
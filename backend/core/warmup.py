@@ -0,0 +1,104 @@
+"""
+warmup.py
+
+Preparação da aplicação no processo principal do servidor de produção, antes da criação
+dos workers (ver gunicorn.conf.py).
+
+Tudo o que é carregado aqui (módulos, URLconf, templates do admin) fica em memória
+partilhada copy-on-write pelos workers, que arrancam prontos a responder sem repetir
+este trabalho no primeiro pedido.
+"""
+
+import gc
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+# Templates do painel administrativo pré-carregados (com o cached loader, quando DEBUG=False)
+ADMIN_TEMPLATES = [
+    'admin/base_site.html',
+    'admin/index.html',
+    'admin/login.html',
+    'admin/change_list.html',
+    'admin/change_form.html',
+    'admin/delete_confirmation.html',
+]
+
+# Backends de cache sem estado partilhado entre processos
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache(workers):
+    """
+    Verifica se a cache é partilhada pelos workers.
+
+    Os holds, o rate limiting e a versão dos horários de cada local são guardados na cache:
+    com uma cache por processo, cada worker teria a sua cópia (ex.: um hold não seria visto
+    pelos pedidos atendidos pelos restantes workers).
+
+    Args:
+        workers (int): Número de processos do servidor.
+
+    Raises:
+        ImproperlyConfigured: Se existir mais de um worker e a cache não for partilhada.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if workers > 1 and backend in PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f"A cache '{backend}' não é partilhada entre processos e o servidor tem {workers} workers. Defina DJANGO_REDIS_URL (ou DJANGO_CACHE_TABLE) ou GUNICORN_WORKERS=1."
+        )
+
+
+def check_migrations(database='default'):
+    """
+    Verifica, sem as executar, se existem migrações por aplicar.
+
+    Args:
+        database (str): Alias da base de dados a verificar.
+
+    Raises:
+        ImproperlyConfigured: Se existirem migrações por aplicar.
+    """
+    connection = connections[database]
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    if plan:
+        pending = ', '.join(f'{migration.app_label}.{migration.name}' for migration, _ in plan)
+        raise ImproperlyConfigured(
+            f"Existem migrações por aplicar na base de dados '{database}' ({pending}). Execute 'python manage.py migrate_locations' antes de iniciar o servidor."
+        )
+
+
+def warm_up():
+    """
+    Carrega a aplicação e liberta os recursos que não podem ser partilhados entre processos.
+
+    Deve ser chamada no processo principal, depois de a aplicação WSGI ser importada e
+    antes de os workers serem criados.
+    """
+    # Compila todas as rotas (URLconf e views, incluindo o admin)
+    get_resolver().url_patterns
+
+    # Compila os templates do admin
+    for template_name in ADMIN_TEMPLATES:
+        try:
+            get_template(template_name)
+        except TemplateDoesNotExist:
+            pass
+
+    # Ligações à base de dados não podem ser partilhadas entre processos
+    connections.close_all()
+
+    # Move os objetos já criados para uma geração permanente, evitando que o garbage
+    # collector dos workers lhes toque (o que anularia a partilha copy-on-write)
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,74 @@
+# ================================================================================================
+# CONFIGURAÇÃO DO SERVIDOR DE PRODUÇÃO - Gunicorn
+# ================================================================================================
+# Utilização (a partir da pasta 'backend'):
+#     gunicorn -c gunicorn.conf.py core.wsgi:application
+#
+# A aplicação é importada e preparada uma única vez no processo principal (preload_app)
+# antes da criação dos workers, que a partilham em memória copy-on-write. As migrações
+# são verificadas, mas não executadas, no arranque.
+
+import multiprocessing
+import os
+import sys
+
+# ------------------------------------------------------------------------------------------------
+# REDE
+# ------------------------------------------------------------------------------------------------
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# TLS opcional (em produção, normalmente terminado num reverse proxy)
+certfile = os.environ.get('GUNICORN_CERTFILE') or None
+keyfile = os.environ.get('GUNICORN_KEYFILE') or None
+
+# ------------------------------------------------------------------------------------------------
+# WORKERS
+# ------------------------------------------------------------------------------------------------
+# Processos: 2 por CPU + 1; threads por processo para sobrepor esperas de I/O (base de dados)
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Importa e prepara a aplicação antes do fork (copy-on-write)
+preload_app = True
+
+# Recicla workers periodicamente (com variação aleatória para não reiniciarem em simultâneo)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# ------------------------------------------------------------------------------------------------
+# LOGGING
+# ------------------------------------------------------------------------------------------------
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+# ------------------------------------------------------------------------------------------------
+# HOOKS
+# ------------------------------------------------------------------------------------------------
+
+def when_ready(server):
+    """
+    Executado no processo principal depois de a aplicação ser carregada e antes do fork.
+
+    Verifica a cache e as migrações e prepara a aplicação (ver core/warmup.py).
+    """
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+    from core.warmup import check_migrations, check_shared_cache, warm_up
+
+    try:
+        check_shared_cache(workers)
+        # Base de dados 'default' e bases de dados dos locais
+        for database in settings.DATABASES:
+            check_migrations(database)
+    except ImproperlyConfigured as e:
+        server.log.error(str(e))
+        sys.exit(1)
+
+    warm_up()
+    server.log.info('Aplicação preparada: %s workers x %s threads', workers, threads)
@@ -69,6 +69,55 @@ async function create_booking(name, phone, date, time, number_of_guests, notes =
   }
 }
 
+// ================================================================================================
+// PEDIDOS AGREGADOS (vários endpoints num único pedido)
+// ================================================================================================
+
+async function batch(requests) {
+  if (!Array.isArray(requests) || requests.length === 0) {
+    console.error("Erro: Lista de pedidos vazia.");
+    return -1;
+  }
+  try {
+    const res = await fetch(`${BACKEND_URL}/api/batch/`, {
+      method: "POST",
+      credentials: "include",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ requests }),
+    });
+
+    if (!res.ok) {
+      return -1;
+    }
+
+    // Resultados indexados pelo 'id' de cada pedido
+    const data = await res.json();
+    return Object.fromEntries(data.responses.map((response) => [response.id, response]));
+  } catch (error) {
+    console.error("Erro:", error);
+    return -1;
+  }
+}
+
+// Mesas, reservas e estado da sessão (equivalente a list_mesas, view_bookings e admin_status)
+async function load_overview() {
+  const results = await batch([
+    { id: "mesas", path: "/api/mesas/list/" },
+    { id: "bookings", path: "/api/bookings/list/" },
+    { id: "status", path: "/api/admin/status/" },
+  ]);
+  if (results === -1) {
+    return -1;
+  }
+
+  const { mesas, bookings, status } = results;
+  return {
+    mesas: mesas.status === 200 ? mesas.body : -1,
+    bookings: bookings.status === 200 ? bookings.body : -1,
+    status: status.status === 200 ? { authenticated: true, ...status.body } : { authenticated: false },
+  };
+}
+
 // ================================================================================================
 // FUNÇÕES DE AUTENTICAÇÃO
 // ================================================================================================
@@ -222,6 +271,8 @@ export {
   list_mesas,
   view_bookings,
   create_booking,
+  batch,
+  load_overview,
   admin_login,
   admin_logout,
   admin_status,
@@ -5,6 +5,8 @@ import react from '@vitejs/plugin-react'
 // Em Docker: usa o nome do serviço 'backend'
 // Em desenvolvimento local: usa localhost
 const BACKEND_URL = process.env.VITE_API_URL || 'https://localhost:8000'; // Se fôr necessário modificar algum destes urls, modifique também em src/libraries/api.js para evitar erros
+// Servidor ASGI dos eventos em tempo real (/api/stream/)
+const EVENTS_URL = process.env.VITE_EVENTS_URL || 'https://localhost:8001';
 
 // https://vite.dev/config/
 export default defineConfig({
@@ -18,6 +20,12 @@ export default defineConfig({
       usePolling: true,  // Necessário para hot reload em containers Docker
     },
     proxy: {
+      // Eventos em tempo real (servidor ASGI); tem de ficar antes de '/api'
+      '/api/stream': {
+        target: EVENTS_URL,
+        changeOrigin: true,
+        secure: false,
+      },
       // Proxy para a API do Django
       '/api': {
         target: BACKEND_URL,